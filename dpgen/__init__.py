@@ -1,3 +1,5 @@
+import importlib.metadata
+import importlib.util
 import logging
 import os
 
@@ -46,12 +48,16 @@ def info():
         "paramiko",
         "custodian",
     ]:
-        try:
-            mm = __import__(modui)
-            print("%10s %10s   %s" % (modui, mm.__version__, mm.__path__[0]))  # noqa: UP031
-        except ImportError:
+        # the dependencies are not imported, which takes seconds
+        spec = importlib.util.find_spec(modui)
+        if spec is None:
             print("%10s %10s Not Found" % (modui, ""))  # noqa: UP031
-        except AttributeError:
+            continue
+        try:
+            version = importlib.metadata.version(modui)
+            path = spec.submodule_search_locations[0]
+            print("%10s %10s   %s" % (modui, version, path))  # noqa: UP031
+        except (importlib.metadata.PackageNotFoundError, TypeError, IndexError):
             print("%10s %10s unknown version or path" % (modui, ""))  # noqa: UP031
     print()
 
@@ -265,6 +265,8 @@ class EOS(Property):
                 )
                 # res_data[vol] = all_res[ii]['energy'] / len(all_res[ii]['force'])
                 # ptr_data += '%7.3f  %8.4f \n' % (vol, all_res[ii]['energy'] / len(all_res[ii]['force']))
+            if self.parameter.get("eos_fit", False):
+                ptr_data += self._fit_eos(output_file, res_data)
 
         else:
             if "init_data_path" not in self.parameter:
@@ -282,3 +284,27 @@ class EOS(Property):
             json.dump(res_data, fp, indent=4)
 
         return res_data, ptr_data
+
+    def _fit_eos(self, output_file, res_data):
+        """Fit the EOS forms to the volume-energy data.
+
+        The ranked forms are dumped to eos_fit.json next to the output file.
+        """
+        from dpgen.auto_test.lib.mfp_eosfit import fit_eos_batch
+
+        funcs = self.parameter["eos_fit"]
+        if funcs is True:
+            funcs = None
+        vols = sorted(res_data.keys())
+        table = fit_eos_batch([(vols, [res_data[vv] for vv in vols])], funcs)[0]
+        dumpfn(
+            table,
+            os.path.join(os.path.dirname(output_file), "eos_fit.json"),
+            indent=4,
+        )
+        ptr_data = " EOS         V0(A^3)  E0(eV)   B0(GPa)  residual\n"
+        for ii in table:
+            ptr_data += "{:10s}  {:7.3f}  {:8.4f}  {:7.2f}  {:.3e}\n".format(
+                ii["eos"], ii["v0"], ii["e0"], ii["b0"], ii["residual"]
+            )
+        return ptr_data
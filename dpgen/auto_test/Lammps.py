@@ -1,6 +1,7 @@
 import os
 import warnings
 
+import numpy as np
 from monty.serialization import dumpfn, loadfn
 
 import dpgen.auto_test.lib.lammps as lammps
@@ -296,135 +297,34 @@ class Lammps(Task):
         if not os.path.isfile(dump_lammps):
             warnings.warn("cannot find dump.relax in " + output_dir + " skip")
             return None
+        with open(log_lammps) as fp:
+            finished = "Total wall time:" in fp.read()
+        if not finished:
+            warnings.warn("lammps not finished " + log_lammps + " skip")
+            return None
         else:
-            box = []
-            coord = []
-            vol = []
-            energy = []
-            force = []
-            virial = []
-            stress = []
-            with open(dump_lammps) as fin:
-                dump = fin.read().split("\n")
-            dumptime = []
-            for idx, ii in enumerate(dump):
-                if ii == "ITEM: TIMESTEP":
-                    box.append([])
-                    coord.append([])
-                    force.append([])
-                    dumptime.append(int(dump[idx + 1]))
-                    natom = int(dump[idx + 3])
-                    xlo_bound = float(dump[idx + 5].split()[0])
-                    xhi_bound = float(dump[idx + 5].split()[1])
-                    xy = float(dump[idx + 5].split()[2])
-                    ylo_bound = float(dump[idx + 6].split()[0])
-                    yhi_bound = float(dump[idx + 6].split()[1])
-                    xz = float(dump[idx + 6].split()[2])
-                    zlo = float(dump[idx + 7].split()[0])
-                    zhi = float(dump[idx + 7].split()[1])
-                    yz = float(dump[idx + 7].split()[2])
-                    xx = (
-                        xhi_bound
-                        - max([0, xy, xz, xy + xz])
-                        - (xlo_bound - min([0, xy, xz, xy + xz]))
-                    )
-                    yy = yhi_bound - max([0, yz]) - (ylo_bound - min([0, yz]))
-                    zz = zhi - zlo
-                    box[-1].append([xx, 0.0, 0.0])
-                    box[-1].append([xy, yy, 0.0])
-                    box[-1].append([xz, yz, zz])
-                    vol.append(xx * yy * zz)
-                    type_list = []
-                    for jj in range(natom):
-                        type_list.append(int(dump[idx + 9 + jj].split()[1]) - 1)
-                        if "xs ys zs" in dump[idx + 8]:
-                            a_x = (
-                                float(dump[idx + 9 + jj].split()[2]) * xx
-                                + float(dump[idx + 9 + jj].split()[3]) * xy
-                                + float(dump[idx + 9 + jj].split()[4]) * xz
-                            )
-                            a_y = (
-                                float(dump[idx + 9 + jj].split()[3]) * yy
-                                + float(dump[idx + 9 + jj].split()[4]) * yz
-                            )
-                            a_z = float(dump[idx + 9 + jj].split()[4]) * zz
-                        else:
-                            a_x = float(dump[idx + 9 + jj].split()[2])
-                            a_y = float(dump[idx + 9 + jj].split()[3])
-                            a_z = float(dump[idx + 9 + jj].split()[4])
-                        coord[-1].append([a_x, a_y, a_z])
-                        fx = float(dump[idx + 9 + jj].split()[5])
-                        fy = float(dump[idx + 9 + jj].split()[6])
-                        fz = float(dump[idx + 9 + jj].split()[7])
-                        force[-1].append([fx, fy, fz])
-
-            with open(log_lammps) as fp:
-                if "Total wall time:" not in fp.read():
-                    warnings.warn("lammps not finished " + log_lammps + " skip")
-                    return None
-                else:
-                    fp.seek(0)
-                    lines = fp.read().split("\n")
-                    idid = -1
-                    for ii in dumptime:
-                        idid += 1
-                        for jj in lines:
-                            line = jj.split()
-                            if len(line) and str(ii) == line[0]:
-                                try:
-                                    [float(kk) for kk in line]
-                                except Exception:
-                                    continue
-                                stress.append([])
-                                virial.append([])
-                                energy.append(float(line[1]))
-                                # virials = stress * vol * 1e5 *1e-30 * 1e19/1.6021766208
-                                stress[-1].append(
-                                    [
-                                        float(line[2]) / 1000.0,
-                                        float(line[5]) / 1000.0,
-                                        float(line[6]) / 1000.0,
-                                    ]
-                                )
-                                stress[-1].append(
-                                    [
-                                        float(line[5]) / 1000.0,
-                                        float(line[3]) / 1000.0,
-                                        float(line[7]) / 1000.0,
-                                    ]
-                                )
-                                stress[-1].append(
-                                    [
-                                        float(line[6]) / 1000.0,
-                                        float(line[7]) / 1000.0,
-                                        float(line[4]) / 1000.0,
-                                    ]
-                                )
-                                stress_to_virial = (
-                                    vol[idid] * 1e5 * 1e-30 * 1e19 / 1.6021766208
-                                )
-                                virial[-1].append(
-                                    [
-                                        float(line[2]) * stress_to_virial,
-                                        float(line[5]) * stress_to_virial,
-                                        float(line[6]) * stress_to_virial,
-                                    ]
-                                )
-                                virial[-1].append(
-                                    [
-                                        float(line[5]) * stress_to_virial,
-                                        float(line[3]) * stress_to_virial,
-                                        float(line[7]) * stress_to_virial,
-                                    ]
-                                )
-                                virial[-1].append(
-                                    [
-                                        float(line[6]) * stress_to_virial,
-                                        float(line[7]) * stress_to_virial,
-                                        float(line[4]) * stress_to_virial,
-                                    ]
-                                )
-                                break
+            dumptime, type_list, box, coord, force = lammps.read_dump(dump_lammps)
+            thermo = lammps.read_thermo(log_lammps)
+            vol = np.prod(np.diagonal(box, axis1=1, axis2=2), axis=1)
+            # the frames without thermo output are skipped
+            found = np.array([str(ii) in thermo for ii in dumptime], dtype=bool)
+            thermo = np.array(
+                [thermo[str(ii)][:8] for ii in dumptime if str(ii) in thermo]
+            ).reshape(-1, 8)
+            energy = thermo[:, 1]
+            # pxx, pyy, pzz, pxy, pxz, pyz -> 3x3 tensor
+            pressure = thermo[:, [2, 5, 6, 5, 3, 7, 6, 7, 4]].reshape(-1, 3, 3)
+            stress = pressure / 1000.0
+            # virials = stress * vol * 1e5 *1e-30 * 1e19/1.6021766208
+            stress_to_virial = vol[found] * 1e5 * 1e-30 * 1e19 / 1.6021766208
+            virial = pressure * stress_to_virial[:, None, None]
+            type_list = type_list.tolist()
+            box = box.tolist()
+            coord = coord.tolist()
+            force = force.tolist()
+            energy = energy.tolist()
+            stress = stress.tolist()
+            virial = virial.tolist()
 
             _tmp = self.type_map
             dlog.debug(_tmp)
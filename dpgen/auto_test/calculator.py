@@ -1,6 +1,22 @@
+import functools
+import json
+import os
+from collections import defaultdict
+
+import dpdata
+import numpy as np
+from monty.json import MontyDecoder
+from monty.serialization import dumpfn, loadfn
+
+from dpgen import dlog
 from dpgen.auto_test.ABACUS import ABACUS
 from dpgen.auto_test.Lammps import Lammps
+from dpgen.auto_test.lib.lammps import element_list
 from dpgen.auto_test.VASP import VASP
+from dpgen.util import parallel_map
+
+# 1 eV/Angstrom^3 in kBar
+ev_a3_to_kbar = 1602.1766208
 
 
 def make_calculator(inter_parameter, path_to_poscar):
@@ -10,6 +26,8 @@ def make_calculator(inter_parameter, path_to_poscar):
         return VASP(inter_parameter, path_to_poscar)
     elif inter_type == "abacus":
         return ABACUS(inter_parameter, path_to_poscar)
+    elif inter_type == "deepmd" and inter_parameter.get("in_process", False):
+        return DeepmdInProcess(inter_parameter, path_to_poscar)
     elif inter_type in ["deepmd", "meam", "eam_fs", "eam_alloy"]:
         return Lammps(inter_parameter, path_to_poscar)
     #    if inter_type == 'siesta':
@@ -17,3 +35,280 @@ def make_calculator(inter_parameter, path_to_poscar):
     #        pass
     else:
         raise RuntimeError(f"unsupported interaction {inter_type}")
+
+
+class DeepmdInProcess(Lammps):
+    """DeePMD interaction evaluated in-process by the DeePMD-kit Python API.
+
+    The task directories are prepared in the same way as LAMMPS tasks. Instead
+    of submitting LAMMPS jobs, :func:`run_deepmd_tasks` evaluates the tasks and
+    writes ``result_task.json`` and ``CONTCAR`` in each task directory, which
+    are then collected by :meth:`compute`.
+    """
+
+    def compute(self, output_dir):
+        result_file = os.path.join(output_dir, "result_task.json")
+        if not os.path.isfile(result_file):
+            return super().compute(output_dir)
+        with open(result_file) as fp:
+            return json.load(fp)
+
+
+def check_in_process(task_dir):
+    """Check whether a task can be evaluated in-process.
+
+    Parameters
+    ----------
+    task_dir : str
+        the task directory
+
+    Returns
+    -------
+    bool
+        False if the task uses a user-provided LAMMPS input or the
+        relaxation under pressure, which are only supported by LAMMPS
+    """
+    inter = loadfn(os.path.join(task_dir, "inter.json"))
+    task_param = loadfn(os.path.join(task_dir, "task.json"))
+    cal_setting = task_param["cal_setting"]
+    if os.path.isfile(inter.get("in_lammps", "auto")) and (
+        task_param["cal_type"] == "relaxation"
+    ):
+        return False
+    if "input_prop" in cal_setting and os.path.isfile(cal_setting["input_prop"]):
+        return False
+    if task_param["cal_type"] == "relaxation" and "scale2equi" in task_param:
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=4)
+def _load_deep_pot(model):
+    from deepmd.infer import DeepPot
+
+    return DeepPot(model)
+
+
+def _read_setforce(task_dir):
+    # the fix setforce added to in.lammps, e.g. by the gamma line property,
+    # is translated to the masks of the fixed directions
+    in_lammps = os.path.join(task_dir, "in.lammps")
+    if not os.path.isfile(in_lammps):
+        return None
+    with open(in_lammps) as fp:
+        for line in fp:
+            words = line.split()
+            if len(words) == 7 and words[0] == "fix" and words[3] == "setforce":
+                return [ww == "0" for ww in words[4:7]]
+    return None
+
+
+def _make_result_dict(atom_names, atom_types, cells, coords, energies, forces, virials):
+    # the same format as Lammps.compute; the stress is the pressure in kBar
+    vols = np.abs(np.linalg.det(cells))
+    stress = virials / vols[:, None, None] * ev_a3_to_kbar
+    atom_numbs = [
+        int(np.count_nonzero(atom_types == ii)) for ii in range(len(atom_names))
+    ]
+    return {
+        "@module": "dpdata.system",
+        "@class": "LabeledSystem",
+        "data": {
+            "atom_numbs": atom_numbs,
+            "atom_names": atom_names,
+            "atom_types": {
+                "@module": "numpy",
+                "@class": "array",
+                "dtype": "int64",
+                "data": atom_types.tolist(),
+            },
+            "orig": {
+                "@module": "numpy",
+                "@class": "array",
+                "dtype": "int64",
+                "data": [0, 0, 0],
+            },
+            **{
+                kk: {
+                    "@module": "numpy",
+                    "@class": "array",
+                    "dtype": "float64",
+                    "data": np.asarray(vv, dtype=float).tolist(),
+                }
+                for kk, vv in (
+                    ("cells", cells),
+                    ("coords", coords),
+                    ("energies", energies),
+                    ("forces", forces),
+                    ("virials", virials),
+                    ("stress", stress),
+                )
+            },
+        },
+    }
+
+
+def _dump_result(task_dir, result_dict):
+    dumpfn(result_dict, os.path.join(task_dir, "result_task.json"), indent=4)
+    system = MontyDecoder().process_decoded(result_dict)
+    system.to("vasp/poscar", os.path.join(task_dir, "CONTCAR"), frame_idx=-1)
+
+
+def _relax(
+    dp, model_types, atom_names, atom_types, cell, coord, task_dir, task_param, fmax
+):
+    from ase import Atoms
+    from ase.calculators.calculator import Calculator, all_changes
+    from ase.constraints import FixCartesian
+    from ase.optimize import BFGS
+
+    try:
+        from ase.filters import UnitCellFilter
+    except ImportError:
+        # ase < 3.23
+        from ase.constraints import UnitCellFilter
+
+    class _DeepPotCalculator(Calculator):
+        implemented_properties = ["energy", "free_energy", "forces", "stress"]
+
+        def calculate(self, atoms=None, properties=None, system_changes=all_changes):
+            super().calculate(atoms, properties, system_changes)
+            cell = np.asarray(self.atoms.get_cell())
+            e, f, v = dp.eval(
+                self.atoms.get_positions().reshape(1, -1),
+                cell.reshape(1, -1),
+                model_types,
+            )
+            virial = v.reshape(3, 3)
+            stress = -virial / self.atoms.get_volume()
+            self.results = {
+                "energy": float(e.ravel()[0]),
+                "free_energy": float(e.ravel()[0]),
+                "forces": f.reshape(-1, 3),
+                "stress": stress.ravel()[[0, 4, 8, 5, 2, 1]],
+            }
+
+    cal_setting = task_param["cal_setting"]
+    atoms = Atoms(
+        symbols=[atom_names[tt] for tt in atom_types],
+        positions=coord,
+        cell=cell,
+        pbc=True,
+    )
+    fixed = _read_setforce(task_dir)
+    if fixed is not None:
+        atoms.set_constraint(FixCartesian(range(len(atoms)), mask=fixed))
+    atoms.calc = _DeepPotCalculator()
+    # the same settings as Lammps.make_input_file: the box is fully relaxed
+    # whenever the shape is relaxed, and relax_shape has been turned off in
+    # task.json for the eos tasks
+    relax_setting = [
+        cal_setting["relax_pos"],
+        cal_setting["relax_shape"],
+        cal_setting["relax_vol"],
+    ]
+    if relax_setting in ([True, True, True], [True, True, False]):
+        target = UnitCellFilter(atoms)
+    elif relax_setting == [True, False, False]:
+        target = atoms
+    else:
+        raise RuntimeError("not supported calculation setting for LAMMPS")
+    # the LAMMPS ftol bounds the norm of the global force vector, while
+    # fmax bounds the largest force on an atom, so ftol is not used here
+    opt = BFGS(target, logfile=os.path.join(task_dir, "outlog"))
+    opt.run(fmax=fmax, steps=cal_setting.get("maxiter", 5000))
+    return np.asarray(atoms.get_cell()), atoms.get_positions()
+
+
+def _run_deepmd_task_group(task_dirs):
+    # evaluate the tasks sharing the same model in one process; the static
+    # frames with the same atom types are evaluated in one batch
+    static_frames = defaultdict(list)
+    for task_dir in task_dirs:
+        inter = loadfn(os.path.join(task_dir, "inter.json"))
+        task_param = loadfn(os.path.join(task_dir, "task.json"))
+        atom_names = element_list(inter["type_map"])
+        # the model is linked into each task directory
+        model = os.path.realpath(
+            os.path.join(task_dir, os.path.basename(inter["model"]))
+        )
+        dp = _load_deep_pot(model)
+        system = dpdata.System(
+            os.path.join(task_dir, "POSCAR"), fmt="vasp/poscar", type_map=atom_names
+        )
+        atom_types = system["atom_types"]
+        model_type_map = dp.get_type_map()
+        model_types = [model_type_map.index(atom_names[tt]) for tt in atom_types]
+        cell = system["cells"][0]
+        coord = system["coords"][0]
+        cal_setting = task_param["cal_setting"]
+        if task_param["cal_type"] == "relaxation" and (
+            cal_setting["relax_pos"]
+            or cal_setting["relax_shape"]
+            or cal_setting["relax_vol"]
+        ):
+            cell, coord = _relax(
+                dp,
+                model_types,
+                atom_names,
+                atom_types,
+                cell,
+                coord,
+                task_dir,
+                task_param,
+                inter.get("in_process_fmax", 1e-3),
+            )
+        key = (model, tuple(atom_names), tuple(atom_types))
+        static_frames[key].append((task_dir, cell, coord))
+    for (model, atom_names, atom_types), frames in static_frames.items():
+        dp = _load_deep_pot(model)
+        model_type_map = dp.get_type_map()
+        model_types = [model_type_map.index(atom_names[tt]) for tt in atom_types]
+        cells = np.array([ff[1] for ff in frames])
+        coords = np.array([ff[2] for ff in frames])
+        e, f, v = dp.eval(
+            coords.reshape(len(frames), -1), cells.reshape(len(frames), -1), model_types
+        )
+        e = e.reshape(len(frames))
+        f = f.reshape(len(frames), -1, 3)
+        v = v.reshape(len(frames), 3, 3)
+        for ii, (task_dir, cell, coord) in enumerate(frames):
+            _dump_result(
+                task_dir,
+                _make_result_dict(
+                    list(atom_names),
+                    np.array(atom_types),
+                    cell[None],
+                    coord[None],
+                    e[ii : ii + 1],
+                    f[ii : ii + 1],
+                    v[ii : ii + 1],
+                ),
+            )
+    return len(task_dirs)
+
+
+def run_deepmd_tasks(task_dirs, nproc=1):
+    """Evaluate DeePMD tasks in the current process or a local process pool.
+
+    Tasks that already have ``result_task.json`` are skipped. The tasks are
+    split into at most ``nproc`` groups, and each group loads the model once.
+
+    Parameters
+    ----------
+    task_dirs : list[str]
+        the task directories prepared for LAMMPS
+    nproc : int, optional
+        the number of processes
+    """
+    task_dirs = [
+        tt
+        for tt in task_dirs
+        if not os.path.isfile(os.path.join(tt, "result_task.json"))
+    ]
+    if len(task_dirs) == 0:
+        return
+    ngroups = max(1, min(nproc, len(task_dirs)))
+    groups = [task_dirs[ii::ngroups] for ii in range(ngroups)]
+    parallel_map(_run_deepmd_task_group, groups, ngroups)
+    dlog.info(f"{len(task_dirs)} tasks are evaluated in-process")
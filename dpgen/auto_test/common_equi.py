@@ -9,11 +9,16 @@ import dpgen.auto_test.lib.abacus as abacus
 import dpgen.auto_test.lib.crys as crys
 import dpgen.auto_test.lib.util as util
 from dpgen import dlog
-from dpgen.auto_test.calculator import make_calculator
+from dpgen.auto_test.calculator import (
+    check_in_process,
+    make_calculator,
+    run_deepmd_tasks,
+)
 from dpgen.auto_test.lib.utils import create_path
 from dpgen.auto_test.mpdb import get_structure
-from dpgen.dispatcher.Dispatcher import make_submission
+from dpgen.dispatcher.Dispatcher import make_submission, run_submission_with_progress
 from dpgen.remote.decide_machine import convert_mdata
+from dpgen.util import parallel_map
 
 lammps_task_type = ["deepmd", "meam", "eam_fs", "eam_alloy"]
 
@@ -154,7 +159,6 @@ def run_equi(confs, inter_param, mdata):
     all_task = []
     for ii in work_path_list:
         all_task.append(os.path.join(ii, "relax_task"))
-    run_tasks = all_task
     inter_type = inter_param["type"]
     # vasp
     if inter_type in ["vasp", "abacus"]:
@@ -163,6 +167,18 @@ def run_equi(confs, inter_param, mdata):
         mdata = convert_mdata(mdata, ["model_devi"])
     else:
         raise RuntimeError(f"unknown task {inter_type}, something wrong")
+    # skip the finished tasks so that an interrupted run can be resumed
+    run_tasks = [tt for tt in all_task if len(util.collect_task([tt], inter_type))]
+    if len(run_tasks) == 0:
+        return
+
+    if (
+        inter_type == "deepmd"
+        and inter_param.get("in_process", False)
+        and all(check_in_process(tt) for tt in all_task)
+    ):
+        run_deepmd_tasks(all_task, inter_param.get("in_process_nproc", 1))
+        return
 
     # dispatch the tasks
     # POSCAR here is useless
@@ -194,10 +210,10 @@ def run_equi(confs, inter_param, mdata):
             outlog="outlog",
             errlog="errlog",
         )
-        submission.run_submission()
+        run_submission_with_progress(submission, name="relaxation")
 
 
-def post_equi(confs, inter_param):
+def post_equi(confs, inter_param, nproc=None):
     # find all POSCARs and their name like mp-xxx
     # ...
     conf_dirs = []
@@ -213,8 +229,14 @@ def post_equi(confs, inter_param):
     # ...
 
     # dump the relaxation result.
-    for ii in task_dirs:
-        poscar = os.path.join(ii, "POSCAR")
-        inter = make_calculator(inter_param, poscar)
-        res = inter.compute(ii)
-        dumpfn(res, os.path.join(ii, "result.json"), indent=4)
+    if nproc is None:
+        nproc = os.cpu_count()
+    parallel_map(_post_equi_task, [(inter_param, ii) for ii in task_dirs], nproc)
+
+
+def _post_equi_task(post_task):
+    inter_param, task_dir = post_task
+    poscar = os.path.join(task_dir, "POSCAR")
+    inter = make_calculator(inter_param, poscar)
+    res = inter.compute(task_dir)
+    dumpfn(res, os.path.join(task_dir, "result.json"), indent=4)
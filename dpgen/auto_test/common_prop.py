@@ -1,12 +1,17 @@
 import glob
+import json
 import os
-from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
 
 from packaging.version import Version
 
 import dpgen.auto_test.lib.util as util
 from dpgen import dlog
-from dpgen.auto_test.calculator import make_calculator
+from dpgen.auto_test.calculator import (
+    check_in_process,
+    make_calculator,
+    run_deepmd_tasks,
+)
 from dpgen.auto_test.Elastic import Elastic
 from dpgen.auto_test.EOS import EOS
 from dpgen.auto_test.Gamma import Gamma
@@ -14,9 +19,9 @@ from dpgen.auto_test.Interstitial import Interstitial
 from dpgen.auto_test.lib.utils import create_path
 from dpgen.auto_test.Surface import Surface
 from dpgen.auto_test.Vacancy import Vacancy
-from dpgen.dispatcher.Dispatcher import make_submission
+from dpgen.dispatcher.Dispatcher import make_submission, run_submission_with_progress
 from dpgen.remote.decide_machine import convert_mdata
-from dpgen.util import sepline
+from dpgen.util import parallel_map, sepline
 
 lammps_task_type = ["deepmd", "meam", "eam_fs", "eam_alloy"]
 
@@ -100,16 +105,13 @@ def run_property(confs, inter_param, property_list, mdata):
     # ...
     # conf_dirs = glob.glob(confs)
     # conf_dirs.sort()
-    processes = len(property_list)
-    pool = Pool(processes=processes)
-    print("Submit job via %d processes" % processes)  # noqa: UP031
     conf_dirs = []
     for conf in confs:
         conf_dirs.extend(glob.glob(conf))
     conf_dirs.sort()
-    task_list = []
-    work_path_list = []
-    multiple_ret = []
+    # the unfinished tasks of all confs and properties sharing the same
+    # machine, resources and command are submitted together
+    submissions = {}
     for ii in conf_dirs:
         sepline(ch=ii, screen=True)
         for jj in property_list:
@@ -129,10 +131,8 @@ def run_property(confs, inter_param, property_list, mdata):
                 os.path.join(ii, property_type + "_" + suffix)
             )
 
-            work_path_list.append(path_to_work)
             tmp_task_list = glob.glob(os.path.join(path_to_work, "task.[0-9]*[0-9]"))
             tmp_task_list.sort()
-            task_list.append(tmp_task_list)
 
             inter_param_prop = inter_param
             if "cal_setting" in jj and "overwrite_interaction" in jj["cal_setting"]:
@@ -162,27 +162,59 @@ def run_property(confs, inter_param, property_list, mdata):
             run_tasks = util.collect_task(all_task, inter_type)
             if len(run_tasks) == 0:
                 continue
-            else:
-                ret = pool.apply_async(
-                    worker,
-                    (
-                        work_path,
-                        all_task,
-                        forward_common_files,
-                        forward_files,
-                        backward_files,
-                        mdata,
-                        inter_type,
-                    ),
-                )
-                multiple_ret.append(ret)
-    pool.close()
-    pool.join()
-    for ii in range(len(multiple_ret)):
-        if not multiple_ret[ii].successful():
-            print("ERROR:", multiple_ret[ii].get())
-            raise RuntimeError("Job %d is not successful!" % ii)  # noqa: UP031
-    print("%d jobs are finished" % len(multiple_ret))  # noqa: UP031
+            elif (
+                inter_type == "deepmd"
+                and inter_param_prop.get("in_process", False)
+                and all(check_in_process(tt) for tt in all_task)
+            ):
+                run_deepmd_tasks(all_task, inter_param_prop.get("in_process_nproc", 1))
+                continue
+            machine, resources, command, group_size = util.get_machine_info(
+                mdata, inter_type
+            )
+            key = json.dumps(
+                [machine, resources, command, forward_files, backward_files],
+                sort_keys=True,
+            )
+            if key not in submissions:
+                submissions[key] = {
+                    "mdata": mdata,
+                    "inter_type": inter_type,
+                    "forward_files": forward_files,
+                    "backward_files": backward_files,
+                    "run_tasks": [],
+                    "forward_common_files": [],
+                }
+            rel_work_path = os.path.relpath(work_path)
+            submissions[key]["run_tasks"].extend(
+                [os.path.join(rel_work_path, tt) for tt in run_tasks]
+            )
+            submissions[key]["forward_common_files"].extend(
+                [os.path.join(rel_work_path, ff) for ff in forward_common_files]
+            )
+    if len(submissions) == 0:
+        return
+    print("Submit tasks via %d submissions" % len(submissions))  # noqa: UP031
+    with ThreadPoolExecutor(max_workers=len(submissions)) as executor:
+        futures = [
+            executor.submit(
+                worker,
+                os.getcwd(),
+                ss["run_tasks"],
+                ss["forward_common_files"],
+                ss["forward_files"],
+                ss["backward_files"],
+                ss["mdata"],
+                ss["inter_type"],
+            )
+            for ss in submissions.values()
+        ]
+        for ii, ff in enumerate(futures):
+            try:
+                ff.result()
+            except Exception as e:
+                raise RuntimeError("Submission %d is not successful!" % ii) from e  # noqa: UP031
+    print("%d submissions are finished" % len(submissions))  # noqa: UP031
 
 
 def worker(
@@ -194,7 +226,6 @@ def worker(
     mdata,
     inter_type,
 ):
-    run_tasks = [os.path.basename(ii) for ii in all_task]
     machine, resources, command, group_size = util.get_machine_info(mdata, inter_type)
     api_version = mdata.get("api_version", "1.0")
     if Version(api_version) < Version("1.0"):
@@ -207,7 +238,7 @@ def worker(
             mdata_resources=resources,
             commands=[command],
             work_path=work_path,
-            run_tasks=run_tasks,
+            run_tasks=all_task,
             group_size=group_size,
             forward_common_files=forward_common_files,
             forward_files=forward_files,
@@ -215,10 +246,10 @@ def worker(
             outlog="outlog",
             errlog="errlog",
         )
-        submission.run_submission()
+        run_submission_with_progress(submission, name=inter_type)
 
 
-def post_property(confs, inter_param, property_list):
+def post_property(confs, inter_param, property_list, nproc=None):
     # find all POSCARs and their name like mp-xxx
     # ...
     #    task_list = []
@@ -228,6 +259,7 @@ def post_property(confs, inter_param, property_list):
     for conf in confs:
         conf_dirs.extend(glob.glob(conf))
     conf_dirs.sort()
+    post_tasks = []
     for ii in conf_dirs:
         for jj in property_list:
             # determine the suffix: from scratch or refine
@@ -247,9 +279,18 @@ def post_property(confs, inter_param, property_list):
 
             property_type = jj["type"]
             path_to_work = os.path.join(ii, property_type + "_" + suffix)
-            prop = make_property_instance(jj, inter_param_prop)
-            prop.compute(
-                os.path.join(path_to_work, "result.json"),
-                os.path.join(path_to_work, "result.out"),
-                path_to_work,
-            )
+            post_tasks.append((jj, inter_param_prop, path_to_work))
+    # the properties of the confs are computed in a process pool
+    if nproc is None:
+        nproc = os.cpu_count()
+    parallel_map(_post_property_task, post_tasks, nproc)
+
+
+def _post_property_task(post_task):
+    parameter, inter_param, path_to_work = post_task
+    prop = make_property_instance(parameter, inter_param)
+    prop.compute(
+        os.path.join(path_to_work, "result.json"),
+        os.path.join(path_to_work, "result.out"),
+        path_to_work,
+    )
@@ -3,6 +3,7 @@
 import os
 
 import dpdata
+import numpy as np
 from dpdata.periodic_table import Element
 from packaging.version import Version
 
@@ -494,6 +495,102 @@ def poscar_from_last_dump(dump, poscar_out, deepmd_type_map):
         lines = fp.write("\n".join(lines))
 
 
+def read_dump(dump):
+    """Read the frames of a lammps dump written by the auto_test inputs.
+
+    The atom lines are expected to be ``id type x y z fx fy fz``, in which
+    the coordinates may be scaled (``xs ys zs``).
+
+    Parameters
+    ----------
+    dump : str
+        path to the lammps dump
+
+    Returns
+    -------
+    steps : np.ndarray
+        the timesteps, in shape (nframes,)
+    atom_types : np.ndarray
+        the atom types of the last frame starting from 0, in shape (natoms,)
+    cells : np.ndarray
+        the cells, in shape (nframes, 3, 3)
+    coords : np.ndarray
+        the cartesian coordinates, in shape (nframes, natoms, 3)
+    forces : np.ndarray
+        the forces, in shape (nframes, natoms, 3)
+    """
+    with open(dump) as fp:
+        lines = fp.read().split("\n")
+    heads = [idx for idx, ii in enumerate(lines) if ii == "ITEM: TIMESTEP"]
+    steps = []
+    atom_types = np.zeros(0, dtype=int)
+    cells = []
+    coords = []
+    forces = []
+    for idx in heads:
+        steps.append(int(lines[idx + 1]))
+        natom = int(lines[idx + 3])
+        bounds = np.zeros((3, 3))
+        for ii in range(3):
+            words = lines[idx + 5 + ii].split()
+            bounds[ii, : len(words)] = [float(ww) for ww in words]
+        xy, xz, yz = bounds[:, 2]
+        xx = (
+            bounds[0, 1]
+            - max([0, xy, xz, xy + xz])
+            - (bounds[0, 0] - min([0, xy, xz, xy + xz]))
+        )
+        yy = bounds[1, 1] - max([0, yz]) - (bounds[1, 0] - min([0, yz]))
+        zz = bounds[2, 1] - bounds[2, 0]
+        cell = np.array([[xx, 0.0, 0.0], [xy, yy, 0.0], [xz, yz, zz]])
+        atoms = np.array(
+            " ".join(lines[idx + 9 : idx + 9 + natom]).split(), dtype=float
+        ).reshape(natom, -1)
+        atom_types = atoms[:, 1].astype(int) - 1
+        coord = atoms[:, 2:5]
+        if "xs ys zs" in lines[idx + 8]:
+            coord = coord @ cell
+        cells.append(cell)
+        coords.append(coord)
+        forces.append(atoms[:, 5:8])
+    return (
+        np.array(steps, dtype=int),
+        atom_types,
+        np.array(cells).reshape(-1, 3, 3),
+        np.array(coords),
+        np.array(forces),
+    )
+
+
+def read_thermo(log):
+    """Read the thermo output of a lammps log into a table keyed by step.
+
+    A thermo line is a line whose words are all numbers. The first line of
+    each step is kept.
+
+    Parameters
+    ----------
+    log : str
+        path to the lammps log
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        the thermo values of each step, keyed by the first word of the line
+    """
+    thermo = {}
+    with open(log) as fp:
+        for line in fp:
+            words = line.split()
+            if len(words) == 0 or words[0] in thermo:
+                continue
+            try:
+                thermo[words[0]] = np.array(words, dtype=float)
+            except ValueError:
+                continue
+    return thermo
+
+
 def check_finished_new(fname, keyword):
     with open(fname) as fp:
         lines = fp.read().split("\n")
@@ -7,7 +7,9 @@ import os
 import matplotlib.pyplot as plt
 import numpy as np
 from scipy.interpolate import BPoly, LSQUnivariateSpline, UnivariateSpline, interp1d
-from scipy.optimize import fsolve, leastsq
+from scipy.optimize import fsolve, leastsq, minimize_scalar
+
+from dpgen.util import parallel_map
 
 kb = 1.3806488e-23  # J K^-1
 kb_ev = 8.6173324e-05  # eV K^-1
@@ -1284,6 +1286,46 @@ def init_guess(fin):
     return x0
 
 
+def init_pars(func, p):
+    """Initial guess of the parameters of an EOS form.
+
+    Parameters
+    ----------
+    func : str
+        name of the EOS form
+    p : list
+        the guess [e0, b0, bp, v0, bpp] from polynomial fitting
+
+    Returns
+    -------
+    list
+        the initial parameters of the EOS form
+    """
+    if (func == "morse_AB") or (func == "morse_3p"):
+        A = 6
+        B = 0.5 * A
+        if func == "morse_AB":
+            p0 = [p[0], A, B, p[3]]
+        else:
+            p0 = [p[0], A, p[3]]
+    elif func in ["mie", "mie_simple"]:
+        p0 = [p[0], 4, 6, p[3]]
+    elif func == "morse_6p":
+        P = 1
+        Q = 2
+        m = 1
+        n = 1
+        p0 = [p[0], p[1], P, p[3], Q, m, n]
+    elif func == "SJX_5p":
+        alpha = 1
+        beta = 1
+        n = 1
+        p0 = [p[0], alpha, beta, p[3], n]
+    else:
+        p0 = p
+    return p0
+
+
 def repro_ve(func, vol_i, p):
     ndata = len(vol_i)
     eni = np.zeros(ndata)
@@ -1468,28 +1510,7 @@ def lsqfit_eos(
 
     # p0 = [e0, b0, bp, v0, bpp]
     if refit == -1:
-        if (func == "morse_AB") or (func == "morse_3p"):
-            A = 6
-            B = 0.5 * A
-            if func == "morse_AB":
-                p0 = [p[0], A, B, p[3]]
-            else:
-                p0 = [p[0], A, p[3]]
-        elif func in ["mie", "mie_simple"]:
-            p0 = [p[0], 4, 6, p[3]]
-        elif func == "morse_6p":
-            P = 1
-            Q = 2
-            m = 1
-            n = 1
-            p0 = [p[0], p[1], P, p[3], Q, m, n]
-        elif func == "SJX_5p":
-            alpha = 1
-            beta = 1
-            n = 1
-            p0 = [p[0], alpha, beta, p[3], n]
-        else:
-            p0 = p
+        p0 = init_pars(func, p)
         print(
             ">> use initial guess of fitted-paramters by polynomial fitting results:\n"
         )
@@ -1664,6 +1685,170 @@ def lsqfit_eos(
     return popt
 
 
+def jac_murnaghan(pars, y, x):
+    """Jacobian of res_murnaghan with respect to the parameters."""
+    e0, b0, bp, v0 = pars[:4]
+    xx = (v0 / x) ** bp
+    jac = np.empty((len(x), len(pars)))
+    jac[:, 0] = 1.0
+    jac[:, 1] = -v0 / (bp - 1) + x / bp * (1 + xx / (bp - 1))
+    jac[:, 2] = b0 * v0 / (bp - 1) ** 2 + b0 * x * (
+        -1 / bp**2
+        + xx * np.log(v0 / x) / (bp * (bp - 1))
+        - xx * (2 * bp - 1) / (bp * (bp - 1)) ** 2
+    )
+    jac[:, 3] = -b0 / (bp - 1) + b0 * x * xx / ((bp - 1) * v0)
+    jac[:, 4:] = 0.0
+    return -jac
+
+
+def jac_birch(pars, y, x):
+    """Jacobian of res_birch (and res_BM4, the same form) with respect to the parameters."""
+    e0, b0, bp, v0 = pars[:4]
+    uu = (v0 / x) ** (2.0 / 3.0) - 1.0
+    du = 2.0 * (uu + 1.0) / (3.0 * v0)
+    jac = np.empty((len(x), len(pars)))
+    jac[:, 0] = 1.0
+    jac[:, 1] = 9.0 / 8.0 * v0 * uu**2 + 9.0 / 16.0 * v0 * (bp - 4.0) * uu**3
+    jac[:, 2] = 9.0 / 16.0 * b0 * v0 * uu**3
+    jac[:, 3] = (
+        9.0 / 8.0 * b0 * uu**2
+        + 9.0 / 16.0 * b0 * (bp - 4.0) * uu**3
+        + (9.0 / 4.0 * b0 * v0 * uu + 27.0 / 16.0 * b0 * v0 * (bp - 4.0) * uu**2) * du
+    )
+    jac[:, 4:] = 0.0
+    return -jac
+
+
+# the EOS forms with analytic Jacobians
+eos_jacobians = {
+    "murnaghan": jac_murnaghan,
+    "birch": jac_birch,
+    "BM4": jac_birch,
+}
+
+
+def _n_pars(func):
+    if func in get_eos_list_3p():
+        return 3
+    elif func in get_eos_list_4p():
+        return 4
+    elif func in get_eos_list_5p():
+        return 5
+    return None
+
+
+def _fit_eos_one(func, vol, en, nstart, seed):
+    # multi-start least squares fitting of one EOS form; the first start is
+    # the polynomial guess and the others perturb it randomly
+    a, b, c = np.polyfit(vol, en, 2)
+    v0 = np.abs(-b / (2 * a))
+    guess = [a * v0**2 + b * v0 + c, 2 * a * v0, 3.0, v0, 1 * eV2GPa]
+    p0 = np.array(init_pars(func, guess)[: _n_pars(func)], dtype=float)
+    rng = np.random.default_rng(seed)
+    res_func = eval("res_" + func)
+    best = None
+    for ii in range(nstart):
+        start = p0.copy()
+        if ii > 0:
+            start[1:] *= 1.0 + 0.2 * rng.uniform(-1.0, 1.0, size=len(start) - 1)
+        try:
+            with np.errstate(all="ignore"):
+                popt, _, infodict, _, ier = leastsq(
+                    res_func,
+                    start,
+                    args=(en, vol),
+                    Dfun=eos_jacobians.get(func),
+                    full_output=1,
+                    maxfev=(len(start) + 1) * 400,
+                )
+        except Exception:
+            continue
+        residual = float(np.sum(infodict["fvec"] ** 2))
+        if ier not in [1, 2, 3, 4] or not np.isfinite(residual):
+            continue
+        if best is None or residual < best[1]:
+            best = (popt, residual)
+    return best
+
+
+def _fit_eos_dataset(task):
+    vol, en, funcs, nstart, seed = task
+    vol = np.asarray(vol, dtype=float)
+    en = np.asarray(en, dtype=float)
+    table = []
+    for func in funcs:
+        best = _fit_eos_one(func, vol, en, nstart, seed)
+        if best is None:
+            continue
+        popt, residual = best
+        efunc = eval(func)
+        # equilibrium properties from the fitted curve
+        vv = np.linspace(vol.min(), vol.max(), 1001)
+        with np.errstate(all="ignore"):
+            ee = efunc(vv, popt)
+        if not np.all(np.isfinite(ee)):
+            continue
+        imin = np.argmin(ee)
+        with np.errstate(all="ignore"):
+            v0 = minimize_scalar(
+                lambda x: efunc(np.array([x]), popt)[0],
+                bounds=(vv[max(imin - 1, 0)], vv[min(imin + 1, len(vv) - 1)]),
+                method="bounded",
+            ).x
+        dv = 1e-3 * v0
+        with np.errstate(all="ignore"):
+            e_m, e0, e_p = efunc(np.array([v0 - dv, v0, v0 + dv]), popt)
+        b0 = v0 * (e_p - 2 * e0 + e_m) / dv**2 * eV2GPa
+        table.append(
+            {
+                "eos": func,
+                "pars": popt.tolist(),
+                "residual": residual,
+                "rmse": float(np.sqrt(residual / len(vol))),
+                "e0": float(e0),
+                "v0": float(v0),
+                "b0": float(b0),
+            }
+        )
+    table.sort(key=lambda x: x["residual"])
+    return table
+
+
+def fit_eos_batch(datasets, funcs=None, nstart=4, nproc=1, seed=0):
+    """Fit EOS forms to many volume-energy datasets.
+
+    Each form is fitted by least squares from ``nstart`` initial guesses: the
+    guess from polynomial fitting, and random perturbations of it. Analytic
+    Jacobians are used for the forms in ``eos_jacobians``. The datasets are
+    fitted in a process pool.
+
+    Parameters
+    ----------
+    datasets : list of tuple
+        the (volumes, energies) of each dataset
+    funcs : list of str, optional
+        the EOS forms to fit, default all forms in get_eos_list()
+    nstart : int, optional
+        number of initial guesses of each form
+    nproc : int, optional
+        number of processes
+    seed : int, optional
+        random seed of the perturbed initial guesses
+
+    Returns
+    -------
+    list of list of dict
+        for each dataset, the fitted forms ranked by the residual. Each item
+        has the keys eos, pars, residual, rmse, e0 (eV), v0 (A^3) and b0
+        (GPa). The forms failed to fit are not included.
+    """
+    if funcs is None:
+        funcs = get_eos_list()
+    tasks = [(vol, en, list(funcs), nstart, seed) for vol, en in datasets]
+    return parallel_map(_fit_eos_dataset, tasks, nproc)
+
+
 def parse_argument():
     parser = argparse.ArgumentParser(
         description=" Script to fit EOS in MTP calculations"
@@ -41,11 +41,11 @@ def run_task(step, param_file, machine_file=None):
         run_property(confs, inter_parameter, property_list, mdata)
 
     elif step == "post" and "relaxation" in jdata:
-        post_equi(confs, inter_parameter)
+        post_equi(confs, inter_parameter, jdata.get("post_nproc"))
 
     elif step == "post" and "properties" in jdata:
         property_list = jdata["properties"]
-        post_property(confs, inter_parameter, property_list)
+        post_property(confs, inter_parameter, property_list, jdata.get("post_nproc"))
 
     else:
         raise RuntimeError("unknown tasks")
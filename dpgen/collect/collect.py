@@ -1,19 +1,53 @@
 #!/usr/bin/env python3
 
 import argparse
+import functools
 import glob
 import json
 import os
+import shutil
+import tempfile
 
 import dpdata
+import numpy as np
 
-from dpgen.generator.run import data_system_fmt
-from dpgen.util import expand_sys_str
+from dpgen.util import expand_sys_str, parallel_map
 
 
 def collect_data(
-    target_folder, param_file, output, verbose=True, shuffle=True, merge=True
+    target_folder,
+    param_file,
+    output,
+    verbose=True,
+    shuffle=True,
+    merge=True,
+    chunk_size=None,
+    nproc=1,
 ):
+    """Collect the data of a DP-GEN job.
+
+    Parameters
+    ----------
+    target_folder : str
+        the directory of the DP-GEN job
+    param_file : str
+        the parameter file of the DP-GEN job, located in the job directory
+    output : str
+        the output directory of data
+    verbose : bool, optional
+        print the number of frames of each system
+    shuffle : bool, optional
+        shuffle the frames of the collected systems
+    merge : bool, optional
+        merge the systems with the same chemical formula
+    chunk_size : int, optional
+        if given, the data is collected out-of-core: the systems are indexed
+        first, and the frames are streamed into ``set.*`` of at most
+        ``chunk_size`` frames, so that at most one set is held in memory
+    nproc : int, optional
+        the number of processes used to index and write the systems in the
+        out-of-core mode
+    """
     target_folder = os.path.abspath(target_folder)
     output = os.path.abspath(output)
     # goto input
@@ -30,6 +64,16 @@ def collect_data(
             max_str_len + 5,
             max_form_len,
         )
+    else:
+        ptr_fmt = None
+    if chunk_size is not None:
+        try:
+            _collect_data_chunked(
+                jdata, output, ptr_fmt, shuffle, merge, chunk_size, nproc
+            )
+        finally:
+            os.chdir(cwd)
+        return
     # init systems
     init_data = []
     init_data_prefix = jdata.get("init_data_prefix", "")
@@ -46,15 +90,12 @@ def collect_data(
     iters = ["iter.%06d" % ii for ii in range(numb_jobs)]  # noqa: UP031
     # loop over iters to collect data
     for ii in range(len(iters)):
-        iter_data = glob.glob(os.path.join(iters[ii], "02.fp", "data.[0-9]*[0-9]"))
-        iter_data.sort()
-        iter_data = sum([expand_sys_str(ii) for ii in iter_data], [])
-        for jj in iter_data:
+        for sys_idx, jj in _glob_iter_data(iters[ii]):
             sys = dpdata.LabeledSystem(jj, fmt="deepmd/npy")
             if merge:
                 sys_str = sys.formula
             else:
-                sys_str = os.path.basename(jj).split(".")[-1]
+                sys_str = sys_idx
             if sys_str in coll_data.keys():
                 coll_data[sys_str].append(sys)
             else:
@@ -95,6 +136,9 @@ def collect_data(
     os.chdir(cwd)
     os.makedirs(output, exist_ok=True)
     # dump init data
+    # dpgen.generator.run takes long to import
+    from dpgen.generator.run import data_system_fmt
+
     for idx, ii in enumerate(init_data):
         out_dir = "init." + (data_system_fmt % idx)
         ii.to("deepmd/npy", os.path.join(output, out_dir))
@@ -106,6 +150,185 @@ def collect_data(
         # coll_data[kk].to('deepmd/npy', os.path.join(output, out_dir))
 
 
+def _glob_iter_data(iter_name):
+    """Find the labeled systems of an iteration, including the labels taken
+    from the fp cache.
+
+    Parameters
+    ----------
+    iter_name : str
+        the iteration directory
+
+    Returns
+    -------
+    list[tuple[str, str]]
+        the system index and the path of each system
+    """
+    fp_path = os.path.join(iter_name, "02.fp")
+    data_paths = sorted(
+        glob.glob(os.path.join(fp_path, "data.[0-9]*[0-9]"))
+        + glob.glob(os.path.join(fp_path, "data.cached.[0-9]*[0-9]"))
+    )
+    # the system index is taken from data.*, which may contain several systems
+    return [
+        (os.path.basename(pp).split(".")[-1], ss)
+        for pp in data_paths
+        for ss in expand_sys_str(pp)
+    ]
+
+
+def _index_npy_system(path):
+    """Build the frame-count index of a deepmd/npy system without loading
+    its frames.
+    """
+    atom_types = np.loadtxt(os.path.join(path, "type.raw"), dtype=int, ndmin=1)
+    type_map_file = os.path.join(path, "type_map.raw")
+    if os.path.isfile(type_map_file):
+        with open(type_map_file) as fp:
+            type_map = fp.read().split()
+    else:
+        type_map = ["Type_%d" % ii for ii in range(atom_types.max() + 1)]  # noqa: UP031
+    atom_numbs = np.bincount(atom_types, minlength=len(type_map))
+    sets = sorted(glob.glob(os.path.join(path, "set.*")))
+    keys = (
+        sorted(os.path.basename(ff) for ff in glob.glob(os.path.join(sets[0], "*.npy")))
+        if sets
+        else []
+    )
+    sets = [
+        (ss, np.load(os.path.join(ss, "coord.npy"), mmap_mode="r").shape[0])
+        for ss in sets
+    ]
+    return {
+        "path": path,
+        "type_map": type_map,
+        "atom_types": atom_types.tolist(),
+        "formula": "".join(f"{nn}{cc}" for nn, cc in zip(type_map, atom_numbs)),
+        "natoms": len(atom_types),
+        "nframes": sum(nf for _, nf in sets),
+        "sets": sets,
+        "keys": keys,
+    }
+
+
+def _index_system(path, tmp_dir, sort=False):
+    """Index a system; it is converted to deepmd/npy in tmp_dir if it is not
+    a deepmd/npy system or its atoms are sorted as in `dpdata.System.append`.
+    """
+    if "#" not in path and not sort:
+        return _index_npy_system(path)
+    fmt = "deepmd/npy" if "#" not in path else "deepmd/hdf5"
+    system = dpdata.LabeledSystem(path, fmt=fmt)
+    if sort:
+        system.sort_atom_names()
+        system.sort_atom_types()
+    tmp_path = tempfile.mkdtemp(dir=tmp_dir)
+    system.to("deepmd/npy", tmp_path, set_size=system.get_nframes())
+    return _index_npy_system(tmp_path)
+
+
+def _write_chunked_system(args):
+    """Write the frames of the indexed systems in the given order into
+    ``set.*`` of at most chunk_size frames.
+    """
+    out_dir, systems, order, chunk_size = args
+    os.makedirs(out_dir, exist_ok=True)
+    for ff in ["type.raw", "type_map.raw", "nopbc"]:
+        if os.path.isfile(os.path.join(systems[0]["path"], ff)):
+            shutil.copyfile(
+                os.path.join(systems[0]["path"], ff), os.path.join(out_dir, ff)
+            )
+    keys = functools.reduce(lambda aa, bb: aa & bb, (set(ss["keys"]) for ss in systems))
+    sets = [set_path for ss in systems for set_path, _ in ss["sets"]]
+    offsets = np.cumsum([0] + [nf for ss in systems for _, nf in ss["sets"]])
+    for ichunk, start in enumerate(range(0, len(order), chunk_size)):
+        idx = order[start : start + chunk_size]
+        set_idx = np.searchsorted(offsets, idx, side="right") - 1
+        set_dir = os.path.join(out_dir, "set.%03d" % ichunk)  # noqa: UP031
+        os.makedirs(set_dir, exist_ok=True)
+        for key in sorted(keys):
+            chunk = None
+            for ii in np.unique(set_idx):
+                mask = set_idx == ii
+                data = np.load(os.path.join(sets[ii], key), mmap_mode="r")
+                if chunk is None:
+                    chunk = np.empty((len(idx), *data.shape[1:]), dtype=data.dtype)
+                chunk[mask] = data[idx[mask] - offsets[ii]]
+            np.save(os.path.join(set_dir, key), chunk)
+    return out_dir
+
+
+def _collect_data_chunked(jdata, output, ptr_fmt, shuffle, merge, chunk_size, nproc):
+    sys_configs = jdata.get("sys_configs", [])
+    init_data_prefix = jdata.get("init_data_prefix", "")
+    init_data_sys = jdata.get("init_data_sys", [])
+    numb_jobs = len(jdata.get("model_devi_jobs", {}))
+    iter_sys_idx = []
+    iter_data = []
+    for ii in range(numb_jobs):
+        for sys_idx, path in _glob_iter_data("iter.%06d" % ii):  # noqa: UP031
+            iter_sys_idx.append(sys_idx)
+            iter_data.append(path)
+    os.makedirs(output, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=output) as tmp_dir:
+        # the frame-count index
+        index = functools.partial(_index_system, tmp_dir=tmp_dir)
+        init_index = parallel_map(
+            index, [os.path.join(init_data_prefix, ii) for ii in init_data_sys], nproc
+        )
+        iter_index = parallel_map(index, iter_data, nproc)
+        coll_data = {}
+        for sys_idx, ss in zip(iter_sys_idx, iter_index):
+            if merge:
+                sys_str = ss["formula"]
+            else:
+                sys_str = sys_idx
+            coll_data.setdefault(sys_str, []).append(ss)
+        # the atoms are sorted if the systems to merge are not in the same
+        # order, in the same way as dpdata.System.append
+        for kk, systems in coll_data.items():
+            if any(
+                ss["type_map"] != systems[0]["type_map"]
+                or ss["atom_types"] != systems[0]["atom_types"]
+                for ss in systems[1:]
+            ):
+                sort_index = functools.partial(
+                    _index_system, tmp_dir=tmp_dir, sort=True
+                )
+                coll_data[kk] = parallel_map(
+                    sort_index, [ss["path"] for ss in systems], nproc
+                )
+        if ptr_fmt is not None:
+            for ii, ss in zip(init_data_sys, init_index):
+                print(ptr_fmt % (str(ii), ss["formula"], ss["natoms"], ss["nframes"]))
+            for kk in sorted(coll_data.keys()):
+                sys_str = kk if merge else str(sys_configs[int(kk)])
+                systems = coll_data[kk]
+                print(
+                    ptr_fmt
+                    % (
+                        sys_str,
+                        systems[0]["formula"],
+                        systems[0]["natoms"],
+                        sum(ss["nframes"] for ss in systems),
+                    )
+                )
+        from dpgen.generator.run import data_system_fmt
+
+        tasks = []
+        for idx, ss in enumerate(init_index):
+            out_dir = os.path.join(output, "init." + (data_system_fmt % idx))
+            tasks.append((out_dir, [ss], np.arange(ss["nframes"]), chunk_size))
+        for kk, systems in coll_data.items():
+            nframes = sum(ss["nframes"] for ss in systems)
+            # the shuffle is a permutation of the frames applied while writing
+            order = np.random.permutation(nframes) if shuffle else np.arange(nframes)
+            tasks.append(
+                (os.path.join(output, f"sys.{kk}"), systems, order, chunk_size)
+            )
+        parallel_map(_write_chunked_system, tasks, nproc)
+
+
 def gen_collect(args):
     collect_data(
         args.JOB_DIR,
@@ -114,6 +337,8 @@ def gen_collect(args):
         verbose=args.verbose,
         shuffle=args.shuffle,
         merge=args.merge,
+        chunk_size=args.chunk_size,
+        nproc=args.nproc,
     )
 
 
@@ -143,6 +368,18 @@ def _main():
     parser.add_argument(
         "-s", "--shuffle", action="store_true", help="shuffle the data systems"
     )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="collect the data out-of-core and write sets of at most this number of frames",
+    )
+    parser.add_argument(
+        "--nproc",
+        type=int,
+        default=1,
+        help="number of processes to index and write the data in the out-of-core mode",
+    )
     args = parser.parse_args()
     gen_collect(args)
 
@@ -95,6 +95,7 @@ def init_bulk_jdata_arginfo() -> Argument:
     doc_pert_numb = "Number of perturbations for each scaled (key `scale`) POSCAR."
     doc_pert_box = "Anisotropic Perturbation for cells (independent changes of lengths of three box vectors as well as angel among) in decimal formats. 9 elements of the 3x3 perturbation matrix will be randomly sampled from a uniform distribution (default) in the range [-pert_box, pert_box]. Such a perturbation matrix adds the identity matrix gives the actual transformation matrix for this perturbation operation."
     doc_pert_atom = "Perturbation of atom coordinates (Angstrom). Random perturbations are performed on three coordinates of each atom by adding values randomly sampled from a uniform distribution in the range [-pert_atom, pert_atom]."
+    doc_pert_nproc = "Number of processes to generate the perturbed structures. The structures of each scaled POSCAR are generated at once in the DP-GEN process."
     doc_md_nstep = "Steps of AIMD in stage 3. If it's not equal to settings via `NSW` in `md_incar`, DP-GEN will follow `NSW`."
     doc_coll_ndata = "Maximal number of collected data."
     doc_type_map = (
@@ -121,6 +122,7 @@ def init_bulk_jdata_arginfo() -> Argument:
             Argument("pert_numb", int, optional=False, doc=doc_pert_numb),
             Argument("pert_box", float, optional=False, doc=doc_pert_box),
             Argument("pert_atom", float, optional=False, doc=doc_pert_atom),
+            Argument("pert_nproc", int, optional=True, default=1, doc=doc_pert_nproc),
             Argument("md_nstep", int, optional=False, doc=doc_md_nstep),
             Argument("coll_ndata", int, optional=False, doc=doc_coll_ndata),
             Argument("type_map", list[str], optional=True, doc=doc_type_map),
@@ -166,6 +168,7 @@ def init_surf_jdata_arginfo() -> Argument:
     doc_pert_numb = "Number of perturbations for each scaled (key `scale`) POSCAR."
     doc_pert_box = "Anisotropic Perturbation for cells (independent changes of lengths of three box vectors as well as angel among) in decimal formats. 9 elements of the 3x3 perturbation matrix will be randomly sampled from a uniform distribution (default) in the range [-pert_box, pert_box]. Such a perturbation matrix adds the identity matrix gives the actual transformation matrix for this perturbation operation."
     doc_pert_atom = "Perturbation of atom coordinates (Angstrom). Random perturbations are performed on three coordinates of each atom by adding values randomly sampled from a uniform distribution in the range [-pert_atom, pert_atom]."
+    doc_pert_nproc = "Number of processes to generate the perturbed structures. The structures of each scaled POSCAR are generated at once in the DP-GEN process."
     doc_coll_ndata = "Maximal number of collected data."
     return Argument(
         "init_surf_jdata",
@@ -196,6 +199,7 @@ def init_surf_jdata_arginfo() -> Argument:
             Argument("pert_numb", int, optional=False, doc=doc_pert_numb),
             Argument("pert_box", float, optional=False, doc=doc_pert_box),
             Argument("pert_atom", float, optional=False, doc=doc_pert_atom),
+            Argument("pert_nproc", int, optional=True, default=1, doc=doc_pert_nproc),
             Argument("coll_ndata", int, optional=False, doc=doc_coll_ndata),
         ],
         doc=doc_init_surf,
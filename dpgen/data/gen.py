@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 
 import argparse
+import copy
+import functools
 import glob
 import os
 import re
 import shutil
-import subprocess as sp
-import sys
 
 import dpdata
 import numpy as np
@@ -17,6 +17,10 @@ import dpgen.data.tools.fcc as fcc
 import dpgen.data.tools.hcp as hcp
 import dpgen.data.tools.sc as sc
 from dpgen import ROOT_PATH, dlog
+from dpgen.data.tools.create_random_disturb import (
+    perturb_cells,
+    write_disturbs_vasp,
+)
 from dpgen.dispatcher.Dispatcher import make_submission
 from dpgen.generator.lib.abacus_scf import (
     get_abacus_input_parameters,
@@ -28,7 +32,7 @@ from dpgen.generator.lib.abacus_scf import (
 from dpgen.generator.lib.utils import check_api_version, symlink_user_forward_files
 from dpgen.generator.lib.vasp import incar_upper
 from dpgen.remote.decide_machine import convert_mdata
-from dpgen.util import load_file
+from dpgen.util import load_file, parallel_map
 
 
 def create_path(path, back=False):
@@ -728,6 +732,70 @@ def make_scale_ABACUS(jdata):
             os.chdir(cwd)
 
 
+def _pert_scaled_task(
+    args,
+    fp_style,
+    pert_numb,
+    pert_box,
+    pert_atom,
+    from_poscar,
+    pp_file,
+    orb_file_names,
+    dpks_descriptor_name,
+    type_map,
+):
+    """Write the perturbed structures of a scaled structure."""
+    path_work, seed = args
+    rng = np.random.default_rng(seed)
+    if fp_style == "vasp":
+        write_disturbs_vasp(
+            os.path.join(path_work, "POSCAR"),
+            pert_numb,
+            pert_atom,
+            pert_box,
+            shuffle=not from_poscar,
+            rng=rng,
+        )
+    elif fp_style == "abacus":
+        stru = get_abacus_STRU(os.path.join(path_work, "STRU"))
+        natoms = sum(stru["atom_numbs"])
+        # the atoms are not scaled with the cell, as create_disturbs_abacus_dev
+        cells, coords = perturb_cells(
+            stru["cells"],
+            stru["coords"],
+            pert_numb,
+            pert_atom,
+            pert_box,
+            scale_atoms=False,
+            rng=rng,
+        )
+        for kk in range(pert_numb):
+            dir_out = os.path.join(path_work, f"{kk + 1:06d}")
+            create_path(dir_out)
+            stru_d = copy.deepcopy(stru)
+            stru_d["cells"] = cells[kk]
+            if not from_poscar:
+                stru_d["coords"] = coords[kk][rng.permutation(natoms)]
+                ret = make_abacus_scf_stru(
+                    stru_d,
+                    pp_file,
+                    orb_file_names,
+                    dpks_descriptor_name,
+                    type_map=type_map,
+                )
+            else:
+                stru_d["coords"] = coords[kk]
+                stru_d["masses"] = stru_d["atom_masses"]
+                ret = make_abacus_scf_stru(
+                    stru_d,
+                    stru_d["pp_files"],
+                    stru_d["orb_files"],
+                    stru_d["dpks_descriptor"],
+                )
+            with open(os.path.join(dir_out, "STRU"), "w") as fp:
+                fp.write(ret)
+
+
 def pert_scaled(jdata):
     ### Extract data from jdata
     out_dir = jdata["out_dir"]
@@ -755,92 +823,74 @@ def pert_scaled(jdata):
     sys_pe.sort()
     os.chdir(cwd)
 
-    ### Construct the perturbation command
     init_fp_style = jdata.get("init_fp_style", "VASP")
     if init_fp_style == "VASP":
         fp_style = "vasp"
-        poscar_name = "POSCAR"
     elif init_fp_style == "ABACUS":
         fp_style = "abacus"
-        poscar_name = "STRU"
-
-    python_exec = os.path.join(
-        os.path.dirname(__file__), "tools", "create_random_disturb.py"
-    )
-    pert_cmd = f"{sys.executable} {python_exec} -etmax {pert_box} -ofmt {fp_style} {poscar_name} {pert_numb} {pert_atom} > /dev/null"
 
-    ### Loop over each system and scale
+    ### Perturb the (system, scale) pairs in a process pool
+    path_works = []
     for ii in sys_pe:
         for jj in scale:
             path_work = os.path.join(path_sp, ii, f"scale-{jj:.3f}")
             assert os.path.isdir(path_work)
-            os.chdir(path_work)
-            sp.check_call(pert_cmd, shell=True)
-
-            ### Loop over each perturbation
-            for kk in range(pert_numb):
-                if fp_style == "vasp":
-                    pos_in = f"POSCAR{kk + 1}.vasp"
-                elif fp_style == "abacus":
-                    pos_in = f"STRU{kk + 1}.abacus"
-                dir_out = f"{kk + 1:06d}"
-                create_path(dir_out)
-                if fp_style == "vasp":
-                    pos_out = os.path.join(dir_out, "POSCAR")
-                elif fp_style == "abacus":
-                    pos_out = os.path.join(dir_out, "STRU")
-                if not from_poscar:
-                    if fp_style == "vasp":
-                        poscar_shuffle(pos_in, pos_out)
-                    elif fp_style == "abacus":
-                        stru_in = get_abacus_STRU(pos_in)
-                        stru_out = shuffle_stru_data(stru_in)
-                        with open(pos_out, "w") as fp:
-                            fp.write(
-                                make_abacus_scf_stru(
-                                    stru_out,
-                                    pp_file,
-                                    orb_file_names,
-                                    dpks_descriptor_name,
-                                    type_map=jdata["elements"],
-                                )
-                            )
-                else:
-                    shutil.copy2(pos_in, pos_out)
-                os.remove(pos_in)
+            path_works.append(path_work)
+    # each pair has its own random seed drawn from the global random state
+    seeds = np.random.randint(2**31 - 1, size=len(path_works))
+    parallel_map(
+        functools.partial(
+            _pert_scaled_task,
+            fp_style=fp_style,
+            pert_numb=pert_numb,
+            pert_box=pert_box,
+            pert_atom=pert_atom,
+            from_poscar=from_poscar,
+            pp_file=pp_file,
+            orb_file_names=orb_file_names,
+            dpks_descriptor_name=dpks_descriptor_name,
+            type_map=jdata["elements"],
+        ),
+        list(zip(path_works, seeds)),
+        jdata.get("pert_nproc", 1),
+    )
 
-            ### Handle special case (unperturbed ?)
-            kk = -1
-            if fp_style == "vasp":
-                pos_in = "POSCAR"
-            elif fp_style == "abacus":
-                pos_in = "STRU"
-            dir_out = f"{kk + 1:06d}"
-            create_path(dir_out)
+    ### Loop over each system and scale
+    for path_work in path_works:
+        os.chdir(path_work)
+
+        ### Handle special case (unperturbed ?)
+        kk = -1
+        if fp_style == "vasp":
+            pos_in = "POSCAR"
+        elif fp_style == "abacus":
+            pos_in = "STRU"
+        dir_out = f"{kk + 1:06d}"
+        create_path(dir_out)
+        if fp_style == "vasp":
+            pos_out = os.path.join(dir_out, "POSCAR")
+        elif fp_style == "abacus":
+            pos_out = os.path.join(dir_out, "STRU")
+        if not from_poscar:
             if fp_style == "vasp":
-                pos_out = os.path.join(dir_out, "POSCAR")
+                poscar_shuffle(pos_in, pos_out)
             elif fp_style == "abacus":
-                pos_out = os.path.join(dir_out, "STRU")
-            if not from_poscar:
-                if fp_style == "vasp":
-                    poscar_shuffle(pos_in, pos_out)
-                elif fp_style == "abacus":
-                    stru_in = get_abacus_STRU(pos_in)
-                    stru_out = shuffle_stru_data(stru_in)
-                    with open(pos_out, "w") as fp:
-                        fp.write(
-                            make_abacus_scf_stru(
-                                stru_out,
-                                pp_file,
-                                orb_file_names,
-                                dpks_descriptor_name,
-                                type_map=jdata["elements"],
-                            )
+                stru_in = get_abacus_STRU(pos_in)
+                stru_out = shuffle_stru_data(stru_in)
+                with open(pos_out, "w") as fp:
+                    fp.write(
+                        make_abacus_scf_stru(
+                            stru_out,
+                            pp_file,
+                            orb_file_names,
+                            dpks_descriptor_name,
+                            type_map=jdata["elements"],
                         )
-            else:
-                shutil.copy2(pos_in, pos_out)
+                    )
+        else:
+            shutil.copy2(pos_in, pos_out)
 
-            os.chdir(cwd)
+        os.chdir(cwd)
 
 
 def make_vasp_md(jdata, mdata):
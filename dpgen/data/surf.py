@@ -1,12 +1,11 @@
 #!/usr/bin/env python3
 
 import argparse
+import functools
 import glob
 import os
 import re
 import shutil
-import subprocess as sp
-import sys
 
 import numpy as np
 from ase.build import general_surface
@@ -19,10 +18,11 @@ import dpgen.data.tools.fcc as fcc
 import dpgen.data.tools.hcp as hcp
 import dpgen.data.tools.sc as sc
 from dpgen import dlog
+from dpgen.data.tools.create_random_disturb import write_disturbs_vasp
 from dpgen.dispatcher.Dispatcher import make_submission_compat
 from dpgen.generator.lib.utils import symlink_user_forward_files
 from dpgen.remote.decide_machine import convert_mdata
-from dpgen.util import load_file
+from dpgen.util import load_file, parallel_map
 
 
 def create_path(path):
@@ -457,6 +457,18 @@ def make_scale(jdata):
             os.chdir(cwd)
 
 
+def _pert_elong_task(args, pert_numb, pert_box, pert_atom):
+    """Write the perturbed structures of an elongated structure."""
+    path_elong, seed = args
+    write_disturbs_vasp(
+        os.path.join(path_elong, "POSCAR"),
+        pert_numb,
+        pert_atom,
+        pert_box,
+        rng=np.random.default_rng(seed),
+    )
+
+
 def pert_scaled(jdata):
     out_dir = jdata["out_dir"]
     scale = jdata["scale"]
@@ -501,13 +513,8 @@ def pert_scaled(jdata):
     sys_pe.sort()
     os.chdir(cwd)
 
-    ### Construct the perturbation command
-    python_exec = os.path.join(
-        os.path.dirname(__file__), "tools", "create_random_disturb.py"
-    )
-    pert_cmd = f"{sys.executable} {python_exec} -etmax {pert_box} -ofmt vasp POSCAR {pert_numb} {pert_atom} > /dev/null"
-
     ### Loop over each system and scale
+    path_elongs = []
     for ii in sys_pe:
         for jj in scale:
             path_scale = os.path.join(path_sp, ii, f"scale-{jj:.3f}")
@@ -516,31 +523,38 @@ def pert_scaled(jdata):
             dlog.info(os.getcwd())
             poscar_in = os.path.join(path_scale, "POSCAR")
             assert os.path.isfile(poscar_in)
-
-            ### Loop over each perturbation
             for ll in elongs:
                 path_elong = os.path.join(path_scale, f"elong-{ll:3.3f}")
                 create_path(path_elong)
                 os.chdir(path_elong)
                 poscar_elong(poscar_in, "POSCAR", ll)
-                sp.check_call(pert_cmd, shell=True)
-                for kk in range(pert_numb):
-                    pos_in = f"POSCAR{kk + 1}.vasp"
-                    dir_out = f"{kk + 1:06d}"
-                    create_path(dir_out)
-                    pos_out = os.path.join(dir_out, "POSCAR")
-                    poscar_shuffle(pos_in, pos_out)
-                    os.remove(pos_in)
-
-                ### Handle special case (unperturbed ?)
-                kk = -1
-                pos_in = "POSCAR"
-                dir_out = f"{kk + 1:06d}"
-                create_path(dir_out)
-                pos_out = os.path.join(dir_out, "POSCAR")
-                poscar_shuffle(pos_in, pos_out)
-
-                os.chdir(cwd)
+                path_elongs.append(path_elong)
+            os.chdir(cwd)
+
+    ### Perturb the elongated structures in a process pool, each with its own
+    ### random seed drawn from the global random state
+    seeds = np.random.randint(2**31 - 1, size=len(path_elongs))
+    parallel_map(
+        functools.partial(
+            _pert_elong_task,
+            pert_numb=pert_numb,
+            pert_box=pert_box,
+            pert_atom=pert_atom,
+        ),
+        list(zip(path_elongs, seeds)),
+        jdata.get("pert_nproc", 1),
+    )
+
+    ### Handle special case (unperturbed ?)
+    for path_elong in path_elongs:
+        os.chdir(path_elong)
+        kk = -1
+        pos_in = "POSCAR"
+        dir_out = f"{kk + 1:06d}"
+        create_path(dir_out)
+        pos_out = os.path.join(dir_out, "POSCAR")
+        poscar_shuffle(pos_in, pos_out)
+        os.chdir(cwd)
 
 
 def _vasp_check_fin(ii):
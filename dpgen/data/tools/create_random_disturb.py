@@ -44,6 +44,194 @@ def gen_random_disturb(dmax, a, b, dstyle="uniform"):
     return dr
 
 
+def gen_random_disturbs(nfile, natoms, dmax, dstyle="uniform", rng=None):
+    """Generate the random displacements of all atoms in all the perturbed
+    structures at once, in the same distribution as `gen_random_disturb`.
+
+    Parameters
+    ----------
+    nfile : int
+        number of perturbed structures
+    natoms : int
+        number of atoms
+    dmax : float
+        the maximum length of the displacements
+    dstyle : str, optional
+        the distribution of the lengths, uniform, normal or constant
+    rng : numpy.random.Generator, optional
+        the random number generator
+
+    Returns
+    -------
+    numpy.ndarray
+        the displacements in the shape of (nfile, natoms, 3)
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    d0 = rng.random((nfile, natoms, 3)) - 0.5
+    dnorm = np.linalg.norm(d0, axis=-1, keepdims=True)
+    if dstyle == "normal":
+        dmax = rng.normal(0, 0.5, (nfile, natoms, 1)) * dmax
+    elif dstyle == "constant":
+        pass
+    else:
+        # use if we just wanna a disturb in a range of [0, dmax),
+        dmax = rng.random((nfile, natoms, 1)) * dmax
+    return dmax / dnorm * d0
+
+
+def gen_random_emats(nfile, etmax, diag=0, rng=None):
+    """Generate the random strain matrices of all the perturbed structures at
+    once, in the same distribution as `gen_random_emat`.
+
+    Returns
+    -------
+    numpy.ndarray
+        the transformation matrices in the shape of (nfile, 3, 3)
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if np.abs(etmax) >= 1e-6:
+        e = rng.random((nfile, 6)) * 2 * etmax - etmax
+    else:
+        e = np.zeros((nfile, 6))
+    if diag != 0:
+        # isotropic behavior
+        e[:, 3:] = 0
+    emat = np.empty((nfile, 3, 3))
+    emat[:, [0, 1, 2], [0, 1, 2]] = e[:, :3]
+    emat[:, 0, 1] = emat[:, 1, 0] = 0.5 * e[:, 5]
+    emat[:, 0, 2] = emat[:, 2, 0] = 0.5 * e[:, 4]
+    emat[:, 1, 2] = emat[:, 2, 1] = 0.5 * e[:, 3]
+    return emat + np.eye(3)
+
+
+def convert_cells(cells):
+    """Convert the cells to lower triangular matrices, as `io_lammps.convert_cell`
+    does for each cell.
+    """
+    # the lower triangular cell is the Cholesky factor of the metric tensor
+    tri_cells = np.linalg.cholesky(cells @ np.swapaxes(cells, -1, -2))
+    is_tri = np.all(np.abs(np.triu(cells, 1)) < 1e-10, axis=(-1, -2))
+    return np.where(is_tri[:, None, None], cells, tri_cells)
+
+
+def perturb_cells(
+    cell,
+    coords,
+    nfile,
+    dmax,
+    etmax,
+    dstyle="uniform",
+    diag=0,
+    scale_atoms=True,
+    rng=None,
+):
+    """Perturb a structure into nfile structures in lower triangular cells.
+
+    Parameters
+    ----------
+    cell : numpy.ndarray
+        the cell in the shape of (3, 3)
+    coords : numpy.ndarray
+        the cartesian coordinates in the shape of (natoms, 3)
+    nfile : int
+        number of perturbed structures
+    dmax : float
+        the maximum length of the atomic displacements
+    etmax : float
+        the maximum strain of the cell
+    dstyle : str, optional
+        the distribution of the displacements
+    diag : int, optional
+        only the diagonal elements of the strain tensors are randomized
+    scale_atoms : bool, optional
+        the atoms are scaled with the strained cell before the displacements
+    rng : numpy.random.Generator, optional
+        the random number generator
+
+    Returns
+    -------
+    cells : numpy.ndarray
+        the perturbed cells in the shape of (nfile, 3, 3)
+    coords : numpy.ndarray
+        the perturbed coordinates in the shape of (nfile, natoms, 3)
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    natoms = len(coords)
+    dpos = gen_random_disturbs(nfile, natoms, dmax, dstyle, rng=rng)
+    cells = np.asarray(cell) @ gen_random_emats(nfile, etmax, diag, rng=rng)
+    if scale_atoms:
+        frac = np.linalg.solve(np.asarray(cell).T, np.asarray(coords).T).T
+        pos = frac @ cells + dpos
+    else:
+        pos = np.asarray(coords) + dpos
+    cells_new = convert_cells(cells)
+    pos = pos @ np.linalg.solve(cells, cells_new)
+    return cells_new, pos
+
+
+def write_disturbs_vasp(
+    fin,
+    nfile,
+    dmax=1.0,
+    etmax=0.1,
+    dstyle="uniform",
+    diag=0,
+    shuffle=True,
+    rng=None,
+):
+    """Write the perturbed structures of a POSCAR into ``000001/POSCAR``,
+    ``000002/POSCAR``, ... next to it, in the current process.
+
+    The perturbations are the same as `create_disturbs_ase_dev`, but all the
+    structures are generated at once by `perturb_cells`.
+
+    Parameters
+    ----------
+    fin : str
+        the input POSCAR
+    nfile : int
+        number of perturbed structures
+    dmax : float, optional
+        the maximum length of the atomic displacements
+    etmax : float, optional
+        the maximum strain of the cell
+    dstyle : str, optional
+        the distribution of the displacements
+    diag : int, optional
+        only the diagonal elements of the strain tensors are randomized
+    shuffle : bool, optional
+        shuffle the coordinates among the atoms, as `poscar_shuffle` does
+    rng : numpy.random.Generator, optional
+        the random number generator
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    atoms = ase.io.read(fin, format="vasp")
+    cells, coords = perturb_cells(
+        atoms.get_cell().array,
+        atoms.get_positions(),
+        nfile,
+        dmax,
+        etmax,
+        dstyle,
+        diag,
+        rng=rng,
+    )
+    for fid in range(nfile):
+        dir_out = os.path.join(os.path.dirname(fin), f"{fid + 1:06d}")
+        os.makedirs(dir_out, exist_ok=True)
+        atoms_d = atoms.copy()
+        atoms_d.set_cell(cells[fid])
+        if shuffle:
+            atoms_d.set_positions(coords[fid][rng.permutation(len(atoms))])
+        else:
+            atoms_d.set_positions(coords[fid])
+        ase.io.write(os.path.join(dir_out, "POSCAR"), atoms_d, "vasp", vasp5=True)
+
+
 def create_disturbs_ase(
     fin, nfile, dmax=1.0, ofmt="lmp", dstyle="uniform", write_d=False
 ):
@@ -1,17 +1,21 @@
 # /usr/bin/env python
 # Copyright (c) The Dpmodeling Team.
 
+import functools
 import json
 import os
+from collections import defaultdict
 from glob import glob
 from uuid import uuid4
 
 from dpdata import LabeledSystem
-from monty.serialization import dumpfn, loadfn
+from monty.json import MontyEncoder
+from monty.serialization import loadfn
 
 from dpgen import SHORT_CMD, dlog
 from dpgen.database.entry import Entry
 from dpgen.database.vasp import VaspInput
+from dpgen.util import parallel_imap
 
 OUTPUT = SHORT_CMD + "_db.json"
 SUPPORTED_CACULATOR = ["vasp", "pwscf", "gaussian"]
@@ -38,121 +42,209 @@ def _main(param):
     skip_init = False
     if "skip_init" in jdata:
         skip_init = jdata["skip_init"]
+    nproc = jdata.get("nproc", None)
     ## The mapping from sys_info to sys_configs
     assert calculator.lower() in SUPPORTED_CACULATOR
     dlog.info(f"data collection from: {path}")
     if calculator == "vasp":
-        parsing_vasp(path, config_info_dict, skip_init, output, id_prefix)
+        parsing_vasp(path, config_info_dict, skip_init, output, id_prefix, nproc)
     elif calculator == "gaussian":
         parsing_gaussian(path, output)
     else:
         parsing_pwscf(path, output)
 
 
-def parsing_vasp(path, config_info_dict, skip_init, output=OUTPUT, id_prefix=None):
+def parsing_vasp(
+    path, config_info_dict, skip_init, output=OUTPUT, id_prefix=None, nproc=None
+):
+    """Collect the VASP calculations of a DP-GEN job.
+
+    The entries of each iteration are streamed into a line-delimited JSON
+    shard in ``<output>.shards``. An iteration is recorded in
+    ``record.database`` once its shard is complete, so that an interrupted
+    collection is resumed from the recorded iterations. The last recorded
+    iteration is always collected again, as it may be still running. The
+    output is finally merged from the shards; it is line-delimited JSON if
+    its name ends with ``.jsonl``, and a JSON list otherwise.
+
+    Parameters
+    ----------
+    path : str
+        the directory of the DP-GEN job
+    config_info_dict : dict
+        the mapping from the config names to the indexes of sys_configs
+    skip_init : bool
+        skip the data of init_bulk
+    output : str, optional
+        the output file
+    id_prefix : str, optional
+        the prefix of the entry ids; random ids are used if not given
+    nproc : int, optional
+        the number of processes used to parse the tasks; all the CPUs are
+        used if not given
+    """
+    if nproc is None:
+        nproc = os.cpu_count()
     fp_iters = os.path.join(path, ITERS_PAT)
     dlog.debug(fp_iters)
-    f_fp_iters = glob(fp_iters)
+    f_fp_iters = sorted(glob(fp_iters))
     dlog.info(f"len iterations data: {len(f_fp_iters)}")
     fp_init = os.path.join(path, INIT_PAT)
     dlog.debug(fp_init)
-    f_fp_init = glob(fp_init)
-    if skip_init:
-        entries = _parsing_vasp(f_fp_iters, config_info_dict, id_prefix)
-        dlog.info(f"len collected data: {len(entries)}")
-    else:
+    f_fp_init = sorted(glob(fp_init))
+    shard_dir = output + ".shards"
+    os.makedirs(shard_dir, exist_ok=True)
+    if not skip_init:
         dlog.info(f"len initialization data: {len(f_fp_init)}")
-        entries = _parsing_vasp(f_fp_init, config_info_dict, id_prefix, iters=False)
-        entries.extend(_parsing_vasp(f_fp_iters, config_info_dict, id_prefix))
-        dlog.info(f"len collected data: {len(entries)}")
-    # print(output)
-    # print(entries)
-    dumpfn(entries, output, indent=4)
-
-
-def _parsing_vasp(paths, config_info_dict, id_prefix, iters=True):
-    entries = []
+        _parsing_vasp(f_fp_init, config_info_dict, shard_dir, iters=False, nproc=nproc)
+    _parsing_vasp(f_fp_iters, config_info_dict, shard_dir, nproc=nproc)
+    shards = sorted(glob(os.path.join(shard_dir, "iter.*.jsonl")))
+    if not skip_init and os.path.isfile(os.path.join(shard_dir, "init.jsonl")):
+        shards.insert(0, os.path.join(shard_dir, "init.jsonl"))
+    nentries = _merge_shards(shards, output, id_prefix)
+    dlog.info(f"len collected data: {nentries}")
+
+
+def _merge_shards(shards, output, id_prefix):
+    # the entries are copied line by line, so that they are never held in
+    # memory together
+    jsonl = output.endswith(".jsonl")
     icount = 0
-    if iters:
-        iter_record = []
-        iter_record_new = []
-        try:
-            with open("record.database") as f_record:
-                iter_record = [i.split()[0] for i in f_record.readlines()]
-            iter_record.sort()
-            dlog.info("iter_record")
-            dlog.info(iter_record)
-        except Exception:
-            pass
-    for path in paths:
-        try:
-            f_outcar = os.path.join(path, "OUTCAR")
-            f_job = os.path.join(path, "job.json")
+    with open(output, "w") as fout:
+        if not jsonl:
+            fout.write("[")
+        for shard in shards:
+            with open(shard) as fin:
+                for line in fin:
+                    if id_prefix:
+                        entry = json.loads(line)
+                        entry["entry_id"] = id_prefix + "_" + str(icount)
+                        line = json.dumps(entry) + "\n"
+                    if not jsonl:
+                        line = ("\n" if icount == 0 else ",\n") + line.rstrip("\n")
+                    fout.write(line)
+                    icount += 1
+        if not jsonl:
+            fout.write("\n]\n")
+    return icount
+
+
+def _read_outcar_attrib(f_outcar, head_lines=1000, tail_bytes=65536):
+    # the timing lines are in the head and the tail of OUTCAR, so only these
+    # parts are read instead of the whole file
+    attrib = {}
+    with open(f_outcar, "rb") as fin:
+        lines = [fin.readline() for _ in range(head_lines)]
+        head_end = fin.tell()
+        start = max(fin.seek(0, os.SEEK_END) - tail_bytes, head_end)
+        fin.seek(start)
+        if start > head_end:
+            # skip the incomplete line
+            fin.readline()
+        lines.extend(fin.readlines())
+    for line in lines:
+        line = line.decode(errors="ignore")
+        if "running on" in line:
+            attrib["core"] = int(line.split()[2])
+        if "Elapse" in line:
+            attrib["wall_time"] = float(line.split()[-1])
+        if "executed on" in line:
+            attrib["date"] = line.split()[-2]
+            attrib["clocktime"] = line.split()[-1]
+    return attrib
+
+
+def _parse_vasp_task(path, config_info_dict, iters=True):
+    """Parse a VASP task into the JSON string of an entry, or None if failed."""
+    try:
+        f_outcar = os.path.join(path, "OUTCAR")
+        f_job = os.path.join(path, "job.json")
+        vi = VaspInput.from_directory(path)
+        if os.path.isfile(f_job):
+            attrib = loadfn(f_job)
+        else:
+            attrib = {}
+
+        if iters and attrib:
+            # generator/Cu/iter.000031/02.fp/task.007.000000
+            tmp_ = path.split("/")[-1]
+            # config_info=tmp_.split('.')[1]
+            task_info = tmp_.split(".")[-1]
             tmp_iter = path.split("/")[-3]
-            if (tmp_iter in iter_record) and (tmp_iter != iter_record[-1]):
-                continue
-            if tmp_iter not in iter_record_new:
-                iter_record_new.append(tmp_iter)
-            vi = VaspInput.from_directory(path)
-            if os.path.isfile(f_job):
-                attrib = loadfn(f_job)
-            else:
-                attrib = {}
-
-            if iters and attrib:
-                # generator/Cu/iter.000031/02.fp/task.007.000000
-                tmp_ = path.split("/")[-1]
-                # config_info=tmp_.split('.')[1]
-                task_info = tmp_.split(".")[-1]
-                tmp_iter = path.split("/")[-3]
-                iter_info = tmp_iter.split(".")[-1]
-                sys_info = path.split("/")[-4]
-                config_info_int = int(tmp_.split(".")[1])
-                for key, value in config_info_dict.items():
-                    if config_info_int in value:
-                        config_info = key
-                attrib["config_info"] = config_info
-                attrib["task_info"] = task_info
-                attrib["iter_info"] = iter_info
-                attrib["sys_info"] = sys_info
-                with open(f_outcar) as fin_outcar:
-                    infile_outcar = fin_outcar.readlines()
-                for line in infile_outcar:
-                    if "running on" in line:
-                        attrib["core"] = int(line.split()[2])
-                    if "Elapse" in line:
-                        attrib["wall_time"] = float(line.split()[-1])
-                    if "executed on" in line:
-                        attrib["date"] = line.split()[-2]
-                        attrib["clocktime"] = line.split()[-1]
-                dlog.info("Attrib")
-                dlog.info(attrib)
-            comp = vi["POSCAR"].structure.composition
-            ls = LabeledSystem(f_outcar)
-            lss = ls.to_list()
-            for ls in lss:
-                if id_prefix:
-                    eid = id_prefix + "_" + str(icount)
-                else:
-                    eid = str(uuid4())
-            entry = Entry(
-                comp, "vasp", vi.as_dict(), ls.as_dict(), attribute=attrib, entry_id=eid
-            )
-            entries.append(entry)
-            icount += 1
-        except Exception:
-            # dlog.info(str(Exception))
-            dlog.info(f"failed for {path}")
-            # pass
-    if iters:
-        iter_record.sort()
-        iter_record_new.sort()
-        with open("record.database", "w") as fw:
-            for line in iter_record:
-                fw.write(line + "\n")
-            for line in iter_record_new:
+            iter_info = tmp_iter.split(".")[-1]
+            sys_info = path.split("/")[-4]
+            config_info_int = int(tmp_.split(".")[1])
+            for key, value in config_info_dict.items():
+                if config_info_int in value:
+                    config_info = key
+            attrib["config_info"] = config_info
+            attrib["task_info"] = task_info
+            attrib["iter_info"] = iter_info
+            attrib["sys_info"] = sys_info
+            attrib.update(_read_outcar_attrib(f_outcar))
+        comp = vi["POSCAR"].structure.composition
+        # the last frame
+        ls = LabeledSystem(f_outcar).to_list()[-1]
+        entry = Entry(
+            comp,
+            "vasp",
+            vi.as_dict(),
+            ls.as_dict(),
+            attribute=attrib,
+            entry_id=str(uuid4()),
+        )
+        return json.dumps(entry, cls=MontyEncoder)
+    except Exception:
+        return None
+
+
+def _load_record(record="record.database"):
+    if not os.path.isfile(record):
+        return []
+    with open(record) as f_record:
+        return sorted({i.split()[0] for i in f_record if i.strip()})
+
+
+def _parsing_vasp(paths, config_info_dict, shard_dir, iters=True, nproc=1):
+    """Parse the VASP tasks into one shard per iteration.
+
+    Returns the number of entries collected in this call.
+    """
+    groups = defaultdict(list)
+    for path in paths:
+        groups[path.split("/")[-3] if iters else "init"].append(path)
+    iter_record = _load_record()
+    dlog.info("iter_record")
+    dlog.info(iter_record)
+    last_iter = max([ii for ii in iter_record if ii != "init"], default=None)
+    func = functools.partial(
+        _parse_vasp_task, config_info_dict=config_info_dict, iters=iters
+    )
+    icount = 0
+    for name in sorted(groups):
+        shard = os.path.join(shard_dir, name + ".jsonl")
+        if name in iter_record and name != last_iter and os.path.isfile(shard):
+            continue
+        group = groups[name]
+        chunksize = max(1, len(group) // (4 * nproc))
+        with open(shard + ".tmp", "w") as fw:
+            for path, line in zip(
+                group, parallel_imap(func, group, nproc, chunksize=chunksize)
+            ):
+                if line is None:
+                    dlog.info(f"failed for {path}")
+                    continue
                 fw.write(line + "\n")
-    return entries
+                icount += 1
+        os.replace(shard + ".tmp", shard)
+        # checkpoint
+        if name not in iter_record:
+            iter_record = sorted([*iter_record, name])
+            with open("record.database", "w") as fw:
+                for line in iter_record:
+                    fw.write(line + "\n")
+        dlog.info(f"collected {name}")
+    return icount
 
 
 def parsing_pwscf(path, output=OUTPUT):
@@ -1,10 +1,14 @@
 import os
+import time
 
 # import dargs
 from dargs.dargs import Argument
 from dpdispatcher import Machine, Resources, Submission, Task
+from dpdispatcher.utils.job_status import JobStatus
 from packaging.version import Version
 
+from dpgen import dlog
+
 
 def make_submission(
     mdata_machine,
@@ -155,3 +159,44 @@ def make_submission_compat(
         errlog=errlog,
     )
     submission.run_submission()
+
+
+def run_submission_with_progress(
+    submission: Submission, check_interval: float = 30, name: str = "submission"
+) -> None:
+    """Run a submission and log the number of finished tasks while waiting.
+
+    The jobs are submitted first, then the submission is polled until all
+    jobs finish. Unexpected job states are handled in the same way as
+    :meth:`dpdispatcher.Submission.run_submission`, which is called at the
+    end to download the results. An interrupted submission is recovered from
+    the record of dpdispatcher when it is run again with the same tasks.
+
+    Parameters
+    ----------
+    submission : Submission
+        the submission to run
+    check_interval : float, default=30
+        seconds between two checks of the job states
+    name : str, default="submission"
+        name of the submission in the log
+    """
+    # keep the remote files until the results are downloaded at the end
+    submission.run_submission(exit_on_submit=True, clean=False)
+    ntasks = len(submission.belonging_tasks)
+    nfinished = -1
+    while True:
+        finished = sum(
+            len(job.job_task_list)
+            for job in submission.belonging_jobs
+            if job.job_state == JobStatus.finished
+        )
+        if finished != nfinished:
+            dlog.info(f"{name}: {finished}/{ntasks} tasks finished")
+            nfinished = finished
+        if submission.check_all_finished():
+            break
+        time.sleep(check_interval)
+        submission.update_submission_state()
+        submission.handle_unexpected_submission_state()
+    submission.run_submission(check_interval=check_interval)
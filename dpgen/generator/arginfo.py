@@ -25,6 +25,10 @@ def basic_args() -> list[Argument]:
 - 0: no electron temperature. \n\n\
 - 1: eletron temperature as frame parameter. \n\n\
 - 2: electron temperature as atom parameter."
+    doc_skip_finished_tasks = "If set to true, the finished tasks of run_train, run_model_devi and run_fp are not submitted again when a stage is restarted. The tasks are checked by their outputs: the frozen models and lcurve.out of the training tasks, the end of the logs of the model deviation tasks, and the outputs of the FP tasks as in the check of each fp_style. The finished tasks are recorded in `finished_tasks.json` of the work path, so that they are not checked again. The tasks are not skipped if the submission of all the tasks has been submitted by a previous run, so that dpdispatcher recovers its jobs, which may still be running, instead of submitting them again. Not supported by model_devi_engine calypso and fp_style amber/diff and custom."
+    doc_skip_finished_tasks_nproc = (
+        "Number of processes used to check whether the tasks are finished."
+    )
 
     return [
         Argument("type_map", list[str], optional=False, doc=doc_type_map),
@@ -36,6 +40,20 @@ def basic_args() -> list[Argument]:
             doc=doc_mass_map,
         ),
         Argument("use_ele_temp", int, optional=True, default=0, doc=doc_use_ele_temp),
+        Argument(
+            "skip_finished_tasks",
+            bool,
+            optional=True,
+            default=False,
+            doc=doc_skip_finished_tasks,
+        ),
+        Argument(
+            "skip_finished_tasks_nproc",
+            int,
+            optional=True,
+            default=1,
+            doc=doc_skip_finished_tasks_nproc,
+        ),
     ]
 
 
@@ -127,7 +145,7 @@ def training_args_dp() -> list[Argument]:
     )
     doc_model_devi_activation_func = "The activation function in the model. The shape of list should be (N_models, 2), where 2 represents the embedding and fitting network. This option will override default parameters."
     doc_srtab_file_path = "The path of the table for the short-range pairwise interaction which is needed when using DP-ZBL potential"
-    doc_one_h5 = "When using DeePMD-kit, all of the input data will be merged into one HDF5 file."
+    doc_one_h5 = "When using DeePMD-kit, all of the input data will be merged into one HDF5 file. The merged data is kept in `train_data.hdf5` of the working directory, to which only the new or changed systems are appended in each iteration."
     doc_training_init_frozen_model = "At interation 0, initilize the model parameters from the given frozen models. Number of element should be equal to numb_models."
     doc_training_finetune_model = "At interation 0, finetune the model parameters from the given frozen models. Number of element should be equal to numb_models."
 
@@ -625,6 +643,11 @@ def fp_style_vasp_args() -> list[Argument]:
     doc_fp_skip_bad_box = (
         "Skip the configurations that are obviously unreasonable before 02.fp"
     )
+    doc_fp_warm_start = "If set to true, each VASP task starts from the wavefunctions or charge density of the nearest converged task of the previous iterations, i.e. the finished task whose last electronic loop reached EDIFF. The nearest task is picked from the tasks with the same composition and nearly the same cell by a structural fingerprint. Its files are staged in the `warm_start` directory of the task, and ISTART and ICHARG are set in INCAR. The files are also downloaded from all the tasks, which may take much disk space."
+    doc_fp_warm_start_files = (
+        "The files to warm start from: WAVECAR (ISTART = 1) or CHGCAR (ICHARG = 1)."
+    )
+    doc_fp_warm_start_cell_tol = "The largest difference of the cell vectors, in Angstrom, between a task and the task it warm starts from."
 
     return [
         Argument("fp_pp_path", str, optional=False, doc=doc_fp_pp_path),
@@ -635,6 +658,23 @@ def fp_style_vasp_args() -> list[Argument]:
         ),
         Argument("cvasp", bool, optional=True, doc=doc_cvasp),
         Argument("fp_skip_bad_box", str, optional=True, doc=doc_fp_skip_bad_box),
+        Argument(
+            "fp_warm_start", bool, optional=True, default=False, doc=doc_fp_warm_start
+        ),
+        Argument(
+            "fp_warm_start_files",
+            list[str],
+            optional=True,
+            default=["WAVECAR"],
+            doc=doc_fp_warm_start_files,
+        ),
+        Argument(
+            "fp_warm_start_cell_tol",
+            float,
+            optional=True,
+            default=0.05,
+            doc=doc_fp_warm_start_cell_tol,
+        ),
     ]
 
 
@@ -964,10 +1004,16 @@ def fp_args() -> list[Argument]:
     doc_fp_accurate_threshold = "If the accurate ratio is larger than this number, no fp calculation will be performed, i.e. fp_task_max = 0."
     doc_fp_accurate_soft_threshold = "If the accurate ratio is between this number and fp_accurate_threshold, the fp_task_max linearly decays to zero."
     doc_fp_cluster_vacuum = "If the vacuum size is smaller than this value, this cluster will not be chosen for labeling."
+    doc_fp_candidate_select = "The way to pick at most `fp_task_max` structures from the candidates of each system. `random`: pick randomly. `fps`: pick a diverse subset by farthest point sampling on a structural fingerprint, i.e. the smeared histograms of the interatomic distances, of the candidate frames. `fps` only supports model_devi_engine lammps without cluster_cutoff."
     doc_detailed_report_make_fp = (
         "If set to true, a detailed report will be generated for each iteration."
     )
     doc_ratio_failed = "Check the ratio of unsuccessfully terminated jobs. If too many FP tasks are not converged, RuntimeError will be raised."
+    doc_post_fp_nproc = "Number of processes used to parse the outputs of FP tasks in post_fp. Currently supported by fp_style vasp, pwscf, abacus, gaussian and cp2k."
+    doc_fp_cache = "Path to the cache of FP labels, which is a SQLite database shared by runs with the same FP settings. Before the FP inputs are made, the candidate structures whose labels are found in the cache are removed from the FP tasks, and their labels are written to `data.cached.*` in 02.fp. The labels of the new FP tasks are added to the cache in post_fp. The structures are looked up by their species, cell and coordinates, rounded to `fp_cache_tol`, and by the FP parameters. Only the tasks with a POSCAR are looked up. The cache is not used if it is not set."
+    doc_fp_cache_max_size = "The maximal size of the fp cache in MB. The least recently used labels are evicted beyond it."
+    doc_fp_cache_tol = "The tolerance of the cell and coordinates, in Angstrom, within which two structures share the labels in the fp cache."
+    doc_model_devi_fp_pipeline = "If set to true, the model deviation and FP stages of each iteration are pipelined over the systems: the model deviation tasks of each system are submitted separately, and the FP tasks of a system are made and submitted as soon as its model deviation tasks finish, while the FP outputs are collected as soon as its FP tasks finish. The stage reached by each system is recorded in `pipeline.json` of the iteration to restart from. Not supported by model_devi_engine calypso and fp_style amber/diff."
 
     return [
         Argument("fp_task_max", int, optional=False, doc=doc_fp_task_max),
@@ -982,6 +1028,13 @@ def fp_args() -> list[Argument]:
             doc=doc_fp_accurate_soft_threshold,
         ),
         Argument("fp_cluster_vacuum", float, optional=True, doc=doc_fp_cluster_vacuum),
+        Argument(
+            "fp_candidate_select",
+            str,
+            optional=True,
+            default="random",
+            doc=doc_fp_candidate_select,
+        ),
         Argument(
             "detailed_report_make_fp",
             bool,
@@ -990,6 +1043,25 @@ def fp_args() -> list[Argument]:
             doc=doc_detailed_report_make_fp,
         ),
         Argument("ratio_failed", float, optional=True, doc=doc_ratio_failed),
+        Argument("post_fp_nproc", int, optional=True, default=1, doc=doc_post_fp_nproc),
+        Argument("fp_cache", str, optional=True, doc=doc_fp_cache),
+        Argument(
+            "fp_cache_max_size",
+            int,
+            optional=True,
+            default=10240,
+            doc=doc_fp_cache_max_size,
+        ),
+        Argument(
+            "fp_cache_tol", float, optional=True, default=1e-4, doc=doc_fp_cache_tol
+        ),
+        Argument(
+            "model_devi_fp_pipeline",
+            bool,
+            optional=True,
+            default=False,
+            doc=doc_model_devi_fp_pipeline,
+        ),
     ]
 
 
@@ -1,12 +1,14 @@
 import argparse
-import copy
 import glob
+import json
 import math
 import os
 import shutil
 
 import dpdata
 import numpy as np
+from ase import Atoms
+from ase.neighborlist import neighbor_list
 from deepmd.infer import DeepPot as DP
 from deepmd.infer import calc_model_devi
 
@@ -32,6 +34,45 @@ def write_model_devi_out(devi, fname):
     return devi
 
 
+def calc_min_dis(coords, cells, nopbc=False):
+    """Compute the minimum interatomic distance of each frame with a cell-list
+    neighbor search, instead of the dense distance matrix.
+
+    Parameters
+    ----------
+    coords : np.ndarray
+        coordinates in shape (nframes, natoms, 3)
+    cells : np.ndarray
+        cells in shape (nframes, 3, 3)
+    nopbc : bool
+        whether the frames are not periodic
+
+    Returns
+    -------
+    np.ndarray
+        minimum distances in shape (nframes,), 10000 if there is no pair of atoms
+    """
+    min_dis = np.full(len(coords), 10000.0)
+    for ii, (coord, cell) in enumerate(zip(coords, cells)):
+        atoms = Atoms(positions=coord, cell=cell, pbc=not nopbc)
+        if nopbc:
+            max_cutoff = np.linalg.norm(np.ptp(coord, axis=0))
+        else:
+            max_cutoff = np.linalg.norm(cell, axis=1).sum()
+        # enlarge the cutoff until a pair of different atoms is found
+        cutoff = 3.0
+        while True:
+            idx_i, idx_j, dis = neighbor_list("ijd", atoms, cutoff)
+            mask = idx_i != idx_j
+            if np.any(mask):
+                min_dis[ii] = np.min(dis[mask])
+                break
+            if cutoff > max_cutoff:
+                break
+            cutoff *= 2
+    return min_dis
+
+
 def Modd(all_models, type_map):
     # Model Devi
 
@@ -39,7 +80,6 @@ def Modd(all_models, type_map):
     graphs = [DP(model) for model in all_models]
 
     Devis = []
-    pcount = 0
     strus_lists = glob.glob(os.path.join(cwd, "*.structures"))
     for num, strus_path in enumerate(strus_lists):
         structures_data = dpdata.System(strus_path, "deepmd/npy", type_map=type_map)
@@ -51,56 +91,50 @@ def Modd(all_models, type_map):
         else:
             num_per_task = math.ceil(nnum / 500)
 
+        # the frames of a system share the atom types, so they are evaluated in batches
+        nopbc = structures_data.nopbc
+        atom_types = structures_data.data["atom_types"]
         for temp in range(num_per_task):
             task_name = os.path.join(cwd, "task.%03d.%03d" % (num, temp))  # noqa: UP031
             put_poscar = os.path.join(task_name, "traj")
-            if not os.path.exists(task_name):
-                os.mkdir(task_name)
-                os.mkdir(put_poscar)
-            else:
+            if os.path.exists(task_name):
                 shutil.rmtree(task_name)
-                os.mkdir(task_name)
-                os.mkdir(put_poscar)
-            devis = []
-            if (nnum - (temp + 1) * 500) >= 0:
-                temp_sl = range(temp * 500, (temp + 1) * 500)
-            else:
-                temp_sl = range(temp * 500, nnum)
-
-            new_index = 0
-            for index, frameid in enumerate(temp_sl):
-                pdata = structures_data[frameid]
-                pdata.to_vasp_poscar(os.path.join(put_poscar, f"{str(index)}.poscar"))
-                nopbc = pdata.nopbc
-                coord = pdata.data["coords"]
-                cell = pdata.data["cells"] if not nopbc else None
-                atom_types = pdata.data["atom_types"]
-                try:
-                    devi = calc_model_devi(coord, cell, atom_types, graphs, nopbc=nopbc)
-                except TypeError:
-                    devi = calc_model_devi(coord, cell, atom_types, graphs)
-                # ------------------------------------------------------------------------------------
-                # append min-distance in devi list
-                dis = pdata.to_ase_structure()[0].get_all_distances(mic=True)
-                row, col = np.diag_indices_from(dis)
-                dis[row, col] = 10000
-                min_dis = np.nanmin(dis)
-                devi = np.append(devi[0], min_dis)
-                t = [devi]
-                devi = np.array(t)
-                # ------------------------------------------------------------------------------------
-                temp_d = copy.deepcopy(devi)
-                temp_D = copy.deepcopy(devi)
-                devis.append(temp_d)
-                Devis.append(temp_D)
-                devis[index][0][0] = np.array(index)
-                Devis[pcount][0][0] = np.array(pcount)
-                pcount += 1
-                new_index += 1
-            devis = np.vstack(devis)
+            os.mkdir(task_name)
+            os.mkdir(put_poscar)
+            start = temp * 500
+            end = min((temp + 1) * 500, nnum)
+            coords = structures_data.data["coords"][start:end]
+            cells = structures_data.data["cells"][start:end]
+            try:
+                devis = calc_model_devi(
+                    coords.reshape(end - start, -1),
+                    None if nopbc else cells.reshape(end - start, -1),
+                    atom_types,
+                    graphs,
+                    nopbc=nopbc,
+                )
+            except TypeError:
+                devis = calc_model_devi(
+                    coords.reshape(end - start, -1),
+                    None if nopbc else cells.reshape(end - start, -1),
+                    atom_types,
+                    graphs,
+                )
+            # append min-distance in devi list
+            min_dis = calc_min_dis(coords, cells, nopbc=nopbc)
+            devis = np.concatenate([devis[:, :7], min_dis[:, None]], axis=1)
+            devis[:, 0] = np.arange(end - start)
             write_model_devi_out(devis, os.path.join(task_name, "model_devi.out"))
+            # the POSCARs in traj are written only for the selected candidates
+            # when the fp tasks are made, from the frames recorded here
+            with open(os.path.join(task_name, "frames.json"), "w") as fp:
+                json.dump(
+                    {"structures": os.path.basename(strus_path), "start": start}, fp
+                )
+            Devis.append(devis)
 
     Devis = np.vstack(Devis)
+    Devis[:, 0] = np.arange(len(Devis))
     write_model_devi_out(Devis, os.path.join(cwd, "Model_Devi.out"))
 
     f = open(
@@ -0,0 +1,133 @@
+"""Cheap structural fingerprints of the candidate structures.
+
+A structure is described by the Gaussian smeared histograms of the
+distances within a cutoff between each pair of atom types, found by a
+neighbor list of the periodic structure. The fingerprints are used
+to pick the fp task to warm start from, and to pick a diverse subset of the
+candidates.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+
+def structure_fingerprint(
+    cell: np.ndarray,
+    coords: np.ndarray,
+    atom_types: np.ndarray,
+    ntypes: int,
+    rcut: float = 6.0,
+    nbins: int = 60,
+    sigma: float = 0.1,
+) -> np.ndarray:
+    """Compute the fingerprint of a structure.
+
+    Parameters
+    ----------
+    cell : np.ndarray
+        the cell, in shape (3, 3)
+    coords : np.ndarray
+        the coordinates, in shape (natoms, 3)
+    atom_types : np.ndarray
+        the atom types, in shape (natoms,)
+    ntypes : int
+        the number of atom types
+    rcut : float, optional
+        the largest distance in the histograms
+    nbins : int, optional
+        the number of bins of each histogram
+    sigma : float, optional
+        the width of the Gaussian smearing
+
+    Returns
+    -------
+    np.ndarray
+        the fingerprint, in shape (ntypes * ntypes * nbins,)
+    """
+    from ase import Atoms
+    from ase.neighborlist import neighbor_list
+
+    atoms = Atoms(positions=coords, cell=cell, pbc=True)
+    # all the periodic images within rcut; each pair is found twice, as
+    # (i, j) and (j, i)
+    ii, jj, dist = neighbor_list("ijd", atoms, rcut)
+    ti, tj = atom_types[ii], atom_types[jj]
+    # the pairs of types (a, b) and (b, a) are the same
+    pair = np.minimum(ti, tj) * ntypes + np.maximum(ti, tj)
+    centers = np.linspace(0.0, rcut, nbins)
+    weights = 0.5 * np.exp(-0.5 * ((dist[:, None] - centers) / sigma) ** 2)
+    fingerprint = np.zeros((ntypes * ntypes, nbins))
+    np.add.at(fingerprint, pair, weights)
+    return fingerprint.ravel() / len(coords)
+
+
+def farthest_point_sampling(fingerprints: np.ndarray, nsel: int) -> np.ndarray:
+    """Pick a diverse subset by farthest point sampling.
+
+    Starting from the first point, the point farthest from all the picked
+    points is picked one by one.
+
+    Parameters
+    ----------
+    fingerprints : np.ndarray
+        the fingerprints, in shape (npoints, nfeatures)
+    nsel : int
+        the number of points to pick
+
+    Returns
+    -------
+    np.ndarray
+        the indexes of the picked points, in the order they are picked
+    """
+    npoints = len(fingerprints)
+    nsel = min(nsel, npoints)
+    if nsel <= 0:
+        return np.zeros(0, dtype=int)
+    selected = np.zeros(nsel, dtype=int)
+    dist = np.linalg.norm(fingerprints - fingerprints[0], axis=1)
+    dist[0] = -np.inf
+    for ii in range(1, nsel):
+        selected[ii] = np.argmax(dist)
+        dist = np.minimum(
+            dist, np.linalg.norm(fingerprints - fingerprints[selected[ii]], axis=1)
+        )
+        # the picked points are not picked again, even if all are duplicates
+        dist[selected[ii]] = -np.inf
+    return selected
+
+
+def pick_nearest(
+    fingerprint: np.ndarray,
+    cell: np.ndarray,
+    candidates: list[tuple[str, np.ndarray, np.ndarray]],
+    cell_tol: float,
+) -> Optional[str]:
+    """Pick the candidate nearest to a structure.
+
+    Parameters
+    ----------
+    fingerprint : np.ndarray
+        the fingerprint of the structure
+    cell : np.ndarray
+        the cell of the structure
+    candidates : list[tuple[str, np.ndarray, np.ndarray]]
+        the path, cell and fingerprint of each candidate with the same
+        composition as the structure
+    cell_tol : float
+        the largest difference of the cell vectors, in Angstrom
+
+    Returns
+    -------
+    str or None
+        the path of the nearest candidate, or None if no candidate has
+        the same cell
+    """
+    best, best_dist = None, np.inf
+    for path, cand_cell, cand_fingerprint in candidates:
+        if np.max(np.abs(cand_cell - cell)) > cell_tol:
+            continue
+        dist = np.linalg.norm(cand_fingerprint - fingerprint)
+        if dist < best_dist:
+            best, best_dist = path, dist
+    return best
@@ -0,0 +1,283 @@
+"""Content-addressed cache of first-principles labels.
+
+The labels of a structure are stored under a key hashed from its species,
+cell and coordinates, rounded to a tolerance, and from the FP input
+parameters. The coordinates are wrapped into the cell and sorted, so that
+the key does not depend on the order of atoms or the periodic images. The
+cache is a SQLite database; the least recently used entries are evicted
+once its size exceeds the limit.
+"""
+
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import time
+from collections.abc import Iterable
+from typing import Optional
+
+import dpdata
+import numpy as np
+
+# the name of the file recording the cache key in an fp task
+cache_key_name = "fp_cache.key"
+
+# the keys of the fp parameters that do not change the labels
+_fp_unhashed_keys = {
+    "fp_task_max",
+    "fp_task_min",
+    "fp_accurate_threshold",
+    "fp_accurate_soft_threshold",
+    "fp_cluster_vacuum",
+    "fp_candidate_select",
+    "fp_cache",
+    "fp_cache_max_size",
+    "fp_cache_tol",
+    "fp_warm_start",
+    "fp_warm_start_files",
+    "fp_warm_start_cell_tol",
+}
+# the other keys deciding the fp inputs
+_fp_input_keys = {"user_fp_params", "use_ele_temp", "external_input_path"}
+
+_schema = """
+CREATE TABLE IF NOT EXISTS labels (
+    key TEXT PRIMARY KEY,
+    data BLOB,
+    size INTEGER,
+    atime REAL
+);
+"""
+
+
+def _digest_value(value, roots):
+    # a string naming an existing file is replaced by the digest of the file
+    if isinstance(value, str):
+        for root in roots:
+            fname = os.path.join(root, value)
+            if os.path.isfile(fname):
+                with open(fname, "rb") as fp:
+                    return "sha256:" + hashlib.sha256(fp.read()).hexdigest()
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_digest_value(vv, roots) for vv in value]
+    if isinstance(value, dict):
+        return {kk: _digest_value(vv, roots) for kk, vv in value.items()}
+    return value
+
+
+def fp_params_hash(jdata: dict) -> str:
+    """Hash the parameters deciding the FP inputs.
+
+    All the ``fp_*`` keys except those not changing the labels, e.g. the
+    ones selecting the candidates, are hashed.
+    The files referred to by the parameters, e.g. ``fp_incar`` and
+    ``fp_pp_files``, are hashed by their contents.
+
+    Parameters
+    ----------
+    jdata : dict
+        Run parameters.
+
+    Returns
+    -------
+    str
+        the hex digest of the parameters
+    """
+    roots = ["", jdata.get("fp_pp_path", "")]
+    params = {
+        kk: _digest_value(vv, roots)
+        for kk, vv in jdata.items()
+        if (kk.startswith("fp_") and kk not in _fp_unhashed_keys)
+        or kk in _fp_input_keys
+    }
+    return hashlib.sha256(
+        json.dumps(params, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def structure_key(
+    system: dpdata.System,
+    params_hash: str,
+    tol: float = 1e-4,
+    extra: Optional[dict] = None,
+) -> str:
+    """Compute the cache key of the first frame of a system.
+
+    Parameters
+    ----------
+    system : dpdata.System
+        the structure
+    params_hash : str
+        the hash of the FP input parameters
+    tol : float, optional
+        the tolerance of the cell and coordinates, in Angstrom
+    extra : dict, optional
+        the FP parameters of this structure only, e.g. the electron temperature
+
+    Returns
+    -------
+    str
+        the hex digest of the key
+    """
+    cell = system["cells"][0]
+    coords = system["coords"][0]
+    names = np.array(system["atom_names"])[system["atom_types"]]
+    _, species = np.unique(names, return_inverse=True)
+    frac = np.linalg.solve(cell.T, coords.T).T
+    ngrid = np.maximum(np.rint(np.linalg.norm(cell, axis=1) / tol), 1).astype(np.int64)
+    grid = np.rint(frac * ngrid).astype(np.int64) % ngrid
+    order = np.lexsort((grid[:, 2], grid[:, 1], grid[:, 0], species))
+    hh = hashlib.sha256()
+    hh.update(params_hash.encode())
+    if extra:
+        hh.update(json.dumps(extra, sort_keys=True).encode())
+    hh.update(" ".join(names[order]).encode())
+    hh.update(np.rint(cell / tol).astype(np.int64).tobytes())
+    hh.update(grid[order].tobytes())
+    return hh.hexdigest()
+
+
+def _dumps(system):
+    arrays = {kk: vv for kk, vv in system.data.items() if isinstance(vv, np.ndarray)}
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        atom_names=np.array(system["atom_names"]),
+        nopbc=np.array(system.nopbc),
+        **arrays,
+    )
+    return buffer.getvalue()
+
+
+def _loads(blob):
+    with np.load(io.BytesIO(blob)) as npz:
+        data = {kk: npz[kk] for kk in npz.files}
+    data["atom_names"] = [str(ii) for ii in data["atom_names"]]
+    data["atom_numbs"] = [
+        int(np.count_nonzero(data["atom_types"] == ii))
+        for ii in range(len(data["atom_names"]))
+    ]
+    if data.pop("nopbc"):
+        data["nopbc"] = True
+    return dpdata.LabeledSystem(data=data)
+
+
+class FPCache:
+    """On-disk store of FP labels.
+
+    Parameters
+    ----------
+    path : str
+        the path of the SQLite database
+    max_size : int, optional
+        the maximal total size of the stored labels in bytes. The least
+        recently used labels are evicted beyond it.
+    """
+
+    def __init__(self, path: str, max_size: Optional[int] = None):
+        self.path = path
+        self.max_size = max_size
+        dirname = os.path.dirname(os.path.abspath(path))
+        os.makedirs(dirname, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.executescript(_schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, key: str) -> Optional[dpdata.LabeledSystem]:
+        """Get the labeled frame of a key.
+
+        Parameters
+        ----------
+        key : str
+            the cache key
+
+        Returns
+        -------
+        dpdata.LabeledSystem or None
+            the labeled frame, or None if it is not cached
+        """
+        row = self.conn.execute(
+            "SELECT data FROM labels WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        with self.conn:
+            self.conn.execute(
+                "UPDATE labels SET atime = ? WHERE key = ?", (time.time(), key)
+            )
+        return _loads(row[0])
+
+    def put(self, items: Iterable[tuple[str, dpdata.LabeledSystem]]):
+        """Store labeled frames and evict the least recently used ones.
+
+        Parameters
+        ----------
+        items : Iterable[tuple[str, dpdata.LabeledSystem]]
+            the cache keys and the labeled frames
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?)",
+                [
+                    (key, blob, len(blob), now)
+                    for key, blob in ((kk, _dumps(ss)) for kk, ss in items)
+                ],
+            )
+        if self.max_size is not None:
+            self.evict(self.max_size)
+
+    def evict(self, max_size: int):
+        """Evict the least recently used labels until the size is below a limit.
+
+        Parameters
+        ----------
+        max_size : int
+            the maximal total size in bytes
+        """
+        total = self.conn.execute("SELECT SUM(size) FROM labels").fetchone()[0] or 0
+        if total <= max_size:
+            return
+        evicted = []
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM labels ORDER BY atime"
+        ).fetchall():
+            if total <= max_size:
+                break
+            evicted.append((key,))
+            total -= size
+        with self.conn:
+            self.conn.executemany("DELETE FROM labels WHERE key = ?", evicted)
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+
+
+def open_fp_cache(jdata: dict) -> Optional[FPCache]:
+    """Open the FP cache set by ``fp_cache`` in the parameters.
+
+    Parameters
+    ----------
+    jdata : dict
+        Run parameters.
+
+    Returns
+    -------
+    FPCache or None
+        the cache, or None if ``fp_cache`` is not set
+    """
+    path = jdata.get("fp_cache")
+    if not path:
+        return None
+    max_size = jdata.get("fp_cache_max_size", 10240)
+    return FPCache(path, max_size=int(max_size * 1024 * 1024))
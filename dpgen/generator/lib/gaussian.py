@@ -18,6 +18,7 @@ except ImportError:
 try:
     from ase import Atom, Atoms
     from ase.data import atomic_numbers
+    from ase.neighborlist import neighbor_list
 except ImportError:
     pass
 
@@ -216,6 +217,31 @@ def make_gaussian_input(sys_data, fp_params):
 
 
 def take_cluster(old_conf_name, type_map, idx, jdata):
+    return take_clusters(old_conf_name, type_map, [idx], jdata)[0]
+
+
+def take_clusters(old_conf_name, type_map, idxs, jdata):
+    """Take the clusters centered at the given atoms of a frame.
+
+    The frame is read, the fragments are detected and the periodic neighbor
+    list is built only once for all the clusters.
+
+    Parameters
+    ----------
+    old_conf_name : str
+        the lammps/dump file of the frame
+    type_map : list[str]
+        the type map
+    idxs : list[int]
+        the indexes of the center atoms
+    jdata : dict
+        the parameters, with cluster_cutoff, cluster_cutoff_hard and cluster_minify
+
+    Returns
+    -------
+    list[dpdata.System]
+        the cluster of each center atom, with the center atom marked in atom_pref
+    """
     cutoff = jdata["cluster_cutoff"]
     cutoff_hard = jdata.get("cluster_cutoff_hard", None)
     sys = dpdata.System(old_conf_name, fmt="lammps/dump", type_map=type_map)
@@ -228,10 +254,47 @@ def take_cluster(old_conf_name, type_map, idx, jdata):
     frag_numb, frag_index, graph = _crd2frag(
         symbols, coords, True, cell, return_bonds=True
     )
-    # get_distances
+    frag_atoms = [np.where(frag_index == ii)[0] for ii in range(frag_numb)]
+    # periodic neighbor list, in which the minimal image distances are taken
     all_atoms = Atoms(symbols=symbols, positions=coords, pbc=True, cell=cell)
-    all_atoms[idx].tag = 1
-    distances = all_atoms.get_distances(idx, range(len(all_atoms)), mic=True)
+    nl_cutoff = cutoff if cutoff_hard is None else max(cutoff, cutoff_hard)
+    nl_i, nl_j, nl_d = neighbor_list("ijd", all_atoms, nl_cutoff)
+    clusters = []
+    for idx in idxs:
+        distances = np.full(len(all_atoms), np.inf)
+        distances[idx] = 0.0
+        mask = nl_i == idx
+        np.minimum.at(distances, nl_j[mask], nl_d[mask])
+        clusters.append(
+            _cut_cluster(
+                sys,
+                all_atoms,
+                idx,
+                distances,
+                frag_atoms,
+                graph,
+                cutoff,
+                cutoff_hard,
+                jdata.get("cluster_minify", False),
+            )
+        )
+    return clusters
+
+
+def _cut_cluster(
+    sys,
+    all_atoms,
+    idx,
+    distances,
+    frag_atoms,
+    graph,
+    cutoff,
+    cutoff_hard,
+    cluster_minify,
+):
+    atom_names = sys["atom_names"]
+    atom_types = sys["atom_types"]
+    coords = sys["coords"][0]
     distancescutoff = distances < cutoff
     cutoff_atoms_idx = np.where(distancescutoff)[0]
     if cutoff_hard is not None:
@@ -240,23 +303,21 @@ def take_cluster(old_conf_name, type_map, idx, jdata):
     # make cutoff atoms in molecules
     taken_atoms_idx = []
     added = []
-    for ii in range(frag_numb):
-        frag_atoms_idx = np.where(frag_index == ii)[0]
+    for frag_atoms_idx in frag_atoms:
         if cutoff_hard is not None:
             # drop atoms out of the hard cutoff anyway
             frag_atoms_idx = np.intersect1d(frag_atoms_idx, cutoff_atoms_idx_hard)
         if np.any(np.isin(frag_atoms_idx, cutoff_atoms_idx)):
-            if "cluster_minify" in jdata and jdata["cluster_minify"]:
+            if cluster_minify:
                 # support for organic species
                 take_frag_idx = []
                 for aa in frag_atoms_idx:
+                    bonds = graph.getrow(aa).toarray()[0]
                     if np.any(np.isin(aa, cutoff_atoms_idx)):
                         # atom is in the soft cutoff
                         # pick up anyway
                         take_frag_idx.append(aa)
-                    elif np.count_nonzero(
-                        np.logical_and(distancescutoff, graph.toarray()[aa] == 1)
-                    ):
+                    elif np.count_nonzero(np.logical_and(distancescutoff, bonds == 1)):
                         # atom is between the hard cutoff and the soft cutoff
                         # and has a single bond with the atom inside
                         if all_atoms[aa].symbol == "H":
@@ -265,7 +326,7 @@ def take_cluster(old_conf_name, type_map, idx, jdata):
                         else:
                             # for other atoms (C, O, etc.): replace it with a ghost H atom
                             near_atom_idx = np.nonzero(
-                                np.logical_and(distancescutoff, graph.toarray()[aa] > 0)
+                                np.logical_and(distancescutoff, bonds > 0)
                             )[0][0]
                             vector = (
                                 all_atoms[aa].position
@@ -276,9 +337,7 @@ def take_cluster(old_conf_name, type_map, idx, jdata):
                                 + vector / np.linalg.norm(vector) * 1.09
                             )
                             added.append(Atom("H", new_position))
-                    elif np.count_nonzero(
-                        np.logical_and(distancescutoff, graph.toarray()[aa] > 1)
-                    ):
+                    elif np.count_nonzero(np.logical_and(distancescutoff, bonds > 1)):
                         # if that atom has a double bond with the atom inside
                         # just pick up the whole fragment (within the hard cutoff)
                         # TODO: use a more fantastic method
@@ -290,11 +349,14 @@ def take_cluster(old_conf_name, type_map, idx, jdata):
     all_taken_atoms_idx = np.concatenate(taken_atoms_idx)
     # wrap
     cutoff_atoms = sum(added, all_atoms[all_taken_atoms_idx])
+    tags = np.zeros(len(cutoff_atoms), dtype=int)
+    tags[: len(all_taken_atoms_idx)] = all_taken_atoms_idx == idx
+    cutoff_atoms.set_tags(tags)
     cutoff_atoms.wrap(
         center=coords[idx] / cutoff_atoms.get_cell_lengths_and_angles()[0:3], pbc=True
     )
-    coords = cutoff_atoms.get_positions()
-    sys.data["coords"] = np.array([coords])
+    sys = sys.copy()
+    sys.data["coords"] = np.array([cutoff_atoms.get_positions()])
     sys.data["atom_types"] = np.array(
         list(atom_types[all_taken_atoms_idx]) + [atom_names.index("H")] * len(added)
     )
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import itertools
+import os
 import random
 
 import dpdata
@@ -282,6 +284,137 @@ def get_all_dumped_forces(file_name):
     return ret
 
 
+def _parse_dump_force_keys(line, file_name):
+    keys = line.replace("ITEM: ATOMS", "").split()
+    try:
+        return [keys.index("fx"), keys.index("fy"), keys.index("fz")]
+    except ValueError:
+        raise RuntimeError("wrong dump file format, cannot find dump keys", file_name)
+
+
+def get_dumped_forces_square_sum(file_name):
+    """Stream a dump file and accumulate the squared norm of atomic forces.
+
+    Only one frame is held in memory at a time, so the memory usage does not
+    depend on the length of the trajectory.
+
+    Parameters
+    ----------
+    file_name : str
+        the lammps dump file
+
+    Returns
+    -------
+    sum_f2 : float
+        sum of the squared norm of the forces over all atoms and frames
+    count : int
+        number of atoms summed over all frames
+    """
+    sum_f2 = 0.0
+    count = 0
+    natoms = None
+    exist_atoms = False
+    with open(file_name) as fp:
+        for line in fp:
+            if "ITEM: NUMBER OF ATOMS" in line:
+                natoms = int(next(fp))
+            elif "ITEM: ATOMS" in line:
+                if natoms is None:
+                    raise RuntimeError(
+                        "wrong dump file format, cannot find number of atoms",
+                        file_name,
+                    )
+                cols = _parse_dump_force_keys(line, file_name)
+                exist_atoms = True
+                ff = np.loadtxt(itertools.islice(fp, natoms), usecols=cols, ndmin=2)
+                sum_f2 += float(np.sum(np.square(ff)))
+                count += ff.shape[0]
+    if natoms is None:
+        raise RuntimeError(
+            "wrong dump file format, cannot find number of atoms", file_name
+        )
+    if not exist_atoms:
+        raise RuntimeError("wrong dump file format, cannot find dump keys", file_name)
+    return sum_f2, count
+
+
+def _dump_index_name(file_name):
+    return file_name + ".idx.npy"
+
+
+def get_dump_frame_index(file_name, cache=True):
+    """Get the frame-offset index of a lammps dump file.
+
+    The index is built in one pass over the file and, if cache is set,
+    saved next to the dump file. The cached index is reused as long as it
+    is not older than the dump file.
+
+    Parameters
+    ----------
+    file_name : str
+        the lammps dump file
+    cache : bool
+        read and write the cached index
+
+    Returns
+    -------
+    np.ndarray
+        int64 array of the shape (nframes, 2). The columns are the time step
+        and the byte offset of the ``ITEM: TIMESTEP`` line of each frame.
+    """
+    index_name = _dump_index_name(file_name)
+    if (
+        cache
+        and os.path.isfile(index_name)
+        and os.path.getmtime(index_name) >= os.path.getmtime(file_name)
+    ):
+        return np.load(index_name)
+    index = []
+    offset = 0
+    with open(file_name, "rb") as fp:
+        for line in fp:
+            if line.startswith(b"ITEM: TIMESTEP"):
+                step_line = next(fp)
+                index.append([int(step_line), offset])
+                offset += len(step_line)
+            offset += len(line)
+    index = np.array(index, dtype=np.int64).reshape([-1, 2])
+    if cache:
+        try:
+            np.save(index_name, index)
+        except OSError:
+            # the directory may be read-only; the index is only a cache
+            pass
+    return index
+
+
+def read_dump_frame(file_name, index, frame_idx):
+    """Read the text of one frame from a lammps dump file.
+
+    Parameters
+    ----------
+    file_name : str
+        the lammps dump file
+    index : np.ndarray
+        the frame index returned by :func:`get_dump_frame_index`
+    frame_idx : int
+        the position of the frame in the file
+
+    Returns
+    -------
+    str
+        the text of the frame, which can be read by dpdata as ``lammps/dump``
+    """
+    start = int(index[frame_idx][1])
+    with open(file_name, "rb") as fp:
+        fp.seek(start)
+        if frame_idx + 1 < len(index):
+            buff = fp.read(int(index[frame_idx + 1][1]) - start)
+        else:
+            buff = fp.read()
+    return buff.decode()
+
+
 if __name__ == "__main__":
     ret = get_dumped_forces("40.lammpstrj")
     print(ret)
@@ -4,7 +4,9 @@
 3. model devi.
 """
 
+import functools
 import glob
+import json
 import os
 import random
 import shutil
@@ -448,6 +450,34 @@ def analysis(iter_index, jdata, calypso_model_devi_path):
     os.chdir(cwd)
 
 
+@functools.lru_cache(maxsize=4)
+def _load_calypso_structures(strus_path, type_map):
+    return dpdata.System(strus_path, fmt="deepmd/npy", type_map=list(type_map))
+
+
+def write_calypso_poscar(conf_name, type_map):
+    """Write the POSCAR of a frame of CALYPSO model deviation.
+
+    The POSCARs in task.*/traj are not written by calypso_run_model_devi.py,
+    but from the frames recorded in task.*/frames.json when the frame is
+    selected as a candidate.
+
+    Parameters
+    ----------
+    conf_name : str
+        path of the POSCAR, e.g. task.000.000/traj/0.poscar
+    type_map : list[str]
+        the type map
+    """
+    task_path = os.path.dirname(os.path.dirname(conf_name))
+    with open(os.path.join(task_path, "frames.json")) as fp:
+        frames = json.load(fp)
+    strus_path = os.path.join(os.path.dirname(task_path), frames["structures"])
+    index = frames["start"] + int(os.path.basename(conf_name).split(".")[0])
+    structures = _load_calypso_structures(os.path.abspath(strus_path), tuple(type_map))
+    structures[index].to_vasp_poscar(conf_name)
+
+
 def run_calypso_model_devi(iter_index, jdata, mdata):
     dlog.info("start running CALYPSO")
 
@@ -1,5 +1,7 @@
 #!/usr/bin/python3
 
+import dpdata
+
 
 def _make_vasp_incar_dict(
     ecut,
@@ -136,3 +138,32 @@ def incar_upper(dincar):
     for key, val in dincar.items():
         standard_incar[key.upper()] = val
     return Incar(standard_incar)
+
+
+def read_outcar_converged(fname, type_map=None):
+    """Read the converged ionic steps of a VASP OUTCAR.
+
+    The whole OUTCAR is read by dpdata with the ``vasp/outcar`` format, which
+    warns about the unconverged ionic steps and skips them. The last
+    converged step is returned with the number of converged steps, which the
+    fp tasks check against NSW = 1.
+
+    Parameters
+    ----------
+    fname : str
+        the OUTCAR file
+    type_map : list of str, optional
+        the type map applied to the system
+
+    Returns
+    -------
+    dpdata.LabeledSystem
+        the last converged frame, or an empty system if no step converged
+    int
+        the number of converged ionic steps in the OUTCAR
+    """
+    system = dpdata.LabeledSystem(fname, fmt="vasp/outcar", type_map=type_map)
+    nframes = system.get_nframes()
+    if nframes == 0:
+        return dpdata.LabeledSystem(), 0
+    return system[nframes - 1 :], nframes
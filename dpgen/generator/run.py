@@ -10,8 +10,9 @@ iter:
 
 import argparse
 import copy
+import functools
 import glob
-import itertools
+import io
 import json
 import logging
 import logging.handlers
@@ -22,9 +23,11 @@ import re
 import shlex
 import shutil
 import sys
+import time
 import warnings
 from collections import Counter
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
@@ -50,11 +53,23 @@ from dpgen.generator.lib.cp2k import (
     make_cp2k_xyz,
 )
 from dpgen.generator.lib.ele_temp import NBandsEsti
-from dpgen.generator.lib.gaussian import make_gaussian_input, take_cluster
+from dpgen.generator.lib.fingerprint import (
+    farthest_point_sampling,
+    pick_nearest,
+    structure_fingerprint,
+)
+from dpgen.generator.lib.fp_cache import (
+    cache_key_name,
+    fp_params_hash,
+    open_fp_cache,
+    structure_key,
+)
+from dpgen.generator.lib.gaussian import make_gaussian_input, take_clusters
 from dpgen.generator.lib.lammps import (
-    get_all_dumped_forces,
-    get_dumped_forces,
+    get_dump_frame_index,
+    get_dumped_forces_square_sum,
     make_lammps_input,
+    read_dump_frame,
 )
 from dpgen.generator.lib.make_calypso import (
     _make_model_devi_buffet,
@@ -74,6 +89,7 @@ from dpgen.generator.lib.pwmat import (
 from dpgen.generator.lib.pwscf import make_pwscf_input
 from dpgen.generator.lib.run_calypso import (
     run_calypso_model_devi,
+    write_calypso_poscar,
 )
 from dpgen.generator.lib.siesta import make_siesta_input
 from dpgen.generator.lib.utils import (
@@ -88,14 +104,18 @@ from dpgen.generator.lib.utils import (
 from dpgen.generator.lib.vasp import (
     incar_upper,
     make_vasp_incar_user_dict,
+    read_outcar_converged,
     write_incar_dict,
 )
 from dpgen.remote.decide_machine import convert_mdata
 from dpgen.util import (
+    concat_multi_systems,
+    concat_systems,
     convert_training_data_to_hdf5,
     expand_sys_str,
     load_file,
     normalize,
+    parallel_map,
     sepline,
     set_directory,
     setup_ele_temp,
@@ -114,6 +134,12 @@ model_devi_task_fmt = data_system_fmt + ".%06d"
 model_devi_conf_fmt = data_system_fmt + ".%04d"
 fp_name = "02.fp"
 fp_task_fmt = data_system_fmt + ".%06d"
+pipeline_record = "pipeline.json"
+finished_tasks_record = "finished_tasks.json"
+warm_start_name = "warm_start"
+data_manifest_name = "data_manifest.json"
+train_data_store_name = "train_data.hdf5"
+pipeline_check_interval = 30
 cvasp_file = os.path.join(ROOT_PATH, "generator/lib/cvasp.py")
 # for calypso
 calypso_run_opt_name = "gen_stru_analy"
@@ -163,6 +189,123 @@ def make_fp_task_name(sys_idx, counter):
     return "task." + fp_task_fmt % (sys_idx, counter)
 
 
+def _glob_sys_tasks(work_path, sys_idx=None):
+    """Glob the tasks in work_path; only those of system sys_idx if it is given."""
+    if sys_idx is None:
+        pattern = "task.*"
+    else:
+        pattern = "task." + data_system_fmt % sys_idx + ".*"
+    return glob.glob(os.path.join(work_path, pattern))
+
+
+def _task_mtime(task):
+    return os.stat(task).st_mtime_ns
+
+
+def _skip_finished_tasks(work_path, tasks, check_fin, jdata):
+    """Filter out the finished tasks if ``skip_finished_tasks`` is set.
+
+    The tasks not recorded as finished are checked by check_fin in parallel.
+    The finished tasks are recorded in ``finished_tasks.json`` of work_path,
+    together with the modification time of the task directories, so that
+    they are not checked again unless the directories are changed.
+
+    Parameters
+    ----------
+    work_path : str
+        the work path of the tasks
+    tasks : list of str
+        the paths of the tasks
+    check_fin : callable
+        the function checking whether a task is finished; None if the tasks
+        cannot be checked
+    jdata : dict
+        Run parameters.
+
+    Returns
+    -------
+    list of str
+        the paths of the unfinished tasks
+    """
+    if not jdata.get("skip_finished_tasks", False) or check_fin is None:
+        return tasks
+    record = os.path.join(work_path, finished_tasks_record)
+    finished = {}
+    if os.path.isfile(record):
+        with open(record) as fp:
+            finished = json.load(fp)
+    mtimes = {ii: _task_mtime(ii) for ii in tasks}
+    to_check = [ii for ii in tasks if finished.get(os.path.basename(ii)) != mtimes[ii]]
+    checked = parallel_map(
+        check_fin, to_check, jdata.get("skip_finished_tasks_nproc", 1)
+    )
+    for ii, fin in zip(to_check, checked):
+        if fin:
+            finished[os.path.basename(ii)] = mtimes[ii]
+        else:
+            finished.pop(os.path.basename(ii), None)
+    with open(record + ".tmp", "w") as fp:
+        json.dump(finished, fp, indent=4)
+    os.replace(record + ".tmp", record)
+    run_tasks = [ii for ii in tasks if os.path.basename(ii) not in finished]
+    dlog.info(
+        f"{len(tasks) - len(run_tasks)} of {len(tasks)} tasks in {work_path} are finished, skip them"
+    )
+    return run_tasks
+
+
+def _submission_recorded(submission):
+    # a previous run of the submission has left its record to recover from;
+    # the hash of the record and the remote root it is written in are known
+    # only after the jobs are generated and the machine is bound
+    submission.generate_jobs()
+    return submission.machine.context.check_file_exists(
+        f"{submission.submission_hash}.json"
+    )
+
+
+def _make_submission_skip_finished(make, work_path, tasks, check_fin, jdata):
+    """Make the submission of the unfinished tasks if ``skip_finished_tasks`` is set.
+
+    The submission of all the tasks is kept if it has been submitted by a
+    previous run, so that dpdispatcher recovers its jobs, which may still be
+    running, instead of submitting them again.
+
+    Parameters
+    ----------
+    make : callable
+        the function making the submission of the tasks given by the
+        ``run_tasks`` keyword argument
+    work_path : str
+        the work path of the tasks
+    tasks : list of str
+        the paths of the tasks
+    check_fin : callable
+        the function checking whether a task is finished; None if the tasks
+        cannot be checked
+    jdata : dict
+        Run parameters.
+
+    Returns
+    -------
+    Submission or None
+        the submission, or None if all the tasks are finished
+    """
+    submission = make(run_tasks=[os.path.basename(ii) for ii in tasks])
+    if (
+        not jdata.get("skip_finished_tasks", False)
+        or check_fin is None
+        or _submission_recorded(submission)
+    ):
+        return submission
+    run_tasks = _skip_finished_tasks(work_path, tasks, check_fin, jdata)
+    if len(run_tasks) == 0:
+        return None
+    if len(run_tasks) == len(tasks):
+        return submission
+    return make(run_tasks=[os.path.basename(ii) for ii in run_tasks])
+
+
 def get_sys_index(task):
     task.sort()
     system_index = []
@@ -406,25 +549,19 @@ def make_train_dp(iter_index, jdata, mdata):
                 number_old_frames += get_nframes(single_sys)
     old_range = None
     if iter_index > 0:
+        iters_data = load_data_manifest(range(iter_index))
         for ii in range(iter_index):
             if ii == iter_index - 1:
                 old_range = len(init_data_sys)
-            fp_path = os.path.join(make_iter_name(ii), fp_name)
-            fp_data_sys = glob.glob(os.path.join(fp_path, "data.*"))
             if model_devi_engine == "calypso":
                 _modd_path = os.path.join(
                     make_iter_name(ii), model_devi_name, calypso_model_devi_name
                 )
                 sys_list = glob.glob(os.path.join(_modd_path, "*.structures"))
                 sys_batch_size = ["auto" for aa in range(len(sys_list))]
-            for jj in fp_data_sys:
+            for jj, data_systems in iters_data[ii].items():
                 sys_idx = int(jj.split(".")[-1])
-                sys_paths = expand_sys_str(jj)
-                nframes = 0
-                for sys_single in sys_paths:
-                    nframes += dpdata.LabeledSystem(
-                        sys_single, fmt="deepmd/npy"
-                    ).get_nframes()
+                nframes = sum(ss["nframes"] for ss in data_systems)
                 if auto_ratio:
                     if ii == iter_index - 1:
                         number_new_frames += nframes
@@ -432,13 +569,14 @@ def make_train_dp(iter_index, jdata, mdata):
                         number_old_frames += nframes
                 if nframes < fp_task_min:
                     log_task(
-                        "nframes (%d) in data sys %s is too small, skip" % (nframes, jj)  # noqa: UP031
+                        "nframes (%d) in data sys %s is too small, skip"  # noqa: UP031
+                        % (nframes, os.path.join(make_iter_name(ii), fp_name, jj))
                     )
                     continue
-                for sys_single in sys_paths:
+                for ss in data_systems:
                     init_data_sys.append(
                         Path(
-                            os.path.normpath(os.path.join("../data.iters", sys_single))
+                            os.path.normpath(os.path.join("../data.iters", ss["path"]))
                         ).as_posix()
                     )
                     batch_size = (
@@ -446,7 +584,14 @@ def make_train_dp(iter_index, jdata, mdata):
                         if sys_idx < len(sys_batch_size)
                         else "auto"
                     )
-                    init_batch_size.append(detect_batch_size(batch_size, sys_single))
+                    init_batch_size.append(
+                        detect_batch_size(
+                            batch_size,
+                            ss["path"],
+                            natoms=ss["natoms"],
+                            nframes=ss["nframes"],
+                        )
+                    )
     # establish tasks
     jinput = jdata["default_training_param"]
     try:
@@ -675,7 +820,12 @@ def make_train_dp(iter_index, jdata, mdata):
     symlink_user_forward_files(mdata=mdata, task_type="train", work_path=work_path)
     # HDF5 format for training data
     if jdata.get("one_h5", False):
-        convert_training_data_to_hdf5(input_files, os.path.join(work_path, "data.hdf5"))
+        # the systems of the previous iterations are kept in the store
+        convert_training_data_to_hdf5(
+            input_files,
+            os.path.join(work_path, "data.hdf5"),
+            store_file=train_data_store_name,
+        )
 
 
 def _link_old_models(work_path, old_model_files, ii, basename: Optional[str] = None):
@@ -697,17 +847,17 @@ def _link_old_models(work_path, old_model_files, ii, basename: Optional[str] = N
         os.chdir(cwd)
 
 
-def detect_batch_size(batch_size, system=None):
+def detect_batch_size(batch_size, system=None, natoms=None, nframes=None):
     if isinstance(batch_size, int):
         return batch_size
     elif batch_size == "auto":
         # automaticcaly set batch size, batch_size = 32 // atom_numb (>=1, <=fram_numb)
-        # check if h5 file
-        format = "deepmd/npy" if "#" not in system else "deepmd/hdf5"
-        s = dpdata.LabeledSystem(system, fmt=format)
-        return int(
-            min(np.ceil(32.0 / float(s["coords"].shape[1])), s["coords"].shape[0])
-        )
+        if natoms is None or nframes is None:
+            # check if h5 file
+            format = "deepmd/npy" if "#" not in system else "deepmd/hdf5"
+            s = dpdata.LabeledSystem(system, fmt=format)
+            natoms, nframes = s["coords"].shape[1], s["coords"].shape[0]
+        return int(min(np.ceil(32.0 / float(natoms)), nframes))
     else:
         raise RuntimeError("Unsupported batch size")
 
@@ -718,6 +868,129 @@ def get_nframes(system):
     return s.get_nframes()
 
 
+def _fp_data_mtime(fp_path):
+    """Get the latest modification time, in ns, of 02.fp and the files of
+    its data systems, so that the systems rewritten in place are found.
+    """
+    if not os.path.isdir(fp_path):
+        return None
+    mtimes = [os.stat(fp_path).st_mtime_ns]
+    for data_path in glob.glob(os.path.join(fp_path, "data.*")):
+        mtimes.append(os.stat(data_path).st_mtime_ns)
+        for root, _, files in os.walk(data_path):
+            mtimes.append(os.stat(root).st_mtime_ns)
+            mtimes.extend(os.stat(os.path.join(root, ff)).st_mtime_ns for ff in files)
+    return max(mtimes)
+
+
+def _scan_fp_data(iter_index):
+    """Scan the data systems collected in 02.fp of an iteration.
+
+    Returns
+    -------
+    dict
+        for each data.* directory, the path, nframes, natoms, formula and the
+        files of its systems
+    """
+    fp_path = os.path.join(make_iter_name(iter_index), fp_name)
+    data = {}
+    for data_path in sorted(glob.glob(os.path.join(fp_path, "data.*"))):
+        systems = []
+        for single_sys in expand_sys_str(data_path):
+            format = "deepmd/npy" if "#" not in single_sys else "deepmd/hdf5"
+            s = dpdata.LabeledSystem(single_sys, fmt=format)
+            if "#" not in single_sys:
+                files = sorted(
+                    glob.glob(os.path.join(single_sys, "set.*"))
+                    + glob.glob(os.path.join(single_sys, "type*.raw"))
+                    + glob.glob(os.path.join(single_sys, "nopbc"))
+                )
+                files = [os.path.relpath(ff, single_sys) for ff in files]
+            else:
+                files = []
+            systems.append(
+                {
+                    "path": Path(single_sys).as_posix(),
+                    "nframes": s.get_nframes(),
+                    "natoms": s.get_natoms(),
+                    "formula": s.formula,
+                    "files": files,
+                }
+            )
+        data[os.path.basename(data_path)] = systems
+    return {"mtime": _fp_data_mtime(fp_path), "data": data}
+
+
+def _dump_data_manifest(manifest):
+    with open(data_manifest_name + ".tmp", "w") as fp:
+        json.dump(manifest, fp, indent=1)
+    os.replace(data_manifest_name + ".tmp", data_manifest_name)
+
+
+def update_data_manifest(iter_index):
+    """Record the fp data of an iteration in the data manifest next to
+    record.dpgen, so that the following trainings do not scan it again.
+
+    Parameters
+    ----------
+    iter_index : int
+        iter index
+    """
+    manifest = {}
+    if os.path.isfile(data_manifest_name):
+        with open(data_manifest_name) as fp:
+            manifest = json.load(fp)
+    manifest[make_iter_name(iter_index)] = _scan_fp_data(iter_index)
+    _dump_data_manifest(manifest)
+
+
+def load_data_manifest(iter_indexes):
+    """Load the fp data of iterations from the data manifest.
+
+    An iteration is scanned again if it is missing in the manifest or its
+    02.fp directory or the files of its data systems have been modified
+    since it was recorded. The scanned
+    iterations are written back if the manifest exists, i.e. it is maintained
+    by `run_iter`.
+
+    Parameters
+    ----------
+    iter_indexes : list[int]
+        iter indexes
+
+    Returns
+    -------
+    list[dict]
+        for each iteration, the systems of each data.* directory
+    """
+    manifest = None
+    if os.path.isfile(data_manifest_name):
+        with open(data_manifest_name) as fp:
+            manifest = json.load(fp)
+    ret = []
+    updated = False
+    for ii in iter_indexes:
+        iter_name = make_iter_name(ii)
+        mtime = _fp_data_mtime(os.path.join(iter_name, fp_name))
+        record = manifest.get(iter_name) if manifest is not None else None
+        if record is None or record["mtime"] != mtime:
+            record = _scan_fp_data(ii)
+            if manifest is not None:
+                manifest[iter_name] = record
+                updated = True
+        ret.append(record["data"])
+    if updated:
+        _dump_data_manifest(manifest)
+    return ret
+
+
+def _train_check_fin(ii, suffix=".pb", compress=False):
+    models = [f"frozen_model{suffix}", "lcurve.out"]
+    if compress:
+        models.append(f"frozen_model_compressed{suffix}")
+    return all(os.path.isfile(os.path.join(ii, ff)) for ff in models)
+
+
 def run_train(iter_index, jdata, mdata):
     mlp_engine = jdata.get("mlp_engine", "dp")
     if mlp_engine == "dp":
@@ -821,17 +1094,6 @@ def run_train_dp(iter_index, jdata, mdata):
             "DP-GEN currently only supports for DeePMD-kit 1.x to 3.x version!"
         )
 
-    # _tasks = [os.path.basename(ii) for ii in all_task]
-    # run_tasks = []
-    # for ii in all_task:
-    #     check_pb = os.path.join(ii, "frozen_model.pb")
-    #     check_lcurve = os.path.join(ii, "lcurve.out")
-    #     if os.path.isfile(check_pb) and os.path.isfile(check_lcurve):
-    #         pass
-    #     else:
-    #         run_tasks.append(ii)
-    run_tasks = [os.path.basename(ii) for ii in all_task]
-
     forward_files = [train_input_file]
     if "srtab_file_path" in jdata.keys():
         forward_files.append(zbl_file)
@@ -880,9 +1142,9 @@ def run_train_dp(iter_index, jdata, mdata):
             init_data_sys.append(os.path.join("data.init", ii))
         trans_comm_data = []
         cwd = os.getcwd()
+        iters_data = load_data_manifest(range(iter_index))
         os.chdir(work_path)
-        fp_data = glob.glob(os.path.join("data.iters", "iter.*", "02.fp", "data.*"))
-        for ii in itertools.chain(init_data_sys, fp_data):
+        for ii in init_data_sys:
             sys_paths = expand_sys_str(ii)
             for single_sys in sys_paths:
                 if "#" not in single_sys:
@@ -892,6 +1154,17 @@ def run_train_dp(iter_index, jdata, mdata):
                 else:
                     # H5 file
                     trans_comm_data.append(single_sys.split("#")[0])
+        for iter_data in iters_data:
+            for data_systems in iter_data.values():
+                for ss in data_systems:
+                    single_sys = os.path.join("data.iters", ss["path"])
+                    if "#" not in single_sys:
+                        trans_comm_data += [
+                            os.path.join(single_sys, ff) for ff in ss["files"]
+                        ]
+                    else:
+                        # H5 file
+                        trans_comm_data.append(single_sys.split("#")[0])
     else:
         cwd = os.getcwd()
         trans_comm_data = ["data.hdf5"]
@@ -911,19 +1184,32 @@ def run_train_dp(iter_index, jdata, mdata):
     ### Submit jobs
     check_api_version(mdata)
 
-    submission = make_submission(
-        mdata["train_machine"],
-        mdata["train_resources"],
-        commands=commands,
-        work_path=work_path,
-        run_tasks=run_tasks,
-        group_size=train_group_size,
-        forward_common_files=trans_comm_data,
-        forward_files=forward_files,
-        backward_files=backward_files,
-        outlog="train.log",
-        errlog="train.log",
+    submission = _make_submission_skip_finished(
+        functools.partial(
+            make_submission,
+            mdata["train_machine"],
+            mdata["train_resources"],
+            commands=commands,
+            work_path=work_path,
+            group_size=train_group_size,
+            forward_common_files=trans_comm_data,
+            forward_files=forward_files,
+            backward_files=backward_files,
+            outlog="train.log",
+            errlog="train.log",
+        ),
+        work_path,
+        all_task,
+        functools.partial(
+            _train_check_fin,
+            suffix=suffix,
+            compress=jdata.get("dp_compress", False),
+        ),
+        jdata,
     )
+    if submission is None:
+        log_task("all models are trained")
+        return
     submission.run_submission()
 
 
@@ -1208,6 +1494,9 @@ def make_model_devi(iter_index, jdata, mdata):
     models = sorted(glob.glob(os.path.join(train_path, f"graph*{suffix}")))
     work_path = os.path.join(iter_name, model_devi_name)
     create_path(work_path)
+    # the pipeline record of the previous model deviation tasks is stale
+    if os.path.isfile(os.path.join(iter_name, pipeline_record)):
+        os.remove(os.path.join(iter_name, pipeline_record))
     if model_devi_engine == "calypso":
         _calypso_run_opt_path = os.path.join(work_path, calypso_run_opt_name)
         calypso_model_devi_path = os.path.join(work_path, calypso_model_devi_name)
@@ -1988,7 +2277,33 @@ def _make_model_devi_amber(
             os.chdir(cwd_)
 
 
-def run_md_model_devi(iter_index, jdata, mdata):
+def _tail_contains(fname, pattern, size=4096):
+    # the end of a log file only, which may be long
+    if not os.path.isfile(fname):
+        return False
+    with open(fname, "rb") as fp:
+        fp.seek(max(os.path.getsize(fname) - size, 0))
+        return pattern.encode() in fp.read()
+
+
+def _lammps_check_fin(ii, nbeads=None):
+    if nbeads is None:
+        return _tail_contains(os.path.join(ii, "model_devi.log"), "Total wall time")
+    return all(
+        _tail_contains(os.path.join(ii, f"log.lammps.{jj:d}"), "Total wall time")
+        for jj in range(nbeads)
+    )
+
+
+def _gromacs_check_fin(ii):
+    return os.path.isfile(os.path.join(ii, "model_devi.out"))
+
+
+def _amber_check_fin(ii):
+    return _tail_contains(os.path.join(ii, "rc.mdout"), "Total wall time")
+
+
+def run_md_model_devi(iter_index, jdata, mdata, sys_idx=None, exit_on_submit=False):
     # rmdlog.info("This module has been run !")
     model_devi_exec = mdata["model_devi_command"]
 
@@ -2002,32 +2317,31 @@ def run_md_model_devi(iter_index, jdata, mdata):
     work_path = os.path.join(iter_name, model_devi_name)
     assert os.path.isdir(work_path)
 
-    all_task = glob.glob(os.path.join(work_path, "task.*"))
+    all_task = _glob_sys_tasks(work_path, sys_idx)
     all_task.sort()
     fp = open(os.path.join(work_path, "cur_job.json"))
     cur_job = json.load(fp)
 
-    run_tasks_ = all_task
-    # for ii in all_task:
-    #     fres = os.path.join(ii, 'model_devi.out')
-    #     if os.path.isfile(fres) :
-    #         nlines = np.loadtxt(fres).shape[0]
-    #         if nframes != nlines :
-    #             run_tasks_.append(ii)
-    #     else :
-    #         run_tasks_.append(ii)
-
-    run_tasks = [os.path.basename(ii) for ii in run_tasks_]
-    # dlog.info("all_task is ", all_task)
-    # dlog.info("run_tasks in run_model_deviation",run_tasks_)
+    if len(all_task) == 0:
+        raise RuntimeError(
+            "run_tasks for model_devi should not be empty! Please check your files."
+        )
+    model_devi_engine = jdata.get("model_devi_engine", "lammps")
+    if model_devi_engine == "lammps":
+        nbeads = jdata["model_devi_jobs"][iter_index].get("nbeads")
+        check_fin = functools.partial(_lammps_check_fin, nbeads=nbeads)
+    elif model_devi_engine == "gromacs":
+        check_fin = _gromacs_check_fin
+    elif model_devi_engine == "amber":
+        check_fin = _amber_check_fin
+    else:
+        check_fin = None
 
     suffix = _get_model_suffix(jdata)
     all_models = glob.glob(os.path.join(work_path, f"graph*{suffix}"))
     model_names = [os.path.basename(ii) for ii in all_models]
 
-    model_devi_engine = jdata.get("model_devi_engine", "lammps")
     if model_devi_engine == "lammps":
-        nbeads = jdata["model_devi_jobs"][iter_index].get("nbeads")
         if nbeads is None:
             command = f"{{ if [ ! -f dpgen.restart.10000 ]; then {model_devi_exec} -i input.lammps -v restart 0; else {model_devi_exec} -i input.lammps -v restart 1; fi }}"
         else:
@@ -2131,28 +2445,34 @@ def run_md_model_devi(iter_index, jdata, mdata):
     user_forward_files = mdata.get("model_devi" + "_user_forward_files", [])
     forward_files += [os.path.basename(file) for file in user_forward_files]
     backward_files += mdata.get("model_devi" + "_user_backward_files", [])
-    if len(run_tasks) == 0:
-        raise RuntimeError(
-            "run_tasks for model_devi should not be empty! Please check your files."
-        )
 
     ### Submit jobs
     check_api_version(mdata)
 
-    submission = make_submission(
-        mdata["model_devi_machine"],
-        mdata["model_devi_resources"],
-        commands=commands,
-        work_path=work_path,
-        run_tasks=run_tasks,
-        group_size=model_devi_group_size,
-        forward_common_files=model_names,
-        forward_files=forward_files,
-        backward_files=backward_files,
-        outlog="model_devi.log",
-        errlog="model_devi.log",
+    submission = _make_submission_skip_finished(
+        functools.partial(
+            make_submission,
+            mdata["model_devi_machine"],
+            mdata["model_devi_resources"],
+            commands=commands,
+            work_path=work_path,
+            group_size=model_devi_group_size,
+            forward_common_files=model_names,
+            forward_files=forward_files,
+            backward_files=backward_files,
+            outlog="model_devi.log",
+            errlog="model_devi.log",
+        ),
+        work_path,
+        all_task,
+        check_fin,
+        jdata,
     )
-    submission.run_submission()
+    if submission is None:
+        log_task("all model_devi tasks are finished")
+        return None
+    submission.run_submission(exit_on_submit=exit_on_submit)
+    return submission
 
 
 def run_model_devi(iter_index, jdata, mdata):
@@ -2180,8 +2500,10 @@ def _to_face_dist(box_):
 def check_cluster(conf_name, fp_cluster_vacuum, fmt="lammps/dump"):
     sys = dpdata.System(conf_name, fmt)
     assert sys.get_nframes() == 1
-    cell = sys.data["cells"][0]
-    coord = sys.data["coords"][0]
+    return _is_bad_cluster(sys["cells"][0], sys["coords"][0], fp_cluster_vacuum)
+
+
+def _is_bad_cluster(cell, coord, fp_cluster_vacuum):
     xlim = max(coord[:, 0]) - min(coord[:, 0])
     ylim = max(coord[:, 1]) - min(coord[:, 1])
     zlim = max(coord[:, 2]) - min(coord[:, 2])
@@ -2198,37 +2520,41 @@ def check_cluster(conf_name, fp_cluster_vacuum, fmt="lammps/dump"):
 
 
 def check_bad_box(conf_name, criteria, fmt="lammps/dump"):
-    all_c = criteria.split(";")
     sys = dpdata.System(conf_name, fmt)
     assert sys.get_nframes() == 1
+    return _is_bad_box(sys["cells"][0], criteria)
+
+
+def _is_bad_box(cell, criteria):
+    all_c = criteria.split(";")
     is_bad = False
     for ii in all_c:
         [key, value] = ii.split(":")
         if key == "length_ratio":
-            lengths = np.linalg.norm(sys["cells"][0], axis=1)
+            lengths = np.linalg.norm(cell, axis=1)
             ratio = np.max(lengths) / np.min(lengths)
             if ratio > float(value):
                 is_bad = True
         elif key == "height_ratio":
-            lengths = np.linalg.norm(sys["cells"][0], axis=1)
-            dists = _to_face_dist(sys["cells"][0])
+            lengths = np.linalg.norm(cell, axis=1)
+            dists = _to_face_dist(cell)
             ratio = np.max(lengths) / np.min(dists)
             if ratio > float(value):
                 is_bad = True
         #
         elif key == "wrap_ratio":
             ratio = [
-                sys["cells"][0][1][0] / sys["cells"][0][0][0],
-                sys["cells"][0][2][1] / sys["cells"][0][1][1],
-                sys["cells"][0][2][0] / sys["cells"][0][0][0],
+                cell[1][0] / cell[0][0],
+                cell[2][1] / cell[1][1],
+                cell[2][0] / cell[0][0],
             ]
             if np.max(np.abs(ratio)) > float(value):
                 is_bad = True
         elif key == "tilt_ratio":
             ratio = [
-                sys["cells"][0][1][0] / sys["cells"][0][1][1],
-                sys["cells"][0][2][1] / sys["cells"][0][2][2],
-                sys["cells"][0][2][0] / sys["cells"][0][2][2],
+                cell[1][0] / cell[1][1],
+                cell[2][1] / cell[2][2],
+                cell[2][0] / cell[2][2],
             ]
             if np.max(np.abs(ratio)) > float(value):
                 is_bad = True
@@ -2237,17 +2563,68 @@ def check_bad_box(conf_name, criteria, fmt="lammps/dump"):
     return is_bad
 
 
+def _save_model_devi_npy(fname: str, model_devi: np.ndarray):
+    """Atomically write the binary sidecar of a model deviation file."""
+    tmp_name = fname + ".tmp"
+    with open(tmp_name, "wb") as f:
+        np.save(f, np.ascontiguousarray(model_devi, dtype=float))
+    os.replace(tmp_name, fname)
+
+
+def load_model_devi(fname: str) -> np.ndarray:
+    """Load a model deviation file through its binary sidecar.
+
+    The text file, e.g. ``model_devi.out``, is parsed only once and converted
+    into a ``.npy`` sidecar next to it, e.g. ``model_devi.npy``. Later calls
+    memory-map the sidecar unless the text file has been modified since.
+
+    Parameters
+    ----------
+    fname : str
+        the model deviation text file
+
+    Returns
+    -------
+    np.ndarray
+        the model deviation, one row per frame; read-only if memory-mapped
+    """
+    npy_name = os.path.splitext(fname)[0] + ".npy"
+    if os.path.isfile(npy_name) and (
+        not os.path.isfile(fname)
+        or os.stat(npy_name).st_mtime_ns >= os.stat(fname).st_mtime_ns
+    ):
+        model_devi = np.load(npy_name, mmap_mode="r")
+    else:
+        model_devi = np.loadtxt(fname, ndmin=2)
+        _save_model_devi_npy(npy_name, model_devi)
+    if model_devi.size == 0:
+        return np.empty((0, 0))
+    return model_devi
+
+
 def _read_model_devi_file(
     task_path: str,
     model_devi_f_avg_relative: bool = False,
     model_devi_merge_traj: bool = False,
 ):
-    model_devi_files = glob.glob(os.path.join(task_path, "model_devi*.out"))
-    if len(model_devi_files) > 1:
-        model_devi_files_sorted = sorted(
-            model_devi_files,
-            key=lambda x: int(re.search(r"model_devi(\d+)\.out", x).group(1)),
+    model_devi_files = {}
+    for ff in glob.glob(os.path.join(task_path, "model_devi*.out")):
+        match = re.search(r"model_devi(\d+)\.out$", os.path.basename(ff))
+        if match is not None:
+            model_devi_files[int(match.group(1))] = ff
+    model_devi_files_sorted = [
+        model_devi_files[kk] for kk in sorted(model_devi_files.keys())
+    ]
+    merged_npy = os.path.join(task_path, "model_devi.npy")
+    if len(model_devi_files_sorted) > 1 and not (
+        os.path.isfile(merged_npy)
+        and all(
+            os.stat(merged_npy).st_mtime_ns >= os.stat(ff).st_mtime_ns
+            for ff in model_devi_files_sorted
         )
+    ):
+        # the beads are merged only once; the sidecar of the merged file
+        # tells whether the beads have been merged and trajectories renamed
         with open(model_devi_files_sorted[0]) as f:
             first_line = f.readline()
         if not (first_line.startswith("#")):
@@ -2255,7 +2632,7 @@ def _read_model_devi_file(
         num_beads = len(model_devi_files_sorted)
         model_devi_contents = []
         for file in model_devi_files_sorted:
-            model_devi_contents.append(np.loadtxt(file))
+            model_devi_contents.append(np.loadtxt(file, ndmin=2))
         assert all(
             model_devi_content.shape[0] == model_devi_contents[0].shape[0]
             for model_devi_content in model_devi_contents
@@ -2314,20 +2691,23 @@ def _read_model_devi_file(
                         f"{frame_number + ibead * (int(last_step) + 1):d}.lammpstrj",
                     )
                     os.rename(traj_files_sorted[ibead][itraj], new_filename)
-    model_devi = np.loadtxt(os.path.join(task_path, "model_devi.out"))
+        _save_model_devi_npy(merged_npy, model_devi)
+    model_devi = load_model_devi(os.path.join(task_path, "model_devi.out"))
     if model_devi_f_avg_relative:
+        model_devi = np.array(model_devi)
         if model_devi_merge_traj is True:
-            all_traj = os.path.join(task_path, "all.lammpstrj")
-            all_f = get_all_dumped_forces(all_traj)
+            trajs = [os.path.join(task_path, "all.lammpstrj")]
         else:
             trajs = glob.glob(os.path.join(task_path, "traj", "*.lammpstrj"))
-            all_f = []
-            for ii in trajs:
-                all_f.append(get_dumped_forces(ii))
-
-        all_f = np.array(all_f)
-        all_f = all_f.reshape([-1, 3])
-        avg_f = np.sqrt(np.average(np.sum(np.square(all_f), axis=1)))
+        # accumulate in a streaming pass to keep the memory usage constant
+        sum_f2 = 0.0
+        count = 0
+        for ii in trajs:
+            ii_sum_f2, ii_count = get_dumped_forces_square_sum(ii)
+            sum_f2 += ii_sum_f2
+            count += ii_count
+        # nan without trajectory frames, as the average of no forces
+        avg_f = np.sqrt(sum_f2 / count) if count > 0 else np.nan
         model_devi[:, 4:7] = model_devi[:, 4:7] / avg_f
         np.savetxt(
             os.path.join(task_path, "model_devi_avgf.out"), model_devi, fmt="%16.6e"
@@ -2335,6 +2715,73 @@ def _read_model_devi_file(
     return model_devi
 
 
+def _classify_model_devi(
+    all_conf: np.ndarray,
+    f_trust_lo: float,
+    f_trust_hi: float,
+    v_trust_lo: float,
+    v_trust_hi: float,
+    cluster_cutoff: Optional[float] = None,
+    model_devi_skip: int = 0,
+    min_dis: Optional[float] = None,
+):
+    """Classify all frames of one model deviation array with boolean masks.
+
+    Parameters
+    ----------
+    all_conf : np.ndarray
+        model deviation array, one row per frame
+    f_trust_lo, f_trust_hi, v_trust_lo, v_trust_hi : float
+        trust levels of force and virial model deviation
+    cluster_cutoff : float, optional
+        if set, classify each atom by the per-atom force deviation
+        (columns 7 and later) instead of each frame
+    model_devi_skip : int
+        frames with a time step smaller than this are skipped
+    min_dis : float, optional
+        frames whose minimal distance (last column) is not larger than
+        this are failed; only used by the calypso engine
+
+    Returns
+    -------
+    steps : np.ndarray
+        time steps of all frames
+    accurate, candidate, failed, rest : np.ndarray
+        boolean masks of the shape (nframes,), or (nframes, natoms) if
+        cluster_cutoff is set. rest marks frames that belong to none of
+        the sets, e.g. nan deviations
+    """
+    all_conf = np.atleast_2d(all_conf)
+    steps = all_conf[:, 0].astype(int)
+    valid = all_conf[:, 0] >= model_devi_skip
+    if cluster_cutoff is None:
+        md_v = all_conf[:, 1]
+        md_f = all_conf[:, 4]
+        if min_dis is not None:
+            too_close = valid & (all_conf[:, -1] <= float(min_dis))
+            valid = valid & ~too_close
+        else:
+            too_close = np.zeros_like(valid)
+        candidate = valid & (
+            ((md_v < v_trust_hi) & (md_v >= v_trust_lo))
+            | ((md_f < f_trust_hi) & (md_f >= f_trust_lo))
+        )
+        failed = valid & ~candidate & ((md_v >= v_trust_hi) | (md_f >= f_trust_hi))
+        accurate = (
+            valid & ~candidate & ~failed & (md_v < v_trust_lo) & (md_f < f_trust_lo)
+        )
+        rest = valid & ~(candidate | failed | accurate)
+        failed = failed | too_close
+    else:
+        md_f = all_conf[:, 7:]
+        valid = valid[:, None]
+        candidate = valid & (md_f < f_trust_hi) & (md_f >= f_trust_lo)
+        accurate = valid & (md_f < f_trust_lo)
+        failed = valid & (md_f >= f_trust_hi)
+        rest = np.zeros(all_conf.shape[0], dtype=bool)
+    return steps, accurate, candidate, failed, rest
+
+
 def _select_by_model_devi_standard(
     modd_system_task: list[str],
     f_trust_lo: float,
@@ -2348,6 +2795,7 @@ def _select_by_model_devi_standard(
     model_devi_merge_traj: bool = False,
     detailed_report_make_fp: bool = True,
 ):
+    min_dis = None
     if model_devi_engine == "calypso":
         iter_name = modd_system_task[0].split("/")[0]
         _work_path = os.path.join(iter_name, model_devi_name)
@@ -2358,81 +2806,54 @@ def _select_by_model_devi_standard(
     fp_candidate = []
     fp_rest_accurate = []
     fp_rest_failed = []
-    cc = 0
     counter = Counter()
     counter["candidate"] = 0
     counter["failed"] = 0
     counter["accurate"] = 0
+
+    def _collect(tt, steps, mask):
+        # [task, step] for frames, [task, step, atom] for atoms
+        if mask.ndim == 1:
+            return [[tt, cc] for cc in steps[mask].tolist()]
+        rows, cols = np.nonzero(mask)
+        return [[tt, cc, jj] for cc, jj in zip(steps[rows].tolist(), cols.tolist())]
+
     for tt in modd_system_task:
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
             all_conf = _read_model_devi_file(
                 tt, model_devi_f_avg_relative, model_devi_merge_traj
             )
-
-            if all_conf.shape == (7,):
-                all_conf = all_conf.reshape(1, all_conf.shape[0])
-            elif model_devi_engine == "calypso" and all_conf.shape == (8,):
-                all_conf = all_conf.reshape(1, all_conf.shape[0])
-            for ii in range(all_conf.shape[0]):
-                if all_conf[ii][0] < model_devi_skip:
-                    continue
-                cc = int(all_conf[ii][0])
-                if cluster_cutoff is None:
-                    if model_devi_engine == "calypso":
-                        if float(all_conf[ii][-1]) <= float(min_dis):
-                            if detailed_report_make_fp:
-                                fp_rest_failed.append([tt, cc])
-                            counter["failed"] += 1
-                            continue
-                    if (
-                        all_conf[ii][1] < v_trust_hi and all_conf[ii][1] >= v_trust_lo
-                    ) or (
-                        all_conf[ii][4] < f_trust_hi and all_conf[ii][4] >= f_trust_lo
-                    ):
-                        fp_candidate.append([tt, cc])
-                        counter["candidate"] += 1
-                    elif (all_conf[ii][1] >= v_trust_hi) or (
-                        all_conf[ii][4] >= f_trust_hi
-                    ):
-                        if detailed_report_make_fp:
-                            fp_rest_failed.append([tt, cc])
-                        counter["failed"] += 1
-                    elif all_conf[ii][1] < v_trust_lo and all_conf[ii][4] < f_trust_lo:
-                        if detailed_report_make_fp:
-                            fp_rest_accurate.append([tt, cc])
-                        counter["accurate"] += 1
-                    else:
-                        if model_devi_engine == "calypso":
-                            dlog.info(
-                                "ase opt traj %s frame %d with f devi %f does not belong to either accurate, candidiate and failed "  # noqa: UP031
-                                % (tt, ii, all_conf[ii][4])
-                            )
-                        else:
-                            raise RuntimeError(
-                                "md traj %s frame %d with f devi %f does not belong to either accurate, candidiate and failed, it should not happen"  # noqa: UP031
-                                % (tt, ii, all_conf[ii][4])
-                            )
-                else:
-                    idx_candidate = np.where(
-                        np.logical_and(
-                            all_conf[ii][7:] < f_trust_hi,
-                            all_conf[ii][7:] >= f_trust_lo,
-                        )
-                    )[0]
-                    for jj in idx_candidate:
-                        fp_candidate.append([tt, cc, jj])
-                    counter["candidate"] += len(idx_candidate)
-                    idx_rest_accurate = np.where(all_conf[ii][7:] < f_trust_lo)[0]
-                    if detailed_report_make_fp:
-                        for jj in idx_rest_accurate:
-                            fp_rest_accurate.append([tt, cc, jj])
-                    counter["accurate"] += len(idx_rest_accurate)
-                    idx_rest_failed = np.where(all_conf[ii][7:] >= f_trust_hi)[0]
-                    if detailed_report_make_fp:
-                        for jj in idx_rest_failed:
-                            fp_rest_failed.append([tt, cc, jj])
-                    counter["failed"] += len(idx_rest_failed)
+        if all_conf.size == 0:
+            continue
+        steps, accurate, candidate, failed, rest = _classify_model_devi(
+            all_conf,
+            f_trust_lo,
+            f_trust_hi,
+            v_trust_lo,
+            v_trust_hi,
+            cluster_cutoff=cluster_cutoff,
+            model_devi_skip=model_devi_skip,
+            min_dis=min_dis,
+        )
+        for ii in np.nonzero(rest)[0]:
+            if model_devi_engine == "calypso":
+                dlog.info(
+                    "ase opt traj %s frame %d with f devi %f does not belong to either accurate, candidiate and failed "  # noqa: UP031
+                    % (tt, ii, all_conf[ii][4])
+                )
+            else:
+                raise RuntimeError(
+                    "md traj %s frame %d with f devi %f does not belong to either accurate, candidiate and failed, it should not happen"  # noqa: UP031
+                    % (tt, ii, all_conf[ii][4])
+                )
+        fp_candidate.extend(_collect(tt, steps, candidate))
+        counter["candidate"] += int(np.count_nonzero(candidate))
+        counter["failed"] += int(np.count_nonzero(failed))
+        counter["accurate"] += int(np.count_nonzero(accurate))
+        if detailed_report_make_fp:
+            fp_rest_failed.extend(_collect(tt, steps, failed))
+            fp_rest_accurate.extend(_collect(tt, steps, accurate))
 
     return fp_rest_accurate, fp_candidate, fp_rest_failed, counter
 
@@ -2477,7 +2898,6 @@ def _select_by_model_devi_adaptive_trust_low(
     for tt in modd_system_task:
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            model_devi = np.loadtxt(os.path.join(tt, "model_devi.out"))
             model_devi = _read_model_devi_file(
                 tt, model_devi_f_avg_relative, model_devi_merge_traj
             )
@@ -2537,6 +2957,68 @@ def _select_by_model_devi_adaptive_trust_low(
     return accur, candi, failed, counter, f_trust_lo, v_trust_lo
 
 
+def _fps_fp_candidates(
+    fp_candidate,
+    numb_task,
+    type_map,
+    model_devi_merge_traj,
+    trj_freq,
+    all_traj_index,
+):
+    """Move a diverse subset of the candidates to the front.
+
+    The fingerprints of the candidate frames are computed, and numb_task
+    candidates are picked by farthest point sampling, starting from the
+    first one of the shuffled candidates.
+
+    Parameters
+    ----------
+    fp_candidate : list
+        the model deviation task and the frame of each candidate
+    numb_task : int
+        the number of the candidates to pick
+    type_map : list of str
+        the type map
+    model_devi_merge_traj : bool
+        whether the frames are merged into all.lammpstrj
+    trj_freq : int
+        the dump frequency of the merged trajectories
+    all_traj_index : dict
+        the frame-offset index of each all.lammpstrj, updated in place
+
+    Returns
+    -------
+    list
+        the candidates, the picked ones first
+    """
+    fingerprints = []
+    for cc in fp_candidate:
+        tt, ii = cc[0], cc[1]
+        if model_devi_merge_traj:
+            all_traj = os.path.join(tt, "all.lammpstrj")
+            if all_traj not in all_traj_index:
+                all_traj_index[all_traj] = get_dump_frame_index(all_traj)
+            conf = io.StringIO(
+                read_dump_frame(
+                    all_traj, all_traj_index[all_traj], int(int(ii) / trj_freq)
+                )
+            )
+        else:
+            conf = os.path.join(tt, "traj", str(ii) + ".lammpstrj")
+        system = dpdata.System(conf, fmt="lammps/dump", type_map=type_map)
+        fingerprints.append(
+            structure_fingerprint(
+                system["cells"][0],
+                system["coords"][0],
+                system["atom_types"],
+                len(type_map),
+            )
+        )
+    selected = farthest_point_sampling(np.array(fingerprints), numb_task)
+    rest = np.setdiff1d(np.arange(len(fp_candidate)), selected)
+    return [fp_candidate[ii] for ii in np.concatenate([selected, rest])]
+
+
 def _make_fp_vasp_inner(
     iter_index,
     modd_path,
@@ -2551,12 +3033,14 @@ def _make_fp_vasp_inner(
     fp_link_files,
     type_map,
     jdata,
+    sys_idx=None,
 ):
     """iter_index          int             iter index
     modd_path           string          path of model devi
     work_path           string          path of fp
     fp_task_max         int             max number of tasks
     fp_link_files       [string]        linked files for fp, POTCAR for example
+    sys_idx             int             only make the tasks of this system if given
     fp_params           map             parameters for fp.
     """
     # --------------------------------------------------------------------------------------------------------------------------------------
@@ -2599,10 +3083,11 @@ def _make_fp_vasp_inner(
     set_tmp = set(system_index)
     system_index = list(set_tmp)
     system_index.sort()
+    if sys_idx is not None:
+        system_index = [ss for ss in system_index if int(ss) == sys_idx]
 
     fp_tasks = []
-
-    charges_recorder = []  # record charges for each fp_task
+    write_futures = []
     charges_map = jdata.get("sys_charges", [])
 
     cluster_cutoff = jdata.get("cluster_cutoff", None)
@@ -2615,6 +3100,15 @@ def _make_fp_vasp_inner(
     skip_bad_box = jdata.get("fp_skip_bad_box")
     # skip discrete structure in cluster
     fp_cluster_vacuum = jdata.get("fp_cluster_vacuum", None)
+    # pick the candidates randomly or by farthest point sampling
+    fp_candidate_select = jdata.get("fp_candidate_select", "random")
+    if fp_candidate_select == "fps" and (
+        model_devi_engine != "lammps" or cluster_cutoff is not None
+    ):
+        warnings.warn(
+            "fp_candidate_select fps only supports model_devi_engine lammps without cluster_cutoff, the candidates are picked randomly."
+        )
+        fp_candidate_select = "random"
 
     def _trust_limitation_check(sys_idx, lim):
         if isinstance(lim, list):
@@ -2625,379 +3119,453 @@ def _make_fp_vasp_inner(
             sys_lim = lim
         return sys_lim
 
-    for ss in system_index:
-        modd_system_glob = os.path.join(modd_path, "task." + ss + ".*")
-        modd_system_task = glob.glob(modd_system_glob)
-        modd_system_task.sort()
-        if model_devi_engine in ("lammps", "gromacs", "calypso"):
-            # convert global trust limitations to local ones
-            f_trust_lo_sys = _trust_limitation_check(int(ss), f_trust_lo)
-            f_trust_hi_sys = _trust_limitation_check(int(ss), f_trust_hi)
-            v_trust_lo_sys = _trust_limitation_check(int(ss), v_trust_lo)
-            v_trust_hi_sys = _trust_limitation_check(int(ss), v_trust_hi)
-
-            # assumed e -> v
-            if not model_devi_adapt_trust_lo:
-                (
-                    fp_rest_accurate,
-                    fp_candidate,
-                    fp_rest_failed,
-                    counter,
-                ) = _select_by_model_devi_standard(
-                    modd_system_task,
-                    f_trust_lo_sys,
-                    f_trust_hi_sys,
-                    v_trust_lo_sys,
-                    v_trust_hi_sys,
-                    cluster_cutoff,
-                    model_devi_engine,
-                    model_devi_skip,
-                    model_devi_f_avg_relative=model_devi_f_avg_relative,
-                    model_devi_merge_traj=model_devi_merge_traj,
-                    detailed_report_make_fp=detailed_report_make_fp,
-                )
-            else:
-                numb_candi_f = jdata.get("model_devi_numb_candi_f", 10)
-                numb_candi_v = jdata.get("model_devi_numb_candi_v", 0)
-                perc_candi_f = jdata.get("model_devi_perc_candi_f", 0.0)
-                perc_candi_v = jdata.get("model_devi_perc_candi_v", 0.0)
-                (
-                    fp_rest_accurate,
-                    fp_candidate,
-                    fp_rest_failed,
-                    counter,
-                    f_trust_lo_ad,
-                    v_trust_lo_ad,
-                ) = _select_by_model_devi_adaptive_trust_low(
-                    modd_system_task,
-                    f_trust_hi_sys,
-                    numb_candi_f,
-                    perc_candi_f,
-                    v_trust_hi_sys,
-                    numb_candi_v,
-                    perc_candi_v,
-                    model_devi_skip=model_devi_skip,
-                    model_devi_f_avg_relative=model_devi_f_avg_relative,
-                    model_devi_merge_traj=model_devi_merge_traj,
-                )
-                dlog.info(
-                    "system {:s} {:9s} : f_trust_lo {:6.3f}   v_trust_lo {:6.3f}".format(
-                        ss, "adapted", f_trust_lo_ad, v_trust_lo_ad
+    # structure files are written in a thread pool to overlap the file system I/O
+    with ThreadPoolExecutor() as executor:
+        for ss in system_index:
+            modd_system_glob = os.path.join(modd_path, "task." + ss + ".*")
+            modd_system_task = glob.glob(modd_system_glob)
+            modd_system_task.sort()
+            if model_devi_engine in ("lammps", "gromacs", "calypso"):
+                # convert global trust limitations to local ones
+                f_trust_lo_sys = _trust_limitation_check(int(ss), f_trust_lo)
+                f_trust_hi_sys = _trust_limitation_check(int(ss), f_trust_hi)
+                v_trust_lo_sys = _trust_limitation_check(int(ss), v_trust_lo)
+                v_trust_hi_sys = _trust_limitation_check(int(ss), v_trust_hi)
+
+                # assumed e -> v
+                if not model_devi_adapt_trust_lo:
+                    (
+                        fp_rest_accurate,
+                        fp_candidate,
+                        fp_rest_failed,
+                        counter,
+                    ) = _select_by_model_devi_standard(
+                        modd_system_task,
+                        f_trust_lo_sys,
+                        f_trust_hi_sys,
+                        v_trust_lo_sys,
+                        v_trust_hi_sys,
+                        cluster_cutoff,
+                        model_devi_engine,
+                        model_devi_skip,
+                        model_devi_f_avg_relative=model_devi_f_avg_relative,
+                        model_devi_merge_traj=model_devi_merge_traj,
+                        detailed_report_make_fp=detailed_report_make_fp,
                     )
-                )
-        elif model_devi_engine == "amber":
-            counter = Counter()
-            counter["candidate"] = 0
-            counter["failed"] = 0
-            counter["accurate"] = 0
-            fp_rest_accurate = []
-            fp_candidate = []
-            fp_rest_failed = []
-            for tt in modd_system_task:
-                cc = 0
-                with open(os.path.join(tt, "rc.mdout")) as f:
-                    skip_first = False
-                    first_active = True
-                    for line in f:
-                        if line.startswith("     ntx     =       1"):
-                            skip_first = True
-                        if line.startswith(
-                            "Active learning frame written with max. frc. std.:"
-                        ):
-                            if skip_first and first_active:
-                                first_active = False
-                                continue
-                            model_devi = (
-                                float(line.split()[-2])
-                                * dpdata.unit.EnergyConversion("kcal_mol", "eV").value()
-                            )
-                            if model_devi < f_trust_lo:
-                                # accurate
-                                if detailed_report_make_fp:
-                                    fp_rest_accurate.append([tt, cc])
-                                counter["accurate"] += 1
-                            elif model_devi > f_trust_hi:
-                                # failed
-                                if detailed_report_make_fp:
-                                    fp_rest_failed.append([tt, cc])
-                                counter["failed"] += 1
-                            else:
-                                # candidate
-                                fp_candidate.append([tt, cc])
-                                counter["candidate"] += 1
-                            cc += 1
+                else:
+                    numb_candi_f = jdata.get("model_devi_numb_candi_f", 10)
+                    numb_candi_v = jdata.get("model_devi_numb_candi_v", 0)
+                    perc_candi_f = jdata.get("model_devi_perc_candi_f", 0.0)
+                    perc_candi_v = jdata.get("model_devi_perc_candi_v", 0.0)
+                    (
+                        fp_rest_accurate,
+                        fp_candidate,
+                        fp_rest_failed,
+                        counter,
+                        f_trust_lo_ad,
+                        v_trust_lo_ad,
+                    ) = _select_by_model_devi_adaptive_trust_low(
+                        modd_system_task,
+                        f_trust_hi_sys,
+                        numb_candi_f,
+                        perc_candi_f,
+                        v_trust_hi_sys,
+                        numb_candi_v,
+                        perc_candi_v,
+                        model_devi_skip=model_devi_skip,
+                        model_devi_f_avg_relative=model_devi_f_avg_relative,
+                        model_devi_merge_traj=model_devi_merge_traj,
+                    )
+                    dlog.info(
+                        "system {:s} {:9s} : f_trust_lo {:6.3f}   v_trust_lo {:6.3f}".format(
+                            ss, "adapted", f_trust_lo_ad, v_trust_lo_ad
+                        )
+                    )
+            elif model_devi_engine == "amber":
+                counter = Counter()
+                counter["candidate"] = 0
+                counter["failed"] = 0
+                counter["accurate"] = 0
+                fp_rest_accurate = []
+                fp_candidate = []
+                fp_rest_failed = []
+                for tt in modd_system_task:
+                    cc = 0
+                    with open(os.path.join(tt, "rc.mdout")) as f:
+                        skip_first = False
+                        first_active = True
+                        for line in f:
+                            if line.startswith("     ntx     =       1"):
+                                skip_first = True
+                            if line.startswith(
+                                "Active learning frame written with max. frc. std.:"
+                            ):
+                                if skip_first and first_active:
+                                    first_active = False
+                                    continue
+                                model_devi = (
+                                    float(line.split()[-2])
+                                    * dpdata.unit.EnergyConversion(
+                                        "kcal_mol", "eV"
+                                    ).value()
+                                )
+                                if model_devi < f_trust_lo:
+                                    # accurate
+                                    if detailed_report_make_fp:
+                                        fp_rest_accurate.append([tt, cc])
+                                    counter["accurate"] += 1
+                                elif model_devi > f_trust_hi:
+                                    # failed
+                                    if detailed_report_make_fp:
+                                        fp_rest_failed.append([tt, cc])
+                                    counter["failed"] += 1
+                                else:
+                                    # candidate
+                                    fp_candidate.append([tt, cc])
+                                    counter["candidate"] += 1
+                                cc += 1
 
-        else:
-            raise RuntimeError("unknown model_devi_engine", model_devi_engine)
+            else:
+                raise RuntimeError("unknown model_devi_engine", model_devi_engine)
 
-        # print a report
-        fp_sum = sum(counter.values())
+            # print a report
+            fp_sum = sum(counter.values())
 
-        if fp_sum == 0:
-            dlog.info(f"system {ss:s} has no fp task, maybe the model devi is nan %")
-            continue
-        for cc_key, cc_value in counter.items():
-            dlog.info(
-                f"system {ss:s} {cc_key:9s} : {cc_value:6d} in {fp_sum:6d} {cc_value / fp_sum * 100:6.2f} %"
-            )
-        random.shuffle(fp_candidate)
-        if detailed_report_make_fp:
-            random.shuffle(fp_rest_failed)
-            random.shuffle(fp_rest_accurate)
-            with open(
-                os.path.join(work_path, f"candidate.shuffled.{ss}.out"), "w"
-            ) as fp:
-                for ii in fp_candidate:
-                    fp.write(" ".join([str(nn) for nn in ii]) + "\n")
-            with open(
-                os.path.join(work_path, f"rest_accurate.shuffled.{ss}.out"), "w"
-            ) as fp:
-                for ii in fp_rest_accurate:
-                    fp.write(" ".join([str(nn) for nn in ii]) + "\n")
-            with open(
-                os.path.join(work_path, f"rest_failed.shuffled.{ss}.out"), "w"
-            ) as fp:
-                for ii in fp_rest_failed:
-                    fp.write(" ".join([str(nn) for nn in ii]) + "\n")
-
-        # set number of tasks
-        accurate_ratio = float(counter["accurate"]) / float(fp_sum)
-        fp_accurate_threshold = jdata.get("fp_accurate_threshold", 1)
-        fp_accurate_soft_threshold = jdata.get(
-            "fp_accurate_soft_threshold", fp_accurate_threshold
-        )
-        if accurate_ratio < fp_accurate_soft_threshold:
-            this_fp_task_max = fp_task_max
-        elif (
-            accurate_ratio >= fp_accurate_soft_threshold
-            and accurate_ratio < fp_accurate_threshold
-        ):
-            this_fp_task_max = int(
-                fp_task_max
-                * (accurate_ratio - fp_accurate_threshold)
-                / (fp_accurate_soft_threshold - fp_accurate_threshold)
+            if fp_sum == 0:
+                dlog.info(
+                    f"system {ss:s} has no fp task, maybe the model devi is nan %"
+                )
+                continue
+            for cc_key, cc_value in counter.items():
+                dlog.info(
+                    f"system {ss:s} {cc_key:9s} : {cc_value:6d} in {fp_sum:6d} {cc_value / fp_sum * 100:6.2f} %"
+                )
+            random.shuffle(fp_candidate)
+            if detailed_report_make_fp:
+                random.shuffle(fp_rest_failed)
+                random.shuffle(fp_rest_accurate)
+                with open(
+                    os.path.join(work_path, f"candidate.shuffled.{ss}.out"), "w"
+                ) as fp:
+                    for ii in fp_candidate:
+                        fp.write(" ".join([str(nn) for nn in ii]) + "\n")
+                with open(
+                    os.path.join(work_path, f"rest_accurate.shuffled.{ss}.out"), "w"
+                ) as fp:
+                    for ii in fp_rest_accurate:
+                        fp.write(" ".join([str(nn) for nn in ii]) + "\n")
+                with open(
+                    os.path.join(work_path, f"rest_failed.shuffled.{ss}.out"), "w"
+                ) as fp:
+                    for ii in fp_rest_failed:
+                        fp.write(" ".join([str(nn) for nn in ii]) + "\n")
+
+            # set number of tasks
+            accurate_ratio = float(counter["accurate"]) / float(fp_sum)
+            fp_accurate_threshold = jdata.get("fp_accurate_threshold", 1)
+            fp_accurate_soft_threshold = jdata.get(
+                "fp_accurate_soft_threshold", fp_accurate_threshold
             )
-        else:
-            this_fp_task_max = 0
-        # ----------------------------------------------------------------------------
-        if model_devi_engine == "calypso":
-            calypso_intend_fp_num_temp = (
-                len(fp_candidate) / candi_num
-            ) * calypso_total_fp_num
-            if calypso_intend_fp_num_temp < 1:
-                calypso_intend_fp_num = 1
+            if accurate_ratio < fp_accurate_soft_threshold:
+                this_fp_task_max = fp_task_max
+            elif (
+                accurate_ratio >= fp_accurate_soft_threshold
+                and accurate_ratio < fp_accurate_threshold
+            ):
+                this_fp_task_max = int(
+                    fp_task_max
+                    * (accurate_ratio - fp_accurate_threshold)
+                    / (fp_accurate_soft_threshold - fp_accurate_threshold)
+                )
             else:
-                calypso_intend_fp_num = int(calypso_intend_fp_num_temp)
-        # ----------------------------------------------------------------------------
-        numb_task = min(this_fp_task_max, len(fp_candidate))
-        if numb_task < fp_task_min:
-            numb_task = 0
-
-        # ----------------------------------------------------------------------------
-        if (model_devi_engine == "calypso" and len(jdata.get("type_map")) == 1) or (
-            model_devi_engine == "calypso"
-            and len(jdata.get("type_map")) > 1
-            and candi_num <= calypso_total_fp_num
-        ):
+                this_fp_task_max = 0
+            # ----------------------------------------------------------------------------
+            if model_devi_engine == "calypso":
+                calypso_intend_fp_num_temp = (
+                    len(fp_candidate) / candi_num
+                ) * calypso_total_fp_num
+                if calypso_intend_fp_num_temp < 1:
+                    calypso_intend_fp_num = 1
+                else:
+                    calypso_intend_fp_num = int(calypso_intend_fp_num_temp)
+            # ----------------------------------------------------------------------------
             numb_task = min(this_fp_task_max, len(fp_candidate))
             if numb_task < fp_task_min:
                 numb_task = 0
-        elif (
-            model_devi_engine == "calypso"
-            and len(jdata.get("type_map")) > 1
-            and candi_num > calypso_total_fp_num
-        ):
-            numb_task = calypso_intend_fp_num
-            if len(fp_candidate) < numb_task:
-                numb_task = 0
-        # ----------------------------------------------------------------------------
-        dlog.info(
-            f"system {ss:s} accurate_ratio: {accurate_ratio:8.4f}    thresholds: {fp_accurate_soft_threshold:6.4f} and {fp_accurate_threshold:6.4f}   eff. task min and max {fp_task_min:4d} {this_fp_task_max:4d}   number of fp tasks: {numb_task:6d}"
-        )
-        # make fp tasks
-
-        # read all.lammpstrj, save in all_sys for each system_index
-        all_sys = []
-        trj_freq = None
-        netcdftraj = None
-        if model_devi_merge_traj:
-            for ii in modd_system_task:
-                all_traj = os.path.join(ii, "all.lammpstrj")
-                all_sys_per_task = dpdata.System(
-                    all_traj, fmt="lammps/dump", type_map=type_map
-                )
-                all_sys.append(all_sys_per_task)
-            model_devi_jobs = jdata["model_devi_jobs"]
-            cur_job = model_devi_jobs[iter_index]
-            trj_freq = int(
-                _get_param_alias(cur_job, ["t_freq", "trj_freq", "traj_freq"])
-            )
 
-        count_bad_box = 0
-        count_bad_cluster = 0
-        fp_candidate = sorted(fp_candidate[:numb_task])
-
-        for cc in range(numb_task):
-            tt = fp_candidate[cc][0]
-            ii = fp_candidate[cc][1]
-            ss = os.path.basename(tt).split(".")[1]
-            conf_name = os.path.join(tt, "traj")
-            conf_sys = None
-            if model_devi_engine == "lammps":
-                if model_devi_merge_traj:
-                    conf_sys = all_sys[int(os.path.basename(tt).split(".")[-1])][
-                        int(int(ii) / trj_freq)
-                    ]
-                else:
-                    conf_name = os.path.join(conf_name, str(ii) + ".lammpstrj")
-                ffmt = "lammps/dump"
-            elif model_devi_engine == "gromacs":
-                conf_name = os.path.join(conf_name, str(ii) + ".gromacstrj")
-                ffmt = "lammps/dump"
-            elif model_devi_engine == "amber":
-                conf_name = os.path.join(tt, "rc.nc")
-                rst_name = os.path.abspath(os.path.join(tt, "init.rst7"))
-            elif model_devi_engine == "calypso":
-                conf_name = os.path.join(conf_name, str(ii) + ".poscar")
-                ffmt = "vasp/poscar"
-            else:
-                raise RuntimeError("unknown model_devi engine", model_devi_engine)
-            conf_name = os.path.abspath(conf_name)
-            if skip_bad_box is not None:
-                skip = check_bad_box(conf_name, skip_bad_box, fmt=ffmt)
-                if skip:
-                    count_bad_box += 1
-                    continue
+            # ----------------------------------------------------------------------------
+            if (model_devi_engine == "calypso" and len(jdata.get("type_map")) == 1) or (
+                model_devi_engine == "calypso"
+                and len(jdata.get("type_map")) > 1
+                and candi_num <= calypso_total_fp_num
+            ):
+                numb_task = min(this_fp_task_max, len(fp_candidate))
+                if numb_task < fp_task_min:
+                    numb_task = 0
+            elif (
+                model_devi_engine == "calypso"
+                and len(jdata.get("type_map")) > 1
+                and candi_num > calypso_total_fp_num
+            ):
+                numb_task = calypso_intend_fp_num
+                if len(fp_candidate) < numb_task:
+                    numb_task = 0
+            # ----------------------------------------------------------------------------
+            dlog.info(
+                f"system {ss:s} accurate_ratio: {accurate_ratio:8.4f}    thresholds: {fp_accurate_soft_threshold:6.4f} and {fp_accurate_threshold:6.4f}   eff. task min and max {fp_task_min:4d} {this_fp_task_max:4d}   number of fp tasks: {numb_task:6d}"
+            )
+            # make fp tasks
+
+            # frame-offset index of all.lammpstrj for each task, built lazily so
+            # that only the selected frames are read
+            all_traj_index = {}
+            trj_freq = None
+            netcdftraj = None
+            if model_devi_merge_traj:
+                model_devi_jobs = jdata["model_devi_jobs"]
+                cur_job = model_devi_jobs[iter_index]
+                trj_freq = int(
+                    _get_param_alias(cur_job, ["t_freq", "trj_freq", "traj_freq"])
+                )
 
-            if fp_cluster_vacuum is not None:
-                assert fp_cluster_vacuum > 0
-                skip_cluster = check_cluster(conf_name, fp_cluster_vacuum)
-                if skip_cluster:
-                    count_bad_cluster += 1
-                    continue
+            if fp_candidate_select == "fps" and 0 < numb_task < len(fp_candidate):
+                fp_candidate = _fps_fp_candidates(
+                    fp_candidate,
+                    numb_task,
+                    type_map,
+                    model_devi_merge_traj,
+                    trj_freq,
+                    all_traj_index,
+                )
 
-            if model_devi_engine != "calypso":
-                # link job.json
-                job_name = os.path.join(tt, "job.json")
-                job_name = os.path.abspath(job_name)
-
-            if cluster_cutoff is not None:
-                # take clusters
-                jj = fp_candidate[cc][2]
-                poscar_name = f"{conf_name}.cluster.{jj}.POSCAR"
-                new_system = take_cluster(conf_name, type_map, jj, jdata)
-                new_system.to_vasp_poscar(poscar_name)
-            fp_task_name = make_fp_task_name(int(ss), cc)
-            fp_task_path = os.path.join(work_path, fp_task_name)
-            create_path(fp_task_path)
-            fp_tasks.append(fp_task_path)
-            if charges_map:
-                charges_recorder.append(charges_map[int(ss)])
-            cwd = os.getcwd()
-            os.chdir(fp_task_path)
-            if cluster_cutoff is None:
+            count_bad_box = 0
+            count_bad_cluster = 0
+            cluster_cache = {}
+            fp_candidate = sorted(fp_candidate[:numb_task])
+
+            for cc in range(numb_task):
+                tt = fp_candidate[cc][0]
+                ii = fp_candidate[cc][1]
+                ss = os.path.basename(tt).split(".")[1]
+                conf_name = os.path.join(tt, "traj")
+                conf_sys = None
                 if model_devi_engine == "lammps":
                     if model_devi_merge_traj:
-                        conf_sys.to("lammps/lmp", "conf.dump")
+                        all_traj = os.path.join(tt, "all.lammpstrj")
+                        if all_traj not in all_traj_index:
+                            all_traj_index[all_traj] = get_dump_frame_index(all_traj)
+                        conf_sys = dpdata.System(
+                            io.StringIO(
+                                read_dump_frame(
+                                    all_traj,
+                                    all_traj_index[all_traj],
+                                    int(int(ii) / trj_freq),
+                                )
+                            ),
+                            fmt="lammps/dump",
+                            type_map=type_map,
+                        )
                     else:
-                        os.symlink(os.path.relpath(conf_name), "conf.dump")
-                    os.symlink(os.path.relpath(job_name), "job.json")
+                        conf_name = os.path.join(conf_name, str(ii) + ".lammpstrj")
+                    ffmt = "lammps/dump"
                 elif model_devi_engine == "gromacs":
-                    os.symlink(os.path.relpath(conf_name), "conf.dump")
-                    os.symlink(os.path.relpath(job_name), "job.json")
+                    conf_name = os.path.join(conf_name, str(ii) + ".gromacstrj")
+                    ffmt = "lammps/dump"
                 elif model_devi_engine == "amber":
-                    # read and write with ase
-                    from ase.io.netcdftrajectory import (
-                        NetCDFTrajectory,
-                        write_netcdftrajectory,
+                    conf_name = os.path.join(tt, "rc.nc")
+                    rst_name = os.path.abspath(os.path.join(tt, "init.rst7"))
+                elif model_devi_engine == "calypso":
+                    conf_name = os.path.join(conf_name, str(ii) + ".poscar")
+                    ffmt = "vasp/poscar"
+                    if not os.path.isfile(conf_name) and os.path.isfile(
+                        os.path.join(tt, "frames.json")
+                    ):
+                        write_calypso_poscar(conf_name, type_map)
+                else:
+                    raise RuntimeError("unknown model_devi engine", model_devi_engine)
+                conf_name = os.path.abspath(conf_name)
+                if (
+                    conf_sys is None
+                    and model_devi_engine in ("lammps", "calypso")
+                    and (
+                        (model_devi_engine == "lammps" and cluster_cutoff is None)
+                        or skip_bad_box is not None
+                        or fp_cluster_vacuum is not None
                     )
-
-                    if cc > 0 and tt == fp_candidate[cc - 1][0]:
-                        # same MD task, use the same file
-                        pass
+                ):
+                    # the frame is parsed only once for the filters and the POSCAR
+                    conf_sys = dpdata.System(conf_name, fmt=ffmt, type_map=type_map)
+                if skip_bad_box is not None:
+                    if conf_sys is not None:
+                        skip = _is_bad_box(conf_sys["cells"][0], skip_bad_box)
                     else:
-                        # not the same file
-                        if cc > 0:
-                            # close the old file
+                        skip = check_bad_box(conf_name, skip_bad_box, fmt=ffmt)
+                    if skip:
+                        count_bad_box += 1
+                        continue
+
+                if fp_cluster_vacuum is not None:
+                    assert fp_cluster_vacuum > 0
+                    if conf_sys is not None:
+                        skip_cluster = _is_bad_cluster(
+                            conf_sys["cells"][0],
+                            conf_sys["coords"][0],
+                            fp_cluster_vacuum,
+                        )
+                    else:
+                        skip_cluster = check_cluster(conf_name, fp_cluster_vacuum)
+                    if skip_cluster:
+                        count_bad_cluster += 1
+                        continue
+
+                if model_devi_engine != "calypso":
+                    # link job.json
+                    job_name = os.path.join(tt, "job.json")
+                    job_name = os.path.abspath(job_name)
+
+                if cluster_cutoff is not None:
+                    # take clusters
+                    jj = fp_candidate[cc][2]
+                    poscar_name = f"{conf_name}.cluster.{jj}.POSCAR"
+                    if conf_name not in cluster_cache:
+                        # candidates are sorted, so all the atoms picked from the
+                        # same frame are cut with a single neighbor list
+                        cluster_idxs = []
+                        for kk in fp_candidate[cc:]:
+                            if kk[0] != tt or kk[1] != ii:
+                                break
+                            cluster_idxs.append(kk[2])
+                        cluster_cache = {
+                            conf_name: dict(
+                                zip(
+                                    cluster_idxs,
+                                    take_clusters(
+                                        conf_name, type_map, cluster_idxs, jdata
+                                    ),
+                                )
+                            )
+                        }
+                    new_system = cluster_cache[conf_name][jj]
+                    write_futures.append(
+                        executor.submit(new_system.to_vasp_poscar, poscar_name)
+                    )
+                fp_task_name = make_fp_task_name(int(ss), cc)
+                fp_task_path = os.path.join(work_path, fp_task_name)
+                create_path(fp_task_path)
+                fp_tasks.append(fp_task_path)
+                if cluster_cutoff is None:
+                    if model_devi_engine == "lammps":
+                        if model_devi_merge_traj:
+                            conf_sys.to(
+                                "lammps/lmp", os.path.join(fp_task_path, "conf.dump")
+                            )
+                        else:
+                            os.symlink(
+                                os.path.relpath(conf_name, fp_task_path),
+                                os.path.join(fp_task_path, "conf.dump"),
+                            )
+                        os.symlink(
+                            os.path.relpath(job_name, fp_task_path),
+                            os.path.join(fp_task_path, "job.json"),
+                        )
+                        # dump to poscar
+                        write_futures.append(
+                            executor.submit(
+                                conf_sys.to_vasp_poscar,
+                                os.path.join(fp_task_path, "POSCAR"),
+                            )
+                        )
+                        if charges_map:
+                            warnings.warn(
+                                '"sys_charges" keyword only support for gromacs engine now.'
+                            )
+                    elif model_devi_engine == "gromacs":
+                        os.symlink(
+                            os.path.relpath(conf_name, fp_task_path),
+                            os.path.join(fp_task_path, "conf.dump"),
+                        )
+                        os.symlink(
+                            os.path.relpath(job_name, fp_task_path),
+                            os.path.join(fp_task_path, "job.json"),
+                        )
+                        write_futures.append(
+                            executor.submit(
+                                dump_to_deepmd_raw,
+                                conf_name,
+                                os.path.join(fp_task_path, "deepmd.raw"),
+                                type_map,
+                                fmt="gromacs/gro",
+                                charge=charges_map[int(ss)] if charges_map else None,
+                            )
+                        )
+                    elif model_devi_engine == "amber":
+                        # read and write with ase
+                        from ase.io.netcdftrajectory import (
+                            NetCDFTrajectory,
+                            write_netcdftrajectory,
+                        )
+
+                        if cc > 0 and tt == fp_candidate[cc - 1][0]:
+                            # same MD task, use the same file
+                            pass
+                        else:
+                            # not the same file
+                            if cc > 0:
+                                # close the old file
+                                netcdftraj.close()
+                            netcdftraj = NetCDFTrajectory(conf_name)
+                        # write nc file
+                        write_netcdftrajectory(
+                            os.path.join(fp_task_path, "rc.nc"), netcdftraj[ii]
+                        )
+                        if cc >= numb_task - 1:
                             netcdftraj.close()
-                        netcdftraj = NetCDFTrajectory(conf_name)
-                    # write nc file
-                    write_netcdftrajectory("rc.nc", netcdftraj[ii])
-                    if cc >= numb_task - 1:
-                        netcdftraj.close()
-                    # link restart since it's necessary to start Amber
-                    os.symlink(os.path.relpath(rst_name), "init.rst7")
-                    os.symlink(os.path.relpath(job_name), "job.json")
-                elif model_devi_engine == "calypso":
-                    os.symlink(os.path.relpath(conf_name), "POSCAR")
-                    fjob = open("job.json", "w+")
-                    fjob.write('{"model_devi_engine":"calypso"}')
-                    fjob.close()
-                    # os.system('touch job.json')
+                        # link restart since it's necessary to start Amber
+                        os.symlink(
+                            os.path.relpath(rst_name, fp_task_path),
+                            os.path.join(fp_task_path, "init.rst7"),
+                        )
+                        os.symlink(
+                            os.path.relpath(job_name, fp_task_path),
+                            os.path.join(fp_task_path, "job.json"),
+                        )
+                    elif model_devi_engine == "calypso":
+                        os.symlink(
+                            os.path.relpath(conf_name, fp_task_path),
+                            os.path.join(fp_task_path, "POSCAR"),
+                        )
+                        with open(os.path.join(fp_task_path, "job.json"), "w") as fjob:
+                            fjob.write('{"model_devi_engine":"calypso"}')
+                    else:
+                        raise RuntimeError(
+                            "unknown model_devi_engine", model_devi_engine
+                        )
                 else:
-                    raise RuntimeError("unknown model_devi_engine", model_devi_engine)
-            else:
-                os.symlink(os.path.relpath(poscar_name), "POSCAR")
-                np.save("atom_pref", new_system.data["atom_pref"])
-            for pair in fp_link_files:
-                os.symlink(pair[0], pair[1])
-            os.chdir(cwd)
-        if count_bad_box > 0:
-            dlog.info(
-                f"system {ss:s} skipped {count_bad_box:6d} confs with bad box, {numb_task - count_bad_box:6d} remains"
-            )
-        if count_bad_cluster > 0:
-            dlog.info(
-                f"system {ss:s} skipped {count_bad_cluster:6d} confs with bad cluster, {numb_task - count_bad_cluster:6d} remains"
-            )
+                    os.symlink(
+                        os.path.relpath(poscar_name, fp_task_path),
+                        os.path.join(fp_task_path, "POSCAR"),
+                    )
+                    np.save(
+                        os.path.join(fp_task_path, "atom_pref"),
+                        new_system.data["atom_pref"],
+                    )
+                for pair in fp_link_files:
+                    os.symlink(pair[0], os.path.join(fp_task_path, pair[1]))
+            if count_bad_box > 0:
+                dlog.info(
+                    f"system {ss:s} skipped {count_bad_box:6d} confs with bad box, {numb_task - count_bad_box:6d} remains"
+                )
+            if count_bad_cluster > 0:
+                dlog.info(
+                    f"system {ss:s} skipped {count_bad_cluster:6d} confs with bad cluster, {numb_task - count_bad_cluster:6d} remains"
+                )
+        # wait for the structure files written in the thread pool
+        for future in write_futures:
+            future.result()
     if model_devi_engine == "calypso":
         dlog.info(
             f"summary  accurate_ratio: {acc_num * 100 / tot:8.4f}%  candidata_ratio: {candi_num * 100 / tot:8.4f}%  failed_ratio: {fail_num * 100 / tot:8.4f}%  in {tot:d} structures"
         )
-    if cluster_cutoff is None:
-        cwd = os.getcwd()
-        for idx, task in enumerate(fp_tasks):
-            os.chdir(task)
-            if model_devi_engine == "lammps":
-                sys = None
-                if model_devi_merge_traj:
-                    sys = dpdata.System(
-                        "conf.dump", fmt="lammps/lmp", type_map=type_map
-                    )
-                else:
-                    sys = dpdata.System(
-                        "conf.dump", fmt="lammps/dump", type_map=type_map
-                    )
-                sys.to_vasp_poscar("POSCAR")
-                # dump to poscar
-
-                if charges_map:
-                    warnings.warn(
-                        '"sys_charges" keyword only support for gromacs engine now.'
-                    )
-            elif model_devi_engine == "gromacs":
-                # dump_to_poscar('conf.dump', 'POSCAR', type_map, fmt = "gromacs/gro")
-                if charges_map:
-                    dump_to_deepmd_raw(
-                        "conf.dump",
-                        "deepmd.raw",
-                        type_map,
-                        fmt="gromacs/gro",
-                        charge=charges_recorder[idx],
-                    )
-                else:
-                    dump_to_deepmd_raw(
-                        "conf.dump",
-                        "deepmd.raw",
-                        type_map,
-                        fmt="gromacs/gro",
-                        charge=None,
-                    )
-            elif model_devi_engine in ("amber", "calypso"):
-                pass
-            else:
-                raise RuntimeError("unknown model_devi engine", model_devi_engine)
-            os.chdir(cwd)
     return fp_tasks
 
 
@@ -3111,10 +3679,130 @@ def make_vasp_incar_ele_temp(jdata, filename, ele_temp, nbands_esti=None):
         incar.write_file("INCAR")
 
 
-def make_fp_vasp_incar(iter_index, jdata, nbands_esti=None):
+def make_vasp_incar_warm_start(filename, warm_start_files, restart):
+    from pymatgen.io.vasp import Incar
+
+    with open(filename) as fp:
+        incar = fp.read()
+    try:
+        incar = incar_upper(Incar.from_string(incar))
+    except AttributeError:
+        incar = incar_upper(Incar.from_str(incar))
+    # the files are written for the following tasks
+    if "WAVECAR" in warm_start_files:
+        incar["LWAVE"] = True
+    if "CHGCAR" in warm_start_files:
+        incar["LCHARG"] = True
+    if restart:
+        if "WAVECAR" in warm_start_files:
+            incar["ISTART"] = 1
+            incar["ICHARG"] = 0
+        else:
+            incar["ISTART"] = 0
+            incar["ICHARG"] = 1
+    incar.write_file(filename)
+
+
+def _warm_start_candidates(iter_index, jdata, warm_start_files):
+    # the converged fp tasks of the previous iterations that have written the
+    # files, grouped by the composition
+    type_map = jdata["type_map"]
+    candidates = {}
+    for ii in range(iter_index):
+        fp_path = os.path.join(make_iter_name(ii), fp_name)
+        for tt in sorted(glob.glob(os.path.join(fp_path, "task.*"))):
+            if not os.path.isfile(os.path.join(tt, "POSCAR")) or not all(
+                os.path.isfile(os.path.join(tt, ff))
+                and os.path.getsize(os.path.join(tt, ff)) > 0
+                for ff in warm_start_files
+            ):
+                continue
+            # VASP writes the files even if the SCF is not converged
+            if not _vasp_check_converged(tt):
+                continue
+            system = dpdata.System(
+                os.path.join(tt, "POSCAR"), fmt="vasp/poscar", type_map=type_map
+            )
+            candidates.setdefault(tuple(system["atom_numbs"]), []).append(
+                (
+                    tt,
+                    system["cells"][0],
+                    structure_fingerprint(
+                        system["cells"][0],
+                        system["coords"][0],
+                        system["atom_types"],
+                        len(type_map),
+                    ),
+                )
+            )
+    return candidates
+
+
+def make_fp_vasp_warm_start(iter_index, jdata, sys_idx=None):
+    """Warm start the VASP fp tasks from the nearest converged tasks.
+
+    For each fp task, the converged task of the previous iterations with the
+    same composition and nearly the same cell, and with the nearest structure
+    fingerprint, is picked. Its WAVECAR or CHGCAR is linked into the
+    ``warm_start`` directory of the task, which is copied into the task
+    directory before VASP runs, and ISTART and ICHARG are set in INCAR.
+
+    Parameters
+    ----------
+    iter_index : int
+        iter index
+    jdata : dict
+        Run parameters.
+    sys_idx : int, optional
+        Only warm start the tasks of this system.
+    """
+    if not jdata.get("fp_warm_start", False):
+        return
+    warm_start_files = jdata.get("fp_warm_start_files", ["WAVECAR"])
+    cell_tol = jdata.get("fp_warm_start_cell_tol", 0.05)
+    type_map = jdata["type_map"]
+    work_path = os.path.join(make_iter_name(iter_index), fp_name)
+    fp_tasks = sorted(_glob_sys_tasks(work_path, sys_idx))
+    if len(fp_tasks) == 0:
+        return
+    candidates = _warm_start_candidates(iter_index, jdata, warm_start_files)
+    count = 0
+    for ii in fp_tasks:
+        warm_start_path = os.path.join(ii, warm_start_name)
+        if os.path.isdir(warm_start_path):
+            shutil.rmtree(warm_start_path)
+        os.makedirs(warm_start_path)
+        system = dpdata.System(
+            os.path.join(ii, "POSCAR"), fmt="vasp/poscar", type_map=type_map
+        )
+        nearest = pick_nearest(
+            structure_fingerprint(
+                system["cells"][0],
+                system["coords"][0],
+                system["atom_types"],
+                len(type_map),
+            ),
+            system["cells"][0],
+            candidates.get(tuple(system["atom_numbs"]), []),
+            cell_tol,
+        )
+        if nearest is not None:
+            for ff in warm_start_files:
+                os.symlink(
+                    os.path.relpath(os.path.join(nearest, ff), warm_start_path),
+                    os.path.join(warm_start_path, ff),
+                )
+            count += 1
+        make_vasp_incar_warm_start(
+            os.path.join(ii, "INCAR"), warm_start_files, nearest is not None
+        )
+    dlog.info(f"warm start {count} of {len(fp_tasks)} fp tasks")
+
+
+def make_fp_vasp_incar(iter_index, jdata, nbands_esti=None, sys_idx=None):
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -3132,10 +3820,10 @@ def make_fp_vasp_incar(iter_index, jdata, nbands_esti=None):
         os.chdir(cwd)
 
 
-def _make_fp_pwmat_input(iter_index, jdata):
+def _make_fp_pwmat_input(iter_index, jdata, sys_idx=None):
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -3147,7 +3835,7 @@ def _make_fp_pwmat_input(iter_index, jdata):
         os.chdir(cwd)
 
 
-def make_fp_vasp_cp_cvasp(iter_index, jdata):
+def make_fp_vasp_cp_cvasp(iter_index, jdata, sys_idx=None):
     # Move cvasp interface to jdata
     if ("cvasp" in jdata) and (jdata["cvasp"] is True):
         pass
@@ -3155,7 +3843,7 @@ def make_fp_vasp_cp_cvasp(iter_index, jdata):
         return
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -3167,14 +3855,14 @@ def make_fp_vasp_cp_cvasp(iter_index, jdata):
         os.chdir(cwd)
 
 
-def make_fp_vasp_kp(iter_index, jdata):
+def make_fp_vasp_kp(iter_index, jdata, sys_idx=None):
     from pymatgen.io.vasp import Incar, Kpoints
 
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
     fp_aniso_kspacing = jdata.get("fp_aniso_kspacing")
 
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -3219,7 +3907,7 @@ def make_fp_vasp_kp(iter_index, jdata):
         os.chdir(cwd)
 
 
-def _link_fp_vasp_pp(iter_index, jdata):
+def _link_fp_vasp_pp(iter_index, jdata, sys_idx=None):
     fp_pp_path = jdata["fp_pp_path"]
     fp_pp_files = jdata["fp_pp_files"]
     assert os.path.exists(fp_pp_path)
@@ -3228,7 +3916,7 @@ def _link_fp_vasp_pp(iter_index, jdata):
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
 
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -3241,7 +3929,7 @@ def _link_fp_vasp_pp(iter_index, jdata):
         os.chdir(cwd)
 
 
-def sys_link_fp_vasp_pp(iter_index, jdata):
+def sys_link_fp_vasp_pp(iter_index, jdata, sys_idx=None):
     fp_pp_path = jdata["fp_pp_path"]
     fp_pp_files = jdata["fp_pp_files"]
     fp_pp_path = os.path.abspath(fp_pp_path)
@@ -3254,7 +3942,7 @@ def sys_link_fp_vasp_pp(iter_index, jdata):
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
 
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -3283,14 +3971,14 @@ def sys_link_fp_vasp_pp(iter_index, jdata):
             os.chdir(cwd)
 
 
-def _link_fp_abacus_pporb_descript(iter_index, jdata):
+def _link_fp_abacus_pporb_descript(iter_index, jdata, sys_idx=None):
     # assume pp orbital files, numerical descrptors and model for dpks are all in fp_pp_path.
     fp_pp_path = os.path.abspath(jdata["fp_pp_path"])
     type_map = jdata["type_map"]
 
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -3355,7 +4043,7 @@ def _link_fp_abacus_pporb_descript(iter_index, jdata):
         os.chdir(cwd)
 
 
-def _make_fp_vasp_configs(iter_index: int, jdata: dict):
+def _make_fp_vasp_configs(iter_index: int, jdata: dict, sys_idx: Optional[int] = None):
     """Read the model deviation from model_devi step, and then generate the candidated structures
     in 02.fp directory.
 
@@ -3367,6 +4055,9 @@ def _make_fp_vasp_configs(iter_index: int, jdata: dict):
         The index of iteration.
     jdata : dict
         The json data.
+    sys_idx : int, optional
+        Only make the candidated structures of this system. The existing
+        tasks of the other systems in 02.fp are kept.
 
     Returns
     -------
@@ -3379,7 +4070,10 @@ def _make_fp_vasp_configs(iter_index: int, jdata: dict):
     type_map = jdata["type_map"]
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    create_path(work_path)
+    if sys_idx is None:
+        create_path(work_path)
+    else:
+        os.makedirs(work_path, exist_ok=True)
 
     modd_path = os.path.join(iter_name, model_devi_name)
     task_min = -1
@@ -3420,11 +4114,12 @@ def _make_fp_vasp_configs(iter_index: int, jdata: dict):
         [],
         type_map,
         jdata,
+        sys_idx=sys_idx,
     )
     return fp_tasks
 
 
-def make_fp_vasp(iter_index, jdata):
+def make_fp_vasp(iter_index, jdata, sys_idx=None):
     # abs path for fp_incar if it exists
     if "fp_incar" in jdata:
         jdata["fp_incar"] = os.path.abspath(jdata["fp_incar"])
@@ -3435,18 +4130,20 @@ def make_fp_vasp(iter_index, jdata):
         nbe = None
     # order is critical!
     # 1, create potcar
-    sys_link_fp_vasp_pp(iter_index, jdata)
+    sys_link_fp_vasp_pp(iter_index, jdata, sys_idx=sys_idx)
     # 2, create incar
-    make_fp_vasp_incar(iter_index, jdata, nbands_esti=nbe)
+    make_fp_vasp_incar(iter_index, jdata, nbands_esti=nbe, sys_idx=sys_idx)
     # 3, create kpoints
-    make_fp_vasp_kp(iter_index, jdata)
+    make_fp_vasp_kp(iter_index, jdata, sys_idx=sys_idx)
     # 4, copy cvasp
-    make_fp_vasp_cp_cvasp(iter_index, jdata)
+    make_fp_vasp_cp_cvasp(iter_index, jdata, sys_idx=sys_idx)
+    # 5, link the files to warm start from
+    make_fp_vasp_warm_start(iter_index, jdata, sys_idx=sys_idx)
 
 
-def make_fp_pwscf(iter_index, jdata):
+def make_fp_pwscf(iter_index, jdata, sys_idx=None):
     work_path = os.path.join(make_iter_name(iter_index), fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     # make pwscf input
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
@@ -3473,12 +4170,12 @@ def make_fp_pwscf(iter_index, jdata):
             fp.write(ret)
         os.chdir(cwd)
     # link pp files
-    _link_fp_vasp_pp(iter_index, jdata)
+    _link_fp_vasp_pp(iter_index, jdata, sys_idx=sys_idx)
 
 
-def make_fp_abacus_scf(iter_index, jdata):
+def make_fp_abacus_scf(iter_index, jdata, sys_idx=None):
     work_path = os.path.join(make_iter_name(iter_index), fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     pporb_path = "pporb"
     # make abacus/pw/scf input
     iter_name = make_iter_name(iter_index)
@@ -3580,12 +4277,12 @@ def make_fp_abacus_scf(iter_index, jdata):
 
         os.chdir(cwd)
     # link pp and orbital files
-    _link_fp_abacus_pporb_descript(iter_index, jdata)
+    _link_fp_abacus_pporb_descript(iter_index, jdata, sys_idx=sys_idx)
 
 
-def make_fp_siesta(iter_index, jdata):
+def make_fp_siesta(iter_index, jdata, sys_idx=None):
     work_path = os.path.join(make_iter_name(iter_index), fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     # make siesta input
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
@@ -3605,12 +4302,12 @@ def make_fp_siesta(iter_index, jdata):
             fp.write(ret)
         os.chdir(cwd)
     # link pp files
-    _link_fp_vasp_pp(iter_index, jdata)
+    _link_fp_vasp_pp(iter_index, jdata, sys_idx=sys_idx)
 
 
-def make_fp_gaussian(iter_index, jdata):
+def make_fp_gaussian(iter_index, jdata, sys_idx=None):
     work_path = os.path.join(make_iter_name(iter_index), fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     # make gaussian gjf file
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
@@ -3635,9 +4332,9 @@ def make_fp_gaussian(iter_index, jdata):
         os.chdir(cwd)
 
 
-def make_fp_cp2k(iter_index, jdata):
+def make_fp_cp2k(iter_index, jdata, sys_idx=None):
     work_path = os.path.join(make_iter_name(iter_index), fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     # make cp2k input
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
@@ -3672,18 +4369,18 @@ def make_fp_cp2k(iter_index, jdata):
         os.chdir(cwd)
 
     # link pp files
-    _link_fp_vasp_pp(iter_index, jdata)
+    _link_fp_vasp_pp(iter_index, jdata, sys_idx=sys_idx)
 
 
-def make_fp_pwmat(iter_index, jdata):
+def make_fp_pwmat(iter_index, jdata, sys_idx=None):
     # abs path for fp_incar if it exists
     if "fp_incar" in jdata:
         jdata["fp_incar"] = os.path.abspath(jdata["fp_incar"])
     # order is critical!
     # 1, link pp files
-    _link_fp_vasp_pp(iter_index, jdata)
+    _link_fp_vasp_pp(iter_index, jdata, sys_idx=sys_idx)
     # 2, create pwmat input
-    _make_fp_pwmat_input(iter_index, jdata)
+    _make_fp_pwmat_input(iter_index, jdata, sys_idx=sys_idx)
 
 
 def make_fp_amber_diff(iter_index: int, jdata: dict):
@@ -3785,7 +4482,7 @@ def make_fp_amber_diff(iter_index: int, jdata: dict):
     os.chdir(cwd)
 
 
-def make_fp_custom(iter_index, jdata):
+def make_fp_custom(iter_index, jdata, sys_idx=None):
     """Make input file for customized FP style.
 
     Convert the POSCAR file to custom format.
@@ -3798,7 +4495,7 @@ def make_fp_custom(iter_index, jdata):
         Run parameters.
     """
     work_path = os.path.join(make_iter_name(iter_index), fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_params = jdata["fp_params"]
     input_fn = fp_params["input_fn"]
     input_fmt = fp_params["input_fmt"]
@@ -3809,7 +4506,7 @@ def make_fp_custom(iter_index, jdata):
             system.to(input_fmt, input_fn)
 
 
-def make_fp(iter_index, jdata, mdata):
+def make_fp(iter_index, jdata, mdata, sys_idx=None):
     """Select the candidate strutures and make the input file of FP calculation.
 
     Parameters
@@ -3820,16 +4517,111 @@ def make_fp(iter_index, jdata, mdata):
         Run parameters.
     mdata : dict
         Machine parameters.
+    sys_idx : int, optional
+        Only make the FP tasks of this system.
     """
-    fp_tasks = _make_fp_vasp_configs(iter_index, jdata)
+    fp_tasks = _make_fp_vasp_configs(iter_index, jdata, sys_idx=sys_idx)
     if len(fp_tasks) == 0:
         return
-    make_fp_calculation(iter_index, jdata, mdata)
+    make_fp_calculation(iter_index, jdata, mdata, sys_idx=sys_idx)
+
+
+def _make_fp_cache_hits(iter_index, jdata, sys_idx=None):
+    """Take the labels of the fp tasks from the fp cache.
 
+    The tasks whose labels are found in the cache set by ``fp_cache`` are
+    removed, and their labels are written to ``data.cached.*`` in 02.fp.
+    The cache keys of the other tasks are recorded in the task directories,
+    so that their labels are added to the cache by post_fp.
 
-def make_fp_calculation(iter_index, jdata, mdata):
+    Parameters
+    ----------
+    iter_index : int
+        iter index
+    jdata : dict
+        Run parameters.
+    sys_idx : int, optional
+        Only look up the tasks of this system.
+    """
+    if jdata["fp_style"] == "amber/diff":
+        return
+    fp_cache = open_fp_cache(jdata)
+    if fp_cache is None:
+        return
+    work_path = os.path.join(make_iter_name(iter_index), fp_name)
+    fp_tasks = sorted(_glob_sys_tasks(work_path, sys_idx))
+    params_hash = fp_params_hash(jdata)
+    tol = jdata.get("fp_cache_tol", 1e-4)
+    hits = {}
+    with fp_cache:
+        for ii in fp_tasks:
+            poscar = os.path.join(ii, "POSCAR")
+            if not os.path.isfile(poscar):
+                continue
+            system = dpdata.System(
+                poscar, fmt="vasp/poscar", type_map=jdata["type_map"]
+            )
+            extra = None
+            job_name = os.path.join(ii, "job.json")
+            if os.path.isfile(job_name):
+                with open(job_name) as fp:
+                    job_data = json.load(fp)
+                if "ele_temp" in job_data:
+                    extra = {"ele_temp": job_data["ele_temp"]}
+            key = structure_key(system, params_hash, tol=tol, extra=extra)
+            labeled = fp_cache.get(key)
+            if labeled is None:
+                with open(os.path.join(ii, cache_key_name), "w") as fp:
+                    fp.write(key)
+            else:
+                ss = os.path.basename(ii).split(".")[1]
+                hits.setdefault(ss, []).append(labeled)
+                shutil.rmtree(ii)
+    for ss, systems in hits.items():
+        sys_data_path = os.path.join(work_path, f"data.cached.{ss}")
+        if os.path.isdir(sys_data_path):
+            shutil.rmtree(sys_data_path)
+        dpdata.MultiSystems(*systems, type_map=jdata["type_map"]).to_deepmd_npy(
+            sys_data_path
+        )
+    nhits = sum(len(systems) for systems in hits.values())
+    dlog.info(f"fp cache: {nhits} of {len(fp_tasks)} fp tasks are found in the cache")
+
+
+def _fp_cache_store(jdata, sys_files, sys_parsed):
+    """Add the labels parsed from the fp tasks to the fp cache.
+
+    Parameters
+    ----------
+    jdata : dict
+        Run parameters.
+    sys_files : dict
+        the fp output files, or task directories, of each system index
+    sys_parsed : dict
+        the parsed systems of each system index, in the order of the files
+    """
+    fp_cache = open_fp_cache(jdata)
+    if fp_cache is None:
+        return
+    items = []
+    for ss, files in sys_files.items():
+        for ff, labeled in zip(files, sys_parsed[ss]):
+            task_path = ff if os.path.isdir(ff) else os.path.dirname(ff)
+            key_name = os.path.join(task_path, cache_key_name)
+            if len(labeled) != 1 or not os.path.isfile(key_name):
+                continue
+            with open(key_name) as fp:
+                items.append((fp.read().strip(), labeled))
+    with fp_cache:
+        fp_cache.put(items)
+
+
+def make_fp_calculation(iter_index, jdata, mdata, sys_idx=None):
     """Make the input file of FP calculation.
 
+    The tasks found in the fp cache, if ``fp_cache`` is set, are replaced
+    by the cached labels first.
+
     Parameters
     ----------
     iter_index : int
@@ -3838,32 +4630,40 @@ def make_fp_calculation(iter_index, jdata, mdata):
         Run parameters.
     mdata : dict
         Machine parameters.
+    sys_idx : int, optional
+        Only make the input files of the tasks of this system.
     """
+    _make_fp_cache_hits(iter_index, jdata, sys_idx=sys_idx)
     fp_style = jdata["fp_style"]
     if fp_style == "vasp":
-        make_fp_vasp(iter_index, jdata)
+        make_fp_vasp(iter_index, jdata, sys_idx=sys_idx)
     elif fp_style == "pwscf":
-        make_fp_pwscf(iter_index, jdata)
+        make_fp_pwscf(iter_index, jdata, sys_idx=sys_idx)
     elif fp_style == "abacus":
-        make_fp_abacus_scf(iter_index, jdata)
+        make_fp_abacus_scf(iter_index, jdata, sys_idx=sys_idx)
     elif fp_style == "siesta":
-        make_fp_siesta(iter_index, jdata)
+        make_fp_siesta(iter_index, jdata, sys_idx=sys_idx)
     elif fp_style == "gaussian":
-        make_fp_gaussian(iter_index, jdata)
+        make_fp_gaussian(iter_index, jdata, sys_idx=sys_idx)
     elif fp_style == "cp2k":
-        make_fp_cp2k(iter_index, jdata)
+        make_fp_cp2k(iter_index, jdata, sys_idx=sys_idx)
     elif fp_style == "pwmat":
-        make_fp_pwmat(iter_index, jdata)
+        make_fp_pwmat(iter_index, jdata, sys_idx=sys_idx)
     elif fp_style == "amber/diff":
         make_fp_amber_diff(iter_index, jdata)
     elif fp_style == "custom":
-        make_fp_custom(iter_index, jdata)
+        make_fp_custom(iter_index, jdata, sys_idx=sys_idx)
     else:
         raise RuntimeError("unsupported fp style")
     # Copy user defined forward_files
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    symlink_user_forward_files(mdata=mdata, task_type="fp", work_path=work_path)
+    task_format = None
+    if sys_idx is not None:
+        task_format = {"fp": "task." + data_system_fmt % sys_idx + ".*"}
+    symlink_user_forward_files(
+        mdata=mdata, task_type="fp", work_path=work_path, task_format=task_format
+    )
 
 
 def _vasp_check_fin(ii):
@@ -3878,6 +4678,18 @@ def _vasp_check_fin(ii):
     return True
 
 
+def _vasp_check_converged(ii):
+    # the run is finished and its last electronic loop is converged
+    if not _vasp_check_fin(ii):
+        return False
+    converged = False
+    with open(os.path.join(ii, "OUTCAR")) as fp:
+        for line in fp:
+            if "aborting loop" in line:
+                converged = "EDIFF is reached" in line
+    return converged
+
+
 def _qe_check_fin(ii):
     if os.path.isfile(os.path.join(ii, "output")):
         with open(os.path.join(ii, "output")) as fp:
@@ -3959,6 +4771,8 @@ def run_fp_inner(
     check_fin,
     log_file="fp.log",
     forward_common_files=[],
+    sys_idx=None,
+    exit_on_submit=False,
 ):
     fp_command = mdata["fp_command"]
     fp_group_size = mdata["fp_group_size"]
@@ -3968,10 +4782,10 @@ def run_fp_inner(
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
 
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
-        return
+        return None
 
     fp_style = jdata["fp_style"]
     if fp_style == "amber/diff":
@@ -3998,12 +4812,6 @@ def run_fp_inner(
             ).format(jdata["cutoff"])
         )
 
-    fp_run_tasks = fp_tasks
-    # for ii in fp_tasks :
-    #     if not check_fin(ii) :
-    #         fp_run_tasks.append(ii)
-    run_tasks = [os.path.basename(ii) for ii in fp_run_tasks]
-
     user_forward_files = mdata.get("fp" + "_user_forward_files", [])
     forward_files += [os.path.basename(file) for file in user_forward_files]
     backward_files += mdata.get("fp" + "_user_backward_files", [])
@@ -4011,23 +4819,33 @@ def run_fp_inner(
     ### Submit jobs
     check_api_version(mdata)
 
-    submission = make_submission(
-        mdata["fp_machine"],
-        mdata["fp_resources"],
-        commands=[fp_command],
-        work_path=work_path,
-        run_tasks=run_tasks,
-        group_size=fp_group_size,
-        forward_common_files=forward_common_files,
-        forward_files=forward_files,
-        backward_files=backward_files,
-        outlog=log_file,
-        errlog=log_file,
+    submission = _make_submission_skip_finished(
+        functools.partial(
+            make_submission,
+            mdata["fp_machine"],
+            mdata["fp_resources"],
+            commands=[fp_command],
+            work_path=work_path,
+            group_size=fp_group_size,
+            forward_common_files=forward_common_files,
+            forward_files=forward_files,
+            backward_files=backward_files,
+            outlog=log_file,
+            errlog=log_file,
+        ),
+        work_path,
+        fp_tasks,
+        check_fin,
+        jdata,
     )
-    submission.run_submission()
+    if submission is None:
+        log_task("all fp tasks are finished")
+        return None
+    submission.run_submission(exit_on_submit=exit_on_submit)
+    return submission
 
 
-def run_fp(iter_index, jdata, mdata):
+def run_fp(iter_index, jdata, mdata, sys_idx=None, exit_on_submit=False):
     fp_style = jdata["fp_style"]
     fp_pp_files = jdata.get("fp_pp_files", [])
 
@@ -4045,7 +4863,16 @@ def run_fp(iter_index, jdata, mdata):
             forward_common_files = []
         else:
             forward_common_files = []
-        run_fp_inner(
+        if jdata.get("fp_warm_start", False):
+            warm_start_files = jdata.get("fp_warm_start_files", ["WAVECAR"])
+            forward_files.append(warm_start_name)
+            backward_files += warm_start_files
+            # the warm_start directory is empty if no task is picked
+            mdata = mdata.copy()
+            mdata["fp_command"] = (
+                f"cp {warm_start_name}/* . 2>/dev/null ; " + mdata["fp_command"]
+            )
+        submission = run_fp_inner(
             iter_index,
             jdata,
             mdata,
@@ -4053,11 +4880,13 @@ def run_fp(iter_index, jdata, mdata):
             backward_files,
             _vasp_check_fin,
             forward_common_files=forward_common_files,
+            sys_idx=sys_idx,
+            exit_on_submit=exit_on_submit,
         )
     elif fp_style == "pwscf":
         forward_files = ["input"] + fp_pp_files
         backward_files = ["output"]
-        run_fp_inner(
+        submission = run_fp_inner(
             iter_index,
             jdata,
             mdata,
@@ -4065,6 +4894,8 @@ def run_fp(iter_index, jdata, mdata):
             backward_files,
             _qe_check_fin,
             log_file="output",
+            sys_idx=sys_idx,
+            exit_on_submit=exit_on_submit,
         )
     elif fp_style == "abacus":
         fp_params = {}
@@ -4079,7 +4910,7 @@ def run_fp(iter_index, jdata, mdata):
         if "kspacing" not in fp_params.keys():
             forward_files.append("KPT")
         backward_files = ["output", "OUT.ABACUS"]
-        run_fp_inner(
+        submission = run_fp_inner(
             iter_index,
             jdata,
             mdata,
@@ -4087,11 +4918,13 @@ def run_fp(iter_index, jdata, mdata):
             backward_files,
             _abacus_scf_check_fin,
             log_file="output",
+            sys_idx=sys_idx,
+            exit_on_submit=exit_on_submit,
         )
     elif fp_style == "siesta":
         forward_files = ["input"] + fp_pp_files
         backward_files = ["output"]
-        run_fp_inner(
+        submission = run_fp_inner(
             iter_index,
             jdata,
             mdata,
@@ -4099,11 +4932,13 @@ def run_fp(iter_index, jdata, mdata):
             backward_files,
             _siesta_check_fin,
             log_file="output",
+            sys_idx=sys_idx,
+            exit_on_submit=exit_on_submit,
         )
     elif fp_style == "gaussian":
         forward_files = ["input"]
         backward_files = ["output"]
-        run_fp_inner(
+        submission = run_fp_inner(
             iter_index,
             jdata,
             mdata,
@@ -4111,11 +4946,13 @@ def run_fp(iter_index, jdata, mdata):
             backward_files,
             _gaussian_check_fin,
             log_file="output",
+            sys_idx=sys_idx,
+            exit_on_submit=exit_on_submit,
         )
     elif fp_style == "cp2k":
         forward_files = ["input.inp", "coord.xyz"]
         backward_files = ["output"]
-        run_fp_inner(
+        submission = run_fp_inner(
             iter_index,
             jdata,
             mdata,
@@ -4123,11 +4960,13 @@ def run_fp(iter_index, jdata, mdata):
             backward_files,
             _cp2k_check_fin,
             log_file="output",
+            sys_idx=sys_idx,
+            exit_on_submit=exit_on_submit,
         )
     elif fp_style == "pwmat":
         forward_files = ["atom.config", "etot.input"] + fp_pp_files
         backward_files = ["REPORT", "OUT.MLMD", "output"]
-        run_fp_inner(
+        submission = run_fp_inner(
             iter_index,
             jdata,
             mdata,
@@ -4135,6 +4974,8 @@ def run_fp(iter_index, jdata, mdata):
             backward_files,
             _pwmat_check_fin,
             log_file="output",
+            sys_idx=sys_idx,
+            exit_on_submit=exit_on_submit,
         )
     elif fp_style == "amber/diff":
         forward_files = ["rc.nc"]
@@ -4153,7 +4994,7 @@ def run_fp(iter_index, jdata, mdata):
             "qm_region",
             "init*.rst7",
         ]
-        run_fp_inner(
+        submission = run_fp_inner(
             iter_index,
             jdata,
             mdata,
@@ -4162,12 +5003,14 @@ def run_fp(iter_index, jdata, mdata):
             None,
             log_file="output",
             forward_common_files=forward_common_files,
+            sys_idx=sys_idx,
+            exit_on_submit=exit_on_submit,
         )
     elif fp_style == "custom":
         fp_params = jdata["fp_params"]
         forward_files = [fp_params["input_fn"]]
         backward_files = [fp_params["output_fn"]]
-        run_fp_inner(
+        submission = run_fp_inner(
             iter_index,
             jdata,
             mdata,
@@ -4175,9 +5018,12 @@ def run_fp(iter_index, jdata, mdata):
             backward_files,
             None,
             log_file="output",
+            sys_idx=sys_idx,
+            exit_on_submit=exit_on_submit,
         )
     else:
         raise RuntimeError("unsupported fp style")
+    return submission
 
 
 def post_fp_check_fail(iter_index, jdata, rfailed=None):
@@ -4200,6 +5046,9 @@ def post_fp_check_fail(iter_index, jdata, rfailed=None):
         for single_sys in sys_paths:
             sys = dpdata.LabeledSystem(os.path.join(single_sys), fmt="deepmd/npy")
             nframe += len(sys)
+            # the frames taken from the fp cache have no task
+            if os.path.basename(ii).startswith("data.cached."):
+                ntask += len(sys)
     nfail = ntask - nframe
 
     rfail = float(nfail) / float(ntask)
@@ -4208,7 +5057,93 @@ def post_fp_check_fail(iter_index, jdata, rfailed=None):
         raise RuntimeError("find too many unsuccessfully terminated jobs")
 
 
-def post_fp_vasp(iter_index, jdata, rfailed=None):
+def _post_fp_vasp_one(oo, type_map, use_ele_temp=0):
+    """Parse the OUTCAR of one VASP fp task."""
+    try:
+        _sys, nframes = read_outcar_converged(oo, type_map=type_map)
+    except Exception:
+        dlog.info("Try to parse from vasprun.xml")
+        try:
+            _sys = dpdata.LabeledSystem(
+                oo.replace("OUTCAR", "vasprun.xml"), type_map=type_map
+            )
+        except Exception:
+            _sys = dpdata.LabeledSystem()
+            dlog.info("Failed fp path: {}".format(oo.replace("OUTCAR", "")))
+        nframes = len(_sys)
+    if nframes >= 2:
+        raise RuntimeError("The vasp parameter NSW should be set as 1")
+    if nframes == 1:
+        # save ele_temp, if any
+        if os.path.exists(oo.replace("OUTCAR", "job.json")):
+            with open(oo.replace("OUTCAR", "job.json")) as fp:
+                job_data = json.load(fp)
+            if "ele_temp" in job_data:
+                assert use_ele_temp
+                ele_temp = job_data["ele_temp"]
+                if use_ele_temp == 0:
+                    raise RuntimeError(
+                        "should not get ele temp at setting: use_ele_temp == 0"
+                    )
+                elif use_ele_temp == 1:
+                    _sys.data["fparam"] = np.array(ele_temp).reshape(1, 1)
+                elif use_ele_temp == 2:
+                    tile_te = np.tile(ele_temp, [_sys.get_natoms()])
+                    _sys.data["aparam"] = tile_te.reshape(1, _sys.get_natoms(), 1)
+                else:
+                    raise RuntimeError(
+                        "invalid setting of use_ele_temp " + str(use_ele_temp)
+                    )
+                # check if ele_temp shape is correct
+                _sys.check_data()
+    return _sys
+
+
+def _post_fp_load_labeled(oo, fmt, type_map):
+    """Parse the output of one fp task with dpdata."""
+    return dpdata.LabeledSystem(oo, fmt=fmt, type_map=type_map)
+
+
+def _post_fp_gaussian_one(oo, type_map, use_atom_pref=False):
+    """Parse the output of one Gaussian fp task."""
+    sys = dpdata.LabeledSystem(oo, fmt="gaussian/log")
+    if len(sys) > 0:
+        sys.check_type_map(type_map=type_map)
+    if use_atom_pref:
+        sys.data["atom_pref"] = np.load(
+            os.path.join(os.path.dirname(oo), "atom_pref.npy")
+        )
+    return sys
+
+
+def _post_fp_parse_systems(sys_files, func, nproc=1):
+    """Parse the fp outputs of all systems in one (parallel) pass.
+
+    Parameters
+    ----------
+    sys_files : dict
+        the fp output files of each system index
+    func : Callable
+        the function parsing one output file
+    nproc : int
+        the number of processes
+
+    Returns
+    -------
+    dict
+        the parsed systems of each system index, in the order of the files
+    """
+    all_files = [ff for files in sys_files.values() for ff in files]
+    all_sys = parallel_map(func, all_files, nproc)
+    ret = {}
+    start = 0
+    for ss, files in sys_files.items():
+        ret[ss] = all_sys[start : start + len(files)]
+        start += len(files)
+    return ret
+
+
+def post_fp_vasp(iter_index, jdata, rfailed=None, sys_idx=None):
     ratio_failed = rfailed if rfailed else jdata.get("ratio_failed", 0.05)
     model_devi_engine = jdata.get("model_devi_engine", "lammps")
     if model_devi_engine != "calypso":
@@ -4218,7 +5153,7 @@ def post_fp_vasp(iter_index, jdata, rfailed=None):
 
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -4233,65 +5168,30 @@ def post_fp_vasp(iter_index, jdata, rfailed=None):
 
     cwd = os.getcwd()
 
+    sys_outcars = {}
+    for ss in system_index:
+        sys_outcars[ss] = sorted(
+            glob.glob(os.path.join(work_path, f"task.{ss}.*/OUTCAR"))
+        )
+    sys_parsed = _post_fp_parse_systems(
+        sys_outcars,
+        functools.partial(
+            _post_fp_vasp_one, type_map=jdata["type_map"], use_ele_temp=use_ele_temp
+        ),
+        nproc=jdata.get("post_fp_nproc", 1),
+    )
+    _fp_cache_store(jdata, sys_outcars, sys_parsed)
+
     tcount = 0
     icount = 0
     for ss in system_index:
-        sys_outcars = glob.glob(os.path.join(work_path, f"task.{ss}.*/OUTCAR"))
-        sys_outcars.sort()
-        tcount += len(sys_outcars)
-        all_sys = None
-        all_te = []
-        for oo in sys_outcars:
-            try:
-                _sys = dpdata.LabeledSystem(oo, type_map=jdata["type_map"])
-            except Exception:
-                dlog.info("Try to parse from vasprun.xml")
-                try:
-                    _sys = dpdata.LabeledSystem(
-                        oo.replace("OUTCAR", "vasprun.xml"), type_map=jdata["type_map"]
-                    )
-                except Exception:
-                    _sys = dpdata.LabeledSystem()
-                    dlog.info("Failed fp path: {}".format(oo.replace("OUTCAR", "")))
-            if len(_sys) == 1:
-                # save ele_temp, if any
-                if os.path.exists(oo.replace("OUTCAR", "job.json")):
-                    with open(oo.replace("OUTCAR", "job.json")) as fp:
-                        job_data = json.load(fp)
-                    if "ele_temp" in job_data:
-                        assert use_ele_temp
-                        ele_temp = job_data["ele_temp"]
-                        all_te.append(ele_temp)
-                        if use_ele_temp == 0:
-                            raise RuntimeError(
-                                "should not get ele temp at setting: use_ele_temp == 0"
-                            )
-                        elif use_ele_temp == 1:
-                            _sys.data["fparam"] = np.array(ele_temp).reshape(1, 1)
-                        elif use_ele_temp == 2:
-                            tile_te = np.tile(ele_temp, [_sys.get_natoms()])
-                            _sys.data["aparam"] = tile_te.reshape(
-                                1, _sys.get_natoms(), 1
-                            )
-                        else:
-                            raise RuntimeError(
-                                "invalid setting of use_ele_temp " + str(use_ele_temp)
-                            )
-                        # check if ele_temp shape is correct
-                        _sys.check_data()
-                if all_sys is None:
-                    all_sys = _sys
-                else:
-                    all_sys.append(_sys)
-            elif len(_sys) >= 2:
-                raise RuntimeError("The vasp parameter NSW should be set as 1")
-            else:
-                icount += 1
-        all_te = np.array(all_te)
+        tcount += len(sys_outcars[ss])
+        icount += sum(len(_sys) == 0 for _sys in sys_parsed[ss])
+        all_sys = concat_systems(sys_parsed[ss])
         if all_sys is not None:
             sys_data_path = os.path.join(work_path, f"data.{ss}")
             all_sys.to_deepmd_raw(sys_data_path)
-            all_sys.to_deepmd_npy(sys_data_path, set_size=len(sys_outcars))
+            all_sys.to_deepmd_npy(sys_data_path, set_size=len(sys_outcars[ss]))
 
     if tcount == 0:
         rfail = 0.0
@@ -4308,13 +5208,13 @@ def post_fp_vasp(iter_index, jdata, rfailed=None):
         )
 
 
-def post_fp_pwscf(iter_index, jdata):
+def post_fp_pwscf(iter_index, jdata, sys_idx=None):
     model_devi_jobs = jdata["model_devi_jobs"]
     assert iter_index < len(model_devi_jobs)
 
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -4327,43 +5227,36 @@ def post_fp_pwscf(iter_index, jdata):
     system_index = list(set_tmp)
     system_index.sort()
 
-    cwd = os.getcwd()
+    sys_output = {}
     for ss in system_index:
-        sys_output = glob.glob(os.path.join(work_path, f"task.{ss}.*/output"))
+        sys_output_ss = glob.glob(os.path.join(work_path, f"task.{ss}.*/output"))
         sys_input = glob.glob(os.path.join(work_path, f"task.{ss}.*/input"))
-        sys_output.sort()
+        sys_output_ss.sort()
         sys_input.sort()
-
-        flag = True
-        for ii, oo in zip(sys_input, sys_output):
-            if flag:
-                _sys = dpdata.LabeledSystem(
-                    oo, fmt="qe/pw/scf", type_map=jdata["type_map"]
-                )
-                if len(_sys) > 0:
-                    all_sys = _sys
-                    flag = False
-                else:
-                    pass
-            else:
-                _sys = dpdata.LabeledSystem(
-                    oo, fmt="qe/pw/scf", type_map=jdata["type_map"]
-                )
-                if len(_sys) > 0:
-                    all_sys.append(_sys)
-
-        sys_data_path = os.path.join(work_path, f"data.{ss}")
-        all_sys.to_deepmd_raw(sys_data_path)
-        all_sys.to_deepmd_npy(sys_data_path, set_size=len(sys_output))
+        sys_output[ss] = [oo for ii, oo in zip(sys_input, sys_output_ss)]
+    sys_parsed = _post_fp_parse_systems(
+        sys_output,
+        functools.partial(
+            _post_fp_load_labeled, fmt="qe/pw/scf", type_map=jdata["type_map"]
+        ),
+        nproc=jdata.get("post_fp_nproc", 1),
+    )
+    _fp_cache_store(jdata, sys_output, sys_parsed)
+    for ss in system_index:
+        all_sys = concat_systems(sys_parsed[ss])
+        if all_sys is not None:
+            sys_data_path = os.path.join(work_path, f"data.{ss}")
+            all_sys.to_deepmd_raw(sys_data_path)
+            all_sys.to_deepmd_npy(sys_data_path, set_size=len(sys_output[ss]))
 
 
-def post_fp_abacus_scf(iter_index, jdata):
+def post_fp_abacus_scf(iter_index, jdata, sys_idx=None):
     model_devi_jobs = jdata["model_devi_jobs"]
     assert iter_index < len(model_devi_jobs)
 
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -4376,37 +5269,36 @@ def post_fp_abacus_scf(iter_index, jdata):
     system_index = list(set_tmp)
     system_index.sort()
 
-    cwd = os.getcwd()
+    sys_output = {}
     for ss in system_index:
-        sys_output = glob.glob(os.path.join(work_path, f"task.{ss}.*"))
+        sys_output_ss = glob.glob(os.path.join(work_path, f"task.{ss}.*"))
         sys_input = glob.glob(os.path.join(work_path, f"task.{ss}.*/INPUT"))
-        sys_output.sort()
+        sys_output_ss.sort()
         sys_input.sort()
-
-        all_sys = None
-        for ii, oo in zip(sys_input, sys_output):
-            _sys = dpdata.LabeledSystem(
-                oo, fmt="abacus/scf", type_map=jdata["type_map"]
-            )
-            if len(_sys) > 0:
-                if all_sys is None:
-                    all_sys = _sys
-                else:
-                    all_sys.append(_sys)
-
+        sys_output[ss] = [oo for ii, oo in zip(sys_input, sys_output_ss)]
+    sys_parsed = _post_fp_parse_systems(
+        sys_output,
+        functools.partial(
+            _post_fp_load_labeled, fmt="abacus/scf", type_map=jdata["type_map"]
+        ),
+        nproc=jdata.get("post_fp_nproc", 1),
+    )
+    _fp_cache_store(jdata, sys_output, sys_parsed)
+    for ss in system_index:
+        all_sys = concat_systems(sys_parsed[ss])
         if all_sys is not None:
             sys_data_path = os.path.join(work_path, f"data.{ss}")
             all_sys.to_deepmd_raw(sys_data_path)
-            all_sys.to_deepmd_npy(sys_data_path, set_size=len(sys_output))
+            all_sys.to_deepmd_npy(sys_data_path, set_size=len(sys_output[ss]))
 
 
-def post_fp_siesta(iter_index, jdata):
+def post_fp_siesta(iter_index, jdata, sys_idx=None):
     model_devi_jobs = jdata["model_devi_jobs"]
     assert iter_index < len(model_devi_jobs)
 
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -4447,13 +5339,13 @@ def post_fp_siesta(iter_index, jdata):
         all_sys.to_deepmd_npy(sys_data_path, set_size=len(sys_output))
 
 
-def post_fp_gaussian(iter_index, jdata):
+def post_fp_gaussian(iter_index, jdata, sys_idx=None):
     model_devi_jobs = jdata["model_devi_jobs"]
     assert iter_index < len(model_devi_jobs)
 
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -4466,38 +5358,40 @@ def post_fp_gaussian(iter_index, jdata):
     system_index = list(set_tmp)
     system_index.sort()
 
-    cwd = os.getcwd()
+    sys_output = {}
     for ss in system_index:
-        sys_output = glob.glob(os.path.join(work_path, f"task.{ss}.*/output"))
-        sys_output.sort()
-        for idx, oo in enumerate(sys_output):
-            sys = dpdata.LabeledSystem(oo, fmt="gaussian/log")
-            if len(sys) > 0:
-                sys.check_type_map(type_map=jdata["type_map"])
-            if jdata.get("use_atom_pref", False):
-                sys.data["atom_pref"] = np.load(
-                    os.path.join(os.path.dirname(oo), "atom_pref.npy")
-                )
-            if idx == 0:
-                if jdata.get("use_clusters", False):
-                    all_sys = dpdata.MultiSystems(sys, type_map=jdata["type_map"])
-                else:
-                    all_sys = sys
-            else:
-                all_sys.append(sys)
-        sys_data_path = os.path.join(work_path, f"data.{ss}")
-        all_sys.to_deepmd_raw(sys_data_path)
-        all_sys.to_deepmd_npy(sys_data_path, set_size=len(sys_output))
+        sys_output[ss] = sorted(
+            glob.glob(os.path.join(work_path, f"task.{ss}.*/output"))
+        )
+    sys_parsed = _post_fp_parse_systems(
+        sys_output,
+        functools.partial(
+            _post_fp_gaussian_one,
+            type_map=jdata["type_map"],
+            use_atom_pref=jdata.get("use_atom_pref", False),
+        ),
+        nproc=jdata.get("post_fp_nproc", 1),
+    )
+    _fp_cache_store(jdata, sys_output, sys_parsed)
+    for ss in system_index:
+        if jdata.get("use_clusters", False):
+            all_sys = concat_multi_systems(sys_parsed[ss], type_map=jdata["type_map"])
+        else:
+            all_sys = concat_systems(sys_parsed[ss])
+        if all_sys is not None:
+            sys_data_path = os.path.join(work_path, f"data.{ss}")
+            all_sys.to_deepmd_raw(sys_data_path)
+            all_sys.to_deepmd_npy(sys_data_path, set_size=len(sys_output[ss]))
 
 
-def post_fp_cp2k(iter_index, jdata, rfailed=None):
+def post_fp_cp2k(iter_index, jdata, rfailed=None, sys_idx=None):
     ratio_failed = rfailed if rfailed else jdata.get("ratio_failed", 0.10)
     model_devi_jobs = jdata["model_devi_jobs"]
     assert iter_index < len(model_devi_jobs)
 
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -4510,24 +5404,29 @@ def post_fp_cp2k(iter_index, jdata, rfailed=None):
     system_index = list(set_tmp)
     system_index.sort()
 
-    cwd = os.getcwd()
+    sys_output = {}
+    for ss in system_index:
+        sys_output[ss] = sorted(
+            glob.glob(os.path.join(work_path, f"task.{ss}.*/output"))
+        )
+    sys_parsed = _post_fp_parse_systems(
+        sys_output,
+        functools.partial(
+            _post_fp_load_labeled, fmt="cp2kdata/e_f", type_map=jdata["type_map"]
+        ),
+        nproc=jdata.get("post_fp_nproc", 1),
+    )
+    _fp_cache_store(jdata, sys_output, sys_parsed)
     # tcount: num of all fp tasks
     tcount = 0
     # icount: num of converged fp tasks
     icount = 0
     for ss in system_index:
-        sys_output = glob.glob(os.path.join(work_path, f"task.{ss}.*/output"))
-        sys_output.sort()
-        tcount += len(sys_output)
-        all_sys = dpdata.MultiSystems(type_map=jdata["type_map"])
-        for oo in sys_output:
-            _sys = dpdata.LabeledSystem(
-                oo, fmt="cp2kdata/e_f", type_map=jdata["type_map"]
-            )
-            all_sys.append(_sys)
-            icount += 1
+        tcount += len(sys_output[ss])
+        icount += len(sys_parsed[ss])
+        all_sys = concat_multi_systems(sys_parsed[ss], type_map=jdata["type_map"])
 
-        if (all_sys is not None) and (len(all_sys) > 0):
+        if len(all_sys) > 0:
             sys_data_path = os.path.join(work_path, f"data.{ss}")
             all_sys.to_deepmd_raw(sys_data_path)
             all_sys.to_deepmd_npy(sys_data_path)
@@ -4548,14 +5447,14 @@ def post_fp_cp2k(iter_index, jdata, rfailed=None):
         )
 
 
-def post_fp_pwmat(iter_index, jdata, rfailed=None):
+def post_fp_pwmat(iter_index, jdata, rfailed=None, sys_idx=None):
     ratio_failed = rfailed if rfailed else jdata.get("ratio_failed", 0.05)
     model_devi_jobs = jdata["model_devi_jobs"]
     assert iter_index < len(model_devi_jobs)
 
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -4599,13 +5498,13 @@ def post_fp_pwmat(iter_index, jdata, rfailed=None):
         raise RuntimeError("find too many unsuccessfully terminated jobs")
 
 
-def post_fp_amber_diff(iter_index, jdata):
+def post_fp_amber_diff(iter_index, jdata, sys_idx=None):
     model_devi_jobs = jdata["model_devi_jobs"]
     assert iter_index < len(model_devi_jobs)
 
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -4632,7 +5531,7 @@ def post_fp_amber_diff(iter_index, jdata):
         all_sys.to_deepmd_npy(sys_data_path, set_size=len(sys_output), prec=np.float64)
 
 
-def post_fp_custom(iter_index, jdata):
+def post_fp_custom(iter_index, jdata, sys_idx=None):
     """Post fp for custom fp. Collect data from user-defined `output_fn`.
 
     Parameters
@@ -4647,7 +5546,7 @@ def post_fp_custom(iter_index, jdata):
 
     iter_name = make_iter_name(iter_index)
     work_path = os.path.join(iter_name, fp_name)
-    fp_tasks = glob.glob(os.path.join(work_path, "task.*"))
+    fp_tasks = _glob_sys_tasks(work_path, sys_idx)
     fp_tasks.sort()
     if len(fp_tasks) == 0:
         return
@@ -4677,30 +5576,44 @@ def post_fp_custom(iter_index, jdata):
         all_sys.to_deepmd_npy(sys_data_path, set_size=len(sys_output), prec=np.float64)
 
 
-def post_fp(iter_index, jdata):
+def post_fp_calculation(iter_index, jdata, sys_idx=None, rfailed=None):
+    """Collect the labeled data of the FP calculation.
+
+    Parameters
+    ----------
+    iter_index : int
+        iter index
+    jdata : dict
+        Run parameters.
+    sys_idx : int, optional
+        Only collect the data of the tasks of this system.
+    rfailed : float, optional
+        The allowed ratio of failed tasks, for the styles checking it.
+    """
     fp_style = jdata["fp_style"]
     if fp_style == "vasp":
-        post_fp_vasp(iter_index, jdata)
+        post_fp_vasp(iter_index, jdata, rfailed=rfailed, sys_idx=sys_idx)
     elif fp_style == "pwscf":
-        post_fp_pwscf(iter_index, jdata)
+        post_fp_pwscf(iter_index, jdata, sys_idx=sys_idx)
     elif fp_style == "abacus":
-        post_fp_abacus_scf(iter_index, jdata)
+        post_fp_abacus_scf(iter_index, jdata, sys_idx=sys_idx)
     elif fp_style == "siesta":
-        post_fp_siesta(iter_index, jdata)
+        post_fp_siesta(iter_index, jdata, sys_idx=sys_idx)
     elif fp_style == "gaussian":
-        post_fp_gaussian(iter_index, jdata)
+        post_fp_gaussian(iter_index, jdata, sys_idx=sys_idx)
     elif fp_style == "cp2k":
-        post_fp_cp2k(iter_index, jdata)
+        post_fp_cp2k(iter_index, jdata, rfailed=rfailed, sys_idx=sys_idx)
     elif fp_style == "pwmat":
-        post_fp_pwmat(iter_index, jdata)
+        post_fp_pwmat(iter_index, jdata, rfailed=rfailed, sys_idx=sys_idx)
     elif fp_style == "amber/diff":
-        post_fp_amber_diff(iter_index, jdata)
+        post_fp_amber_diff(iter_index, jdata, sys_idx=sys_idx)
     elif fp_style == "custom":
-        post_fp_custom(iter_index, jdata)
+        post_fp_custom(iter_index, jdata, sys_idx=sys_idx)
     else:
         raise RuntimeError("unsupported fp style")
-    post_fp_check_fail(iter_index, jdata)
-    # clean traj
+
+
+def clean_model_devi_traj(iter_index, jdata):
     clean_traj = True
     if "model_devi_clean_traj" in jdata:
         clean_traj = jdata["model_devi_clean_traj"]
@@ -4719,6 +5632,141 @@ def post_fp(iter_index, jdata):
             shutil.rmtree(ii)
 
 
+def post_fp(iter_index, jdata):
+    post_fp_calculation(iter_index, jdata)
+    post_fp_check_fail(iter_index, jdata)
+    # clean traj
+    clean_model_devi_traj(iter_index, jdata)
+
+
+def _load_pipeline_record(iter_index):
+    record = os.path.join(make_iter_name(iter_index), pipeline_record)
+    if not os.path.isfile(record):
+        return {}
+    with open(record) as fp:
+        return json.load(fp)
+
+
+def _dump_pipeline_record(iter_index, stages):
+    record = os.path.join(make_iter_name(iter_index), pipeline_record)
+    with open(record + ".tmp", "w") as fp:
+        json.dump(stages, fp, indent=4)
+    os.replace(record + ".tmp", record)
+
+
+def _poll_pipeline_submission(submission):
+    """Check whether a submitted submission of the pipeline is finished.
+
+    The job states are updated without uploading the forward files again.
+    The results are downloaded by :meth:`dpdispatcher.Submission.run_submission`
+    once all the jobs finish.
+
+    Parameters
+    ----------
+    submission : Submission
+        the submitted submission
+
+    Returns
+    -------
+    bool
+        whether all the jobs are finished and the results are downloaded
+    """
+    submission.update_submission_state()
+    submission.handle_unexpected_submission_state()
+    if not submission.check_all_finished():
+        return False
+    submission.run_submission()
+    return True
+
+
+def run_model_devi_fp_pipeline(iter_index, jdata, mdata):
+    """Run model_devi, make_fp, run_fp and collect the FP data system by system.
+
+    The model deviation tasks of each system are submitted as a separate
+    submission, which are polled without blocking. Once the tasks of a system
+    finish, its FP tasks are made and submitted, and the FP data of the system
+    is collected once its FP tasks finish. The other systems go on meanwhile,
+    so that a slow task only holds up its own system.
+
+    The stage reached by each system is recorded in ``pipeline.json`` of the
+    iteration. A restarted run recovers the submissions of the recorded stages.
+    The check of failed FP tasks and the cleaning of trajectories are left to
+    the post_fp stage.
+
+    Parameters
+    ----------
+    iter_index : int
+        iter index
+    jdata : dict
+        Run parameters.
+    mdata : dict
+        Machine parameters.
+    """
+    if jdata.get("model_devi_engine", "lammps") == "calypso":
+        raise RuntimeError("model_devi_fp_pipeline does not support calypso")
+    if jdata["fp_style"] == "amber/diff":
+        raise RuntimeError("model_devi_fp_pipeline does not support amber/diff")
+    iter_name = make_iter_name(iter_index)
+    modd_path = os.path.join(iter_name, model_devi_name)
+    fp_path = os.path.join(iter_name, fp_name)
+    system_index = get_sys_index(glob.glob(os.path.join(modd_path, "task.*")))
+    if len(system_index) == 0:
+        raise RuntimeError(
+            "run_tasks for model_devi should not be empty! Please check your files."
+        )
+
+    stages = _load_pipeline_record(iter_index)
+    if not stages:
+        create_path(fp_path)
+        stages = {ss: "model_devi" for ss in system_index}
+        _dump_pipeline_record(iter_index, stages)
+    submissions = {}
+    while True:
+        for ss in system_index:
+            sys_idx = int(ss)
+            if stages[ss] == "model_devi":
+                if ss not in submissions:
+                    submissions[ss] = run_md_model_devi(
+                        iter_index, jdata, mdata, sys_idx=sys_idx, exit_on_submit=True
+                    )
+                    finished = (
+                        submissions[ss] is None or submissions[ss].check_all_finished()
+                    )
+                else:
+                    finished = _poll_pipeline_submission(submissions[ss])
+                if not finished:
+                    continue
+                dlog.info(f"system {ss:s} finished model_devi, making fp tasks")
+                # remove the tasks left by an interrupted make_fp
+                for tt in _glob_sys_tasks(fp_path, sys_idx):
+                    shutil.rmtree(tt)
+                make_fp(iter_index, jdata, mdata, sys_idx=sys_idx)
+                del submissions[ss]
+                stages[ss] = "fp"
+                _dump_pipeline_record(iter_index, stages)
+            if stages[ss] == "fp":
+                if ss not in submissions:
+                    submissions[ss] = run_fp(
+                        iter_index, jdata, mdata, sys_idx=sys_idx, exit_on_submit=True
+                    )
+                    finished = (
+                        submissions[ss] is None or submissions[ss].check_all_finished()
+                    )
+                else:
+                    finished = _poll_pipeline_submission(submissions[ss])
+                if not finished:
+                    continue
+                dlog.info(f"system {ss:s} finished fp, collecting data")
+                # the ratio of failed tasks is checked over all systems in post_fp
+                post_fp_calculation(iter_index, jdata, sys_idx=sys_idx, rfailed=1.0)
+                del submissions[ss]
+                stages[ss] = "done"
+                _dump_pipeline_record(iter_index, stages)
+        if all(stage == "done" for stage in stages.values()):
+            break
+        time.sleep(pipeline_check_interval)
+
+
 def set_version(mdata):
     deepmd_version = "2"
     mdata["deepmd_version"] = deepmd_version
@@ -4784,6 +5832,7 @@ def run_iter(param_file, machine_file):
             raise ValueError("There should not be blank lines in record.dpgen.")
         dlog.info("continue from iter %03d task %02d" % (iter_rec[0], iter_rec[1]))  # noqa: UP031
 
+    pipeline = jdata.get("model_devi_fp_pipeline", False)
     cont = True
     ii = -1
     while cont:
@@ -4813,20 +5862,31 @@ def run_iter(param_file, machine_file):
                     break
             elif jj == 4:
                 log_iter("run_model_devi", ii, jj)
-                run_model_devi(ii, jdata, mdata)
+                if pipeline:
+                    # make_fp, run_fp and the data collection run in the pipeline
+                    run_model_devi_fp_pipeline(ii, jdata, mdata)
+                else:
+                    run_model_devi(ii, jdata, mdata)
 
             elif jj == 5:
                 log_iter("post_model_devi", ii, jj)
                 post_model_devi(ii, jdata, mdata)
             elif jj == 6:
                 log_iter("make_fp", ii, jj)
-                make_fp(ii, jdata, mdata)
+                if not pipeline:
+                    make_fp(ii, jdata, mdata)
             elif jj == 7:
                 log_iter("run_fp", ii, jj)
-                run_fp(ii, jdata, mdata)
+                if not pipeline:
+                    run_fp(ii, jdata, mdata)
             elif jj == 8:
                 log_iter("post_fp", ii, jj)
-                post_fp(ii, jdata)
+                if pipeline:
+                    post_fp_check_fail(ii, jdata)
+                    clean_model_devi_traj(ii, jdata)
+                else:
+                    post_fp(ii, jdata)
+                update_data_manifest(ii)
             else:
                 raise RuntimeError("unknown task %d, something wrong" % jj)  # noqa: UP031
             record_iter(record, ii, jj)
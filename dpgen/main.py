@@ -3,20 +3,11 @@
 
 
 import argparse
+import importlib
 import sys
+from typing import Callable
 
 from dpgen import info
-from dpgen.auto_test.run import gen_test
-from dpgen.collect.collect import gen_collect
-from dpgen.data.gen import gen_init_bulk
-from dpgen.data.reaction import gen_init_reaction
-from dpgen.data.surf import gen_init_surf
-from dpgen.database.run import db_run
-from dpgen.generator.run import gen_run
-from dpgen.gui import start_dpgui
-from dpgen.simplify.simplify import gen_simplify
-from dpgen.tools.auto_gen_param import auto_gen_param
-from dpgen.tools.run_report import run_report
 
 """
 A master convenience script with many tools for driving dpgen.
@@ -28,6 +19,32 @@ __maintainer__ = "Haidi Wang"
 __email__ = ""
 
 
+def lazy_func(module: str, name: str) -> Callable:
+    """Returns a subcommand handler imported on dispatch.
+
+    The subcommand modules import heavy dependencies, so they are not imported
+    until the subcommand is run.
+
+    Parameters
+    ----------
+    module : str
+        the module of the handler
+    name : str
+        the name of the handler
+
+    Returns
+    -------
+    Callable
+        the function calling the handler with the parsed arguments
+    """
+
+    def func(args):
+        return getattr(importlib.import_module(module), name)(args)
+
+    func.__name__ = name
+    return func
+
+
 def main_parser() -> argparse.ArgumentParser:
     """Returns parser for `dpgen` command.
 
@@ -60,7 +77,7 @@ def main_parser() -> argparse.ArgumentParser:
         nargs="?",
         help="machine file, json/yaml format",
     )
-    parser_init_surf.set_defaults(func=gen_init_surf)
+    parser_init_surf.set_defaults(func=lazy_func("dpgen.data.surf", "gen_init_surf"))
 
     # init bulk model
     parser_init_bulk = subparsers.add_parser(
@@ -76,7 +93,7 @@ def main_parser() -> argparse.ArgumentParser:
         nargs="?",
         help="machine file, json/yaml format",
     )
-    parser_init_bulk.set_defaults(func=gen_init_bulk)
+    parser_init_bulk.set_defaults(func=lazy_func("dpgen.data.gen", "gen_init_bulk"))
 
     parser_auto_gen_param = subparsers.add_parser(
         "auto_gen_param", help="auto gen param.json"
@@ -85,7 +102,9 @@ def main_parser() -> argparse.ArgumentParser:
     parser_auto_gen_param.add_argument(
         "PARAM", type=str, help="parameter file, json/yaml format"
     )
-    parser_auto_gen_param.set_defaults(func=auto_gen_param)
+    parser_auto_gen_param.set_defaults(
+        func=lazy_func("dpgen.tools.auto_gen_param", "auto_gen_param")
+    )
 
     # parser_init_reaction
     parser_init_reaction = subparsers.add_parser(
@@ -101,7 +120,9 @@ def main_parser() -> argparse.ArgumentParser:
         nargs="?",
         help="machine file, json/yaml format",
     )
-    parser_init_reaction.set_defaults(func=gen_init_reaction)
+    parser_init_reaction.set_defaults(
+        func=lazy_func("dpgen.data.reaction", "gen_init_reaction")
+    )
 
     # run
     parser_run = subparsers.add_parser(
@@ -110,7 +131,7 @@ def main_parser() -> argparse.ArgumentParser:
     parser_run.add_argument("PARAM", type=str, help="parameter file, json/yaml format")
     parser_run.add_argument("MACHINE", type=str, help="machine file, json/yaml format")
     parser_run.add_argument("-d", "--debug", action="store_true", help="log debug info")
-    parser_run.set_defaults(func=gen_run)
+    parser_run.set_defaults(func=lazy_func("dpgen.generator.run", "gen_run"))
 
     # run/report
     parser_rr = subparsers.add_parser(
@@ -144,7 +165,7 @@ def main_parser() -> argparse.ArgumentParser:
         help="the json file provides DP-GEN paramters, should be located in JOB_DIR",
     )
     parser_rr.add_argument("-v", "--verbose", action="store_true", help="being loud")
-    parser_rr.set_defaults(func=run_report)
+    parser_rr.set_defaults(func=lazy_func("dpgen.tools.run_report", "run_report"))
 
     # collect
     parser_coll = subparsers.add_parser("collect", help="Collect data.")
@@ -174,14 +195,26 @@ def main_parser() -> argparse.ArgumentParser:
     parser_coll.add_argument(
         "-s", "--shuffle", action="store_true", help="shuffle the data systems"
     )
-    parser_coll.set_defaults(func=gen_collect)
+    parser_coll.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="collect the data out-of-core and write sets of at most this number of frames",
+    )
+    parser_coll.add_argument(
+        "--nproc",
+        type=int,
+        default=1,
+        help="number of processes to index and write the data in the out-of-core mode",
+    )
+    parser_coll.set_defaults(func=lazy_func("dpgen.collect.collect", "gen_collect"))
 
     # simplify
     parser_run = subparsers.add_parser("simplify", help="Simplify data.")
     parser_run.add_argument("PARAM", type=str, help="parameter file, json/yaml format")
     parser_run.add_argument("MACHINE", type=str, help="machine file, json/yaml format")
     parser_run.add_argument("-d", "--debug", action="store_true", help="log debug info")
-    parser_run.set_defaults(func=gen_simplify)
+    parser_run.set_defaults(func=lazy_func("dpgen.simplify.simplify", "gen_simplify"))
 
     # test
     parser_test = subparsers.add_parser(
@@ -199,14 +232,14 @@ def main_parser() -> argparse.ArgumentParser:
     parser_test.add_argument(
         "-d", "--debug", action="store_true", help="log debug info"
     )
-    parser_test.set_defaults(func=gen_test)
+    parser_test.set_defaults(func=lazy_func("dpgen.auto_test.run", "gen_test"))
 
     # db
     parser_db = subparsers.add_parser("db", help="Collecting data from DP-GEN.")
 
     parser_db.add_argument("PARAM", type=str, help="parameter file, json format")
 
-    parser_db.set_defaults(func=db_run)
+    parser_db.set_defaults(func=lazy_func("dpgen.database.run", "db_run"))
 
     # gui
     parser_gui = subparsers.add_parser(
@@ -229,7 +262,7 @@ def main_parser() -> argparse.ArgumentParser:
             "to the network on both IPv4 and IPv6 (where available)."
         ),
     )
-    parser_gui.set_defaults(func=start_dpgui)
+    parser_gui.set_defaults(func=lazy_func("dpgen.gui", "start_dpgui"))
     return parser
 
 
@@ -36,6 +36,11 @@ def general_simplify_arginfo() -> Argument:
     )
     doc_model_devi_e_trust_lo = "The lower bound of energy per atom for the selection for the model deviation. Requires DeePMD-kit version >=2.2.2."
     doc_model_devi_e_trust_hi = "The higher bound of energy per atom for the selection for the model deviation. Requires DeePMD-kit version >=2.2.2."
+    doc_rest_compact_ratio = (
+        "The rest data is rewritten only when the share of its frames that are neither picked nor accurate drops below this ratio. "
+        "Otherwise the rest data of the last iteration is kept, and only the status of each frame is updated in rest_status.npz. "
+        "With the default value 1, the rest data is rewritten in every iteration unless no frame is picked or accurate."
+    )
     doc_true_error_f_trust_lo = "The lower bound of forces for the selection for the true error. Requires DeePMD-kit version >=2.2.4."
     doc_true_error_f_trust_hi = "The higher bound of forces for the selection for the true error. Requires DeePMD-kit version >=2.2.4."
     doc_true_error_e_trust_lo = "The lower bound of energy per atom for the selection for the true error. Requires DeePMD-kit version >=2.2.4."
@@ -72,6 +77,13 @@ def general_simplify_arginfo() -> Argument:
             default=1e10,
             doc=doc_model_devi_e_trust_hi,
         ),
+        Argument(
+            "rest_compact_ratio",
+            float,
+            optional=True,
+            default=1.0,
+            doc=doc_rest_compact_ratio,
+        ),
         Argument(
             "true_error_f_trust_lo",
             float,
@@ -165,6 +177,9 @@ def fp_args() -> list[Argument]:
     doc_fp_accurate_threshold = "If the accurate ratio is larger than this number, no fp calculation will be performed, i.e. fp_task_max = 0."
     doc_fp_accurate_soft_threshold = "If the accurate ratio is between this number and fp_accurate_threshold, the fp_task_max linearly decays to zero."
     doc_ratio_failed = "Check the ratio of unsuccessfully terminated jobs. If too many FP tasks are not converged, RuntimeError will be raised."
+    doc_fp_cache = "Path to the cache of FP labels, which is a SQLite database shared by runs with the same FP settings. Before the FP inputs are made, the candidate structures whose labels are found in the cache are removed from the FP tasks, and their labels are written to `data.cached.*` in 02.fp. The labels of the new FP tasks are added to the cache in post_fp. The structures are looked up by their species, cell and coordinates, rounded to `fp_cache_tol`, and by the FP parameters. Only the tasks with a POSCAR are looked up. The cache is not used if it is not set."
+    doc_fp_cache_max_size = "The maximal size of the fp cache in MB. The least recently used labels are evicted beyond it."
+    doc_fp_cache_tol = "The tolerance of the cell and coordinates, in Angstrom, within which two structures share the labels in the fp cache."
 
     return [
         Argument("fp_task_max", int, optional=True, doc=doc_fp_task_max),
@@ -179,6 +194,17 @@ def fp_args() -> list[Argument]:
             doc=doc_fp_accurate_soft_threshold,
         ),
         Argument("ratio_failed", float, optional=True, doc=doc_ratio_failed),
+        Argument("fp_cache", str, optional=True, doc=doc_fp_cache),
+        Argument(
+            "fp_cache_max_size",
+            int,
+            optional=True,
+            default=10240,
+            doc=doc_fp_cache_max_size,
+        ),
+        Argument(
+            "fp_cache_tol", float, optional=True, default=1e-4, doc=doc_fp_cache_tol
+        ),
     ]
 
 
@@ -55,6 +55,9 @@ rest_data_name = "data.rest"
 accurate_data_name = "data.accurate"
 detail_file_name_prefix = "details"
 true_error_file_name = "true_error"
+rest_status_name = "rest_status.npz"
+# status of each frame of the rest data
+frame_status = {"candidate": 0, "picked": 1, "accurate": 2, "failed": 3}
 sys_name_fmt = "sys." + data_system_fmt
 sys_name_pattern = "sys.[0-9]*[0-9]"
 
@@ -210,9 +213,21 @@ def make_model_devi(iter_index, jdata, mdata):
         os.path.abspath(rest_data_path),
         os.path.join(work_path, rest_data_name + ".old"),
     )
+    # link the status of the frames if the rest data is not compacted
+    rest_status_path = os.path.join(last_iter_name, model_devi_name, rest_status_name)
+    if os.path.isfile(rest_status_path):
+        os.symlink(
+            os.path.abspath(rest_status_path),
+            os.path.join(work_path, _old_name(rest_status_name)),
+        )
     return True
 
 
+def _old_name(fname: str) -> str:
+    base, ext = os.path.splitext(fname)
+    return base + ".old" + ext
+
+
 def run_model_devi(iter_index, jdata, mdata):
     """Submit dp test tasks."""
     iter_name = make_iter_name(iter_index)
@@ -233,12 +248,19 @@ def run_model_devi(iter_index, jdata, mdata):
     detail_file_name = detail_file_name_prefix
     system_file_name = rest_data_name + ".old"
     if jdata.get("one_h5", False):
-        # convert system to one h5 file
+        # convert system to one h5 file; the rest data that is not compacted
+        # is shared by iterations, so is its h5 file
         system_path = os.path.join(work_path, system_file_name)
-        dpdata.MultiSystems(type_map=jdata["type_map"]).from_deepmd_npy(
-            system_path,
-            labeled=False,
-        ).to_deepmd_hdf5(system_path + ".hdf5")
+        store_h5 = os.path.realpath(system_path) + ".hdf5"
+        if not os.path.isfile(store_h5):
+            dpdata.MultiSystems(type_map=jdata["type_map"]).from_deepmd_npy(
+                system_path,
+                labeled=False,
+            ).to_deepmd_hdf5(store_h5)
+        if store_h5 != os.path.abspath(system_path + ".hdf5"):
+            if os.path.lexists(system_path + ".hdf5"):
+                os.remove(system_path + ".hdf5")
+            os.symlink(store_h5, system_path + ".hdf5")
         system_file_name += ".hdf5"
     command = "rm -f {detail_file} && {dp} model-devi -m {model} -s {system} -o {detail_file}".format(
         dp=mdata.get("model_devi_command", "dp"),
@@ -284,6 +306,71 @@ def run_model_devi(iter_index, jdata, mdata):
     submission.run_submission()
 
 
+def _read_model_devi_details(fname: str) -> dict:
+    """Read the detail file of ``dp model-devi`` into one array per system.
+
+    Parameters
+    ----------
+    fname : str
+        the detail file, in which the frames of each system follow a
+        ``# data.rest.old/<name>`` line and a line of column names
+
+    Returns
+    -------
+    dict
+        the column names and the data array of each system name
+    """
+    details = {}
+    name = None
+    columns = None
+    lines = []
+
+    def _flush():
+        if name is not None:
+            if lines:
+                data = np.loadtxt(lines, ndmin=2)
+            else:
+                data = np.zeros((0, len(columns)))
+            details[name] = (columns, data)
+
+    with open(fname) as f:
+        for line in f:
+            if line.startswith("# data.rest.old"):
+                _flush()
+                name = (line.split()[1]).split("/")[-1]
+                lines = []
+            elif line.startswith("#"):
+                columns = line.split()[1:]
+            elif line.strip():
+                lines.append(line)
+    _flush()
+    return details
+
+
+def _gather_frames(systems, selc_idx: dict, type_map) -> dpdata.MultiSystems:
+    """Gather the selected frames with one fancy-index per source system.
+
+    Parameters
+    ----------
+    systems : dpdata.MultiSystems
+        the source systems
+    selc_idx : dict
+        the selected frame indexes of each system name
+    type_map : list[str]
+        the type map
+
+    Returns
+    -------
+    dpdata.MultiSystems
+        the selected frames
+    """
+    selc_systems = dpdata.MultiSystems(type_map=type_map)
+    for sys_name, sys_id in selc_idx.items():
+        if len(sys_id):
+            selc_systems.append(systems[sys_name].sub_system(sys_id))
+    return selc_systems
+
+
 def post_model_devi(iter_index, jdata, mdata):
     """Calculate the model deviation."""
     iter_name = make_iter_name(iter_index)
@@ -300,102 +387,78 @@ def post_model_devi(iter_index, jdata, mdata):
     use_true_error = f_trust_lo_err < float("inf") or e_trust_lo_err < float("inf")
 
     type_map = jdata.get("type_map", [])
-    sys_accurate = dpdata.MultiSystems(type_map=type_map)
-    sys_candinate = dpdata.MultiSystems(type_map=type_map)
-    sys_failed = dpdata.MultiSystems(type_map=type_map)
-
-    labeled = jdata.get("labeled", False)
-    sys_entire = dpdata.MultiSystems(type_map=type_map).from_deepmd_npy(
-        os.path.join(work_path, rest_data_name + ".old"), labeled=labeled
-    )
+    rest_compact_ratio = jdata.get("rest_compact_ratio", 1.0)
+    rest_old_path = os.path.join(work_path, rest_data_name + ".old")
+    old_status = {}
+    if os.path.isfile(os.path.join(work_path, _old_name(rest_status_name))):
+        with np.load(os.path.join(work_path, _old_name(rest_status_name))) as data:
+            old_status = {kk: data[kk] for kk in data.files}
 
     detail_file_name = detail_file_name_prefix
-    if not use_true_error:
-        with open(os.path.join(work_path, detail_file_name)) as f:
-            for line in f:
-                if line.startswith("# data.rest.old"):
-                    name = (line.split()[1]).split("/")[-1]
-                elif line.startswith("#"):
-                    columns = line.split()[1:]
-                    cidx_step = columns.index("step")
-                    cidx_max_devi_f = columns.index("max_devi_f")
-                    try:
-                        cidx_devi_e = columns.index("devi_e")
-                    except ValueError:
-                        # DeePMD-kit < 2.2.2
-                        cidx_devi_e = None
-                else:
-                    idx = int(line.split()[cidx_step])
-                    f_devi = float(line.split()[cidx_max_devi_f])
-                    if cidx_devi_e is not None:
-                        e_devi = float(line.split()[cidx_devi_e])
-                    else:
-                        e_devi = 0.0
-                    subsys = sys_entire[name][idx]
-                    if f_devi >= f_trust_hi or e_devi >= e_trust_hi:
-                        sys_failed.append(subsys)
-                    elif (
-                        f_trust_lo <= f_devi < f_trust_hi
-                        or e_trust_lo <= e_devi < e_trust_hi
-                    ):
-                        sys_candinate.append(subsys)
-                    elif f_devi < f_trust_lo and e_devi < e_trust_lo:
-                        sys_accurate.append(subsys)
-                    else:
-                        raise RuntimeError(
-                            "reach a place that should NOT be reached..."
-                        )
-    else:
-        with (
-            open(os.path.join(work_path, detail_file_name)) as f,
-            open(os.path.join(work_path, true_error_file_name)) as f_err,
-        ):
-            for line, line_err in zip(f, f_err):
-                if line.startswith("# data.rest.old"):
-                    name = (line.split()[1]).split("/")[-1]
-                elif line.startswith("#"):
-                    columns = line.split()[1:]
-                    cidx_step = columns.index("step")
-                    cidx_max_devi_f = columns.index("max_devi_f")
-                    cidx_devi_e = columns.index("devi_e")
-                else:
-                    idx = int(line.split()[cidx_step])
-                    f_devi = float(line.split()[cidx_max_devi_f])
-                    f_err = float(line_err.split()[cidx_max_devi_f])
-                    e_devi = float(line.split()[cidx_devi_e])
-                    e_err = float(line_err.split()[cidx_devi_e])
-
-                    subsys = sys_entire[name][idx]
-                    if (
-                        f_devi >= f_trust_hi
-                        or e_devi >= e_trust_hi
-                        or f_err >= f_trust_hi_err
-                        or e_err >= e_trust_hi_err
-                    ):
-                        sys_failed.append(subsys)
-                    elif (
-                        f_trust_lo <= f_devi < f_trust_hi
-                        or e_trust_lo <= e_devi < e_trust_hi
-                        or f_trust_lo_err <= f_err < f_trust_hi_err
-                        or e_trust_lo_err <= e_err < e_trust_hi_err
-                    ):
-                        sys_candinate.append(subsys)
-                    elif (
-                        f_devi < f_trust_lo
-                        and e_devi < e_trust_lo
-                        and f_err < f_trust_lo_err
-                        and e_err < e_trust_lo_err
-                    ):
-                        sys_accurate.append(subsys)
-                    else:
-                        raise RuntimeError(
-                            "reach a place that should NOT be reached..."
-                        )
+    details = _read_model_devi_details(os.path.join(work_path, detail_file_name))
+    if use_true_error:
+        true_errors = _read_model_devi_details(
+            os.path.join(work_path, true_error_file_name)
+        )
+    # frame indexes of each set in each system of the rest data
+    idx_accurate = {}
+    idx_candidate = {}
+    idx_failed = {}
+    status = {}
+    for name, (columns, data) in details.items():
+        steps = data[:, columns.index("step")].astype(int)
+        if name in old_status:
+            status[name] = old_status[name].copy()
+        else:
+            status[name] = np.full(
+                steps.max() + 1 if steps.size else 0, frame_status["candidate"]
+            )
+        # only the frames that are neither picked nor accurate are classified
+        is_rest = np.isin(
+            status[name][steps], (frame_status["candidate"], frame_status["failed"])
+        )
+        data = data[is_rest]
+        steps = steps[is_rest]
+        if use_true_error:
+            err_columns, err_data = true_errors[name]
+            true_errors[name] = (err_columns, err_data[is_rest])
+        f_devi = data[:, columns.index("max_devi_f")]
+        if "devi_e" in columns:
+            e_devi = data[:, columns.index("devi_e")]
+        elif use_true_error:
+            raise ValueError("devi_e is not found in " + detail_file_name)
+        else:
+            # DeePMD-kit < 2.2.2
+            e_devi = np.zeros_like(f_devi)
+        is_failed = (f_devi >= f_trust_hi) | (e_devi >= e_trust_hi)
+        is_candidate = ((f_trust_lo <= f_devi) & (f_devi < f_trust_hi)) | (
+            (e_trust_lo <= e_devi) & (e_devi < e_trust_hi)
+        )
+        is_accurate = (f_devi < f_trust_lo) & (e_devi < e_trust_lo)
+        if use_true_error:
+            err_columns, err_data = true_errors[name]
+            f_err = err_data[:, err_columns.index("max_devi_f")]
+            e_err = err_data[:, err_columns.index("devi_e")]
+            is_failed |= (f_err >= f_trust_hi_err) | (e_err >= e_trust_hi_err)
+            is_candidate |= ((f_trust_lo_err <= f_err) & (f_err < f_trust_hi_err)) | (
+                (e_trust_lo_err <= e_err) & (e_err < e_trust_hi_err)
+            )
+            is_accurate &= (f_err < f_trust_lo_err) & (e_err < e_trust_lo_err)
+        is_candidate &= ~is_failed
+        is_accurate &= ~is_failed & ~is_candidate
+        if not np.all(is_failed | is_candidate | is_accurate):
+            raise RuntimeError("reach a place that should NOT be reached...")
+        idx_failed[name] = steps[is_failed]
+        idx_candidate[name] = steps[is_candidate]
+        idx_accurate[name] = steps[is_accurate]
+        status[name][idx_failed[name]] = frame_status["failed"]
+        status[name][idx_candidate[name]] = frame_status["candidate"]
+        status[name][idx_accurate[name]] = frame_status["accurate"]
 
     counter = {
-        "candidate": sys_candinate.get_nframes(),
-        "accurate": sys_accurate.get_nframes(),
-        "failed": sys_failed.get_nframes(),
+        "candidate": sum(ii.size for ii in idx_candidate.values()),
+        "accurate": sum(ii.size for ii in idx_accurate.values()),
+        "failed": sum(ii.size for ii in idx_failed.values()),
     }
     fp_sum = sum(counter.values())
     for cc_key, cc_value in counter.items():
@@ -408,16 +471,19 @@ def post_model_devi(iter_index, jdata, mdata):
             "no candidate but still have failed cases, stop. You may want to refine the training or to increase the trust level hi"
         )
 
-    # label the candidate system
-    labels = []
-    items = sys_candinate.systems.items()
-
-    for key, system in items:
-        labels.extend([(key, j) for j in range(len(system))])
+    # label the candidate frames by the system and the frame index
+    cand_names = list(idx_candidate.keys())
+    cand_owner = np.concatenate(
+        [np.full(idx_candidate[name].size, ii) for ii, name in enumerate(cand_names)]
+        + [np.zeros(0, dtype=int)]
+    )
+    cand_frames = np.concatenate(
+        [idx_candidate[name] for name in cand_names] + [np.zeros(0, dtype=int)]
+    )
     # candinate: pick up randomly
     iter_pick_number = jdata["iter_pick_number"]
     idx = np.arange(counter["candidate"])
-    assert len(idx) == len(labels)
+    assert len(idx) == len(cand_frames)
     np.random.shuffle(idx)
     pick_idx = idx[:iter_pick_number]
     rest_idx = idx[iter_pick_number:]
@@ -434,26 +500,59 @@ def post_model_devi(iter_index, jdata, mdata):
             )
         )
 
+    def _split_candidate(selc_idx):
+        return {
+            name: cand_frames[selc_idx[cand_owner[selc_idx] == ii]]
+            for ii, name in enumerate(cand_names)
+        }
+
+    idx_picked = _split_candidate(pick_idx)
+    idx_rest = _split_candidate(rest_idx)
+    for name, idx in idx_picked.items():
+        status[name][idx] = frame_status["picked"]
+    # the rest data is compacted only when the share of the frames left in it
+    # drops below rest_compact_ratio; otherwise it is kept and only the status
+    # of the frames is updated
+    n_rest = sum(ii.size for ii in idx_rest.values()) + counter["failed"]
+    n_store = sum(ii.size for ii in status.values())
+    compact = n_rest == 0 or n_rest < rest_compact_ratio * n_store
+
+    # only the systems with selected frames are read
+    used_names = {
+        name
+        for idx_sets in (idx_picked, idx_accurate)
+        + ((idx_rest, idx_failed) if compact else ())
+        for name, idx in idx_sets.items()
+        if idx.size
+    }
+    system_cls = get_system_cls(jdata)
+    sys_entire = {
+        name: system_cls(os.path.join(rest_old_path, name), fmt="deepmd/npy")
+        for name in sorted(used_names)
+    }
+
     # dump the picked candinate data
-    picked_systems = dpdata.MultiSystems(type_map=type_map)
-    for j in pick_idx:
-        sys_name, sys_id = labels[j]
-        picked_systems.append(sys_candinate[sys_name][sys_id])
+    picked_systems = _gather_frames(sys_entire, idx_picked, type_map)
     sys_data_path = os.path.join(work_path, picked_data_name)
     picked_systems.to_deepmd_raw(sys_data_path)
     picked_systems.to_deepmd_npy(sys_data_path, set_size=iter_pick_number)
 
     # dump the rest data (not picked candinate data and failed data)
-    rest_systems = dpdata.MultiSystems(type_map=type_map)
-    for j in rest_idx:
-        sys_name, sys_id = labels[j]
-        rest_systems.append(sys_candinate[sys_name][sys_id])
-    rest_systems += sys_failed
     sys_data_path = os.path.join(work_path, rest_data_name)
-    rest_systems.to_deepmd_raw(sys_data_path)
-    rest_systems.to_deepmd_npy(sys_data_path, set_size=rest_systems.get_nframes())
+    if compact:
+        rest_systems = _gather_frames(sys_entire, idx_rest, type_map)
+        rest_systems += _gather_frames(sys_entire, idx_failed, type_map)
+        rest_systems.to_deepmd_raw(sys_data_path)
+        rest_systems.to_deepmd_npy(sys_data_path, set_size=rest_systems.get_nframes())
+    else:
+        dlog.info(
+            f"keep the rest data with {n_rest:d} of {n_store:d} frames left, only update the status"
+        )
+        os.symlink(os.path.realpath(rest_old_path), sys_data_path)
+        np.savez(os.path.join(work_path, rest_status_name), **status)
 
     # dump the accurate data -- to another directory
+    sys_accurate = _gather_frames(sys_entire, idx_accurate, type_map)
     sys_data_path = os.path.join(work_path, accurate_data_name)
     sys_accurate.to_deepmd_raw(sys_data_path)
     sys_accurate.to_deepmd_npy(sys_data_path, set_size=sys_accurate.get_nframes())
@@ -38,7 +38,9 @@ def collect_data(target_folder, param_file, output, verbose=True):
     iters = glob.glob("iter.[0-9]*[0-9]")
     iters.sort()
     for ii in iters:
+        # including the labels taken from the fp cache
         iter_data = glob.glob(os.path.join(ii, "02.fp", "data.[0-9]*[0-9]"))
+        iter_data += glob.glob(os.path.join(ii, "02.fp", "data.cached.[0-9]*[0-9]"))
         iter_data.sort()
         for jj in iter_data:
             sys_idx = int(os.path.basename(jj).split(".")[-1])
@@ -64,7 +66,7 @@ def collect_data(target_folder, param_file, output, verbose=True):
             os.symlink(in_sys_path, out_file)
         # cat data.configs
         data_configs = glob.glob(
-            os.path.join("iter.[0-9]*[0-9].data.[0-9]*[0-9]", "orig", "data.configs")
+            os.path.join("iter.[0-9]*[0-9].data.*[0-9]", "orig", "data.configs")
         )
         data_configs.sort()
         os.makedirs("orig", exist_ok=True)
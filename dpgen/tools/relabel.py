@@ -13,24 +13,7 @@ import dpdata
 from dpgen.generator.lib.pwscf import make_pwscf_input
 from dpgen.generator.lib.siesta import make_siesta_input
 from dpgen.generator.run import update_mass_map
-
-
-def get_lmp_info(input_file):
-    with open(input_file) as fp:
-        lines = [line.rstrip("\n") for line in fp]
-    for ii in lines:
-        words = ii.split()
-        if len(words) >= 4 and words[0] == "variable":
-            if words[1] == "TEMP":
-                temp = float(words[3])
-            elif words[1] == "PRES":
-                pres = float(words[3])
-        if len(words) >= 4 and words[0] == "fix":
-            if words[3] == "nvt":
-                ens = "nvt"
-            elif words[3] == "npt":
-                ens = "npt"
-    return ens, temp, pres
+from dpgen.tools.run_index import get_lmp_info, update_index  # noqa: F401
 
 
 def link_pp_files(tdir, fp_pp_path, fp_pp_files):
@@ -178,7 +161,7 @@ def create_tasks(
     fp_pp_path = os.path.abspath(fp_pp_path)
     os.chdir(cwd_)
     fp_params = fp_jdata["fp_params"]
-    # collect tasks from iter dirs
+    # collect tasks from the run index
     sys_tasks = [[] for ii in sys]
     sys_tasks_record = [[] for ii in sys]
     sys_tasks_cc = [0 for ii in sys]
@@ -186,42 +169,28 @@ def create_tasks(
     iters = glob.glob("iter.[0-9]*[0-9]")
     iters.sort()
     # iters = iters[:2]
+    conn = update_index(target_folder, type_map=jdata["type_map"], verbose=verbose)
     for ii in iters[:numb_iter]:
-        iter_tasks = glob.glob(
-            os.path.join(ii, "02.fp", "task.[0-9]*[0-9].[0-9]*[0-9]")
-        )
-        iter_tasks.sort()
+        iter_tasks = conn.execute(
+            "SELECT task, sys_idx, model_devi_task, frame, ens, temp, pres "
+            "FROM fp_tasks WHERE iter = ? ORDER BY task",
+            (ii,),
+        ).fetchall()
         if verbose:
             print("# check iter " + ii + " with %6d tasks" % len(iter_tasks))  # noqa: UP031
-        for jj in iter_tasks:
-            sys_idx = int(os.path.basename(jj).split(".")[-2])
+        for task, sys_idx, md_task, frame, ens, temp, pres in iter_tasks:
+            jj = os.path.join(ii, "02.fp", task)
             sys_tasks[sys_idx].append(jj)
-            if os.path.islink(os.path.join(jj, "conf.lmp")):
-                linked_file = os.path.realpath(os.path.join(jj, "conf.lmp"))
-            elif os.path.islink(os.path.join(jj, "conf.dump")):
-                linked_file = os.path.realpath(os.path.join(jj, "conf.dump"))
-            else:
+            if md_task is None:
                 raise RuntimeError("cannot file linked conf file")
-            linked_keys = linked_file.split("/")
-            task_record = (
-                linked_keys[-5]
-                + "."
-                + linked_keys[-3]
-                + "."
-                + linked_keys[-1].split(".")[0]
-            )
-            task_record_keys = task_record.split(".")
-            ens, temp, pres = get_lmp_info(
-                os.path.join(ii, "01.model_devi", linked_keys[-3], "input.lammps")
-            )
             human_record = (
                 "iter: %s   system: %s   model_devi_task: %s   frame: %6d   fp_task: %s   ens: %s   temp: %10.2f   pres: %10.2f"  # noqa: UP031
                 % (
-                    task_record_keys[1],
-                    task_record_keys[3],
-                    linked_keys[-3],
-                    int(task_record_keys[-1]),
-                    os.path.basename(jj),
+                    ii.split(".")[1],
+                    md_task.split(".")[1],
+                    md_task,
+                    frame,
+                    task,
                     ens,
                     temp,
                     pres,
@@ -229,6 +198,7 @@ def create_tasks(
             )
             # print(human_record)
             sys_tasks_record[sys_idx].append(human_record)
+    conn.close()
     # for ii in range(numb_sys) :
     #     for jj in range(len(sys_tasks[ii])) :
     #         print(sys_tasks[ii][jj], sys_tasks_record[ii][jj])
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""Persistent index of the tasks of a DP-GEN run.
+
+Each iteration is scanned once after it is finished, and the records of
+its tasks are stored in a SQLite database in the job directory. The
+reports of ``dpgen run/report`` are queries on this index. Iterations
+that are not finished yet are scanned again on every update, and so are
+the finished ones whose directories have been changed since, e.g. when
+an iteration is rerun.
+"""
+
+import glob
+import os
+import re
+import sqlite3
+import time
+
+import numpy as np
+
+index_name = "run_index.db"
+# the last step of an iteration in record.dpgen
+iter_last_step = 8
+
+_schema = """
+CREATE TABLE IF NOT EXISTS iterations (
+    iter TEXT PRIMARY KEY,
+    mtime INTEGER,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS train_tasks (
+    iter TEXT,
+    task TEXT,
+    finished INTEGER,
+    wall_time REAL,
+    PRIMARY KEY (iter, task)
+);
+CREATE TABLE IF NOT EXISTS model_devi_tasks (
+    iter TEXT,
+    task TEXT,
+    ens TEXT,
+    temp REAL,
+    pres REAL,
+    finished INTEGER,
+    wall_time REAL,
+    PRIMARY KEY (iter, task)
+);
+CREATE TABLE IF NOT EXISTS fp_tasks (
+    iter TEXT,
+    task TEXT,
+    sys_idx INTEGER,
+    model_devi_task TEXT,
+    frame INTEGER,
+    ens TEXT,
+    temp REAL,
+    pres REAL,
+    max_devi_v REAL,
+    max_devi_f REAL,
+    has_outcar INTEGER,
+    converged INTEGER,
+    finished INTEGER,
+    wall_time REAL,
+    cores INTEGER,
+    PRIMARY KEY (iter, task)
+);
+CREATE TABLE IF NOT EXISTS fp_outs (
+    iter TEXT,
+    out_type TEXT,
+    count INTEGER,
+    PRIMARY KEY (iter, out_type)
+);
+"""
+
+
+def _finished_iters(target_folder):
+    # the iterations that have passed the last step in record.dpgen
+    record = os.path.join(target_folder, "record.dpgen")
+    if not os.path.isfile(record):
+        return set()
+    finished = set()
+    with open(record) as fp:
+        for line in fp:
+            words = line.split()
+            if len(words) >= 2 and int(words[1]) >= iter_last_step:
+                finished.add("iter.%06d" % int(words[0]))  # noqa: UP031
+    return finished
+
+
+def _iter_mtime(iter_path):
+    # the stages of a rerun iteration are moved away and made again
+    return max(
+        os.stat(pp).st_mtime_ns
+        for pp in [iter_path]
+        + [os.path.join(iter_path, ss) for ss in ["00.train", "01.model_devi", "02.fp"]]
+        if os.path.isdir(pp)
+    )
+
+
+def get_lmp_info(input_file):
+    with open(input_file) as fp:
+        lines = [line.rstrip("\n") for line in fp]
+    for ii in lines:
+        words = ii.split()
+        if len(words) >= 4 and words[0] == "variable":
+            if words[1] == "TEMP":
+                temp = float(words[3])
+            elif words[1] == "PRES":
+                pres = float(words[3])
+        if len(words) >= 4 and words[0] == "fix":
+            if words[3] == "nvt":
+                ens = "nvt"
+            elif words[3] == "npt":
+                ens = "npt"
+    return ens, temp, pres
+
+
+def _grep_first(fname, pattern, max_lines=None):
+    with open(fname, errors="ignore") as fp:
+        for idx, line in enumerate(fp):
+            if max_lines is not None and idx >= max_lines:
+                break
+            match = pattern.search(line)
+            if match:
+                return match
+    return None
+
+
+_train_time = re.compile(r"wall time:\s*([0-9.eE+-]+)\s*s")
+_lammps_time = re.compile(r"Total wall time:\s*(\d+):(\d+):(\d+)")
+_vasp_time = re.compile(r"Total CPU time used \(sec\):\s*([0-9.eE+-]+)")
+_vasp_cores = re.compile(r"running on\s+(\d+)")
+
+
+def _scan_train(iter_path):
+    records = []
+    for task in sorted(
+        glob.glob(os.path.join(iter_path, "00.train", "[0-9][0-9][0-9]"))
+    ):
+        log = os.path.join(task, "train.log")
+        wall_time = None
+        if os.path.isfile(log):
+            match = _grep_first(log, _train_time)
+            if match:
+                wall_time = float(match.group(1))
+        records.append((os.path.basename(task), wall_time is not None, wall_time))
+    return records
+
+
+def _scan_model_devi(iter_path):
+    records = []
+    for task in sorted(glob.glob(os.path.join(iter_path, "01.model_devi", "task.*"))):
+        ens, temp, pres = None, None, None
+        input_lammps = os.path.join(task, "input.lammps")
+        if os.path.isfile(input_lammps):
+            try:
+                ens, temp, pres = get_lmp_info(input_lammps)
+            except UnboundLocalError:
+                # not a lammps md input
+                pass
+        wall_time = None
+        log = os.path.join(task, "log.lammps")
+        if os.path.isfile(log):
+            match = _grep_first(log, _lammps_time)
+            if match:
+                hour, minute, sec = (int(ii) for ii in match.groups())
+                wall_time = 3600 * hour + 60 * minute + sec
+        records.append(
+            (os.path.basename(task), ens, temp, pres, wall_time is not None, wall_time)
+        )
+    return records
+
+
+def _scan_fp(iter_path, model_devi_info):
+    # dpgen.generator.run takes long to import
+    from dpgen.generator.run import _vasp_check_converged, load_model_devi
+
+    fp_path = os.path.join(iter_path, "02.fp")
+    outs = {}
+    for out in glob.glob(os.path.join(fp_path, "*out")):
+        out_type = os.path.basename(out).split(".")[0]
+        with open(out, "rb") as fp:
+            outs[out_type] = outs.get(out_type, 0) + sum(1 for _ in fp)
+    model_devi_cache = {}
+    records = []
+    for task in sorted(
+        glob.glob(os.path.join(fp_path, "task.[0-9]*[0-9].[0-9]*[0-9]"))
+    ):
+        task_name = os.path.basename(task)
+        sys_idx = int(task_name.split(".")[-2])
+        md_task, frame = None, None
+        for conf in ["conf.dump", "conf.lmp"]:
+            if os.path.lexists(os.path.join(task, conf)):
+                linked_keys = os.path.realpath(os.path.join(task, conf)).split("/")
+                md_task = linked_keys[-3]
+                try:
+                    frame = int(linked_keys[-1].split(".")[0])
+                except ValueError:
+                    frame = None
+                break
+        ens, temp, pres = model_devi_info.get(md_task, (None, None, None))
+        max_devi_v, max_devi_f = None, None
+        if md_task is not None and frame is not None:
+            # each model deviation file is read once for all the fp tasks
+            if md_task not in model_devi_cache:
+                fname = os.path.join(
+                    iter_path, "01.model_devi", md_task, "model_devi.out"
+                )
+                model_devi_cache[md_task] = (
+                    load_model_devi(fname) if os.path.isfile(fname) else None
+                )
+            model_devi = model_devi_cache[md_task]
+            if model_devi is not None and model_devi.size:
+                rows = np.flatnonzero(model_devi[:, 0] == frame)
+                if rows.size:
+                    max_devi_v = float(model_devi[rows[0], 1])
+                    max_devi_f = float(model_devi[rows[0], 4])
+        outcar = os.path.join(task, "OUTCAR")
+        has_outcar = os.path.isfile(outcar)
+        converged, wall_time, cores = None, None, None
+        if has_outcar:
+            converged = _vasp_check_converged(task)
+            match = _grep_first(outcar, _vasp_cores, max_lines=1000)
+            if match:
+                cores = int(match.group(1))
+            match = _grep_first(outcar, _vasp_time)
+            if match:
+                wall_time = float(match.group(1))
+        records.append(
+            (
+                task_name,
+                sys_idx,
+                md_task,
+                frame,
+                ens,
+                temp,
+                pres,
+                max_devi_v,
+                max_devi_f,
+                has_outcar,
+                converged,
+                wall_time is not None,
+                wall_time,
+                cores,
+            )
+        )
+    return records, outs
+
+
+def _index_iter(conn, iter_path):
+    iter_name = os.path.basename(iter_path)
+    for table in ["train_tasks", "model_devi_tasks", "fp_tasks", "fp_outs"]:
+        conn.execute(f"DELETE FROM {table} WHERE iter = ?", (iter_name,))
+    conn.executemany(
+        "INSERT INTO train_tasks VALUES (?, ?, ?, ?)",
+        [(iter_name, *rr) for rr in _scan_train(iter_path)],
+    )
+    md_records = _scan_model_devi(iter_path)
+    conn.executemany(
+        "INSERT INTO model_devi_tasks VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(iter_name, *rr) for rr in md_records],
+    )
+    model_devi_info = {rr[0]: rr[1:4] for rr in md_records}
+    fp_records, outs = _scan_fp(iter_path, model_devi_info)
+    conn.executemany(
+        "INSERT INTO fp_tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(iter_name, *rr) for rr in fp_records],
+    )
+    conn.executemany(
+        "INSERT INTO fp_outs VALUES (?, ?, ?)",
+        [(iter_name, kk, vv) for kk, vv in outs.items()],
+    )
+
+
+def update_index(target_folder, type_map=None, verbose=False):
+    """Index the iterations of a DP-GEN job that are not indexed yet.
+
+    Parameters
+    ----------
+    target_folder : str
+        the directory of the DP-GEN job
+    type_map : list of str, optional
+        not used; the fp outputs are checked without being parsed
+    verbose : bool, optional
+        print the scanned iterations
+
+    Returns
+    -------
+    sqlite3.Connection
+        the connection to the index, stored as run_index.db in the job
+        directory
+    """
+    target_folder = os.path.abspath(target_folder)
+    conn = sqlite3.connect(os.path.join(target_folder, index_name))
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(iterations)")]
+    if columns and "mtime" not in columns:
+        # an index of an older version, whose iterations are scanned again
+        with conn:
+            conn.execute("DROP TABLE iterations")
+    conn.executescript(_schema)
+    indexed = dict(conn.execute("SELECT iter, mtime FROM iterations"))
+    finished = _finished_iters(target_folder)
+    iters = sorted(glob.glob(os.path.join(target_folder, "iter.[0-9]*[0-9]")))
+    for iter_path in iters:
+        iter_name = os.path.basename(iter_path)
+        mtime = _iter_mtime(iter_path)
+        # the iterations rolled back in record.dpgen or rerun are scanned again
+        if iter_name in finished and indexed.get(iter_name) == mtime:
+            continue
+        if verbose:
+            print("# index " + iter_name)
+        with conn:
+            conn.execute("DELETE FROM iterations WHERE iter = ?", (iter_name,))
+            _index_iter(conn, iter_path)
+            if iter_name in finished:
+                conn.execute(
+                    "INSERT INTO iterations VALUES (?, ?, ?)",
+                    (iter_name, mtime, time.time()),
+                )
+    # drop the records of removed iterations
+    iter_names = [os.path.basename(ii) for ii in iters]
+    with conn:
+        for table in [
+            "iterations",
+            "train_tasks",
+            "model_devi_tasks",
+            "fp_tasks",
+            "fp_outs",
+        ]:
+            conn.execute(
+                f"DELETE FROM {table} WHERE iter NOT IN ({','.join('?' * len(iter_names))})",
+                iter_names,
+            )
+    return conn
@@ -1,12 +1,11 @@
 #!/usr/bin/env python3
 
-import glob
 import json
 import os
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
-from dpgen.tools.relabel import get_lmp_info
+from dpgen.tools.run_index import update_index
 
 
 def ascii_hist(count):
@@ -21,47 +20,26 @@ def stat_sys(target_folder, param_file="param.json", verbose=True, mute=False):
     target_folder = os.path.abspath(target_folder)
     with open(os.path.join(target_folder, param_file)) as fp:
         jdata = json.load(fp)
-    # goto input
-    cwd = os.getcwd()
-    os.chdir(target_folder)
     sys = jdata["sys_configs"]
     numb_sys = len(sys)
     sys_tasks_count = [0 for ii in sys]
     sys_tasks_trait = [[] for ii in sys]
     sys_tasks_trait_count = [[] for ii in sys]
-    # collect tasks from iter dirs
-    iters = glob.glob("iter.[0-9]*[0-9]")
-    iters.sort()
-    # iters = iters[:2]
-    for ii in iters:
-        iter_tasks = glob.glob(
-            os.path.join(ii, "02.fp", "task.[0-9]*[0-9].[0-9]*[0-9]")
-        )
-        iter_tasks.sort()
-        if verbose:
-            print("# check iter " + ii + " with %6d tasks" % len(iter_tasks))  # noqa: UP031
-        for jj in iter_tasks:
-            sys_idx = int(os.path.basename(jj).split(".")[-2])
-            sys_tasks_count[sys_idx] += 1
-            linked_file = os.path.realpath(os.path.join(jj, "conf.dump"))
-            linked_keys = linked_file.split("/")
-            task_record = (
-                linked_keys[-5]
-                + "."
-                + linked_keys[-3]
-                + "."
-                + linked_keys[-1].split(".")[0]
-            )
-            task_record_keys = task_record.split(".")
-            ens, temp, pres = get_lmp_info(
-                os.path.join(ii, "01.model_devi", linked_keys[-3], "input.lammps")
-            )
-            trait = [ens, temp, pres]
-            if trait not in sys_tasks_trait[sys_idx]:
-                sys_tasks_trait[sys_idx].append(trait)
-                sys_tasks_trait_count[sys_idx].append(0)
-            t_idx = sys_tasks_trait[sys_idx].index(trait)
-            sys_tasks_trait_count[sys_idx][t_idx] += 1
+    # collect tasks from the index of the iter dirs
+    conn = update_index(target_folder, jdata.get("type_map"), verbose=verbose)
+    if verbose:
+        for iter_name, count in conn.execute(
+            "SELECT iter, COUNT(*) FROM fp_tasks GROUP BY iter ORDER BY iter"
+        ):
+            print("# check iter " + iter_name + " with %6d tasks" % count)  # noqa: UP031
+    for sys_idx, ens, temp, pres, count in conn.execute(
+        "SELECT sys_idx, ens, temp, pres, COUNT(*) FROM fp_tasks "
+        "GROUP BY sys_idx, ens, temp, pres"
+    ):
+        sys_tasks_count[sys_idx] += count
+        sys_tasks_trait[sys_idx].append([ens, temp, pres])
+        sys_tasks_trait_count[sys_idx].append(count)
+    conn.close()
     sys_tasks_all = []
     for ii in range(numb_sys):
         # print(sys[ii], sys_tasks_count[ii])
@@ -93,7 +71,6 @@ def stat_sys(target_folder, param_file="param.json", verbose=True, mute=False):
                         sys_tasks_all[ii][jj][3],
                     )
                 )
-    os.chdir(cwd)
     return sys, sys_tasks_count, sys_tasks_all
 
 
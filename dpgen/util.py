@@ -1,11 +1,14 @@
 #!/usr/bin/env python
 import json
 import os
+import shutil
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import (
     contextmanager,
 )
 from pathlib import Path
-from typing import Union
+from typing import Callable, Optional, Union
 
 import dpdata
 import h5py
@@ -100,7 +103,108 @@ def normalize(arginfo: Argument, data: dict, strict_check: bool = True) -> dict:
     return data
 
 
-def convert_training_data_to_hdf5(input_files: list[str], h5_file: str):
+def _system_signature(system: str) -> list:
+    """Signature of a training system by the sizes and mtimes of its files."""
+    if "#" in system:
+        p1, p2 = system.split("#")
+        st = os.stat(p1)
+        return [p2, st.st_size, st.st_mtime_ns]
+    sig = []
+    for root in [system, *sorted(str(pp) for pp in Path(system).glob("set.*"))]:
+        for entry in sorted(os.scandir(root), key=lambda x: x.name):
+            if entry.is_file():
+                st = entry.stat()
+                sig.append(
+                    [os.path.relpath(entry.path, system), st.st_size, st.st_mtime_ns]
+                )
+    return sig
+
+
+def _copy_system_to_hdf5(system: str, group: h5py.Group):
+    """Copy a training system in the deepmd/npy or deepmd/hdf5 format to a HDF5
+    group, without loading it through dpdata. The frame data is stored in
+    chunked, compressed datasets.
+    """
+    if "#" in system:
+        p1, p2 = system.split("#")
+        with h5py.File(p1, "r") as f:
+            src = f[p2] if p2 else f["/"]
+            for kk in src.keys():
+                src.copy(kk, group)
+        return
+    root = Path(system)
+    group.create_dataset(
+        "type.raw", data=np.loadtxt(root / "type.raw", dtype=int, ndmin=1)
+    )
+    if (root / "type_map.raw").is_file():
+        type_map = np.loadtxt(root / "type_map.raw", dtype=str, ndmin=1)
+        group.create_dataset("type_map.raw", data=np.array(type_map, dtype="S"))
+    for set_dir in sorted(root.glob("set.*")):
+        set_group = group.create_group(set_dir.name)
+        for ff in sorted(set_dir.glob("*.npy")):
+            data = np.load(ff)
+            set_group.create_dataset(
+                ff.name,
+                data=data,
+                chunks=True if data.ndim > 0 and data.size > 0 else None,
+                compression="gzip" if data.ndim > 0 and data.size > 0 else None,
+            )
+    if (root / "nopbc").is_file():
+        group.create_dataset("nopbc", data=True)
+
+
+def _update_hdf5_store(store_file: str, systems: dict[str, str]):
+    """Update a HDF5 store with the training systems.
+
+    The systems missing in the store are appended in place. If a system in
+    the store has changed or is no longer given, the store is rewritten to a
+    new file instead, so that the files linked to the previous store keep
+    their data and the space of the old groups is freed.
+
+    Parameters
+    ----------
+    store_file : str
+        HDF5 store file name
+    systems : dict[str, str]
+        the source path of each group in the store
+    """
+    sigs = {name: _system_signature(system) for name, system in systems.items()}
+    ingested = {}
+    if os.path.isfile(store_file):
+        with h5py.File(store_file, "r") as f:
+            ingested = {
+                name: sig
+                for name, sig in json.loads(f.attrs.get("ingested", "{}")).items()
+                if name in f
+            }
+    kept = [name for name, sig in ingested.items() if sigs.get(name) == sig]
+    rewrite = len(kept) < len(ingested)
+    tmp_file = store_file + ".tmp"
+    ingested = {name: sigs[name] for name in kept}
+    nnew = 0
+    with h5py.File(tmp_file if rewrite else store_file, "w" if rewrite else "a") as f:
+        if rewrite:
+            with h5py.File(store_file, "r") as src:
+                for name in kept:
+                    src.copy(src[name], f, name=name)
+            f.attrs["ingested"] = json.dumps(ingested)
+        for name, system in systems.items():
+            if name in ingested:
+                continue
+            _copy_system_to_hdf5(system, f.create_group(name))
+            ingested[name] = sigs[name]
+            f.attrs["ingested"] = json.dumps(ingested)
+            nnew += 1
+    if rewrite:
+        os.replace(tmp_file, store_file)
+    dlog.info(
+        "Appended %d of %d training systems to %s", nnew, len(systems), store_file
+    )
+
+
+def convert_training_data_to_hdf5(
+    input_files: list[str], h5_file: str, store_file: Optional[str] = None
+):
     """Convert training data to HDF5 format and update the input files.
 
     Parameters
@@ -109,6 +213,12 @@ def convert_training_data_to_hdf5(input_files: list[str], h5_file: str):
         DeePMD-kit input file names
     h5_file : str
         HDF5 file name
+    store_file : str, optional
+        HDF5 store file name. If given, the systems are appended to the store
+        when they are not ingested yet or their files have changed since, and
+        h5_file is a hard link to the store. The group names are paths
+        relative to the directory of h5_file, so the store can be shared by
+        directories with the same layout, e.g. the training of each iteration.
     """
     systems = []
     h5_dir = Path(h5_file).parent.absolute()
@@ -142,6 +252,26 @@ def convert_training_data_to_hdf5(input_files: list[str], h5_file: str):
             json.dump(jinput, f, indent=4)
     systems = list(set(systems))
 
+    if store_file is not None:
+        groups = {}
+        for ii in sorted(systems):
+            if "#" in ii:
+                p1, p2 = ii.split("#")
+                groups[os.path.normpath(os.path.relpath(p1, h5_dir)) + p2] = ii
+            else:
+                groups[os.path.normpath(os.path.relpath(ii, h5_dir))] = ii
+        _update_hdf5_store(store_file, groups)
+        if os.path.lexists(h5_file):
+            os.remove(h5_file)
+        # the store is only appended in place, so h5_file keeps its data
+        # when the store is rewritten later
+        try:
+            os.link(store_file, h5_file)
+        except OSError:
+            # e.g. across file systems
+            shutil.copyfile(store_file, h5_file)
+        return
+
     dlog.info("Combining %d training systems to %s...", len(systems), h5_file)
 
     with h5py.File(h5_file, "w") as f:
@@ -159,6 +289,150 @@ def convert_training_data_to_hdf5(input_files: list[str], h5_file: str):
                 s.to("deepmd/hdf5", group)
 
 
+def parallel_map(func: Callable, items: list, nproc: Optional[int] = 1) -> list:
+    """Apply a function to every item, optionally in a process pool.
+
+    Parameters
+    ----------
+    func : Callable
+        a picklable function taking one item
+    items : list
+        the items
+    nproc : int, optional
+        number of processes. If it is None or no more than 1, the items are
+        processed one after another in the current process.
+
+    Returns
+    -------
+    list
+        the results, in the same order as the items
+    """
+    items = list(items)
+    if nproc is None or nproc <= 1 or len(items) <= 1:
+        return [func(ii) for ii in items]
+    chunksize = max(1, len(items) // (4 * nproc))
+    with ProcessPoolExecutor(max_workers=nproc) as executor:
+        return list(executor.map(func, items, chunksize=chunksize))
+
+
+def parallel_imap(
+    func: Callable, items: Iterable, nproc: Optional[int] = 1, chunksize: int = 1
+) -> Iterator:
+    """Lazily apply a function to every item, optionally in a process pool.
+
+    Unlike :func:`parallel_map`, the results are yielded one by one in the
+    order of the items, so that they can be consumed as a stream.
+
+    Parameters
+    ----------
+    func : Callable
+        a picklable function taking one item
+    items : Iterable
+        the items
+    nproc : int, optional
+        number of processes. If it is None or no more than 1, the items are
+        processed one after another in the current process.
+    chunksize : int, optional
+        number of items sent to a process at once
+
+    Yields
+    ------
+    object
+        the results, in the same order as the items
+    """
+    if nproc is None or nproc <= 1:
+        yield from map(func, items)
+        return
+    with ProcessPoolExecutor(max_workers=nproc) as executor:
+        yield from executor.map(func, items, chunksize=chunksize)
+
+
+def concat_systems(
+    systems: list[dpdata.System],
+) -> Optional[dpdata.System]:
+    """Concatenate systems of the same atoms into one system.
+
+    The frame data of all systems is concatenated once, instead of growing
+    the system with repeated ``System.append``. Systems without frames are
+    skipped. If the systems do not share the same atom names, atom types
+    and data, they are appended one by one as a fallback.
+
+    Parameters
+    ----------
+    systems : list of dpdata.System
+        the systems to concatenate
+
+    Returns
+    -------
+    dpdata.System or None
+        the concatenated system, or None if no system has frames
+    """
+    systems = [ss for ss in systems if len(ss.data["atom_numbs"]) and len(ss) > 0]
+    if len(systems) == 0:
+        return None
+    first = systems[0]
+    frame_keys = [
+        tt.name
+        for tt in first.DTYPES
+        if tt.shape is not None and Axis.NFRAMES in tt.shape and tt.name in first.data
+    ]
+    same = all(
+        ss.data["atom_names"] == first.data["atom_names"]
+        and np.array_equal(ss.data["atom_types"], first.data["atom_types"])
+        and np.array_equal(ss.data["orig"], first.data["orig"])
+        and all(kk in ss.data for kk in frame_keys)
+        and not any(
+            tt.name in ss.data and tt.name not in frame_keys
+            for tt in ss.DTYPES
+            if tt.shape is not None and Axis.NFRAMES in tt.shape
+        )
+        for ss in systems[1:]
+    )
+    if not same:
+        all_sys = first.copy()
+        for ss in systems[1:]:
+            all_sys.append(ss)
+        return all_sys
+    data = first.data.copy()
+    for tt in first.DTYPES:
+        if tt.name in frame_keys:
+            axis_nframes = tt.shape.index(Axis.NFRAMES)
+            data[tt.name] = np.concatenate(
+                [ss.data[tt.name] for ss in systems], axis=axis_nframes
+            )
+    if any(not ss.nopbc for ss in systems):
+        if "nopbc" in data:
+            data["nopbc"] = False
+    return type(first)(data=data)
+
+
+def concat_multi_systems(
+    systems: list[dpdata.System], type_map: Optional[list[str]] = None
+) -> dpdata.MultiSystems:
+    """Collect systems into a MultiSystems, concatenating each formula once.
+
+    Parameters
+    ----------
+    systems : list of dpdata.System
+        the systems to collect
+    type_map : list of str, optional
+        the type map of the MultiSystems
+
+    Returns
+    -------
+    dpdata.MultiSystems
+        the collected systems
+    """
+    groups = {}
+    for ss in systems:
+        if len(ss.data["atom_numbs"]) and len(ss) > 0:
+            groups.setdefault(ss.formula, []).append(ss)
+    all_sys = dpdata.MultiSystems(type_map=type_map)
+    for group in groups.values():
+        all_sys.append(concat_systems(group))
+    return all_sys
+
+
 @contextmanager
 def set_directory(path: Path):
     """Sets the current working path within the context.
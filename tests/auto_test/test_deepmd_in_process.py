@@ -0,0 +1,209 @@
+import os
+import shutil
+import sys
+import unittest
+from unittest import mock
+
+import dpdata
+import numpy as np
+from monty.json import MontyDecoder
+from monty.serialization import dumpfn
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "auto_test"
+
+from dpgen.auto_test.calculator import (
+    DeepmdInProcess,
+    _dump_result,
+    _make_result_dict,
+    _read_setforce,
+    _run_deepmd_task_group,
+    check_in_process,
+    make_calculator,
+)
+from dpgen.auto_test.Lammps import Lammps
+
+from .context import setUpModule  # noqa: F401
+
+
+class FakeDeepPot:
+    """A Lennard-Jones potential with the interface of DeepPot."""
+
+    def get_type_map(self):
+        return ["Al"]
+
+    def eval(self, coords, cells, atom_types):
+        from ase import Atoms
+        from ase.calculators.lj import LennardJones
+
+        nframes = len(coords)
+        e, f, v = [], [], []
+        for coord, cell in zip(coords, cells):
+            atoms = Atoms(
+                numbers=[13] * len(atom_types),
+                positions=coord.reshape(-1, 3),
+                cell=cell.reshape(3, 3),
+                pbc=True,
+            )
+            atoms.calc = LennardJones(sigma=2.4, epsilon=0.4, rc=6.0)
+            e.append(atoms.get_potential_energy())
+            f.append(atoms.get_forces())
+            v.append(-atoms.get_stress(voigt=False) * atoms.get_volume())
+        return (
+            np.reshape(e, (nframes, 1)),
+            np.reshape(f, (nframes, -1)),
+            np.reshape(v, (nframes, 9)),
+        )
+
+
+class TestDeepmdInProcess(unittest.TestCase):
+    def setUp(self):
+        self.inter_param = {
+            "type": "deepmd",
+            "model": "lammps_input/frozen_model.pb",
+            "type_map": {"Al": 0},
+            "in_process": True,
+        }
+        self.relax_param = {
+            "cal_type": "relaxation",
+            "cal_setting": {
+                "relax_pos": True,
+                "relax_shape": True,
+                "relax_vol": True,
+            },
+        }
+        self.task_path = "confs/std-fcc/in_process_00/task.000000"
+        os.makedirs(self.task_path, exist_ok=True)
+        shutil.copy("equi/lammps/Al-fcc.vasp", os.path.join(self.task_path, "POSCAR"))
+
+    def tearDown(self):
+        shutil.rmtree("confs/std-fcc/in_process_00")
+
+    def _make_task(self, task_param):
+        calculator = make_calculator(
+            self.inter_param, os.path.join(self.task_path, "POSCAR")
+        )
+        abs_path = os.path.abspath(self.task_path)
+        calculator.make_potential_files(abs_path)
+        calculator.make_input_file(abs_path, "relaxation", task_param)
+
+    def test_make_calculator(self):
+        calculator = make_calculator(self.inter_param, "POSCAR")
+        self.assertIsInstance(calculator, DeepmdInProcess)
+        inter_param = dict(self.inter_param)
+        inter_param["in_process"] = False
+        calculator = make_calculator(inter_param, "POSCAR")
+        self.assertIs(type(calculator), Lammps)
+
+    def test_check_in_process(self):
+        self._make_task(self.relax_param)
+        self.assertTrue(check_in_process(self.task_path))
+        relax_param = {
+            "cal_type": "relaxation",
+            "cal_setting": {
+                "relax_pos": True,
+                "relax_shape": True,
+                "relax_vol": False,
+            },
+            "scale2equi": [1.0],
+        }
+        self._make_task(relax_param)
+        self.assertFalse(check_in_process(self.task_path))
+
+    def test_read_setforce(self):
+        self.assertIsNone(_read_setforce(self.task_path))
+        with open(os.path.join(self.task_path, "in.lammps"), "w") as fp:
+            fp.write("fix 1 all setforce 0 0 NULL\n")
+        self.assertEqual(_read_setforce(self.task_path), [True, True, False])
+
+    def test_compute(self):
+        system = dpdata.System(
+            os.path.join(self.task_path, "POSCAR"), fmt="vasp/poscar", type_map=["Al"]
+        )
+        natoms = system.get_natoms()
+        rng = np.random.default_rng(0)
+        virials = rng.normal(size=(1, 3, 3))
+        result = _make_result_dict(
+            ["Al"],
+            system["atom_types"],
+            system["cells"],
+            system["coords"],
+            np.array([-3.5 * natoms]),
+            rng.normal(size=(1, natoms, 3)),
+            virials,
+        )
+        _dump_result(self.task_path, result)
+        self.assertTrue(os.path.isfile(os.path.join(self.task_path, "CONTCAR")))
+        dumpfn(self.inter_param, os.path.join(self.task_path, "inter.json"))
+        calculator = make_calculator(self.inter_param, "POSCAR")
+        ret = MontyDecoder().process_decoded(calculator.compute(self.task_path))
+        self.assertIsInstance(ret, dpdata.LabeledSystem)
+        self.assertEqual(ret["atom_numbs"], [natoms])
+        np.testing.assert_allclose(ret["cells"], system["cells"])
+        np.testing.assert_allclose(ret["energies"], [-3.5 * natoms])
+        vol = np.linalg.det(system["cells"][0])
+        np.testing.assert_allclose(ret["stress"], virials / vol * 1602.1766208)
+        contcar = dpdata.System(
+            os.path.join(self.task_path, "CONTCAR"), fmt="vasp/poscar"
+        )
+        np.testing.assert_allclose(contcar["coords"], system["coords"], atol=1e-6)
+
+    def _run_task(self, relax_pos, relax_shape, relax_vol):
+        self._make_task(
+            {
+                "cal_type": "relaxation",
+                "cal_setting": {
+                    "relax_pos": relax_pos,
+                    "relax_shape": relax_shape,
+                    "relax_vol": relax_vol,
+                },
+            }
+        )
+        with mock.patch(
+            "dpgen.auto_test.calculator._load_deep_pot", return_value=FakeDeepPot()
+        ):
+            self.assertEqual(_run_deepmd_task_group([self.task_path]), 1)
+        calculator = make_calculator(self.inter_param, "POSCAR")
+        return MontyDecoder().process_decoded(calculator.compute(self.task_path))
+
+    def test_run_static(self):
+        ret = self._run_task(False, False, False)
+        system = dpdata.System(
+            os.path.join(self.task_path, "POSCAR"), fmt="vasp/poscar", type_map=["Al"]
+        )
+        np.testing.assert_allclose(ret["cells"], system["cells"])
+        e, f, v = FakeDeepPot().eval(
+            system["coords"].reshape(1, -1), system["cells"].reshape(1, -1), [0]
+        )
+        np.testing.assert_allclose(ret["energies"], e.ravel())
+
+    def test_run_relax_pos(self):
+        ret = self._run_task(True, False, False)
+        system = dpdata.System(
+            os.path.join(self.task_path, "POSCAR"), fmt="vasp/poscar", type_map=["Al"]
+        )
+        np.testing.assert_allclose(ret["cells"], system["cells"])
+
+    def test_run_relax_box(self):
+        # the box is fully relaxed by LAMMPS whenever the shape is relaxed
+        system = dpdata.System(
+            os.path.join(self.task_path, "POSCAR"), fmt="vasp/poscar", type_map=["Al"]
+        )
+        vol = np.linalg.det(system["cells"][0])
+        for relax_vol in (True, False):
+            ret = self._run_task(True, True, relax_vol)
+            os.remove(os.path.join(self.task_path, "result_task.json"))
+            self.assertLess(np.linalg.det(ret["cells"][0]), 0.9 * vol)
+            np.testing.assert_allclose(ret["stress"], 0, atol=1e-1)
+            contcar = dpdata.System(
+                os.path.join(self.task_path, "CONTCAR"), fmt="vasp/poscar"
+            )
+            np.testing.assert_allclose(contcar["cells"], ret["cells"], atol=1e-6)
+
+    def test_run_unsupported(self):
+        with self.assertRaises(RuntimeError):
+            self._run_task(False, True, True)
+
+
+if __name__ == "__main__":
+    unittest.main()
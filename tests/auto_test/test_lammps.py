@@ -3,6 +3,8 @@ import shutil
 import sys
 import unittest
 
+import numpy as np
+from monty.json import MontyDecoder
 from monty.serialization import loadfn
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -99,3 +101,42 @@ class TestLammps(unittest.TestCase):
     def test_backward_files(self):
         backward_files = ["log.lammps", "outlog", "dump.relax"]
         self.assertEqual(self.Lammps.backward_files(), backward_files)
+
+    def test_compute(self):
+        cell = np.array([[4.0, 0.0, 0.0], [0.5, 4.2, 0.0], [0.3, 0.2, 4.4]])
+        scaled = np.array([[0.0, 0.0, 0.0], [0.5, 0.5, 0.5]])
+        forces = np.array([[0.1, 0.2, 0.3], [-0.1, -0.2, -0.3]])
+        with open(os.path.join(self.equi_path, "dump.relax"), "w") as fp:
+            for step in [0, 10]:
+                fp.write(
+                    f"ITEM: TIMESTEP\n{step}\nITEM: NUMBER OF ATOMS\n2\n"
+                    "ITEM: BOX BOUNDS xy xz yz pp pp pp\n"
+                    "0.0 4.8 0.5\n0.0 4.4 0.3\n0.0 4.4 0.2\n"
+                    "ITEM: ATOMS id type xs ys zs fx fy fz\n"
+                )
+                for ii in range(2):
+                    fp.write(
+                        f"{ii + 1} 1 {' '.join(map(str, scaled[ii]))} "
+                        f"{' '.join(map(str, forces[ii]))}\n"
+                    )
+        with open(os.path.join(self.equi_path, "log.lammps"), "w") as fp:
+            fp.write(
+                "Step PotEng Pxx Pyy Pzz Pxy Pxz Pyz\n"
+                "0 -7.0 1000 2000 3000 400 500 600\n"
+                "10 -7.5 100 200 300 40 50 60\n"
+                "Loop time of 0.1\n"
+                "Total wall time: 0:00:00\n"
+            )
+        ret = MontyDecoder().process_decoded(self.Lammps.compute(self.equi_path))
+        self.assertEqual(ret["atom_numbs"], [2])
+        np.testing.assert_allclose(ret["cells"], [cell, cell])
+        np.testing.assert_allclose(ret["coords"], [scaled @ cell] * 2)
+        np.testing.assert_allclose(ret["forces"], [forces, forces])
+        np.testing.assert_allclose(ret["energies"], [-7.0, -7.5])
+        np.testing.assert_allclose(
+            ret["stress"][1], [[0.1, 0.04, 0.05], [0.04, 0.2, 0.06], [0.05, 0.06, 0.3]]
+        )
+        vol = np.linalg.det(cell)
+        np.testing.assert_allclose(
+            ret["virials"], ret["stress"] * vol / 1.6021766208 * 1e-3
+        )
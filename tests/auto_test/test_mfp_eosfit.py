@@ -0,0 +1,83 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+from monty.serialization import loadfn
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "auto_test"
+
+from dpgen.auto_test.EOS import EOS
+from dpgen.auto_test.lib import mfp_eosfit
+
+from .context import setUpModule  # noqa: F401
+
+
+class TestFitEOSBatch(unittest.TestCase):
+    def setUp(self):
+        self.vol = np.linspace(14.0, 19.0, 11)
+        self.pars = [[-3.7, 0.5, 4.5, 16.4], [-4.1, 0.8, 4.0, 15.5]]
+        self.datasets = [(self.vol, mfp_eosfit.BM4(self.vol, pp)) for pp in self.pars]
+
+    def test_jacobians(self):
+        en = self.datasets[0][1]
+        pars = np.array([-3.6, 0.6, 4.2, 16.0])
+        for func, jac in mfp_eosfit.eos_jacobians.items():
+            res = getattr(mfp_eosfit, "res_" + func)
+            num = np.stack(
+                [
+                    (res(pars + hh, en, self.vol) - res(pars - hh, en, self.vol)) / 2e-6
+                    for hh in np.eye(4) * 1e-6
+                ],
+                axis=1,
+            )
+            np.testing.assert_allclose(jac(pars, en, self.vol), num, atol=1e-6)
+
+    def test_fit(self):
+        funcs = ["BM4", "vinet", "murnaghan", "morse_3p"]
+        tables = mfp_eosfit.fit_eos_batch(self.datasets, funcs, nproc=2)
+        self.assertEqual(len(tables), 2)
+        for table, pars in zip(tables, self.pars):
+            residuals = [ii["residual"] for ii in table]
+            self.assertEqual(residuals, sorted(residuals))
+            self.assertEqual(table[0]["eos"], "BM4")
+            np.testing.assert_allclose(table[0]["pars"], pars, rtol=1e-5)
+            self.assertAlmostEqual(table[0]["v0"], pars[3], places=4)
+            self.assertAlmostEqual(table[0]["e0"], pars[0], places=6)
+            self.assertAlmostEqual(
+                table[0]["b0"], pars[1] * mfp_eosfit.eV2GPa, delta=0.1
+            )
+
+
+class TestEOSFit(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.eos = EOS(
+            {
+                "type": "eos",
+                "vol_start": 0.9,
+                "vol_end": 1.1,
+                "vol_step": 0.01,
+                "eos_fit": ["BM4", "vinet"],
+            }
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_fit_eos(self):
+        vol = np.linspace(14.0, 19.0, 11)
+        en = mfp_eosfit.BM4(vol, [-3.7, 0.5, 4.5, 16.4])
+        ptr = self.eos._fit_eos(
+            os.path.join(self.tmpdir, "result.json"), dict(zip(vol, en))
+        )
+        table = loadfn(os.path.join(self.tmpdir, "eos_fit.json"))
+        self.assertEqual([ii["eos"] for ii in table], ["BM4", "vinet"])
+        self.assertIn("BM4", ptr.split("\n")[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
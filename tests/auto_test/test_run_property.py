@@ -0,0 +1,95 @@
+import functools
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "auto_test"
+
+from dpgen.auto_test.common_prop import run_property
+from dpgen.dispatcher.Dispatcher import make_submission, run_submission_with_progress
+
+from .context import setUpModule  # noqa: F401
+
+
+class TestRunProperty(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        self.remote_root = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+        self.inter_param = {
+            "type": "deepmd",
+            "model": "frozen_model.pb",
+            "type_map": {"Al": 0},
+        }
+        self.property_list = [{"type": "eos"}, {"type": "vacancy"}]
+        with open("frozen_model.pb", "w") as fp:
+            fp.write("model")
+        for conf in ["confs/std-fcc", "confs/std-bcc"]:
+            for prop in ["eos_00", "vacancy_00"]:
+                work_path = os.path.join(conf, prop)
+                os.makedirs(work_path)
+                for ff in ["frozen_model.pb", "in.lammps"]:
+                    with open(os.path.join(work_path, ff), "w") as fp:
+                        fp.write(ff)
+                for ii in range(2):
+                    task_path = os.path.join(work_path, f"task.{ii:06d}")
+                    os.makedirs(task_path)
+                    for ff in ["conf.lmp", "in.lammps", "frozen_model.pb"]:
+                        with open(os.path.join(task_path, ff), "w") as fp:
+                            fp.write(ff)
+        self.mdata = {
+            "model_devi_command": "echo Total wall time: > log.lammps; touch dump.relax; echo",
+            "model_devi_machine": {
+                "context_type": "LocalContext",
+                "batch_type": "shell",
+                "local_root": "./",
+                "remote_root": self.remote_root,
+            },
+            "model_devi_group_size": 3,
+            "model_devi_resources": {
+                "group_size": 3,
+            },
+        }
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+        shutil.rmtree(self.remote_root)
+
+    @mock.patch(
+        "dpgen.auto_test.common_prop.run_submission_with_progress",
+        functools.partial(run_submission_with_progress, check_interval=0.1),
+    )
+    def test_one_submission(self):
+        tasks = glob.glob("confs/*/*_00/task.*")
+        self.assertEqual(len(tasks), 8)
+        with mock.patch(
+            "dpgen.auto_test.common_prop.make_submission", wraps=make_submission
+        ) as mocked:
+            run_property(
+                ["confs/std-*"], self.inter_param, self.property_list, self.mdata
+            )
+            self.assertEqual(mocked.call_count, 1)
+            self.assertEqual(
+                sorted(mocked.call_args.kwargs["run_tasks"]), sorted(tasks)
+            )
+        for tt in tasks:
+            self.assertTrue(os.path.isfile(os.path.join(tt, "log.lammps")))
+        # the finished tasks are not submitted again
+        with mock.patch(
+            "dpgen.auto_test.common_prop.make_submission", wraps=make_submission
+        ) as mocked:
+            run_property(
+                ["confs/std-*"], self.inter_param, self.property_list, self.mdata
+            )
+            self.assertEqual(mocked.call_count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
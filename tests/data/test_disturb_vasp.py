@@ -0,0 +1,67 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import ase.io
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "data"
+from dpgen.data.tools.create_random_disturb import (
+    perturb_cells,
+    write_disturbs_vasp,
+)
+
+from .context import setUpModule  # noqa: F401
+
+
+class TestPertVasp(unittest.TestCase):
+    def setUp(self):
+        self.atoms = ase.io.read("POSCAR", format="vasp")
+        self.cell = self.atoms.get_cell().array
+        self.cell[1, 0] = 1.0
+        self.cell[2, 1] = 0.5
+        self.coords = self.atoms.get_scaled_positions() @ self.cell
+
+    def test_perturb_cells(self):
+        rng = np.random.default_rng(0)
+        cells, coords = perturb_cells(self.cell, self.coords, 5, 0.0, 0.1, rng=rng)
+        self.assertEqual(cells.shape, (5, 3, 3))
+        self.assertEqual(coords.shape, (5, 4, 3))
+        np.testing.assert_allclose(np.triu(cells, 1), 0.0)
+        # without displacements the atoms are scaled with the cells
+        frac = np.linalg.solve(self.cell.T, self.coords.T).T
+        for cc, pp in zip(cells, coords):
+            np.testing.assert_allclose(np.linalg.solve(cc.T, pp.T).T, frac, atol=1e-12)
+        # the strain is within the range
+        ratio = np.linalg.det(cells) / np.linalg.det(self.cell)
+        self.assertTrue(np.all(np.abs(ratio - 1) < 0.35))
+
+    def test_displacements(self):
+        rng = np.random.default_rng(0)
+        cells, coords = perturb_cells(self.cell, self.coords, 5, 0.1, 0.0, rng=rng)
+        disp = np.linalg.norm(coords - self.coords, axis=-1)
+        self.assertTrue(np.all(disp < 0.1))
+        self.assertTrue(np.all(disp > 0.0))
+        np.testing.assert_allclose(cells, np.tile(self.cell, (5, 1, 1)))
+
+    def test_write(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            shutil.copy("POSCAR", tmpdir)
+            write_disturbs_vasp(os.path.join(tmpdir, "POSCAR"), 3, 0.01, 0.03)
+            for ii in range(3):
+                atoms = ase.io.read(
+                    os.path.join(tmpdir, f"{ii + 1:06d}", "POSCAR"), format="vasp"
+                )
+                self.assertEqual(
+                    atoms.get_chemical_symbols(), self.atoms.get_chemical_symbols()
+                )
+                self.assertAlmostEqual(
+                    atoms.get_volume(), self.atoms.get_volume(), delta=0.2 * 68.921
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -157,6 +157,30 @@ class Test(unittest.TestCase):
             self.assertEqual(len(i.attribute), len(j.attribute))
         os.remove(os.path.join(self.cwd, "dpgen_db.json"))
 
+    def testParsingVaspResume(self):
+        output = os.path.join(self.cwd, "dpgen_db.jsonl")
+        parsing_vasp(
+            self.cwd, self.config_info_dict, True, output, id_prefix="pku", nproc=2
+        )
+        with open(output) as fp:
+            lines = fp.readlines()
+        self.assertEqual(len(lines), 2)
+        entry = Entry.from_dict(json.loads(lines[1]))
+        self.assertEqual(entry.entry_id, "pku_1")
+        self.assertEqual(entry.attribute["core"], 16)
+        self.assertEqual(entry.attribute["wall_time"], 1858.005)
+        with open("record.database") as fp:
+            self.assertEqual(fp.read(), "iter.000000\n")
+        # a finished iteration before the last one is not collected again
+        with open("record.database", "a") as fp:
+            fp.write("iter.000001\n")
+        shard = os.path.join(output + ".shards", "iter.000000.jsonl")
+        with open(shard, "w") as fp:
+            fp.write(lines[0])
+        parsing_vasp(self.cwd, self.config_info_dict, True, output, id_prefix="pku")
+        with open(output) as fp:
+            self.assertEqual(len(fp.readlines()), 1)
+
     def tearDown(self):
         for path in [self.r_init_path, self.r_iter_path, self.data]:
             if os.path.isdir(path):
@@ -165,3 +189,8 @@ class Test(unittest.TestCase):
             os.remove("dpgen.log")
         if os.path.isfile("record.database"):
             os.remove("record.database")
+        for output in ["dpgen_db.json", "dpgen_db.jsonl"]:
+            if os.path.isdir(output + ".shards"):
+                shutil.rmtree(output + ".shards")
+            if os.path.isfile(output):
+                os.remove(output)
@@ -3,10 +3,22 @@ import sys
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 from dpgen.generator.lib.ele_temp import NBandsEsti  # noqa: F401
-from dpgen.generator.lib.gaussian import _crd2frag, detect_multiplicity  # noqa: F401
+from dpgen.generator.lib.fingerprint import (  # noqa: F401
+    farthest_point_sampling,
+    structure_fingerprint,
+)
+from dpgen.generator.lib.gaussian import (  # noqa: F401
+    _crd2frag,
+    detect_multiplicity,
+    take_cluster,
+    take_clusters,
+)
 from dpgen.generator.lib.lammps import (
     get_all_dumped_forces,  # noqa: F401
+    get_dump_frame_index,  # noqa: F401
     get_dumped_forces,  # noqa: F401
+    get_dumped_forces_square_sum,  # noqa: F401
+    read_dump_frame,  # noqa: F401
 )
 from dpgen.generator.lib.make_calypso import (
     make_calypso_input,  # noqa: F401
@@ -1,8 +1,11 @@
+import json
 import os
+import shutil
 import sys
 import unittest
 from pathlib import Path
 
+import dpdata
 import numpy as np
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -13,6 +16,7 @@ from .context import (
     _parse_calypso_input,
     make_calypso_input,
     setUpModule,  # noqa: F401
+    write_calypso_poscar,
     write_model_devi_out,
 )
 
@@ -175,5 +179,28 @@ class TestCALYPSOScript(unittest.TestCase):
         os.remove("input.dat")
 
 
+class TestWriteCalypsoPoscar(unittest.TestCase):
+    def setUp(self):
+        self.work_path = Path("calypso_poscar_test_path")
+        if self.work_path.is_dir():
+            shutil.rmtree(self.work_path)
+        self.system = dpdata.System("data/deepmd", fmt="deepmd/raw")
+        self.system.to("deepmd/npy", str(self.work_path / "000.structures"))
+        (self.work_path / "task.000.001" / "traj").mkdir(parents=True)
+        with open(self.work_path / "task.000.001" / "frames.json", "w") as fp:
+            json.dump({"structures": "000.structures", "start": 1}, fp)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_path)
+
+    def test_write_calypso_poscar(self):
+        conf_name = str(self.work_path / "task.000.001" / "traj" / "1.poscar")
+        write_calypso_poscar(conf_name, self.system["atom_names"])
+        poscar = dpdata.System(conf_name, fmt="vasp/poscar")
+        np.testing.assert_allclose(
+            poscar["coords"][0], self.system["coords"][2], atol=1e-6
+        )
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
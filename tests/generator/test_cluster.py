@@ -13,6 +13,7 @@ from .context import (
     _crd2frag,
     setUpModule,  # noqa: F401
     take_cluster,
+    take_clusters,
 )
 
 
@@ -39,6 +40,107 @@ class Test_take_cluster_minify(unittest.TestCase, CompSys):
         self.places = 0
 
 
+def _take_cluster_ref(old_conf_name, type_map, idx, jdata):
+    # the original implementation of take_cluster, which cuts the cluster
+    # around one atom from the whole distance vector
+    from ase import Atom, Atoms
+
+    cutoff = jdata["cluster_cutoff"]
+    cutoff_hard = jdata.get("cluster_cutoff_hard", None)
+    sys = dpdata.System(old_conf_name, fmt="lammps/dump", type_map=type_map)
+    atom_names = sys["atom_names"]
+    atom_types = sys["atom_types"]
+    cell = sys["cells"][0]
+    coords = sys["coords"][0]
+    symbols = [atom_names[atom_type] for atom_type in atom_types]
+    # detect fragment
+    frag_numb, frag_index, graph = _crd2frag(
+        symbols, coords, True, cell, return_bonds=True
+    )
+    # get_distances
+    all_atoms = Atoms(symbols=symbols, positions=coords, pbc=True, cell=cell)
+    all_atoms[idx].tag = 1
+    distances = all_atoms.get_distances(idx, range(len(all_atoms)), mic=True)
+    distancescutoff = distances < cutoff
+    cutoff_atoms_idx = np.where(distancescutoff)[0]
+    if cutoff_hard is not None:
+        distancescutoff_hard = distances < cutoff_hard
+        cutoff_atoms_idx_hard = np.where(distancescutoff_hard)[0]
+    # make cutoff atoms in molecules
+    taken_atoms_idx = []
+    added = []
+    for ii in range(frag_numb):
+        frag_atoms_idx = np.where(frag_index == ii)[0]
+        if cutoff_hard is not None:
+            # drop atoms out of the hard cutoff anyway
+            frag_atoms_idx = np.intersect1d(frag_atoms_idx, cutoff_atoms_idx_hard)
+        if np.any(np.isin(frag_atoms_idx, cutoff_atoms_idx)):
+            if "cluster_minify" in jdata and jdata["cluster_minify"]:
+                # support for organic species
+                take_frag_idx = []
+                for aa in frag_atoms_idx:
+                    if np.any(np.isin(aa, cutoff_atoms_idx)):
+                        take_frag_idx.append(aa)
+                    elif np.count_nonzero(
+                        np.logical_and(distancescutoff, graph.toarray()[aa] == 1)
+                    ):
+                        if all_atoms[aa].symbol == "H":
+                            take_frag_idx.append(aa)
+                        else:
+                            near_atom_idx = np.nonzero(
+                                np.logical_and(distancescutoff, graph.toarray()[aa] > 0)
+                            )[0][0]
+                            vector = (
+                                all_atoms[aa].position
+                                - all_atoms[near_atom_idx].position
+                            )
+                            new_position = (
+                                all_atoms[near_atom_idx].position
+                                + vector / np.linalg.norm(vector) * 1.09
+                            )
+                            added.append(Atom("H", new_position))
+                    elif np.count_nonzero(
+                        np.logical_and(distancescutoff, graph.toarray()[aa] > 1)
+                    ):
+                        take_frag_idx = frag_atoms_idx
+                        break
+            else:
+                take_frag_idx = frag_atoms_idx
+            taken_atoms_idx.append(take_frag_idx)
+    all_taken_atoms_idx = np.concatenate(taken_atoms_idx)
+    # wrap
+    cutoff_atoms = sum(added, all_atoms[all_taken_atoms_idx])
+    cutoff_atoms.wrap(center=coords[idx] / cutoff_atoms.cell.cellpar()[0:3], pbc=True)
+    coords = cutoff_atoms.get_positions()
+    sys.data["coords"] = np.array([coords])
+    sys.data["atom_types"] = np.array(
+        list(atom_types[all_taken_atoms_idx]) + [atom_names.index("H")] * len(added)
+    )
+    sys.data["atom_pref"] = np.array([cutoff_atoms.get_tags()])
+    for ii, _ in enumerate(atom_names):
+        sys.data["atom_numbs"][ii] = np.count_nonzero(sys.data["atom_types"] == ii)
+    return sys
+
+
+@unittest.skipIf(importlib.util.find_spec("openbabel") is None, "requires openbabel")
+class TestTakeClusters(unittest.TestCase):
+    def test_same_as_reference(self):
+        type_map = ["C", "H"]
+        idxs = [0, 17, 1125]
+        for jdata in (
+            {"cluster_cutoff": 3.5},
+            {"cluster_cutoff": 3.5, "cluster_cutoff_hard": 5.0, "cluster_minify": True},
+        ):
+            clusters = take_clusters("cluster/14400.lammpstrj", type_map, idxs, jdata)
+            self.assertEqual(len(clusters), len(idxs))
+            for idx, cluster in zip(idxs, clusters):
+                ref = _take_cluster_ref("cluster/14400.lammpstrj", type_map, idx, jdata)
+                np.testing.assert_array_equal(cluster["atom_types"], ref["atom_types"])
+                np.testing.assert_array_equal(cluster["atom_pref"], ref["atom_pref"])
+                np.testing.assert_allclose(cluster["coords"], ref["coords"])
+                self.assertEqual(np.count_nonzero(cluster["atom_pref"]), 1)
+
+
 class TestCrd2Frag(unittest.TestCase):
     def test_crd2frag_pbc(self):
         crds = np.array([[0.0, 0.0, 0.0], [19.0, 19.0, 19.0]])
@@ -0,0 +1,197 @@
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import dpdata
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "generator"
+from dpgen.generator.lib.fp_cache import (
+    FPCache,
+    cache_key_name,
+    fp_params_hash,
+    structure_key,
+)
+from dpgen.generator.lib.vasp import read_outcar_converged
+from dpgen.generator.run import _make_fp_cache_hits
+
+from .context import (
+    param_file,
+    post_fp_check_fail,
+    post_fp_vasp,
+    setUpModule,  # noqa: F401
+)
+
+
+def _make_system(perm=None, shift=None, seed=0):
+    rng = np.random.default_rng(seed)
+    atom_types = np.array([0, 0, 1, 1])
+    coords = rng.uniform(0.0, 4.0, size=(1, 4, 3))
+    forces = rng.normal(size=(1, 4, 3))
+    if perm is not None:
+        atom_types = atom_types[perm]
+        coords = coords[:, perm]
+        forces = forces[:, perm]
+    if shift is not None:
+        coords = coords + shift
+    return dpdata.LabeledSystem(
+        data={
+            "atom_names": ["Mg", "Al"],
+            "atom_numbs": [2, 2],
+            "atom_types": atom_types,
+            "orig": np.zeros(3),
+            "cells": 4.0 * np.eye(3)[None],
+            "coords": coords,
+            "energies": np.array([-1.5]),
+            "forces": forces,
+            "virials": np.ones((1, 3, 3)),
+        }
+    )
+
+
+class TestStructureKey(unittest.TestCase):
+    def test_invariance(self):
+        key = structure_key(_make_system(), "params")
+        # the order of atoms
+        self.assertEqual(key, structure_key(_make_system(perm=[3, 1, 0, 2]), "params"))
+        # the periodic images and the noise below the tolerance
+        shift = np.array([[4.0, 0.0, -4.0], [0.0, 1e-6, 0.0], [0.0] * 3, [0.0] * 3])
+        self.assertEqual(key, structure_key(_make_system(shift=shift), "params"))
+        self.assertNotEqual(
+            key, structure_key(_make_system(shift=shift), "params", tol=1e-7)
+        )
+        self.assertNotEqual(key, structure_key(_make_system(seed=1), "params"))
+
+    def test_params(self):
+        system = _make_system()
+        key = structure_key(system, "params")
+        self.assertNotEqual(key, structure_key(system, "other"))
+        self.assertNotEqual(
+            key, structure_key(system, "params", extra={"ele_temp": 0.1})
+        )
+
+    def test_fp_params_hash(self):
+        jdata = {"fp_style": "vasp", "fp_task_max": 10, "model_devi_skip": 0}
+        ref = fp_params_hash(jdata)
+        self.assertEqual(ref, fp_params_hash({**jdata, "fp_task_max": 20}))
+        self.assertEqual(ref, fp_params_hash({**jdata, "model_devi_skip": 1}))
+        self.assertNotEqual(ref, fp_params_hash({**jdata, "fp_style": "cp2k"}))
+
+
+class TestFPCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "cache", "fp_cache.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_get_put(self):
+        system = _make_system()
+        with FPCache(self.path) as cache:
+            self.assertIsNone(cache.get("key"))
+            cache.put([("key", system)])
+        with FPCache(self.path) as cache:
+            cached = cache.get("key")
+        self.assertEqual(cached["atom_names"], ["Mg", "Al"])
+        self.assertEqual(cached["atom_numbs"], [2, 2])
+        self.assertFalse(cached.nopbc)
+        for kk in ["atom_types", "cells", "coords", "energies", "forces", "virials"]:
+            np.testing.assert_allclose(cached[kk], system[kk])
+
+    def test_evict(self):
+        with FPCache(self.path) as cache:
+            cache.put([("key0", _make_system(seed=0))])
+            cache.put([("key1", _make_system(seed=1))])
+            # key0 becomes the most recently used one
+            cache.get("key0")
+            size = cache.conn.execute("SELECT MAX(size) FROM labels").fetchone()[0]
+            cache.max_size = 2 * size
+            cache.put([("key2", _make_system(seed=2))])
+            self.assertEqual(len(cache), 2)
+            self.assertIsNone(cache.get("key1"))
+            self.assertIsNotNone(cache.get("key0"))
+            self.assertIsNotNone(cache.get("key2"))
+
+
+class TestFPCacheVasp(unittest.TestCase):
+    def setUp(self):
+        if os.path.isdir("iter.000000"):
+            shutil.rmtree("iter.000000")
+        with open(param_file) as fp:
+            self.jdata = json.load(fp)
+        self.jdata["fp_cache"] = "fp_cache.db"
+        self._make_tasks()
+
+    def tearDown(self):
+        shutil.rmtree("iter.000000")
+        os.remove("fp_cache.db")
+
+    def _make_tasks(self):
+        if os.path.isdir("iter.000000"):
+            shutil.rmtree("iter.000000")
+        shutil.copytree("out_data_post_fp_vasp", "iter.000000")
+        for outcar in sorted(
+            os.path.join("iter.000000/02.fp", ii, "OUTCAR")
+            for ii in os.listdir("iter.000000/02.fp")
+        ):
+            # no electron temperature in this test
+            os.remove(outcar.replace("OUTCAR", "job.json"))
+            # task.001.000001 is a failed task, which is not looked up
+            system, nframes = read_outcar_converged(
+                outcar, type_map=self.jdata["type_map"]
+            )
+            if nframes == 1:
+                system.to("vasp/poscar", outcar.replace("OUTCAR", "POSCAR"))
+
+    def test_make_post(self):
+        # nothing is cached in the first run
+        _make_fp_cache_hits(0, self.jdata)
+        tasks = sorted(os.listdir("iter.000000/02.fp"))
+        self.assertEqual(len(tasks), 4)
+        for ii in tasks[:3]:
+            self.assertTrue(
+                os.path.isfile(os.path.join("iter.000000/02.fp", ii, cache_key_name))
+            )
+        post_fp_vasp(0, self.jdata, rfailed=0.3)
+        ref = dpdata.LabeledSystem("iter.000000/02.fp/data.000", fmt="deepmd/npy")
+        with FPCache("fp_cache.db") as cache:
+            # task.000.000001 and task.001.000000 share the structure
+            self.assertEqual(len(cache), 2)
+
+        # the finished tasks are taken from the cache in the second run
+        self._make_tasks()
+        _make_fp_cache_hits(0, self.jdata)
+        self.assertEqual(
+            sorted(glob.glob("iter.000000/02.fp/task.*")),
+            ["iter.000000/02.fp/task.001.000001"],
+        )
+        cached = dpdata.MultiSystems().from_deepmd_npy(
+            "iter.000000/02.fp/data.cached.000", labeled=True
+        )
+        self.assertEqual(cached.get_nframes(), 2)
+        cached = cached[0]
+        order = np.argsort(cached["energies"])
+        ref_order = np.argsort(ref["energies"])
+        for kk in ["energies", "forces", "virials", "coords"]:
+            np.testing.assert_allclose(cached[kk][order], ref[kk][ref_order])
+        # 3 cached frames out of 4 tasks
+        post_fp_check_fail(0, self.jdata, rfailed=0.3)
+        with self.assertRaises(RuntimeError):
+            post_fp_check_fail(0, self.jdata, rfailed=0.2)
+
+        # the fp parameters are part of the key
+        self._make_tasks()
+        self.jdata["fp_params"] = {"encut": 600}
+        _make_fp_cache_hits(0, self.jdata)
+        self.assertEqual(glob.glob("iter.000000/02.fp/data.cached.*"), [])
+        self.assertEqual(len(glob.glob("iter.000000/02.fp/task.*")), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,7 +9,10 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 __package__ = "generator"
 from .context import (
     get_all_dumped_forces,
+    get_dump_frame_index,
     get_dumped_forces,
+    get_dumped_forces_square_sum,
+    read_dump_frame,
     setUpModule,  # noqa: F401
 )
 
@@ -110,3 +113,23 @@ ITEM: ATOMS id type x y z fx fy fz
         ff = ff.reshape([-1])
         for ii in range(12):
             self.assertAlmostEqual(ff[ii], self.expected_f[ii])
+
+    def test_square_sum(self):
+        sum_f2, count = get_dumped_forces_square_sum("tmp.dump")
+        self.assertEqual(count, 4)
+        self.assertAlmostEqual(sum_f2, np.sum(np.square(self.expected_f)))
+
+    def test_frame_index(self):
+        index = get_dump_frame_index("tmp.dump")
+        self.assertTrue(os.path.isfile("tmp.dump.idx.npy"))
+        np.testing.assert_array_equal(index[:, 0], [0, 10])
+        # the cached index is reused
+        np.testing.assert_array_equal(get_dump_frame_index("tmp.dump"), index)
+        frame = read_dump_frame("tmp.dump", index, 1)
+        self.assertTrue(frame.startswith("ITEM: TIMESTEP\n10\n"))
+        with open("tmp.frame.dump", "w") as fp:
+            fp.write(frame)
+        ff = get_dumped_forces("tmp.frame.dump").reshape([-1])
+        np.testing.assert_allclose(ff, self.expected_f[6:])
+        os.remove("tmp.frame.dump")
+        os.remove("tmp.dump.idx.npy")
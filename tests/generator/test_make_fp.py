@@ -17,6 +17,7 @@ from pymatgen.io.vasp import Incar, Kpoints
 from .comp_sys import test_atom_names
 from .context import (
     detect_multiplicity,
+    farthest_point_sampling,
     machine_file,
     make_fp,
     make_kspacing_kpoints,
@@ -40,6 +41,7 @@ from .context import (
     ref_cp2k_file_exinput,
     ref_cp2k_file_input,
     setUpModule,  # noqa: F401
+    structure_fingerprint,
 )
 
 vasp_incar_ref = "PREC=A\n\
@@ -241,11 +243,12 @@ def _write_lammps_dump(sys, dump_file, f_idx=0):
             )
 
 
-def _make_fake_md(idx, md_descript, atom_types, type_map, ele_temp=None):
+def _make_fake_md(idx, md_descript, atom_types, type_map, ele_temp=None, cell=None):
     """md_descript: list of dimension
                  [n_sys][n_MD][n_frame]
     ele_temp: list of dimension
-                 [n_sys][n_MD].
+                 [n_sys][n_MD]
+    cell: the cell of all the frames; random if not given.
     """
     natoms = len(atom_types)
     ntypes = len(type_map)
@@ -258,7 +261,10 @@ def _make_fake_md(idx, md_descript, atom_types, type_map, ele_temp=None):
     for sidx, ss in enumerate(md_descript):
         for midx, mm in enumerate(ss):
             nframes = len(mm)
-            cells = np.random.random([nframes, 3, 3])
+            if cell is None:
+                cells = np.random.random([nframes, 3, 3])
+            else:
+                cells = np.tile(cell, (nframes, 1, 1))
             coords = np.random.random([nframes, natoms, 3])
             sys.data["coords"] = coords
             sys.data["cells"] = cells
@@ -940,6 +946,142 @@ class TestMakeFPVasp(unittest.TestCase):
         # _check_potcar(self, 0, jdata['fp_pp_path'], jdata['fp_pp_files'])
         shutil.rmtree("iter.000000")
 
+    def test_make_fp_vasp_fps(self):
+        setUpModule()
+        if os.path.isdir("iter.000000"):
+            shutil.rmtree("iter.000000")
+        with open(param_file) as fp:
+            jdata = json.load(fp)
+        jdata["fp_candidate_select"] = "fps"
+        jdata["fp_task_max"] = 4
+        md_descript = []
+        nsys = 2
+        nmd = 3
+        for ii in range(nsys):
+            tmp = []
+            for jj in range(nmd):
+                tmp.append(np.arange(0, 0.29, 0.29 / 10))
+            md_descript.append(tmp)
+        atom_types = [0, 1, 0, 1]
+        type_map = jdata["type_map"]
+        # the fingerprints count the periodic images within the cutoff, so
+        # the random cells of a fraction of Angstrom are not used
+        _make_fake_md(0, md_descript, atom_types, type_map, cell=4.0 * np.eye(3))
+        make_fp(0, jdata, {})
+        for ss in range(nsys):
+            # the candidates in the shuffled order, from which fps starts
+            with open(f"iter.000000/02.fp/candidate.shuffled.{ss:03d}.out") as fp:
+                candidates = [line.split() for line in fp]
+            fingerprints = []
+            for tt, ff in candidates:
+                system = dpdata.System(
+                    os.path.join(tt, "traj", f"{ff}.lammpstrj"),
+                    fmt="lammps/dump",
+                    type_map=type_map,
+                )
+                fingerprints.append(
+                    structure_fingerprint(
+                        system["cells"][0],
+                        system["coords"][0],
+                        system["atom_types"],
+                        len(type_map),
+                    )
+                )
+            selected = farthest_point_sampling(np.array(fingerprints), 4)
+            ref = sorted(
+                os.path.realpath(
+                    os.path.join(
+                        candidates[ii][0], "traj", f"{candidates[ii][1]}.lammpstrj"
+                    )
+                )
+                for ii in selected
+            )
+            tasks = glob.glob(f"iter.000000/02.fp/task.{ss:03d}.*")
+            self.assertEqual(len(tasks), 4)
+            self.assertEqual(
+                sorted(os.path.realpath(os.path.join(tt, "conf.dump")) for tt in tasks),
+                ref,
+            )
+        _check_incar(self, 0)
+        shutil.rmtree("iter.000000")
+
+    def test_make_fp_vasp_sys_idx(self):
+        setUpModule()
+        if os.path.isdir("iter.000000"):
+            shutil.rmtree("iter.000000")
+        with open(param_file) as fp:
+            jdata = json.load(fp)
+        md_descript = []
+        nsys = 2
+        nmd = 3
+        for ii in range(nsys):
+            tmp = []
+            for jj in range(nmd):
+                tmp.append(np.arange(0, 0.29, 0.29 / 10))
+            md_descript.append(tmp)
+        atom_types = [0, 1, 0, 1]
+        type_map = jdata["type_map"]
+        _make_fake_md(0, md_descript, atom_types, type_map)
+        fp_path = os.path.join("iter.000000", "02.fp")
+        make_fp(0, jdata, {}, sys_idx=1)
+        self.assertEqual(glob.glob(os.path.join(fp_path, "task.000.*")), [])
+        sys1_tasks = sorted(glob.glob(os.path.join(fp_path, "task.001.*")))
+        self.assertGreater(len(sys1_tasks), 0)
+        # making the other system keeps the existing tasks
+        make_fp(0, jdata, {}, sys_idx=0)
+        self.assertEqual(
+            sorted(glob.glob(os.path.join(fp_path, "task.001.*"))), sys1_tasks
+        )
+        self.assertEqual(
+            len(glob.glob(os.path.join(fp_path, "task.000.*"))), len(sys1_tasks)
+        )
+        _check_sel(
+            self,
+            0,
+            jdata["fp_task_max"],
+            jdata["model_devi_f_trust_lo"],
+            jdata["model_devi_f_trust_hi"],
+        )
+        _check_poscars(self, 0, jdata["fp_task_max"], jdata["type_map"])
+        _check_incar(self, 0)
+        _check_kpoints(self, 0)
+        shutil.rmtree("iter.000000")
+
+    def test_make_fp_vasp_skip_bad_box(self):
+        setUpModule()
+        if os.path.isdir("iter.000000"):
+            shutil.rmtree("iter.000000")
+        with open(param_file) as fp:
+            jdata = json.load(fp)
+        md_descript = []
+        nsys = 2
+        nmd = 3
+        for ii in range(nsys):
+            tmp = []
+            for jj in range(nmd):
+                tmp.append(np.arange(0, 0.29, 0.29 / 10))
+            md_descript.append(tmp)
+        atom_types = [0, 1, 0, 1]
+        type_map = jdata["type_map"]
+        _make_fake_md(0, md_descript, atom_types, type_map)
+        fp_path = os.path.join("iter.000000", "02.fp")
+        # no box passes a length ratio below one
+        jdata["fp_skip_bad_box"] = "length_ratio:0.5"
+        make_fp(0, jdata, {})
+        self.assertEqual(glob.glob(os.path.join(fp_path, "task.*")), [])
+        # every box passes
+        jdata["fp_skip_bad_box"] = "length_ratio:1e10"
+        make_fp(0, jdata, {})
+        _check_sel(
+            self,
+            0,
+            jdata["fp_task_max"],
+            jdata["model_devi_f_trust_lo"],
+            jdata["model_devi_f_trust_hi"],
+        )
+        _check_poscars(self, 0, jdata["fp_task_max"], jdata["type_map"])
+        shutil.rmtree("iter.000000")
+
     def test_make_fp_vasp_merge_traj(self):
         setUpModule()
         if os.path.isdir("iter.000000"):
@@ -10,7 +10,11 @@ import unittest
 import dpdata
 import numpy as np
 
-from dpgen.generator.run import _read_model_devi_file, parse_cur_job_sys_revmat
+from dpgen.generator.run import (
+    _read_model_devi_file,
+    load_model_devi,
+    parse_cur_job_sys_revmat,
+)
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 __package__ = "generator"
@@ -28,6 +32,7 @@ from .context import (
     param_pimd_file,
     parse_cur_job,
     parse_cur_job_revmat,
+    pipeline_record,
     revise_by_keys,
     revise_lmp_input_dump,
     revise_lmp_input_model,
@@ -155,7 +160,11 @@ class TestMakeModelDevi(unittest.TestCase):
         with open(machine_file) as fp:
             mdata = json.load(fp)
         _make_fake_models(0, jdata["numb_models"])
+        # the pipeline record of a previous run is removed
+        with open(os.path.join("iter.000000", pipeline_record), "w") as fp:
+            json.dump({"000": "done"}, fp)
         make_model_devi(0, jdata, mdata)
+        self.assertFalse(os.path.exists(os.path.join("iter.000000", pipeline_record)))
         _check_pb(self, 0)
         _check_confs(self, 0, jdata)
         _check_traj_dir(self, 0)
@@ -311,6 +320,51 @@ class TestMakeModelDevi(unittest.TestCase):
             self.assertTrue(
                 os.path.isfile(os.path.join(path, f"traj/{istep}.lammpstrj"))
             )
+        # the second read uses the merged sidecar instead of merging again
+        self.assertTrue(os.path.isfile(os.path.join(path, "model_devi.npy")))
+        model_devi = _read_model_devi_file(path)
+        np.testing.assert_array_almost_equal(model_devi, model_devi_total_array)
+        self.assertEqual(
+            len(glob.glob(os.path.join(path, "traj/*.lammpstrj"))), len(total_steps)
+        )
+
+    def test_load_model_devi(self):
+        path = "test_load_model_devi"
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        fname = os.path.join(path, "model_devi.out")
+        model_devi_array = np.random.default_rng(0).uniform(size=[5, 7])
+        np.savetxt(fname, model_devi_array, header="step max_devi_v")
+        model_devi = load_model_devi(fname)
+        np.testing.assert_array_almost_equal(model_devi, model_devi_array)
+        npy_name = os.path.join(path, "model_devi.npy")
+        self.assertTrue(os.path.isfile(npy_name))
+        # the sidecar is memory-mapped and used without parsing the text
+        with open(fname, "w") as f:
+            f.write("not a number\n")
+        os.utime(fname, ns=(0, 0))
+        model_devi = load_model_devi(fname)
+        self.assertIsInstance(model_devi, np.memmap)
+        np.testing.assert_array_almost_equal(model_devi, model_devi_array)
+        # a modified text file is parsed again
+        np.savetxt(fname, model_devi_array[:2])
+        os.utime(npy_name, ns=(0, 0))
+        model_devi = load_model_devi(fname)
+        np.testing.assert_array_almost_equal(model_devi, model_devi_array[:2])
+        shutil.rmtree(path)
+
+    def test_read_model_devi_file_avg_relative_no_traj(self):
+        path = "test_model_devi_avgf"
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(os.path.join(path, "traj"))
+        np.savetxt(os.path.join(path, "model_devi.out"), np.ones([3, 7]))
+        # no frame to average the forces over
+        model_devi = _read_model_devi_file(path, model_devi_f_avg_relative=True)
+        self.assertTrue(np.all(np.isnan(model_devi[:, 4:7])))
+        np.testing.assert_array_equal(model_devi[:, :4], np.ones([3, 4]))
+        shutil.rmtree(path)
 
 
 class TestMakeModelDeviRevMat(unittest.TestCase):
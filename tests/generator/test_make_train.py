@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import copy
 import glob
 import json
 import os
@@ -8,6 +9,7 @@ import sys
 import unittest
 
 import dpdata
+import h5py
 import numpy as np
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -23,6 +25,7 @@ from .context import (
     param_file_v1_et,
     run_train,
     setUpModule,  # noqa: F401
+    update_data_manifest,
 )
 
 
@@ -321,6 +324,70 @@ class TestMakeTrain(unittest.TestCase):
         shutil.rmtree("iter.000001")
         shutil.rmtree("iter.000000")
 
+    def test_1_data_v1_manifest(self):
+        with open(param_file_v1) as fp:
+            jdata = json.load(fp)
+            jdata.pop("use_ele_temp", None)
+        with open(machine_file_v1) as fp:
+            mdata = json.load(fp)
+        make_train(0, jdata, mdata)
+        _make_fake_fp(0, 0, jdata["fp_task_min"])
+        update_data_manifest(0)
+        with open("data_manifest.json") as fp:
+            manifest = json.load(fp)
+        systems = manifest["iter.000000"]["data"]["data.000"]
+        self.assertEqual(len(systems), 1)
+        self.assertEqual(systems[0]["path"], "iter.000000/02.fp/data.000")
+        self.assertEqual(systems[0]["nframes"], jdata["fp_task_min"])
+        self.assertIn("type.raw", systems[0]["files"])
+        self.assertIn("set.000", systems[0]["files"])
+        make_train(1, jdata, mdata)
+        _check_model_inputs_v1(self, 1, copy.deepcopy(jdata))
+        # the number of frames is read from the manifest
+        systems[0]["nframes"] = jdata["fp_task_min"] - 1
+        with open("data_manifest.json", "w") as fp:
+            json.dump(manifest, fp)
+        shutil.rmtree("iter.000001")
+        make_train(1, jdata, mdata)
+        with open(os.path.join("iter.000001", "00.train", "000", "input.json")) as fp:
+            jinput = json.load(fp)
+        self.assertNotIn(
+            "../data.iters/iter.000000/02.fp/data.000",
+            jinput["training"]["systems"],
+        )
+        # a modified 02.fp is scanned again
+        stat = os.stat(os.path.join("iter.000000", "02.fp"))
+        os.utime(
+            os.path.join("iter.000000", "02.fp"),
+            ns=(stat.st_atime_ns, stat.st_mtime_ns + 1),
+        )
+        shutil.rmtree("iter.000001")
+        make_train(1, jdata, mdata)
+        _check_model_inputs_v1(self, 1, copy.deepcopy(jdata))
+        # so is a system rewritten in place, which does not modify 02.fp
+        with open("data_manifest.json") as fp:
+            manifest = json.load(fp)
+        manifest["iter.000000"]["data"]["data.000"][0]["nframes"] = (
+            jdata["fp_task_min"] - 1
+        )
+        with open("data_manifest.json", "w") as fp:
+            json.dump(manifest, fp)
+        coord = os.path.join("iter.000000", "02.fp", "data.000", "set.000", "coord.npy")
+        mtime = manifest["iter.000000"]["mtime"] + 1
+        os.utime(coord, ns=(mtime, mtime))
+        shutil.rmtree("iter.000001")
+        make_train(1, jdata, mdata)
+        with open(os.path.join("iter.000001", "00.train", "000", "input.json")) as fp:
+            jinput = json.load(fp)
+        self.assertIn(
+            "../data.iters/iter.000000/02.fp/data.000",
+            jinput["training"]["systems"],
+        )
+        # remove testing dirs
+        shutil.rmtree("iter.000001")
+        shutil.rmtree("iter.000000")
+        os.remove("data_manifest.json")
+
     def test_1_data_reuse_v1(self):
         with open(param_file_v1) as fp:
             jdata = json.load(fp)
@@ -521,9 +588,27 @@ class TestMakeTrain(unittest.TestCase):
                 },
             )
 
+        # the systems of iteration 0 are not copied again
+        with h5py.File("train_data.hdf5", "r") as f:
+            ingested = json.loads(f.attrs["ingested"])
+            self.assertEqual(
+                sorted(ingested.keys()),
+                [
+                    "data.init/deepmd",
+                    "data.init/deepmd.hdf5",
+                    "data.iters/iter.000000/02.fp/data.000",
+                ],
+            )
+            sys0 = dpdata.LabeledSystem("data/deepmd", fmt="deepmd/npy")
+            sys1 = dpdata.LabeledSystem(
+                "iter.000001/00.train/data.hdf5#/data.init/deepmd", fmt="deepmd/hdf5"
+            )
+            np.testing.assert_allclose(sys0["coords"], sys1["coords"], rtol=1e-6)
+            np.testing.assert_allclose(sys0["energies"], sys1["energies"], rtol=1e-6)
         # remove testing dirs
         shutil.rmtree("iter.000001")
         shutil.rmtree("iter.000000")
+        os.remove("train_data.hdf5")
 
     def test_training_finetune_model(self):
         """Test `training_finetune_model`."""
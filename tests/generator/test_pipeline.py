@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "generator"
+from .context import (
+    pipeline_record,
+    run_model_devi_fp_pipeline,
+    setUpModule,  # noqa: F401
+)
+
+
+class FakeSubmission:
+    """A submission finishing after a number of polls."""
+
+    def __init__(self, name, npolls, events):
+        self.name = name
+        self.npolls = npolls
+        self.events = events
+        self.nuploads = 0
+
+    def update_submission_state(self):
+        self.npolls -= 1
+
+    def handle_unexpected_submission_state(self):
+        pass
+
+    def check_all_finished(self):
+        return self.npolls <= 0
+
+    def run_submission(self, exit_on_submit=False):
+        if exit_on_submit:
+            self.nuploads += 1
+        else:
+            self.events.append(("download", self.name))
+
+
+class TestModelDeviFPPipeline(unittest.TestCase):
+    def setUp(self):
+        self.iter_name = "iter.000000"
+        if os.path.isdir(self.iter_name):
+            shutil.rmtree(self.iter_name)
+        for ss in ["000", "001"]:
+            os.makedirs(
+                os.path.join(self.iter_name, "01.model_devi", f"task.{ss}.000000")
+            )
+        self.jdata = {"fp_style": "vasp"}
+        self.events = []
+        self.submissions = []
+
+    def tearDown(self):
+        shutil.rmtree(self.iter_name)
+
+    def _submit(self, stage, npolls):
+        def submit(iter_index, jdata, mdata, sys_idx=None, exit_on_submit=False):
+            self.assertTrue(exit_on_submit)
+            self.events.append((stage, sys_idx))
+            submission = FakeSubmission((stage, sys_idx), npolls[sys_idx], self.events)
+            submission.run_submission(exit_on_submit=True)
+            self.submissions.append(submission)
+            return submission
+
+        return submit
+
+    def _run(self, md_polls, fp_polls):
+        def make_fp(iter_index, jdata, mdata, sys_idx=None):
+            self.events.append(("make_fp", sys_idx))
+
+        def post_fp(iter_index, jdata, sys_idx=None, rfailed=None):
+            self.events.append(("post_fp", sys_idx))
+
+        with (
+            mock.patch(
+                "dpgen.generator.run.run_md_model_devi",
+                self._submit("model_devi", md_polls),
+            ),
+            mock.patch("dpgen.generator.run.run_fp", self._submit("fp", fp_polls)),
+            mock.patch("dpgen.generator.run.make_fp", make_fp),
+            mock.patch("dpgen.generator.run.post_fp_calculation", post_fp),
+            mock.patch("dpgen.generator.run.pipeline_check_interval", 0),
+        ):
+            run_model_devi_fp_pipeline(0, self.jdata, {})
+
+    def test_pipeline(self):
+        self._run([3, 1], [1, 1])
+        # system 1 goes on to fp before system 0 finishes model_devi
+        self.assertLess(
+            self.events.index(("post_fp", 1)),
+            self.events.index(("download", ("model_devi", 0))),
+        )
+        for ss in [0, 1]:
+            self.assertLess(
+                self.events.index(("download", ("model_devi", ss))),
+                self.events.index(("make_fp", ss)),
+            )
+            self.assertLess(
+                self.events.index(("download", ("fp", ss))),
+                self.events.index(("post_fp", ss)),
+            )
+        # the files are uploaded once and the results are downloaded once
+        self.assertEqual(len(self.submissions), 4)
+        for submission in self.submissions:
+            self.assertEqual(submission.nuploads, 1)
+            self.assertEqual(self.events.count(("download", submission.name)), 1)
+        with open(os.path.join(self.iter_name, pipeline_record)) as fp:
+            self.assertEqual(json.load(fp), {"000": "done", "001": "done"})
+
+    def test_restart(self):
+        with open(os.path.join(self.iter_name, pipeline_record), "w") as fp:
+            json.dump({"000": "done", "001": "fp"}, fp)
+        self._run([1, 1], [1, 1])
+        self.assertEqual(
+            self.events, [("fp", 1), ("download", ("fp", 1)), ("post_fp", 1)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -24,6 +24,7 @@ from .context import (
     param_siesta_file,
     post_fp,
     post_fp_vasp,
+    read_outcar_converged,
     setup_ele_temp,
     setUpModule,  # noqa: F401
 )
@@ -176,6 +177,43 @@ class TestPostFPVasp(unittest.TestCase):
         with self.assertRaises(RuntimeError):
             post_fp_vasp(0, jdata)
 
+    def test_post_fp_vasp_nproc(self):
+        with open(param_file) as fp:
+            jdata = json.load(fp)
+        jdata["use_ele_temp"] = 2
+        jdata["post_fp_nproc"] = 2
+        setup_ele_temp(True)
+        post_fp_vasp(0, jdata, rfailed=0.3)
+
+        sys = dpdata.LabeledSystem("iter.000000/02.fp/data.000/", fmt="deepmd/raw")
+        self.assertEqual(sys.get_nframes(), 2)
+        ref_sys = dpdata.LabeledSystem(
+            "iter.000000/02.fp/task.000.000000/OUTCAR", type_map=jdata["type_map"]
+        )
+        ref_sys.append(
+            dpdata.LabeledSystem(
+                "iter.000000/02.fp/task.000.000001/OUTCAR",
+                type_map=jdata["type_map"],
+            )
+        )
+        for kk in ["cells", "coords", "energies", "forces", "virials"]:
+            np.testing.assert_allclose(sys[kk], ref_sys[kk], atol=1e-6)
+        aparam = np.load("iter.000000/02.fp/data.000/set.000/aparam.npy")
+        self.assertEqual(aparam.shape, (2, 2))
+
+    def test_read_outcar_converged(self):
+        with self.assertWarns(UserWarning):
+            system, nframes = read_outcar_converged(
+                "iter.000000/02.fp/task.001.000001/OUTCAR"
+            )
+        self.assertEqual(nframes, 0)
+        self.assertEqual(system.get_nframes(), 0)
+        system, nframes = read_outcar_converged(
+            "iter.000000/02.fp/task.000.000000/OUTCAR", type_map=["Mg", "Al"]
+        )
+        self.assertEqual(nframes, 1)
+        self.assertEqual(system["atom_names"], ["Mg", "Al"])
+
 
 class TestPostFPPWSCF(unittest.TestCase, CompLabeledSys):
     def setUp(self):
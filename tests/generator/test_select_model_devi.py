@@ -0,0 +1,180 @@
+import os
+import shutil
+import sys
+import time
+import unittest
+
+import numpy as np
+
+from dpgen.generator.run import _select_by_model_devi_standard
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "generator"
+from .context import setUpModule  # noqa: F401
+
+
+def _select_by_loop(
+    modd_system_task, f_trust_lo, f_trust_hi, v_trust_lo, v_trust_hi, skip
+):
+    # the frame-by-frame loop used before the selection was vectorized
+    accurate, candidate, failed = [], [], []
+    for tt in modd_system_task:
+        all_conf = np.loadtxt(os.path.join(tt, "model_devi.out"))
+        for ii in range(all_conf.shape[0]):
+            if all_conf[ii][0] < skip:
+                continue
+            cc = int(all_conf[ii][0])
+            if (all_conf[ii][1] < v_trust_hi and all_conf[ii][1] >= v_trust_lo) or (
+                all_conf[ii][4] < f_trust_hi and all_conf[ii][4] >= f_trust_lo
+            ):
+                candidate.append([tt, cc])
+            elif (all_conf[ii][1] >= v_trust_hi) or (all_conf[ii][4] >= f_trust_hi):
+                failed.append([tt, cc])
+            elif all_conf[ii][1] < v_trust_lo and all_conf[ii][4] < f_trust_lo:
+                accurate.append([tt, cc])
+    return accurate, candidate, failed
+
+
+class TestSelectByModelDeviStandard(unittest.TestCase):
+    def setUp(self):
+        self.work_path = "test_select_model_devi"
+        if os.path.isdir(self.work_path):
+            shutil.rmtree(self.work_path)
+        rng = np.random.default_rng(0)
+        self.natoms = 5
+        self.tasks = []
+        for ii in range(3):
+            task = os.path.join(self.work_path, f"task.000.{ii:06d}")
+            os.makedirs(task)
+            nframes = 200
+            model_devi = np.zeros([nframes, 7 + self.natoms])
+            model_devi[:, 0] = np.arange(nframes) * 10
+            model_devi[:, 1:] = rng.uniform(0, 0.5, size=[nframes, 6 + self.natoms])
+            np.savetxt(os.path.join(task, "model_devi.out"), model_devi, fmt="%.6e")
+            self.tasks.append(task)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_path)
+
+    def test_same_as_loop(self):
+        ref = _select_by_loop(self.tasks, 0.1, 0.3, 0.15, 0.35, 100)
+        accurate, candidate, failed, counter = _select_by_model_devi_standard(
+            self.tasks, 0.1, 0.3, 0.15, 0.35, None, "lammps", model_devi_skip=100
+        )
+        self.assertEqual(accurate, ref[0])
+        self.assertEqual(candidate, ref[1])
+        self.assertEqual(failed, ref[2])
+        self.assertEqual(counter["accurate"], len(ref[0]))
+        self.assertEqual(counter["candidate"], len(ref[1]))
+        self.assertEqual(counter["failed"], len(ref[2]))
+
+    def test_no_detailed_report(self):
+        ref = _select_by_loop(self.tasks, 0.1, 0.3, 0.15, 0.35, 0)
+        accurate, candidate, failed, counter = _select_by_model_devi_standard(
+            self.tasks,
+            0.1,
+            0.3,
+            0.15,
+            0.35,
+            None,
+            "lammps",
+            detailed_report_make_fp=False,
+        )
+        self.assertEqual(accurate, [])
+        self.assertEqual(failed, [])
+        self.assertEqual(candidate, ref[1])
+        self.assertEqual(counter["accurate"], len(ref[0]))
+        self.assertEqual(counter["failed"], len(ref[2]))
+
+    def test_cluster_cutoff(self):
+        accurate, candidate, failed, counter = _select_by_model_devi_standard(
+            self.tasks, 0.1, 0.3, 0.1, 0.3, 5.0, "lammps", model_devi_skip=100
+        )
+        self.assertEqual(sum(counter.values()), len(self.tasks) * 190 * self.natoms)
+        self.assertEqual(counter["candidate"], len(candidate))
+        for tt in self.tasks:
+            all_conf = np.loadtxt(os.path.join(tt, "model_devi.out"))
+            steps = all_conf[:, 0].astype(int).tolist()
+            for kk, lo, hi in (
+                (accurate, -np.inf, 0.1),
+                (candidate, 0.1, 0.3),
+                (failed, 0.3, np.inf),
+            ):
+                for task, cc, jj in kk:
+                    if task != tt:
+                        continue
+                    self.assertGreaterEqual(cc, 100)
+                    value = all_conf[steps.index(cc), 7 + jj]
+                    self.assertTrue(lo <= value < hi)
+
+    def test_nan_raises(self):
+        model_devi = np.loadtxt(os.path.join(self.tasks[0], "model_devi.out"))
+        model_devi[3, 1:7] = np.nan
+        np.savetxt(
+            os.path.join(self.tasks[0], "model_devi.out"), model_devi, fmt="%.6e"
+        )
+        with self.assertRaises(RuntimeError):
+            _select_by_model_devi_standard(
+                self.tasks, 0.1, 0.3, 0.15, 0.35, None, "lammps"
+            )
+
+    def test_cached(self):
+        # the second selection reads the binary sidecars built by the first one
+        ref = _select_by_loop(self.tasks, 0.1, 0.3, 0.15, 0.35, 0)
+        for _ in range(2):
+            accurate, candidate, failed, _counter = _select_by_model_devi_standard(
+                self.tasks, 0.1, 0.3, 0.15, 0.35, None, "lammps"
+            )
+            self.assertEqual(accurate, ref[0])
+            self.assertEqual(candidate, ref[1])
+            self.assertEqual(failed, ref[2])
+
+
+@unittest.skipUnless(
+    os.environ.get("DPGEN_BENCHMARK"), "set DPGEN_BENCHMARK to run the benchmark"
+)
+class BenchmarkSelectByModelDeviStandard(unittest.TestCase):
+    # the speedup over the frame-by-frame loop is printed, not asserted, as
+    # the timing depends on the machine
+    def setUp(self):
+        self.work_path = "benchmark_select_model_devi"
+        if os.path.isdir(self.work_path):
+            shutil.rmtree(self.work_path)
+        rng = np.random.default_rng(0)
+        natoms = 100
+        self.tasks = []
+        for ii in range(20):
+            task = os.path.join(self.work_path, f"task.000.{ii:06d}")
+            os.makedirs(task)
+            nframes = 5000
+            model_devi = np.zeros([nframes, 7 + natoms])
+            model_devi[:, 0] = np.arange(nframes) * 10
+            model_devi[:, 1:] = rng.uniform(0, 0.5, size=[nframes, 6 + natoms])
+            np.savetxt(os.path.join(task, "model_devi.out"), model_devi, fmt="%.6e")
+            self.tasks.append(task)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_path)
+
+    def test_benchmark(self):
+        args = (self.tasks, 0.1, 0.3, 0.15, 0.35)
+        start = time.perf_counter()
+        ref = _select_by_loop(*args, 0)
+        loop_time = time.perf_counter() - start
+        times = []
+        # the first run parses the text files, the second one reads the
+        # binary sidecars
+        for _ in range(2):
+            start = time.perf_counter()
+            ret = _select_by_model_devi_standard(*args, None, "lammps")
+            times.append(time.perf_counter() - start)
+            self.assertEqual(ret[:3], ref)
+        print(
+            f"\nloop: {loop_time:.3f} s, vectorized: {times[0]:.3f} s "
+            f"({loop_time / times[0]:.1f}x), with sidecars: {times[1]:.3f} s "
+            f"({loop_time / times[1]:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
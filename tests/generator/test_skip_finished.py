@@ -0,0 +1,189 @@
+import functools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "generator"
+from dpgen.dispatcher.Dispatcher import make_submission
+from dpgen.generator.run import (
+    _lammps_check_fin,
+    _make_submission_skip_finished,
+    _skip_finished_tasks,
+    _train_check_fin,
+    _vasp_check_fin,
+    finished_tasks_record,
+)
+
+from .context import setUpModule  # noqa: F401
+
+
+def _write(fname, content):
+    with open(fname, "w") as fp:
+        fp.write(content)
+
+
+def _make_tasks(work_path):
+    tasks = []
+    for ii in range(4):
+        task = os.path.join(work_path, f"task.000.{ii:06d}")
+        os.makedirs(task)
+        tasks.append(task)
+    # task 0 and 2 are finished, task 1 is interrupted, task 3 is not run
+    _write(os.path.join(tasks[0], "OUTCAR"), "Elapsed time")
+    _write(os.path.join(tasks[1], "OUTCAR"), "Iteration")
+    _write(os.path.join(tasks[2], "OUTCAR"), "Elapsed time")
+    return tasks
+
+
+class TestSkipFinishedTasks(unittest.TestCase):
+    def setUp(self):
+        self.work_path = tempfile.mkdtemp()
+        self.tasks = _make_tasks(self.work_path)
+        self.jdata = {"skip_finished_tasks": True, "skip_finished_tasks_nproc": 2}
+
+    def tearDown(self):
+        shutil.rmtree(self.work_path)
+
+    def test_skip(self):
+        run_tasks = _skip_finished_tasks(
+            self.work_path, self.tasks, _vasp_check_fin, self.jdata
+        )
+        self.assertEqual(run_tasks, [self.tasks[1], self.tasks[3]])
+        with open(os.path.join(self.work_path, finished_tasks_record)) as fp:
+            self.assertEqual(
+                sorted(json.load(fp)), ["task.000.000000", "task.000.000002"]
+            )
+
+    def test_record(self):
+        _skip_finished_tasks(self.work_path, self.tasks, _vasp_check_fin, self.jdata)
+        # the recorded tasks are not checked again
+        _write(os.path.join(self.tasks[0], "OUTCAR"), "")
+        _write(os.path.join(self.tasks[1], "OUTCAR"), "Elapsed time")
+        run_tasks = _skip_finished_tasks(
+            self.work_path, self.tasks, _vasp_check_fin, self.jdata
+        )
+        self.assertEqual(run_tasks, [self.tasks[3]])
+        # unless the task is made again
+        shutil.rmtree(self.tasks[2])
+        os.makedirs(self.tasks[2])
+        run_tasks = _skip_finished_tasks(
+            self.work_path, self.tasks, _vasp_check_fin, self.jdata
+        )
+        self.assertEqual(run_tasks, [self.tasks[2], self.tasks[3]])
+
+    def test_disabled(self):
+        run_tasks = _skip_finished_tasks(
+            self.work_path, self.tasks, _vasp_check_fin, {}
+        )
+        self.assertEqual(run_tasks, self.tasks)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.work_path, finished_tasks_record))
+        )
+
+
+class TestMakeSubmissionSkipFinished(unittest.TestCase):
+    def setUp(self):
+        self.work_path = tempfile.mkdtemp()
+        self.remote_root = tempfile.mkdtemp()
+        self.tasks = _make_tasks(self.work_path)
+        for ii in self.tasks:
+            _write(os.path.join(ii, "POSCAR"), "")
+        self.jdata = {"skip_finished_tasks": True}
+        self.make = functools.partial(
+            make_submission,
+            {
+                "batch_type": "Shell",
+                "context_type": "LocalContext",
+                "local_root": "./",
+                "remote_root": self.remote_root,
+            },
+            {
+                "number_node": 1,
+                "cpu_per_node": 1,
+                "gpu_per_node": 0,
+                "queue_name": "",
+                "group_size": 1,
+            },
+            commands=["true"],
+            work_path=self.work_path,
+            group_size=1,
+            forward_common_files=[],
+            forward_files=["POSCAR"],
+            backward_files=["OUTCAR"],
+            outlog="log",
+            errlog="log",
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.work_path)
+        shutil.rmtree(self.remote_root)
+
+    def _make(self):
+        return _make_submission_skip_finished(
+            self.make, self.work_path, self.tasks, _vasp_check_fin, self.jdata
+        )
+
+    def _task_paths(self, submission):
+        return sorted(task.task_work_path for task in submission.belonging_tasks)
+
+    def test_skip(self):
+        submission = self._make()
+        self.assertEqual(
+            self._task_paths(submission), ["task.000.000001", "task.000.000003"]
+        )
+
+    def test_restart(self):
+        # a previous run submitted all the tasks and was killed before they
+        # finished; the restart recovers its record instead of submitting the
+        # unfinished tasks again
+        previous = self.make(run_tasks=[os.path.basename(ii) for ii in self.tasks])
+        previous.generate_jobs()
+        previous.upload_jobs()
+        previous.submission_to_json()
+        submission = self._make()
+        self.assertEqual(submission.submission_hash, previous.submission_hash)
+        self.assertEqual(
+            self._task_paths(submission), [os.path.basename(ii) for ii in self.tasks]
+        )
+        self.assertEqual(
+            submission.machine.context.remote_root,
+            previous.machine.context.remote_root,
+        )
+
+    def test_all_finished(self):
+        for ii in self.tasks:
+            _write(os.path.join(ii, "OUTCAR"), "Elapsed time")
+        self.assertIsNone(self._make())
+
+
+class TestCheckFin(unittest.TestCase):
+    def setUp(self):
+        self.task = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.task)
+
+    def test_train(self):
+        _write(os.path.join(self.task, "frozen_model.pb"), "")
+        self.assertFalse(_train_check_fin(self.task))
+        _write(os.path.join(self.task, "lcurve.out"), "")
+        self.assertTrue(_train_check_fin(self.task))
+        self.assertFalse(_train_check_fin(self.task, suffix=".pth"))
+        self.assertFalse(_train_check_fin(self.task, compress=True))
+
+    def test_lammps(self):
+        log = os.path.join(self.task, "model_devi.log")
+        self.assertFalse(_lammps_check_fin(self.task))
+        _write(log, "Step Temp\n" * 10000)
+        self.assertFalse(_lammps_check_fin(self.task))
+        _write(log, "Step Temp\n" * 10000 + "Total wall time: 0:00:10\n")
+        self.assertTrue(_lammps_check_fin(self.task))
+        self.assertFalse(_lammps_check_fin(self.task, nbeads=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
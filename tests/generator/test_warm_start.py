@@ -0,0 +1,163 @@
+import json
+import os
+import shutil
+import sys
+import unittest
+
+import dpdata
+import numpy as np
+from pymatgen.io.vasp import Incar
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "generator"
+from dpgen.generator.lib.fingerprint import (
+    farthest_point_sampling,
+    pick_nearest,
+    structure_fingerprint,
+)
+
+from .context import (
+    make_fp_vasp_warm_start,
+    make_vasp_incar,
+    param_file,
+    setUpModule,  # noqa: F401
+)
+
+
+def _make_system(coords, cell=None):
+    return dpdata.System(
+        data={
+            "atom_names": ["Mg", "Al"],
+            "atom_numbs": [2, 2],
+            "atom_types": np.array([0, 0, 1, 1]),
+            "orig": np.zeros(3),
+            "cells": (4.0 * np.eye(3) if cell is None else cell)[None],
+            "coords": np.array(coords)[None],
+        }
+    )
+
+
+class TestFingerprint(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.cell = 4.0 * np.eye(3)
+        self.coords = rng.uniform(0.0, 4.0, size=(4, 3))
+        self.atom_types = np.array([0, 0, 1, 1])
+
+    def test_invariance(self):
+        ref = structure_fingerprint(self.cell, self.coords, self.atom_types, 2)
+        perm = [2, 0, 3, 1]
+        shift = np.array([[4.0, 0.0, 0.0], [0.0] * 3, [0.0, -4.0, 4.0], [0.0] * 3])
+        np.testing.assert_allclose(
+            structure_fingerprint(
+                self.cell, (self.coords + shift)[perm], self.atom_types[perm], 2
+            ),
+            ref,
+            atol=1e-12,
+        )
+
+    def test_supercell(self):
+        # the periodic images beyond the minimum image are counted
+        ref = structure_fingerprint(self.cell, self.coords, self.atom_types, 2)
+        shifts = np.array(
+            [[ii, jj, kk] for ii in range(2) for jj in range(2) for kk in range(2)]
+        )
+        coords = (self.coords[None] + 4.0 * shifts[:, None]).reshape(-1, 3)
+        np.testing.assert_allclose(
+            structure_fingerprint(
+                2 * self.cell, coords, np.tile(self.atom_types, len(shifts)), 2
+            ),
+            ref,
+            atol=1e-10,
+        )
+
+    def test_pick_nearest(self):
+        ref = structure_fingerprint(self.cell, self.coords, self.atom_types, 2)
+        candidates = []
+        for ii, scale in enumerate([0.3, 0.01, 0.1]):
+            coords = self.coords + scale * np.ones((4, 3)) * [1, -1, 0, 0.5][ii]
+            coords[0] += scale
+            candidates.append(
+                (
+                    f"task.{ii}",
+                    self.cell,
+                    structure_fingerprint(self.cell, coords, self.atom_types, 2),
+                )
+            )
+        self.assertEqual(pick_nearest(ref, self.cell, candidates, 0.05), "task.1")
+        # the cells differ too much
+        self.assertIsNone(pick_nearest(ref, self.cell * 1.1, candidates, 0.05))
+
+    def test_farthest_point_sampling(self):
+        # two clusters of duplicates and an outlier
+        points = np.array([[0.0, 0.0]] * 3 + [[1.0, 0.0]] * 3 + [[0.0, 5.0]])
+        selected = farthest_point_sampling(points, 3)
+        self.assertEqual(selected.tolist(), [0, 6, 3])
+        # the duplicates are picked once there is nothing else
+        selected = farthest_point_sampling(points, 5)
+        self.assertEqual(len(set(selected.tolist())), 5)
+        self.assertEqual(len(farthest_point_sampling(points, 10)), 7)
+
+
+class TestMakeFPVaspWarmStart(unittest.TestCase):
+    def setUp(self):
+        with open(param_file) as fp:
+            self.jdata = json.load(fp)
+        self.jdata["fp_warm_start"] = True
+        for ii in ["iter.000000", "iter.000001"]:
+            if os.path.isdir(ii):
+                shutil.rmtree(ii)
+        rng = np.random.default_rng(0)
+        self.coords = rng.uniform(0.0, 4.0, size=(2, 4, 3))
+        # the tasks of iteration 0; the third one has no WAVECAR, and the
+        # last one, nearest to the second new task, is not converged
+        for ii, coords in enumerate(
+            [*self.coords, self.coords[0], self.coords[0] - 0.01]
+        ):
+            task = os.path.join("iter.000000/02.fp", f"task.000.{ii:06d}")
+            os.makedirs(task)
+            _make_system(coords).to("vasp/poscar", os.path.join(task, "POSCAR"))
+            if ii != 2:
+                with open(os.path.join(task, "WAVECAR"), "w") as fp:
+                    fp.write("WAVECAR")
+            with open(os.path.join(task, "OUTCAR"), "w") as fp:
+                if ii < 3:
+                    fp.write(" aborting loop because EDIFF is reached \n")
+                else:
+                    fp.write(" aborting loop EDIFF was not reached (unconverged) \n")
+                fp.write(" Elapsed time (sec): 1.0\n")
+        # the new tasks of iteration 1
+        cells = [None, None, 4.5 * np.eye(3)]
+        for ii, (coords, cell) in enumerate(
+            zip([self.coords[1] + 0.01, self.coords[0] - 0.01, self.coords[0]], cells)
+        ):
+            task = os.path.join("iter.000001/02.fp", f"task.000.{ii:06d}")
+            os.makedirs(task)
+            _make_system(coords, cell).to("vasp/poscar", os.path.join(task, "POSCAR"))
+            make_vasp_incar(self.jdata, os.path.join(task, "INCAR"))
+
+    def tearDown(self):
+        shutil.rmtree("iter.000000")
+        shutil.rmtree("iter.000001")
+
+    def test_warm_start(self):
+        make_fp_vasp_warm_start(1, self.jdata)
+        for ii, ref in enumerate(["task.000.000001", "task.000.000000", None]):
+            task = os.path.join("iter.000001/02.fp", f"task.000.{ii:06d}")
+            wavecar = os.path.join(task, "warm_start", "WAVECAR")
+            incar = Incar.from_file(os.path.join(task, "INCAR"))
+            self.assertTrue(incar["LWAVE"])
+            if ref is None:
+                self.assertFalse(os.path.lexists(wavecar))
+                self.assertNotIn("ISTART", incar)
+            else:
+                self.assertEqual(
+                    os.path.realpath(wavecar),
+                    os.path.realpath(os.path.join("iter.000000/02.fp", ref, "WAVECAR")),
+                )
+                self.assertEqual(incar["ISTART"], 1)
+                self.assertEqual(incar["ICHARG"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
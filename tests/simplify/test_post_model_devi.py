@@ -140,3 +140,138 @@ class TestSimplifyModelDevi(unittest.TestCase):
             {},
         )
         assert (self.work_path / "data.picked" / self.system.formula).exists()
+
+
+class TestSimplifyModelDeviPartition(unittest.TestCase):
+    def setUp(self):
+        self.work_path = Path("iter.000001") / dpgen.simplify.simplify.model_devi_name
+        self.work_path.mkdir(exist_ok=True, parents=True)
+        self.nframes = {"H1": 20, "H2": 15}
+        rng = np.random.default_rng(0)
+        header = "\n step max_devi_v min_devi_v avg_devi_v max_devi_f min_devi_f avg_devi_f devi_e"
+        self.f_devi = {}
+        with open(self.work_path / "details", "w") as f:
+            for name, nframes in self.nframes.items():
+                natoms = int(name[1:])
+                # the x coordinate of the first atom records the frame index
+                coords = np.zeros((nframes, natoms, 3), dtype=np.float32)
+                coords[:, 0, 0] = np.arange(nframes)
+                dpdata.System(
+                    data={
+                        "atom_names": ["H"],
+                        "atom_numbs": [natoms],
+                        "atom_types": np.zeros((natoms,), dtype=int),
+                        "coords": coords,
+                        "cells": np.zeros((nframes, 3, 3), dtype=np.float32),
+                        "orig": np.zeros(3, dtype=np.float32),
+                        "nopbc": True,
+                    }
+                ).to_deepmd_npy(self.work_path / "data.rest.old" / name)
+                model_devi = np.zeros((nframes, 8))
+                model_devi[:, 0] = np.arange(nframes)
+                model_devi[:, 4] = rng.uniform(0, 0.3, size=nframes)
+                self.f_devi[name] = model_devi[:, 4]
+                np.savetxt(
+                    f,
+                    model_devi,
+                    fmt=["%12d"] + ["%19.6e" for _ in range(7)],
+                    header="data.rest.old/" + name + header,
+                )
+
+    def tearDown(self):
+        shutil.rmtree("iter.000001", ignore_errors=True)
+
+    def _frames(self, data_name, name):
+        path = self.work_path / data_name / name
+        if not path.exists():
+            return []
+        ss = dpdata.System(str(path), fmt="deepmd/npy")
+        return sorted(ss["coords"][:, 0, 0].astype(int).tolist())
+
+    def test_partition(self):
+        dpgen.simplify.simplify.post_model_devi(
+            1,
+            {
+                "model_devi_f_trust_lo": 0.1,
+                "model_devi_f_trust_hi": 0.2,
+                "model_devi_e_trust_lo": float("inf"),
+                "model_devi_e_trust_hi": float("inf"),
+                "labeled": False,
+                "iter_pick_number": 5,
+            },
+            {},
+        )
+        npicked = 0
+        for name, f_devi in self.f_devi.items():
+            accurate = np.nonzero(f_devi < 0.1)[0].tolist()
+            candidate = np.nonzero((f_devi >= 0.1) & (f_devi < 0.2))[0].tolist()
+            failed = np.nonzero(f_devi >= 0.2)[0].tolist()
+            self.assertEqual(self._frames("data.accurate", name), accurate)
+            picked = self._frames("data.picked", name)
+            rest = self._frames("data.rest", name)
+            npicked += len(picked)
+            self.assertEqual(sorted(picked + rest), sorted(candidate + failed))
+            self.assertTrue(set(picked).issubset(candidate))
+        self.assertEqual(npicked, 5)
+
+    def test_keep_rest(self):
+        jdata = {
+            "model_devi_f_trust_lo": 0.1,
+            "model_devi_f_trust_hi": 0.2,
+            "model_devi_e_trust_lo": float("inf"),
+            "model_devi_e_trust_hi": float("inf"),
+            "labeled": False,
+            "iter_pick_number": 5,
+            "rest_compact_ratio": 0.0,
+        }
+        dpgen.simplify.simplify.post_model_devi(1, jdata, {})
+        rest_path = self.work_path / "data.rest"
+        self.assertTrue(rest_path.is_symlink())
+        with np.load(self.work_path / "rest_status.npz") as data:
+            status = {kk: data[kk] for kk in data.files}
+        picked = []
+        for name, f_devi in self.f_devi.items():
+            self.assertEqual(status[name].size, self.nframes[name])
+            np.testing.assert_array_equal(
+                status[name] == dpgen.simplify.simplify.frame_status["accurate"],
+                f_devi < 0.1,
+            )
+            picked.extend(
+                (name, ii)
+                for ii in np.nonzero(
+                    status[name] == dpgen.simplify.simplify.frame_status["picked"]
+                )[0]
+            )
+            self.assertEqual(
+                self._frames("data.picked", name),
+                sorted(ii for nn, ii in picked if nn == name),
+            )
+        self.assertEqual(len(picked), 5)
+        # the next iteration classifies only the frames left
+        next_path = Path("iter.000002") / dpgen.simplify.simplify.model_devi_name
+        next_path.mkdir(parents=True)
+        os.symlink(rest_path.resolve(), next_path / "data.rest.old")
+        os.symlink(
+            (self.work_path / "rest_status.npz").resolve(),
+            next_path / "rest_status.old.npz",
+        )
+        shutil.copyfile(self.work_path / "details", next_path / "details")
+        jdata["iter_pick_number"] = 100
+        try:
+            dpgen.simplify.simplify.post_model_devi(2, jdata, {})
+            npicked = 0
+            for name in self.nframes:
+                picked2 = dpdata.System(
+                    str(next_path / "data.picked" / name), fmt="deepmd/npy"
+                )
+                frames = picked2["coords"][:, 0, 0].astype(int).tolist()
+                self.assertFalse(set(frames) & {ii for nn, ii in picked if nn == name})
+                npicked += len(frames)
+                self.assertFalse((next_path / "data.accurate" / name).exists())
+            candidate = sum(
+                np.count_nonzero((f_devi >= 0.1) & (f_devi < 0.2))
+                for f_devi in self.f_devi.values()
+            )
+            self.assertEqual(npicked, candidate - 5)
+        finally:
+            shutil.rmtree("iter.000002", ignore_errors=True)
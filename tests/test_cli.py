@@ -1,6 +1,12 @@
+import json
 import subprocess as sp
+import sys
 import unittest
 
+# the budget of `import dpgen.main` in seconds; the lazy imports take a few
+# tens of milliseconds, and importing dpgen.generator.run alone takes seconds
+IMPORT_TIME_BUDGET = 1.0
+
 
 class TestCLI(unittest.TestCase):
     def test_cli(self):
@@ -14,3 +20,46 @@ class TestCLI(unittest.TestCase):
             "autotest",
         ):
             sp.check_output(["dpgen", subcommand, "-h"])
+
+    def test_lazy_import(self):
+        # the subcommand modules and their heavy dependencies are imported
+        # only when the subcommand is run
+        heavy_modules = [
+            "dpdata",
+            "pymatgen",
+            "ase",
+            "scipy",
+            "h5py",
+            "custodian",
+            "dpdispatcher",
+            "dpgen.data.gen",
+            "dpgen.data.surf",
+            "dpgen.data.reaction",
+            "dpgen.generator.run",
+            "dpgen.simplify.simplify",
+            "dpgen.auto_test.run",
+            "dpgen.collect.collect",
+            "dpgen.database.run",
+            "dpgen.tools.run_report",
+            "dpgen.tools.auto_gen_param",
+        ]
+        code = (
+            "import json, sys\n"
+            "import dpgen.main\n"
+            "parser = dpgen.main.main_parser()\n"
+            f"print(json.dumps([m for m in {heavy_modules!r} if m in sys.modules]))\n"
+        )
+        imported = json.loads(sp.check_output([sys.executable, "-c", code]))
+        self.assertEqual(imported, [])
+
+    def test_import_time(self):
+        # the best of a few runs, so that a loaded machine does not fail it
+        code = (
+            "import time\n"
+            "t0 = time.perf_counter()\n"
+            "import dpgen.main\n"
+            "parser = dpgen.main.main_parser()\n"
+            "print(time.perf_counter() - t0)\n"
+        )
+        dt = min(float(sp.check_output([sys.executable, "-c", code])) for _ in range(3))
+        self.assertLess(dt, IMPORT_TIME_BUDGET)
@@ -1,9 +1,11 @@
 import json
+import shutil
 import tempfile
 import unittest
 from pathlib import Path
 
 import dpdata
+import numpy as np
 
 from dpgen.collect.collect import collect_data
 
@@ -35,3 +37,110 @@ class TestCollectData(unittest.TestCase):
             collect_data(inpdir, param_file.name, outdir, verbose=True)
             ms = dpdata.MultiSystems().from_deepmd_npy(outdir)
             self.assertEqual(ms.get_nframes(), self.data.get_nframes() * 3)
+
+    def test_collect_data_chunked(self):
+        with (
+            tempfile.TemporaryDirectory() as inpdir,
+            tempfile.TemporaryDirectory() as outdir,
+            tempfile.TemporaryDirectory() as refdir,
+            tempfile.NamedTemporaryFile() as param_file,
+        ):
+            data = self.data.copy()
+            data.data["atom_names"] = ["H", "O"]
+            data.data["atom_numbs"] = [2, 2]
+            data.data["atom_types"] = np.array([0, 1, 0, 1])
+            data.to_deepmd_npy(Path(inpdir) / "iter.000000" / "02.fp" / "data.000")
+            data.to_deepmd_npy(
+                Path(inpdir) / "iter.000001" / "02.fp" / "data.000" / "aa"
+            )
+            # the atoms in another order are sorted before merging
+            sorted_data = data.sub_system(range(2))
+            sorted_data.sort_atom_types()
+            sorted_data.to_deepmd_npy(
+                Path(inpdir) / "iter.000001" / "02.fp" / "data.001"
+            )
+            data.to_deepmd_npy(Path(inpdir) / "init")
+            with open(param_file.name, "w") as fp:
+                json.dump(
+                    {
+                        "sys_configs": ["sys1", "sys2"],
+                        "model_devi_jobs": [{}, {}],
+                        "init_data_sys": ["init"],
+                    },
+                    fp,
+                )
+
+            collect_data(inpdir, param_file.name, refdir, shuffle=False)
+            collect_data(
+                inpdir,
+                param_file.name,
+                outdir,
+                shuffle=False,
+                chunk_size=3,
+                nproc=2,
+            )
+            self.assertEqual(
+                sorted(p.name for p in Path(outdir).iterdir()),
+                sorted(p.name for p in Path(refdir).iterdir()),
+            )
+            for sys_dir in Path(refdir).iterdir():
+                ref = dpdata.LabeledSystem(sys_dir, fmt="deepmd/npy")
+                ret = dpdata.LabeledSystem(
+                    Path(outdir) / sys_dir.name, fmt="deepmd/npy"
+                )
+                self.assertEqual(
+                    len(list((Path(outdir) / sys_dir.name).glob("set.*"))),
+                    (ref.get_nframes() + 2) // 3,
+                )
+                self.assertEqual(ret.formula, ref.formula)
+                np.testing.assert_array_equal(ret["atom_types"], ref["atom_types"])
+                for kk in ["coords", "cells", "energies", "forces"]:
+                    np.testing.assert_allclose(ret[kk], ref[kk])
+
+            # the shuffled frames are a permutation of the frames
+            shutil.rmtree(outdir)
+            collect_data(inpdir, param_file.name, outdir, chunk_size=3)
+            for sys_dir in Path(refdir).glob("sys.*"):
+                ref = dpdata.LabeledSystem(sys_dir, fmt="deepmd/npy")
+                ret = dpdata.LabeledSystem(
+                    Path(outdir) / sys_dir.name, fmt="deepmd/npy"
+                )
+                np.testing.assert_allclose(
+                    np.sort(ret["energies"]), np.sort(ref["energies"])
+                )
+
+    def test_collect_data_cached(self):
+        # the labels taken from the fp cache are written to data.cached.*
+        with (
+            tempfile.TemporaryDirectory() as inpdir,
+            tempfile.TemporaryDirectory() as outdir,
+            tempfile.NamedTemporaryFile() as param_file,
+        ):
+            fp_path = Path(inpdir) / "iter.000000" / "02.fp"
+            self.data.to_deepmd_npy(fp_path / "data.001")
+            dpdata.MultiSystems(self.data.sub_system(range(2))).to_deepmd_npy(
+                fp_path / "data.cached.001"
+            )
+            with open(param_file.name, "w") as fp:
+                json.dump(
+                    {"sys_configs": ["sys1", "sys2"], "model_devi_jobs": [{}]}, fp
+                )
+
+            nframes = self.data.get_nframes() + 2
+            for merge in (True, False):
+                for chunk_size in (None, 3):
+                    collect_data(
+                        inpdir,
+                        param_file.name,
+                        outdir,
+                        verbose=True,
+                        merge=merge,
+                        chunk_size=chunk_size,
+                    )
+                    ms = dpdata.MultiSystems().from_deepmd_npy(outdir)
+                    self.assertEqual(ms.get_nframes(), nframes)
+                    if not merge:
+                        self.assertEqual(
+                            [p.name for p in Path(outdir).iterdir()], ["sys.001"]
+                        )
+                    shutil.rmtree(outdir)
@@ -0,0 +1,34 @@
+import unittest
+from pathlib import Path
+
+import dpdata
+import numpy as np
+
+from dpgen.util import concat_multi_systems, concat_systems
+
+this_directory = Path(__file__).parent
+
+
+class TestConcatSystems(unittest.TestCase):
+    def setUp(self):
+        self.system = dpdata.LabeledSystem(
+            this_directory / "generator" / "data" / "deepmd", fmt="deepmd/raw"
+        )
+        self.frames = [self.system[ii] for ii in range(self.system.get_nframes())]
+
+    def test_concat(self):
+        ref = self.frames[0].copy()
+        for ss in self.frames[1:]:
+            ref.append(ss)
+        all_sys = concat_systems([dpdata.LabeledSystem(), *self.frames])
+        self.assertEqual(all_sys.get_nframes(), ref.get_nframes())
+        for kk in ["cells", "coords", "energies", "forces"]:
+            np.testing.assert_allclose(all_sys[kk], ref[kk])
+
+    def test_concat_empty(self):
+        self.assertIsNone(concat_systems([dpdata.LabeledSystem()]))
+
+    def test_concat_multi_systems(self):
+        all_sys = concat_multi_systems(self.frames)
+        self.assertEqual(len(all_sys), 1)
+        self.assertEqual(all_sys.get_nframes(), self.system.get_nframes())
@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import dpdata
+import h5py
+import numpy as np
+
+from dpgen.util import convert_training_data_to_hdf5
+
+this_directory = Path(__file__).parent
+
+
+class TestHDF5Store(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+        system = dpdata.LabeledSystem(
+            this_directory / "generator" / "data" / "deepmd", fmt="deepmd/raw"
+        )
+        self.systems = {"sys0": system, "sys1": system.sub_system([0, 1])}
+        for kk, ss in self.systems.items():
+            ss.to("deepmd/npy", os.path.join("data", kk))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def _convert(self, iter_name, systems, store_file="store.hdf5"):
+        os.makedirs(iter_name)
+        os.symlink(os.path.abspath("data"), os.path.join(iter_name, "data"))
+        input_file = os.path.join(iter_name, "input.json")
+        with open(input_file, "w") as f:
+            json.dump(
+                {
+                    "training": {
+                        "training_data": {
+                            "systems": [os.path.join("data", ss) for ss in systems]
+                        }
+                    }
+                },
+                f,
+            )
+        convert_training_data_to_hdf5(
+            [input_file], os.path.join(iter_name, "data.hdf5"), store_file=store_file
+        )
+        with open(input_file) as f:
+            return json.load(f)["training"]["training_data"]["systems"]
+
+    def _ingested(self):
+        with h5py.File("store.hdf5", "r") as f:
+            return json.loads(f.attrs["ingested"])
+
+    def test_append(self):
+        self._convert("iter.000", ["sys0"])
+        ingested0 = self._ingested()
+        self.assertEqual(list(ingested0.keys()), ["data/sys0"])
+        with h5py.File("store.hdf5", "r") as f:
+            dset = f["data/sys0/set.000/coord.npy"]
+            self.assertIsNotNone(dset.chunks)
+            self.assertEqual(dset.compression, "gzip")
+        p_sys = self._convert("iter.001", ["sys0", "sys1"])
+        self.assertEqual(p_sys, ["data.hdf5#/data/sys0", "data.hdf5#/data/sys1"])
+        self.assertEqual(self._ingested()["data/sys0"], ingested0["data/sys0"])
+        for kk, pp in zip(["sys0", "sys1"], p_sys):
+            ss = dpdata.LabeledSystem(os.path.join("iter.001", pp), fmt="deepmd/hdf5")
+            self.assertEqual(ss.get_nframes(), self.systems[kk].get_nframes())
+            np.testing.assert_allclose(ss["coords"], self.systems[kk]["coords"])
+            np.testing.assert_allclose(ss["forces"], self.systems[kk]["forces"])
+
+    def test_changed_system(self):
+        self._convert("iter.000", ["sys0", "sys1"])
+        self.systems["sys1"] = self.systems["sys0"].sub_system([0, 1, 2])
+        self.systems["sys1"].to("deepmd/npy", os.path.join("data", "sys1"))
+        os.utime(os.path.join("data", "sys1", "set.000", "coord.npy"), ns=(0, 0))
+        p_sys = self._convert("iter.001", ["sys0", "sys1"])
+        ss = dpdata.LabeledSystem(os.path.join("iter.001", p_sys[1]), fmt="deepmd/hdf5")
+        self.assertEqual(ss.get_nframes(), 3)
+        # the data of the previous iteration is kept
+        ss = dpdata.LabeledSystem(os.path.join("iter.000", p_sys[1]), fmt="deepmd/hdf5")
+        self.assertEqual(ss.get_nframes(), 2)
+        # the space of the replaced system is freed
+        self._convert("iter.fresh", ["sys0", "sys1"], store_file="fresh.hdf5")
+        self.assertLessEqual(
+            os.path.getsize("store.hdf5"), os.path.getsize("fresh.hdf5")
+        )
+
+    def test_link(self):
+        self._convert("iter.000", ["sys0"])
+        self.assertTrue(os.path.samefile("store.hdf5", "iter.000/data.hdf5"))
+        p_sys = self._convert("iter.001", ["sys0", "sys1"])
+        self.assertTrue(os.path.samefile("store.hdf5", "iter.001/data.hdf5"))
+        # the groups appended later do not change the data given before
+        ss = dpdata.LabeledSystem(os.path.join("iter.000", p_sys[0]), fmt="deepmd/hdf5")
+        self.assertEqual(ss.get_nframes(), self.systems["sys0"].get_nframes())
+
+    def test_stale_system(self):
+        p_sys = self._convert("iter.000", ["sys0", "sys1"])
+        self._convert("iter.001", ["sys0"])
+        self.assertEqual(list(self._ingested().keys()), ["data/sys0"])
+        with h5py.File("store.hdf5", "r") as f:
+            self.assertNotIn("data/sys1", f)
+        self.assertTrue(os.path.samefile("store.hdf5", "iter.001/data.hdf5"))
+        # the data of the previous iteration is kept
+        ss = dpdata.LabeledSystem(os.path.join("iter.000", p_sys[1]), fmt="deepmd/hdf5")
+        self.assertEqual(ss.get_nframes(), 2)
+        self._convert("iter.fresh", ["sys0"], store_file="fresh.hdf5")
+        self.assertLessEqual(
+            os.path.getsize("store.hdf5"), os.path.getsize("fresh.hdf5")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
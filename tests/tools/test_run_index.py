@@ -0,0 +1,167 @@
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+test_dir = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.join(test_dir, ".."))
+__package__ = "tools"
+from dpgen.tools.relabel import create_tasks
+from dpgen.tools.run_index import update_index
+
+from .context import (
+    setUpModule,  # noqa: F401
+    stat_sys,
+)
+
+
+class TestRunIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.job_dir = os.path.join(self.tmpdir, "job")
+        shutil.copytree(
+            os.path.join(test_dir, "run_report_test_output"),
+            self.job_dir,
+            symlinks=True,
+        )
+        self.md_task = os.path.join(
+            self.job_dir, "iter.000000", "01.model_devi", "task.000.000017"
+        )
+        with open(os.path.join(self.md_task, "model_devi.out"), "w") as fp:
+            fp.write("# step max_devi_v min_devi_v avg_devi_v max_devi_f\n")
+            fp.write("0 0.01 0.0 0.0 0.02\n")
+            fp.write("20 0.11 0.0 0.0 0.25\n")
+        with open(os.path.join(self.md_task, "log.lammps"), "w") as fp:
+            fp.write("Total wall time: 1:02:03\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_fp_tasks(self):
+        conn = update_index(self.job_dir)
+        rows = conn.execute(
+            "SELECT sys_idx, model_devi_task, frame, ens, temp, pres, "
+            "max_devi_v, max_devi_f FROM fp_tasks WHERE task = 'task.000.000000'"
+        ).fetchall()
+        self.assertEqual(
+            rows, [(0, "task.000.000017", 20, "npt", 50.0, 2.0, 0.11, 0.25)]
+        )
+        ((wall_time,),) = conn.execute(
+            "SELECT wall_time FROM model_devi_tasks WHERE task = 'task.000.000017'"
+        )
+        self.assertEqual(wall_time, 3723)
+        conn.close()
+        # the model deviation is read through its binary sidecar
+        self.assertTrue(os.path.isfile(os.path.join(self.md_task, "model_devi.npy")))
+
+    def test_fp_converged(self):
+        fp_path = os.path.join(self.job_dir, "iter.000000", "02.fp")
+        outcar = (
+            " running on    4 total cores\n"
+            "------------------------ aborting loop {} -----------------------\n"
+            " Total CPU time used (sec):       12.5\n"
+            " Elapsed time (sec):       13.0\n"
+        )
+        with open(os.path.join(fp_path, "task.000.000000", "OUTCAR"), "w") as fp:
+            fp.write(outcar.format("because EDIFF is reached"))
+        with open(os.path.join(fp_path, "task.000.000001", "OUTCAR"), "w") as fp:
+            fp.write(outcar.format("because of NELM"))
+        conn = update_index(self.job_dir)
+        rows = conn.execute(
+            "SELECT task, converged, wall_time, cores FROM fp_tasks WHERE has_outcar"
+        ).fetchall()
+        self.assertEqual(
+            rows,
+            [("task.000.000000", 1, 12.5, 4), ("task.000.000001", 0, 12.5, 4)],
+        )
+        conn.close()
+
+    def test_incremental(self):
+        # the iteration is not finished and is scanned again
+        update_index(self.job_dir).close()
+        os.remove(os.path.join(self.md_task, "log.lammps"))
+        conn = update_index(self.job_dir)
+        self.assertEqual(conn.execute("SELECT * FROM iterations").fetchall(), [])
+        ((wall_time,),) = conn.execute(
+            "SELECT wall_time FROM model_devi_tasks WHERE task = 'task.000.000017'"
+        )
+        self.assertIsNone(wall_time)
+        conn.close()
+        # the finished iteration is scanned only once
+        with open(os.path.join(self.job_dir, "record.dpgen"), "w") as fp:
+            fp.write("0 8\n")
+        update_index(self.job_dir).close()
+        for ff in glob.glob(
+            os.path.join(self.job_dir, "iter.000000", "01.model_devi", "*", "*")
+        ):
+            if not os.path.isdir(ff):
+                os.remove(ff)
+        _, sys_count, sys_all = stat_sys(self.job_dir, verbose=False, mute=True)
+        self.assertEqual(sys_count, [8, 8])
+        self.assertEqual(sys_all[0][0], ["npt", 50.0, 1.0, 4])
+        # the removed iteration is dropped from the index
+        shutil.rmtree(os.path.join(self.job_dir, "iter.000000"))
+        _, sys_count, _ = stat_sys(self.job_dir, verbose=False, mute=True)
+        self.assertEqual(sys_count, [0, 0])
+
+    def test_rerun(self):
+        with open(os.path.join(self.job_dir, "record.dpgen"), "w") as fp:
+            fp.write("0 8\n")
+        update_index(self.job_dir).close()
+        # the iteration is rolled back in record.dpgen
+        with open(os.path.join(self.job_dir, "record.dpgen"), "w") as fp:
+            fp.write("0 5\n")
+        conn = update_index(self.job_dir)
+        self.assertEqual(conn.execute("SELECT * FROM iterations").fetchall(), [])
+        conn.close()
+        # and rerun, where the fp tasks are made again
+        with open(os.path.join(self.job_dir, "record.dpgen"), "w") as fp:
+            fp.write("0 8\n")
+        fp_path = os.path.join(self.job_dir, "iter.000000", "02.fp")
+        shutil.move(fp_path, fp_path + ".bk000")
+        os.makedirs(os.path.join(fp_path, "task.000.000000"))
+        conn = update_index(self.job_dir)
+        self.assertEqual(
+            conn.execute("SELECT task FROM fp_tasks").fetchall(),
+            [("task.000.000000",)],
+        )
+        self.assertEqual(len(conn.execute("SELECT * FROM iterations").fetchall()), 1)
+        conn.close()
+
+    def test_relabel(self):
+        fp_path = os.path.join(self.job_dir, "iter.000000", "02.fp")
+        for task in os.listdir(fp_path):
+            with open(os.path.join(fp_path, task, "POSCAR"), "w") as fp:
+                fp.write(task)
+        fp_json = os.path.join(self.tmpdir, "fp.json")
+        with open(fp_json, "w") as fp:
+            json.dump(
+                {
+                    "fp_style": "cp2k",
+                    "fp_pp_path": ".",
+                    "fp_pp_files": [],
+                    "fp_params": {},
+                },
+                fp,
+            )
+        output = os.path.join(self.tmpdir, "relabel")
+        create_tasks(
+            self.job_dir, "param.json", output, fp_json, verbose=False, numb_iter=1
+        )
+        task = os.path.join(output, "system.000", "task.000000")
+        with open(os.path.join(task, "POSCAR")) as fp:
+            self.assertEqual(fp.read(), "task.000.000000")
+        with open(os.path.join(task, "record")) as fp:
+            self.assertEqual(
+                fp.read().splitlines()[1],
+                "iter: 000000   system: 000   model_devi_task: task.000.000017   "
+                "frame:     20   fp_task: task.000.000000   ens: npt   "
+                "temp:      50.00   pres:       2.00",
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,6 +13,11 @@ from .context import (
 
 
 class TestRunReport(unittest.TestCase):
+    def tearDown(self):
+        index = os.path.join(test_dir, "run_report_test_output", "run_index.db")
+        if os.path.isfile(index):
+            os.remove(index)
+
     def test_stat_sys(self):
         folder = "run_report_test_output"
         sys, sys_count, sys_all = stat_sys(